@@ -67,7 +67,7 @@ import re
 import getpass
 from datetime import datetime
 from subprocess import CalledProcessError
-from taucmdr import logger, util, TAUCMDR_SCRIPT
+from taucmdr import logger, util, timing, TAUCMDR_SCRIPT
 from taucmdr.error import ConfigurationError
 from taucmdr.cf.objects import TrackedInstance, KeyedRecord
 
@@ -259,6 +259,7 @@ class _CompilerFamily(TrackedInstance):
         return "_CompilerFamily(%s)" % self.name
 
     @classmethod
+    @timing.traced('compiler family probe')
     def probe(cls, absolute_path, candidates=None):
         """Determine the compiler family of a given command.
 
@@ -538,6 +539,7 @@ class InstalledCompiler(metaclass=InstalledCompilerCreator):
                 raise ConfigurationError("Compiler '%s' is a %s compiler, not a %s compiler." %
                                          (absolute_path, probed_family.name, info.family.name))
 
+    @timing.traced('compiler wrapper probe')
     def _probe_wrapper(self):
         if not self.info.family.show_wrapper_flags:
             return None
@@ -617,6 +619,7 @@ class InstalledCompiler(metaclass=InstalledCompilerCreator):
         LOGGER.debug("Wrapper libraries: %s", self.libraries)
 
     @classmethod
+    @timing.traced('compiler probe')
     def probe(cls, command, family=None, role=None):
         """Probe the system to discover information about an installed compiler.
 
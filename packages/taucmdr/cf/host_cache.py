@@ -0,0 +1,273 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Persistent cache of host detection results.
+
+Detecting the host architecture and operating system and resolving commands on the PATH
+all probe the filesystem, and every `tau` process used to repeat that work.  This module
+stores those results in user-level storage so later processes on the same host can skip it.
+
+Cached values are keyed by a fingerprint of the host: the hostname, the kernel release,
+and the environment variables that influence detection (e.g. PATH).  A change in any of
+these selects a different cache entry, so stale results are never returned.  The cache
+file may be shared by many hosts (e.g. a home directory mounted on every node of a cluster)
+so only the most recently used entries are retained.
+"""
+
+import os
+import json
+import time
+import atexit
+import socket
+import hashlib
+import tempfile
+import threading
+from taucmdr import USER_PREFIX, TAUCMDR_VERSION
+from taucmdr import logger
+
+LOGGER = logger.get_logger(__name__)
+
+HOST_CACHE_FILE = os.path.join(USER_PREFIX, 'host_cache.json')
+"""str: Absolute path to the host detection cache file."""
+
+FINGERPRINT_ENVIRONMENT = ('PATH', 'CRAYOS_VERSION', 'PE_ENV')
+"""tuple: Environment variables whose values are part of the host fingerprint."""
+
+MAX_ENTRIES = 32
+"""int: Maximum number of host fingerprints retained in the cache file."""
+
+ATIME_RESOLUTION = 3600
+"""int: Seconds between updates of an entry's last use time when it is only read.
+
+Reading an entry marks it as used so it isn't evicted, but the cache file is only rewritten
+for that reason if the recorded time is older than this, not on every read.
+"""
+
+
+def host_fingerprint(env=None):
+    """Calculate a string that identifies the host and the detection-relevant environment.
+
+    Args:
+        env (dict): Environment variables.  Defaults to :any:`os.environ`.
+
+    Returns:
+        str: A string of hexadecimal digits.
+    """
+    env = os.environ if env is None else env
+    parts = [TAUCMDR_VERSION, socket.gethostname(), os.uname().release]
+    parts.extend(f"{key}={env.get(key, '')}" for key in FINGERPRINT_ENVIRONMENT)
+    return hashlib.sha1('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+class HostCache:
+    """A small persistent key/value store keyed by host fingerprint.
+
+    The cache file is read on first access and written back atomically when the
+    process exits, and only if something changed.  Only the values this process set
+    are merged into the file as it is on disk at that time, so values written by other
+    processes in the meantime are kept.  Two processes that flush at the same instant
+    may still lose one update, which costs nothing but a repeated detection on the next run.
+
+    Attributes:
+        path (str): Absolute path to the cache file.
+        enabled (bool): If False then nothing is read from or written to disk.
+    """
+
+    def __init__(self, path, enabled=True):
+        self.path = path
+        self.enabled = enabled
+        self._entries = None
+        self._changes = set()
+        self._touched = set()
+        self._cleared = False
+        self._lock = threading.Lock()
+        self._fingerprint_key = None
+        self._fingerprint = None
+
+    def _load(self):
+        if self._entries is None:
+            entries = {}
+            if self.enabled:
+                try:
+                    with open(self.path) as fin:
+                        entries = json.load(fin)
+                except (OSError, ValueError) as err:
+                    LOGGER.debug("Host cache '%s' not loaded: %s", self.path, err)
+                if not isinstance(entries, dict):
+                    entries = {}
+            self._entries = entries
+        return self._entries
+
+    def _current_fingerprint(self):
+        key = (os.environ.get(var) for var in FINGERPRINT_ENVIRONMENT)
+        key = tuple(key)
+        if key != self._fingerprint_key:
+            self._fingerprint_key = key
+            self._fingerprint = host_fingerprint()
+        return self._fingerprint
+
+    def _entry(self, create=False):
+        entries = self._load()
+        fingerprint = self._current_fingerprint()
+        entry = entries.get(fingerprint)
+        if entry is None and create:
+            entry = entries[fingerprint] = {}
+        elif entry is not None and time.time() - entry.get('_atime', 0) > ATIME_RESOLUTION:
+            self._touched.add(fingerprint)
+        return entry
+
+    def get(self, key, default=None):
+        """Get a cached value for the current host.
+
+        Args:
+            key (str): Name of the cached value.
+            default: Value to return if `key` is not cached.
+
+        Returns:
+            The cached value or `default`.
+        """
+        with self._lock:
+            entry = self._entry()
+            if entry is None:
+                return default
+            return entry.get(key, default)
+
+    def set(self, key, value):
+        """Cache a value for the current host.
+
+        Args:
+            key (str): Name of the cached value.
+            value: Any JSON-serializable value.
+        """
+        with self._lock:
+            entry = self._entry(create=True)
+            if entry.get(key) != value:
+                entry[key] = value
+                self._changes.add((self._current_fingerprint(), key, None))
+
+    def get_item(self, key, item, default=None):
+        """Get an item from a cached dictionary for the current host.
+
+        Args:
+            key (str): Name of the cached dictionary.
+            item (str): Key in the cached dictionary.
+            default: Value to return if `item` is not cached.
+
+        Returns:
+            The cached value or `default`.
+        """
+        with self._lock:
+            entry = self._entry()
+            if entry is None:
+                return default
+            return entry.get(key, {}).get(item, default)
+
+    def set_item(self, key, item, value):
+        """Set an item in a cached dictionary for the current host.
+
+        Args:
+            key (str): Name of the cached dictionary.
+            item (str): Key in the cached dictionary.
+            value: Any JSON-serializable value.
+        """
+        with self._lock:
+            dct = self._entry(create=True).setdefault(key, {})
+            if dct.get(item) != value:
+                dct[item] = value
+                self._changes.add((self._current_fingerprint(), key, item))
+
+    def clear(self):
+        """Forget all cached values for all hosts."""
+        with self._lock:
+            self._entries = {}
+            self._changes.clear()
+            self._touched.clear()
+            self._cleared = True
+
+    def flush(self):
+        """Write the cache to disk if it has changed.
+
+        The file is replaced atomically so readers never see a partial file.  Only values set by
+        this process and the last use times of entries it used are written; everything else in
+        the file, including values written by other processes since this process loaded the cache,
+        is kept.  If the file holds more than :any:`MAX_ENTRIES` entries the least recently used
+        are evicted.
+        """
+        with self._lock:
+            if not (self.enabled and (self._changes or self._touched or self._cleared)):
+                return
+            merged = {}
+            if not self._cleared:
+                try:
+                    with open(self.path) as fin:
+                        merged = json.load(fin)
+                except (OSError, ValueError):
+                    pass
+                if not isinstance(merged, dict):
+                    merged = {}
+            now = time.time()
+            for fingerprint, key, item in self._changes:
+                value = self._entries[fingerprint][key]
+                entry = merged.get(fingerprint)
+                if not isinstance(entry, dict):
+                    entry = merged[fingerprint] = {}
+                if item is None:
+                    entry[key] = value
+                else:
+                    if not isinstance(entry.get(key), dict):
+                        entry[key] = {}
+                    entry[key][item] = value[item]
+            for fingerprint in self._touched | {change[0] for change in self._changes}:
+                entry = merged.get(fingerprint)
+                if isinstance(entry, dict):
+                    entry['_atime'] = now
+            if len(merged) > MAX_ENTRIES:
+                newest = sorted(merged.items(), key=lambda item: item[1].get('_atime', 0), reverse=True)
+                merged = dict(newest[:MAX_ENTRIES])
+            prefix = os.path.dirname(self.path)
+            try:
+                if not os.path.isdir(prefix):
+                    os.makedirs(prefix)
+                with tempfile.NamedTemporaryFile('w', dir=prefix, prefix='.host_cache', delete=False) as fout:
+                    json.dump(merged, fout)
+                os.replace(fout.name, self.path)
+            except OSError as err:
+                LOGGER.debug("Host cache '%s' not written: %s", self.path, err)
+                try:
+                    os.remove(fout.name)
+                except (OSError, NameError):
+                    pass
+            else:
+                self._entries = merged
+                self._changes.clear()
+                self._touched.clear()
+                self._cleared = False
+
+
+HOST_CACHE = HostCache(HOST_CACHE_FILE, enabled=not os.environ.get('__TAUCMDR_DISABLE_HOST_CACHE__', False))
+"""HostCache: Host detection results for this process, persisted in user-level storage."""
+
+atexit.register(HOST_CACHE.flush)
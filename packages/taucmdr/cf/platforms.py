@@ -33,6 +33,7 @@ import os
 from taucmdr import logger, util
 from taucmdr.error import ConfigurationError
 from taucmdr.cf.objects import KeyedRecord
+from taucmdr.cf.host_cache import HOST_CACHE
 from taucmdr.cf.compiler import host, mpi, shmem
 from taucmdr.cf.compiler.host import HOST_COMPILERS
 from taucmdr.cf.compiler.mpi import MPI_COMPILERS
@@ -69,26 +70,30 @@ class Architecture(KeyedRecord):
 
     @classmethod
     def _parse_proc_cpuinfo(cls):
+        """Parse the first processor stanza of /proc/cpuinfo.
+
+        Only the first processor is needed to identify the architecture so parsing
+        stops at the end of the first stanza rather than reading every core.
+
+        Returns:
+            dict: Field names mapped to values for the first processor.
+        """
         try:
             return cls._cpuinfo
         except AttributeError:
-            cpuinfo = []
-            core = {}
+            core0 = {}
             with open("/proc/cpuinfo") as fin:
                 for line in fin:
-                    if line.startswith('processor'):
-                        core = {}
+                    if not line.strip():
+                        if core0:
+                            break
                         continue
-                    elif core and not line.strip():
-                        cpuinfo.append(core)
-                    else:
-                        key, val = line.split(':')
-                        core[key.strip()] = val.strip()
-            LOGGER.debug("Detected %d processors", len(cpuinfo))
-            cls._cpuinfo = cpuinfo
+                    key, sep, val = line.partition(':')
+                    if sep:
+                        core0[key.strip()] = val.strip()
+            cls._cpuinfo = core0
             return cls._cpuinfo
 
-
     @classmethod
     def detect(cls):
         """Detect the processor architecture we are currently executing on.
@@ -96,7 +101,8 @@ class Architecture(KeyedRecord):
         Mostly relies on Python's platform module but may also probe
         environment variables and file systems in cases where the arch
         isn't immediately known to Python.  These tests may be expensive
-        so the detected value is cached to improve performance.
+        so the detected value is cached in memory and in the persistent
+        host cache to improve performance.
 
         Returns:
             Architecture: The matching architecture description.
@@ -107,13 +113,19 @@ class Architecture(KeyedRecord):
         try:
             return cls._detect
         except AttributeError:
+            try:
+                cls._detect = Architecture.find(HOST_CACHE.get('architecture'))
+            except KeyError:
+                pass
+            else:
+                return cls._detect
             inst = None
             if os.path.exists("/bgsys/drivers/ppcfloor/gnu-linux/bin/powerpc-bgp-linux-gcc"):
                 inst = IBM_BGP
             elif os.path.exists("/bgsys/drivers/ppcfloor/gnu-linux/bin/powerpc64-bgq-linux-gcc"):
                 inst = IBM_BGQ
             elif os.path.exists("/proc/cpuinfo"):
-                core0 = cls._parse_proc_cpuinfo()[0]
+                core0 = cls._parse_proc_cpuinfo()
                 if 'GenuineIntel' in core0.get('vendor_id', ''):
                     model_name = core0.get('model name', '')
                     if 'CoCPU' in model_name:
@@ -128,6 +140,7 @@ class Architecture(KeyedRecord):
                     inst = Architecture.find(python_arch)
                 except KeyError as err:
                     raise ConfigurationError("Host architecture '%s' is not yet supported" % python_arch) from err
+            HOST_CACHE.set('architecture', inst.name)
             cls._detect = inst
             return cls._detect
 
@@ -160,7 +173,8 @@ class OperatingSystem(KeyedRecord):
         Mostly relies on Python's platform module but may also probe
         environment variables and file systems in cases where the arch
         isn't immediately known to Python.  These tests may be expensive
-        so the detected value is cached to improve performance.
+        so the detected value is cached in memory and in the persistent
+        host cache to improve performance.
 
         Returns:
             OperatingSystem: The matching operating system description.
@@ -171,6 +185,12 @@ class OperatingSystem(KeyedRecord):
         try:
             return cls._detect
         except AttributeError:
+            try:
+                cls._detect = OperatingSystem.find(HOST_CACHE.get('operating_system'))
+            except KeyError:
+                pass
+            else:
+                return cls._detect
             if 'CRAYOS_VERSION' in os.environ or 'PE_ENV' in os.environ:
                 inst = CRAY_CNL
             elif HOST_ARCH.is_bluegene():
@@ -182,6 +202,7 @@ class OperatingSystem(KeyedRecord):
                     inst = OperatingSystem.find(python_os)
                 except KeyError as err:
                     raise ConfigurationError("Host operating system '%s' is not yet supported" % python_os) from err
+            HOST_CACHE.set('operating_system', inst.name)
             cls._detect = inst
             return cls._detect
 
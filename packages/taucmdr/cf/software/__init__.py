@@ -36,7 +36,7 @@ class SoftwarePackageError(ConfigurationError):
     message_fmt = ("%(value)s\n"
                    "\n"
                    "%(hints)s\n"
-                   "Please check the selected experiment or send '%(logfile)s' to %(contact)s for assistance.")
+                   "Please check the selected experiment or %(support)s for assistance.")
 
 def get_installation(name):
     module_name = name + '_installation'
@@ -27,22 +27,37 @@
 """Software installation management."""
 
 import os
+import json
+import hashlib
+import tempfile
 import multiprocessing
 from subprocess import CalledProcessError
 from contextlib import contextmanager
-from taucmdr import logger, util
+from concurrent.futures import ThreadPoolExecutor
+from taucmdr import logger, util, timing
 from taucmdr.error import ConfigurationError
 from taucmdr.progress import ProgressIndicator
 from taucmdr.cf.storage import StorageError
 from taucmdr.cf.storage.levels import ORDERED_LEVELS
 from taucmdr.cf.storage.levels import highest_writable_storage
 from taucmdr.cf.software import SoftwarePackageError
+from taucmdr.cf.software.source_store import SourceStore
 from taucmdr.cf import compiler
 from taucmdr.cf.compiler import InstalledCompilerSet
 from taucmdr.cf.platforms import Architecture, OperatingSystem, HOST_OS, DARWIN
 
 LOGGER = logger.get_logger(__name__)
 
+CONFIG_ENVIRONMENT = ('PATH', 'LD_LIBRARY_PATH', 'DYLD_LIBRARY_PATH', 'PROFILEDIR', 'TRACEDIR')
+"""tuple: Environment variables read when calculating compiletime and runtime configurations.
+
+Together with every variable starting with a prefix in :any:`CONFIG_ENVIRONMENT_PREFIXES` these are the
+only variables :any:`ConfigCache` keys on, so unrelated changes like ``PWD`` or ``SHLVL`` still hit the cache.
+"""
+
+CONFIG_ENVIRONMENT_PREFIXES = ('TAU_', 'SCOREP_')
+"""tuple: Prefixes of environment variables read when calculating compiletime and runtime configurations."""
+
 
 def parallel_make_flags(nprocs=None):
     """Flags to enable parallel compilation with `make`.
@@ -78,6 +93,138 @@ def new_os_environ():
         os.environ = old_environ
 
 
+class ConfigCache:
+    """An on-disk memo of :any:`Installation.compiletime_config` and :any:`Installation.runtime_config` results.
+
+    Configuration results are a pure function of the installation, the experiment configuration,
+    and the incoming options and environment, but computing them walks every dependency and may
+    parse the TAU Makefile.  Results are stored as the difference from the incoming environment
+    so the cache file stays small.  The file is rewritten atomically and a lost update from a
+    concurrent process only costs a recomputation.  The cache also records that the installation
+    passed verification, along with the modification times of the files verification depends on,
+    so it need not be verified again before every build or run until one of those files changes.
+
+    Attributes:
+        path (str): Absolute path to the cache file.
+        max_entries (int): Maximum number of results retained in the cache file.
+    """
+
+    def __init__(self, path, *key_parts, max_entries=64):
+        """Initialize the cache.
+
+        Args:
+            path (str): Absolute path to the cache file.
+            *key_parts: JSON-serializable values identifying the configuration, e.g. the installation UID
+                        and the experiment's measurement record.  Results are invalidated if any part changes.
+            max_entries (int): Maximum number of results retained in the cache file.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._base_key = self._digest(key_parts)
+        self._entries = None
+
+    @staticmethod
+    def _digest(parts):
+        data = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path) as fin:
+                    self._entries = json.load(fin)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        prefix = os.path.dirname(self.path)
+        try:
+            util.mkdirp(prefix)
+            with tempfile.NamedTemporaryFile('w', dir=prefix, prefix='.config_cache', delete=False) as fout:
+                json.dump(self._entries, fout)
+            os.replace(fout.name, self.path)
+        except OSError as err:
+            LOGGER.debug("Configuration cache '%s' not written: %s", self.path, err)
+
+    def _put(self, key, entry):
+        entries = self._load()
+        entries[key] = entry
+        while len(entries) > self.max_entries:
+            del entries[next(iter(entries))]
+        self._save()
+
+    @staticmethod
+    def _mtimes(paths):
+        mtimes = {}
+        for path in paths:
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    def is_verified(self):
+        """Check if the installation was verified and the files verification depends on are unchanged.
+
+        Returns:
+            bool: True if :any:`set_verified` was called for this configuration and all its paths
+                  still exist with the modification times recorded then.
+        """
+        mtimes = self._load().get(self._digest([self._base_key, 'verified']))
+        if not isinstance(mtimes, dict) or not mtimes:
+            return False
+        return None not in mtimes.values() and self._mtimes(mtimes) == mtimes
+
+    def set_verified(self, paths):
+        """Record that the installation passed verification.
+
+        Args:
+            paths (list): Files and directories that verification depends on, e.g. the TAU Makefile,
+                          libraries, and compilers.  If any is removed or modified the verification
+                          is no longer trusted.
+        """
+        self._put(self._digest([self._base_key, 'verified']), self._mtimes(paths))
+
+    def memoize(self, kind, key_parts, opts, env, config):
+        """Get a cached configuration result or calculate and cache a new one.
+
+        Only the variables in `env` named by :any:`CONFIG_ENVIRONMENT` or :any:`CONFIG_ENVIRONMENT_PREFIXES`
+        are part of the cache key.  `config` must not read or remove any other variable.
+
+        Args:
+            kind (str): Configuration kind, e.g. 'compiletime' or 'runtime'.
+            key_parts (list): Additional JSON-serializable values that the result depends on.
+            opts (list): Incoming command line options.
+            env (dict): Incoming environment variables.  Defaults to :any:`os.environ`.
+            config: Callable accepting `opts` and `env` and returning the updated (opts, env) tuple.
+
+        Returns:
+            tuple: (opts, env) updated for the new environment.
+        """
+        opts = list(opts) if opts else []
+        env = dict(env if env else os.environ)
+        config_env = sorted(item for item in env.items()
+                            if item[0] in CONFIG_ENVIRONMENT or item[0].startswith(CONFIG_ENVIRONMENT_PREFIXES))
+        key = self._digest([self._base_key, kind, key_parts, opts, config_env])
+        entries = self._load()
+        try:
+            entry = entries[key]
+        except KeyError:
+            pass
+        else:
+            LOGGER.debug("Using cached %s configuration from '%s'", kind, self.path)
+            env.update(entry['set'])
+            for name in entry['unset']:
+                env.pop(name, None)
+            return list(entry['opts']), env
+        new_opts, new_env = config(list(opts), dict(env))
+        self._put(key, {'opts': new_opts,
+                        'set': {name: val for name, val in new_env.items() if env.get(name) != val},
+                        'unset': [name for name in env if name not in new_env]})
+        return new_opts, new_env
+
+
 class Installation:
     """Encapsulates a software package installation.
 
@@ -132,6 +279,7 @@ class Installation:
         assert isinstance(headers, dict) or headers is None
         self._src_prefix = None
         self._install_prefix = None
+        self._build_log = None
         self._include_subdir = 'include'
         self._bin_subdir = 'bin'
         self._lib_subdir = 'lib'
@@ -241,6 +389,47 @@ class Installation:
         else:
             return arch_dct.get(self.target_os, arch_dct.get(None, default))
 
+    def _build_log_path(self):
+        return '%s.build.log' % os.path.normpath(self.install_prefix)
+
+    def _start_build_log(self):
+        """Start a new build log to receive the raw output of :any:`run_build_command`.
+
+        Build output can be many megabytes so it's written straight to a file next to the installation
+        instead of passing through the debug log line by line.  Nothing is written if the debug log is disabled.
+        """
+        self._build_log = None
+        if not logger.DEBUG_LOG_ENABLED:
+            return
+        path = self._build_log_path()
+        try:
+            util.mkdirp(os.path.dirname(path))
+            with open(path, 'wb'):
+                pass
+        except OSError as err:
+            LOGGER.debug("%s build log '%s' not written: %s", self.title, path, err)
+        else:
+            LOGGER.debug("Writing %s build output to '%s'", self.title, path)
+            self._build_log = path
+
+    def run_build_command(self, cmd, cwd=None, env=None, show_progress=True):
+        """Run a build step, e.g. `configure` or `make`, without echoing its output.
+
+        Output goes to the build log if one was started by the installation, otherwise to the debug log.
+
+        Args:
+            cmd (list): Command and its command line arguments.
+            cwd (str): Directory to run the command in.  Defaults to the unpacked source code.
+            env (dict): Environment variables to set or unset, see :any:`util.create_subprocess`.
+            show_progress (bool): If True then show a progress indicator while the command runs.
+
+        Returns:
+            int: The command's return code.
+        """
+        return util.create_subprocess(cmd, cwd=cwd or self._src_prefix, env=env, stdout=False,
+                                      show_progress=show_progress,
+                                      log=not self._build_log, log_file=self._build_log)
+
     def set_group(self, gid=None):
         """Sets the group for all files in the installation.
 
@@ -250,34 +439,36 @@ class Installation:
         if gid is None:
             parent_stat = os.stat(os.path.dirname(self.install_prefix))
             gid = parent_stat.st_gid
-        paths = [self.install_prefix]
+        paths = []
+        if os.stat(self.install_prefix).st_gid != gid:
+            paths.append(self.install_prefix)
         LOGGER.info("Checking installed files...")
         with ProgressIndicator(""):
-            for root, dirs, _ in os.walk(self.install_prefix):
-                paths.extend(os.path.join(root, x) for x in dirs)
+            for _, dirs, _ in util.walk_tree(self.install_prefix):
+                paths.extend(entry.path for entry in dirs if entry.stat(follow_symlinks=False).st_gid != gid)
+        if not paths:
+            return
         LOGGER.info("Setting file permissions...")
-        with ProgressIndicator("", total_size=len(paths)) as progress_bar:
-            for i, path in enumerate(paths):
-                try:
-                    os.chown(path, -1, gid)
-                except OSError as err:
-                    LOGGER.debug("Cannot set group on '%s': %s", path, err)
+        def chown(path):
+            try:
+                os.chown(path, -1, gid)
+            except OSError as err:
+                LOGGER.debug("Cannot set group on '%s': %s", path, err)
+        with ProgressIndicator("", total_size=len(paths)) as progress_bar, \
+                ThreadPoolExecutor(max_workers=util.tree_workers()) as executor:
+            for i, _ in enumerate(executor.map(chown, paths)):
                 progress_bar.update(i)
 
     def _acquire_source(self, reuse_archive):
         archive_file = os.path.basename(self.src)
+        stores = SourceStore.all_stores()
         if reuse_archive:
-            for storage in ORDERED_LEVELS:
-                try:
-                    archive = os.path.join(storage.prefix, "src", archive_file)
-                except StorageError:
-                    continue
-                if os.path.exists(archive):
+            for store in stores:
+                archive = store.lookup(archive_file)
+                if archive:
                     return str(archive)
-        archive_prefix = os.path.join(highest_writable_storage().prefix, "src")
-        archive = os.path.join(archive_prefix, os.path.basename(self.src))
-        util.download(self.src, archive)
-        return str(archive)
+        store = SourceStore.for_storage(highest_writable_storage())
+        return str(store.add(archive_file, self.src, stores))
 
     def acquire_source(self, reuse_archive=True):
         """Acquires package source code archive file via download or file copy.
@@ -354,6 +545,7 @@ class Installation:
             raise ConfigurationError(f"Cannot extract source archive '{archive}': {err}",
                                      "Check that the file or directory is accessible") from err
 
+    @timing.traced('package verify')
     def verify(self):
         """Check if the installation at :any:`installation_prefix` is valid.
 
@@ -385,6 +577,24 @@ class Installation:
                 raise SoftwarePackageError("'%s' is not accessible" % path)
         LOGGER.debug("%s installation at '%s' is valid", self.name, self.install_prefix)
 
+    def verification_paths(self):
+        """List the files that :any:`verify` checks.
+
+        If none of these files has been removed or modified since the installation was verified
+        then it is still valid.  Subclasses that check additional files should extend this list.
+
+        Returns:
+            list: Absolute paths to the installation's commands, libraries, and headers.
+        """
+        paths = [os.path.join(self.bin_path, cmd) for cmd in self.verify_commands]
+        for lib in self.verify_libraries:
+            path = os.path.join(self.lib_path, lib)
+            if not os.path.exists(path):
+                path = os.path.join(self.lib_path+'64', lib)
+            paths.append(path)
+        paths.extend(os.path.join(self.include_path, header) for header in self.verify_headers)
+        return paths
+
     def add_dependency(self, name, sources, *args, **kwargs):
         """Adds a new package to the list of packages this package depends on.
 
@@ -399,6 +609,7 @@ class Installation:
         cls = software.get_installation(name)
         self.dependencies[name] = cls(sources, self.target_arch, self.target_os, self.compilers, *args, **kwargs)
 
+    @timing.traced('package install')
     def install(self, force_reinstall=False):
         """Execute the installation sequence in a sanitized environment.
 
@@ -429,6 +640,7 @@ class Installation:
             util.rmtree(self.install_prefix, ignore_errors=True)
         with new_os_environ(), util.umask(0o002):
             try:
+                self._start_build_log()
                 self._src_prefix = self._prepare_src()
                 self.installation_sequence()
                 self.set_group()
@@ -523,9 +735,9 @@ class MakeInstallation(Installation):
         LOGGER.debug("Making %s at '%s'", self.name, self._src_prefix)
         cmd = ['make'] + parallel_make_flags() + flags
         LOGGER.info("Compiling %s...", self.title)
-        if util.create_subprocess(cmd, cwd=self._src_prefix, stdout=False, show_progress=True):
+        if self.run_build_command(cmd):
             cmd = ['make'] + flags
-            if util.create_subprocess(cmd, cwd=self._src_prefix, stdout=False, show_progress=True):
+            if self.run_build_command(cmd):
                 util.add_error_stack(self._src_prefix)
                 raise SoftwarePackageError('%s compilation failed' % self.title)
 
@@ -542,9 +754,9 @@ class MakeInstallation(Installation):
         LOGGER.debug("Installing %s to '%s'", self.name, self.install_prefix)
         cmd = ['make', 'install'] + parallel_make_flags() + flags
         LOGGER.info("Installing %s...", self.title)
-        if util.create_subprocess(cmd, cwd=self._src_prefix, stdout=False, show_progress=True):
+        if self.run_build_command(cmd):
             cmd = ['make', 'install'] + flags
-            if util.create_subprocess(cmd, cwd=self._src_prefix, stdout=False, show_progress=True):
+            if self.run_build_command(cmd):
                 util.add_error_stack(self._src_prefix)
                 raise SoftwarePackageError('%s installation failed' % self.title)
         # Some systems use lib64 instead of lib
@@ -578,7 +790,7 @@ class AutotoolsInstallation(MakeInstallation):
         LOGGER.debug("Configuring %s at '%s'", self.name, self._src_prefix)
         cmd = ['./configure', '--prefix=%s' % self.install_prefix] + flags
         LOGGER.info("Configuring %s...", self.title)
-        if util.create_subprocess(cmd, cwd=self._src_prefix, stdout=False, show_progress=True, env=env):
+        if self.run_build_command(cmd, env=env):
             util.add_error_stack(self._src_prefix)
             raise SoftwarePackageError('%s configure failed' % self.title)
 
@@ -629,7 +841,7 @@ class CMakeInstallation(MakeInstallation):
         cmake = self._get_cmake()
         cmd = [cmake, '-DCMAKE_INSTALL_PREFIX=%s' % self.install_prefix] + flags
         LOGGER.info("Executing CMake for %s...", self.title)
-        if util.create_subprocess(cmd, cwd=self._src_prefix, stdout=False, show_progress=True):
+        if self.run_build_command(cmd):
             util.add_error_stack(self._src_prefix)
             raise SoftwarePackageError('CMake failed for %s' %self.title)
 
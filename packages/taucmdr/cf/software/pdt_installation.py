@@ -30,7 +30,7 @@ TAU uses PDT for source instrumentation.
 """
 
 import os
-from taucmdr import logger, util
+from taucmdr import logger
 from taucmdr.error import ConfigurationError
 from taucmdr.cf.software import SoftwarePackageError
 from taucmdr.cf.software.installation import AutotoolsInstallation
@@ -205,7 +205,7 @@ class PdtInstallation(AutotoolsInstallation):
         if not os.path.exists(cwd):
             LOGGER.info("roseparse not available on %s.  Good luck!", self.tau_magic.name)
             return
-        if util.create_subprocess(['./configure'], cwd=cwd, stdout=False, show_progress=True):
+        if self.run_build_command(['./configure'], cwd=cwd):
             raise SoftwarePackageError('Unable to configure edg4x-rose parsers')
         LOGGER.info("'edg4x-rose parser configuration successful.  Continuing %s verification...", self.title)
 
@@ -226,5 +226,5 @@ class PdtInstallation(AutotoolsInstallation):
         compiler_flag = family_flags.get(self.compilers[CXX].info.family.name, '')
         cmd = ['./configure', '-prefix=' + self.install_prefix, compiler_flag]
         LOGGER.info("Configuring PDT...")
-        if util.create_subprocess(cmd, cwd=self._src_prefix, stdout=False, show_progress=True):
+        if self.run_build_command(cmd):
             raise SoftwarePackageError('%s configure failed' % self.title)
@@ -0,0 +1,253 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Content-addressed store for software package source archives.
+
+Each storage level keeps source archives in its ``src`` directory.  Archives remain
+available by name (e.g. ``src/tau2.tgz``) so users can copy archives in by hand, but
+each archive is also hard linked to a blob named by its SHA-256 digest and recorded in
+a name index.  The index lets us detect archives that were truncated or modified after
+they were acquired, and the blobs let identical archives in different storage levels
+share disk space.
+"""
+
+import os
+import json
+import errno
+import hashlib
+import tempfile
+import threading
+from taucmdr import logger, util
+from taucmdr.cf.storage import StorageError
+from taucmdr.cf.storage.levels import ORDERED_LEVELS
+
+LOGGER = logger.get_logger(__name__)
+
+_INDEX_LOCK = threading.Lock()
+
+INDEX_FILE = 'index.json'
+"""str: Name of the archive name index file."""
+
+BLOB_DIR = '.sha256'
+"""str: Name of the directory containing content-addressed blobs."""
+
+
+def file_digest(path, block_size=1024*1024):
+    """Calculate the SHA-256 digest of a file.
+
+    Args:
+        path (str): Path to the file.
+        block_size (int): Bytes to read at a time.
+
+    Returns:
+        str: A string of hexadecimal digits.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fin:
+        for block in iter(lambda: fin.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SourceStore:
+    """Source archives in one storage level.
+
+    Attributes:
+        prefix (str): Absolute path to the storage level's ``src`` directory.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._index = None
+
+    @classmethod
+    def for_storage(cls, storage):
+        """Get the source store for a storage level.
+
+        Args:
+            storage (AbstractStorage): The storage level.
+
+        Returns:
+            SourceStore: The source store, or None if the storage level has no filesystem prefix.
+        """
+        try:
+            return cls(os.path.join(storage.prefix, 'src'))
+        except StorageError:
+            return None
+
+    @classmethod
+    def all_stores(cls):
+        """Get the source stores for all storage levels in their preferred order."""
+        stores = (cls.for_storage(storage) for storage in ORDERED_LEVELS)
+        return [store for store in stores if store]
+
+    def path(self, name):
+        return os.path.join(self.prefix, name)
+
+    def blob_path(self, digest):
+        return os.path.join(self.prefix, BLOB_DIR, digest)
+
+    @property
+    def index(self):
+        """dict: Archive names mapped to ``{'sha256': digest, 'size': bytes, 'mtime': ns}``."""
+        if self._index is None:
+            try:
+                with open(self.path(INDEX_FILE)) as fin:
+                    self._index = json.load(fin)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        try:
+            with tempfile.NamedTemporaryFile('w', dir=self.prefix, prefix='.index', delete=False) as fout:
+                json.dump(self.index, fout, indent=2)
+            os.replace(fout.name, self.path(INDEX_FILE))
+        except OSError as err:
+            LOGGER.debug("Source archive index in '%s' not written: %s", self.prefix, err)
+
+    def _record(self, name, digest):
+        stat = os.stat(self.path(name))
+        with _INDEX_LOCK:
+            # Reload so archives recorded concurrently by other threads aren't lost
+            self._index = None
+            self.index[name] = {'sha256': digest, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+            self._save_index()
+
+    def _link_blob(self, name, digest, others=()):
+        """Hard link an archive to its blob, sharing an existing blob from another store if possible."""
+        path = self.path(name)
+        blob = self.blob_path(digest)
+        try:
+            util.mkdirp(os.path.dirname(blob))
+            if not os.path.exists(blob):
+                for other in others:
+                    other_blob = other.blob_path(digest)
+                    if other is not self and os.path.exists(other_blob):
+                        try:
+                            self._replace_with_link(other_blob, path)
+                        except OSError as err:
+                            if err.errno not in (errno.EXDEV, errno.EPERM, errno.EACCES):
+                                raise
+                        else:
+                            LOGGER.debug("Deduplicated '%s' with '%s'", path, other_blob)
+                            break
+                os.link(path, blob)
+            elif not os.path.samefile(path, blob):
+                self._replace_with_link(blob, path)
+        except OSError as err:
+            LOGGER.debug("Unable to link '%s' to '%s': %s", path, blob, err)
+
+    @staticmethod
+    def _replace_with_link(src, dest):
+        tmp = dest + '.link'
+        os.link(src, tmp)
+        os.replace(tmp, dest)
+
+    def lookup(self, name):
+        """Find a verified source archive by name.
+
+        Archives whose size and modification time match the index are trusted.
+        Otherwise the archive's digest is recalculated and compared to the index.
+        Archives that aren't in the index (e.g. copied in by the user) are verified
+        by reading them completely and then added to the index.  If the store isn't
+        writable the result can't be recorded, so they are verified on every lookup.
+
+        Args:
+            name (str): Archive file name.
+
+        Returns:
+            str: Absolute path to the archive, or None if no valid archive exists.
+        """
+        path = self.path(name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        entry = self.index.get(name)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            return path
+        if not entry:
+            # A truncated download or a damaged copy must never be reused, even if it can't be recorded
+            try:
+                util.verify_archive(path)
+            except OSError as err:
+                LOGGER.warning("%s", err)
+                return None
+            if not os.access(self.prefix, os.W_OK):
+                LOGGER.debug("Verified '%s' but can't record it in the read-only index", path)
+                return path
+        digest = file_digest(path)
+        if entry and entry['sha256'] != digest:
+            LOGGER.warning("Source archive '%s' does not match its recorded checksum and will not be used.", path)
+            return None
+        self._link_blob(name, digest)
+        self._record(name, digest)
+        return path
+
+    def add(self, name, src, others=()):
+        """Download or copy a source archive into the store.
+
+        The archive is fetched to a temporary file and verified before it replaces
+        any existing archive with the same name.  A temporary file left behind by an
+        interrupted download is continued rather than downloaded again.
+
+        Args:
+            name (str): Archive file name.
+            src (str): Path or URL to the archive.
+            others (list): Other :any:`SourceStore` instances that may already hold an identical archive.
+
+        Returns:
+            str: Absolute path to the archive.
+
+        Raises:
+            IOError: The archive could not be acquired or is incomplete or corrupt.
+        """
+        path = self.path(name)
+        partial = path + '.partial'
+        resumed = os.path.exists(partial)
+        util.download(src, partial, resume=True)
+        try:
+            try:
+                util.verify_archive(partial)
+            except OSError:
+                if not resumed:
+                    raise
+                # The partial file may have been from a different version of the archive
+                LOGGER.info("Resumed download of '%s' is corrupt, downloading again", src)
+                util.download(src, partial)
+                util.verify_archive(partial)
+            digest = file_digest(partial)
+            os.replace(partial, path)
+        except OSError:
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+            raise
+        self._link_blob(name, digest, others)
+        self._record(name, digest)
+        return path
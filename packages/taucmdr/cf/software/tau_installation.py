@@ -45,10 +45,13 @@ import shlex
 import resource
 import platform
 import multiprocessing
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from subprocess import CalledProcessError
-from taucmdr import logger, util
+from taucmdr import logger, util, timing
 from taucmdr.util import get_command_output
 from taucmdr.error import ConfigurationError, InternalError
+from taucmdr.progress import ProgressIndicator
 from taucmdr.cf.software import SoftwarePackageError
 from taucmdr.cf.software.installation import Installation, parallel_make_flags, new_os_environ
 from taucmdr.cf.compiler import host as host_compilers, InstalledCompilerSet
@@ -144,7 +147,7 @@ TAU_COMPILER_WRAPPERS = {CC: 'tau_cc.sh',
 
 TAU_MINIMAL_COMPILERS = [CC, CXX]
 
-PROFILE_ANALYSIS_TOOLS = 'paraprof', 'pprof'
+PROFILE_ANALYSIS_TOOLS = 'paraprof', 'pprof', 'text'
 
 TRACE_ANALYSIS_TOOLS = 'jumpshot', 'vampir'
 
@@ -362,6 +365,8 @@ class TauInstallation(Installation):
         self._tau_makefile = None
         self._install_tag = None
         self._all_sources = sources
+        # Set by the caller to memoize compiletime_config and runtime_config results
+        self.config_cache = None
         if self.src == 'nightly':
             self.src = NIGHTLY
         self.tau_magic = TauMagic.find((self.target_arch, self.target_os))
@@ -564,14 +569,15 @@ class TauInstallation(Installation):
                     self.src = last_nightly
         return self._install_tag
 
-    def _verify_tau_libs(self, tau_makefile):
+    def _tau_libs(self, tau_makefile):
         makefile_tags = os.path.basename(tau_makefile).replace("Makefile.tau", "")
         static_lib = "libtau%s.*" % makefile_tags
         shared_lib = "libTAUsh%s.*" % makefile_tags
-        for pattern in static_lib, shared_lib:
-            if glob.glob(os.path.join(self.lib_path, pattern)):
-                break
-        else:
+        return [path for pattern in (static_lib, shared_lib)
+                for path in glob.glob(os.path.join(self.lib_path, pattern))]
+
+    def _verify_tau_libs(self, tau_makefile):
+        if not self._tau_libs(tau_makefile):
             raise SoftwarePackageError("TAU libraries for makefile '%s' not found" % tau_makefile)
 
     def _verify_dependency_paths(self, tau_makefile):
@@ -695,6 +701,7 @@ class TauInstallation(Installation):
             raise SoftwarePackageError("TAU I/O wrapper link options not found in '%s'" % io_wrapper_dir)
         LOGGER.debug("Found iowrap link options: %s", iowrap_link_options)
 
+    @timing.traced('TAU verify')
     def verify(self):
         super().verify()
         if not self.minimal:
@@ -711,6 +718,21 @@ class TauInstallation(Installation):
                 self._verify_iowrapper(tau_makefile)
         LOGGER.debug("TAU installation at '%s' is valid", self.install_prefix)
 
+    def verification_paths(self):
+        paths = super().verification_paths()
+        if not self.minimal:
+            tau_makefile = self.get_makefile()
+            paths.append(tau_makefile)
+            paths.extend(self._tau_libs(tau_makefile))
+            if not self.unmanaged:
+                for pkg in self.dependencies.values():
+                    paths.extend(pkg.verification_paths())
+            if self.measure_io:
+                paths.append(os.path.join(self.lib_path, 'wrappers', 'io_wrapper', 'link_options.tau'))
+        # TAU must be rebuilt if a compiler it was built with is replaced
+        paths.extend(comp.absolute_path for comp in self.compilers.values())
+        return paths
+
     def _select_flags(self, header, libglobs, user_libraries, wrap_cc, wrap_cxx, wrap_fc):
         def unique(seq):
             seen = set()
@@ -759,10 +781,14 @@ class TauInstallation(Installation):
 
         return selected_inc, selected_lib, selected_library
 
-    def configure(self):
+    def configure(self, show_progress=True):
         """Configures TAU
 
         Executes TAU's configuration script with appropriate arguments to support the specified configuration.
+        If the source tree is not ``self.install_prefix`` then TAU is configured to install there.
+
+        Args:
+            show_progress (bool): If True then show a progress indicator while configuring.
 
         Raises:
             SoftwareConfigurationError: TAU's configure script failed.
@@ -788,8 +814,9 @@ class TauInstallation(Installation):
                     '-bfd=%s' % binutils.install_prefix if binutils else None,
                     '-unwinder=%s' % self.unwinder,
                     '-unwind=%s' % libunwind.install_prefix if self.unwinder == 'libunwind' and libunwind else None,
+                    self._prefix_flag(),
                    ] if flag]
-            if util.create_subprocess(cmd, cwd=self._src_prefix, stdout=False, show_progress=True):
+            if self.run_build_command(cmd, show_progress=show_progress):
                 raise SoftwarePackageError('TAU configure failed')
             return
 
@@ -894,6 +921,7 @@ class TauInstallation(Installation):
                   '-otf=%s' % libotf2.install_prefix if libotf2 else None,
                   '-sqlite3=%s' % sqlite3.install_prefix if sqlite3 else None,
                   '-level_zero=%s' %level_zero.install_prefix if level_zero else None,
+                  self._prefix_flag(),
                   ] if flag]
         if pdt:
             flags.append('-pdt=%s' % pdt.install_prefix)
@@ -947,22 +975,44 @@ class TauInstallation(Installation):
         cmd = ['./configure'] + flags
         LOGGER.info("Configuring TAU...")
         LOGGER.debug("Configuring TAU: " + (" ".join(cmd)))
-        if util.create_subprocess(cmd, cwd=self._src_prefix, stdout=False, show_progress=True):
+        if self.run_build_command(cmd, show_progress=show_progress):
             raise SoftwarePackageError('TAU configure failed')
 
     def make_install_minimal(self):
         cmd = ['make'] + parallel_make_flags()
         LOGGER.info('Compiling trace input library...')
-        util.create_subprocess(
-            cmd, cwd=os.path.join(self._src_prefix, 'src/TraceInput'), stdout=False, show_progress=True
-        )
+        self.run_build_command(cmd, cwd=os.path.join(self._src_prefix, 'src/TraceInput'))
 
         cmd = ['make', '-k', 'install'] + parallel_make_flags()
         LOGGER.info('Compiling TAU utilities...')
         # Nonzero return value is ignored since a full make would be required for all utilities to build.
         # Just cross your fingers and hope that the utilities you need are compiled.
         # If they don't build then package verification will fail so no harm done.
-        util.create_subprocess(cmd, cwd=os.path.join(self._src_prefix, 'utils'), stdout=False, show_progress=True)
+        self.run_build_command(cmd, cwd=os.path.join(self._src_prefix, 'utils'))
+
+    def _build_log_path(self):
+        # Every TAU configuration is built in the same prefix so each needs its own log
+        return os.path.join(self.install_prefix, 'taucmdr-build-%s.log' % self.uid)
+
+    def _prefix_flag(self):
+        if self._src_prefix and os.path.realpath(self._src_prefix) != os.path.realpath(self.install_prefix):
+            return '-prefix=%s' % self.install_prefix
+        return None
+
+    def make(self, nprocs=None, show_progress=True):
+        """Compiles TAU in the source tree without installing it.
+
+        Args:
+            nprocs (int): Number of parallel make jobs, see :any:`parallel_make_flags`.
+            show_progress (bool): If True then show a progress indicator while compiling.
+
+        Raises:
+            SoftwarePackageError: 'make' failed.
+        """
+        cmd = ['make'] + parallel_make_flags(nprocs)
+        LOGGER.debug("Compiling TAU at '%s'", self._src_prefix)
+        if self.run_build_command(cmd, show_progress=show_progress):
+            raise SoftwarePackageError('TAU compilation failed')
 
     def make_install(self):
         """Installs TAU to ``self.install_prefix``.
@@ -974,13 +1024,16 @@ class TauInstallation(Installation):
         """
         cmd = ['make', 'install'] + parallel_make_flags()
         LOGGER.info('Compiling TAU...')
-        if util.create_subprocess(cmd, cwd=self._src_prefix, stdout=False, show_progress=True):
+        if self.run_build_command(cmd):
             raise SoftwarePackageError('TAU compilation/installation failed')
 
+    @timing.traced('TAU install')
     def install(self, force_reinstall=False):
         """Installs TAU.
 
         Configures, compiles, and installs TAU with all necessary makefiles and libraries.
+        If :any:`config_cache` records that this installation was already verified and none of
+        its :any:`verification_paths` has changed since then, verification is skipped.
 
         Args:
             force_reinstall (bool): Set to True to force reinstall even if TAU is already installed and working.
@@ -994,6 +1047,15 @@ class TauInstallation(Installation):
             self._set_install_prefix(forced_install_prefix)
             LOGGER.warning("TAU makefile was forced! Not verifying TAU installation")
             return
+        cache = None if force_reinstall else self.config_cache
+        if cache is not None and cache.is_verified():
+            LOGGER.debug("TAU installation at '%s' was verified earlier", self.install_prefix)
+            return
+        self._install(force_reinstall)
+        if cache is not None:
+            cache.set_verified(self.verification_paths())
+
+    def _install(self, force_reinstall):
         unmanaged_hints = ["Allow TAU Commander to manage your TAU configurations",
                            "Check for earlier error or warning messages",
                            "Ask your system administrator to build any missing TAU configurations mentioned above"]
@@ -1017,21 +1079,9 @@ class TauInstallation(Installation):
         LOGGER.info("Installing %s at '%s'", self.title, self.install_prefix)
         with new_os_environ(), util.umask(0o02):
             try:
-                # Keep reconfiguring the same source because that's how TAU works
-                if not (self.include_path and os.path.isdir(self.include_path)):
-                    LOGGER.info(f'Installing {self.title} to:\n    {self.install_prefix}')
-                    try:
-                        shutil.move(self._prepare_src(), self.install_prefix)
-                    except Exception as err:
-                        LOGGER.debug("Exception thrown by shutil.move, attempting to continue.")
-                        # On some docker fuse mounted file systems shutil.move was failing with symlinks
-                        # after upgrading from Python 2.7 to 3.x. The failure appears to be in calls to copystat
-                        # within copytree. Despite this the files appear to copy correctly
-                        if not all([os.path.exists(path[1]) for path in err.args[0]]):
-                            LOGGER.info("Unrecoverable exception: %s", err)
-                            raise
-                        LOGGER.debug("All files appear to exist, continuing.")
+                self._place_source()
                 self._src_prefix = self.install_prefix
+                self._start_build_log()
                 self.installation_sequence()
                 self.set_group()
             except SoftwarePackageError as err:
@@ -1049,6 +1099,23 @@ class TauInstallation(Installation):
         LOGGER.info("Verifying %s installation...", self.title)
         return self.verify()
 
+    def _place_source(self):
+        """Unpacks TAU's source code in ``self.install_prefix`` if it isn't there already."""
+        # Keep reconfiguring the same source because that's how TAU works
+        if not (self.include_path and os.path.isdir(self.include_path)):
+            LOGGER.info(f'Installing {self.title} to:\n    {self.install_prefix}')
+            try:
+                shutil.move(self._prepare_src(), self.install_prefix)
+            except Exception as err:
+                LOGGER.debug("Exception thrown by shutil.move, attempting to continue.")
+                # On some docker fuse mounted file systems shutil.move was failing with symlinks
+                # after upgrading from Python 2.7 to 3.x. The failure appears to be in calls to copystat
+                # within copytree. Despite this the files appear to copy correctly
+                if not all([os.path.exists(path[1]) for path in err.args[0]]):
+                    LOGGER.info("Unrecoverable exception: %s", err)
+                    raise
+                LOGGER.debug("All files appear to exist, continuing.")
+
     def installation_sequence(self):
         self.configure()
         if self.minimal:
@@ -1180,6 +1247,7 @@ class TauInstallation(Installation):
                         approx_tags = tags
         return approx_makefile
 
+    @timing.traced('TAU get_makefile')
     def get_makefile(self):
         """Returns an absolute path to a TAU_MAKEFILE.
 
@@ -1242,9 +1310,11 @@ class TauInstallation(Installation):
         """Configures environment for compilation with TAU.
 
         Modifies incoming command line arguments and environment variables
-        for the TAU compiler wrapper scripts.
+        for the TAU compiler wrapper scripts.  If :any:`config_cache` is set
+        then results are memoized there.
 
         Args:
+            compiler (InstalledCompiler): The compiler TAU should fall back to.
             opts (list): Command line options.
             env (dict): Environment variables.
 
@@ -1253,6 +1323,27 @@ class TauInstallation(Installation):
         """
         # The additional `compiler` argument is needed to TAU falls back to the right compiler
         # pylint: disable=arguments-differ
+        if self.config_cache is None:
+            opts, env = self._compiletime_config(compiler, opts, env)
+        else:
+            # The select file is given relative to the working directory so key on its resolved path
+            select_file = os.path.realpath(os.path.abspath(self.select_file)) if self.select_file else None
+            opts, env = self.config_cache.memoize('compiletime', [compiler.uid, logger.LOG_LEVEL, select_file],
+                                                  opts, env,
+                                                  lambda opts, env: self._compiletime_config(compiler, opts, env))
+        if not self.baseline:
+            self._check_makefile_tags(env['TAU_MAKEFILE'])
+        return opts, env
+
+    def _check_makefile_tags(self, makefile):
+        if self.uid not in self._makefile_tags(makefile):
+            LOGGER.warning("Unable to verify compiler compatibility of TAU makefile '%s'.\n\n"
+                           "This might be OK, but it is your responsibility to know that TAU was configured "
+                           "correctly for your experiment. Compiler incompatibility may cause your experiment "
+                           "to crash or produce invalid data.  If you're unsure, use --tau=download to allow "
+                           "TAU Commander to manage your TAU configurations.", makefile)
+
+    def _compiletime_config(self, compiler, opts, env):
         opts, env = super().compiletime_config(opts, env)
         env = self._sanitize_environment(env)
         if self.baseline:
@@ -1311,22 +1402,15 @@ class TauInstallation(Installation):
         except AttributeError:
             pass
         env['TAU_OPTIONS'] = ' '.join(tau_opts)
-        makefile = self.get_makefile()
-        tags = self._makefile_tags(makefile)
-        if self.uid not in tags:
-            LOGGER.warning("Unable to verify compiler compatibility of TAU makefile '%s'.\n\n"
-                           "This might be OK, but it is your responsibility to know that TAU was configured "
-                           "correctly for your experiment. Compiler incompatibility may cause your experiment "
-                           "to crash or produce invalid data.  If you're unsure, use --tau=download to allow "
-                           "TAU Commander to manage your TAU configurations.", makefile)
-        env['TAU_MAKEFILE'] = makefile
+        env['TAU_MAKEFILE'] = self.get_makefile()
         return list(set(opts)), env
 
     def runtime_config(self, opts=None, env=None):
         """Configures environment for execution with TAU.
 
         Modifies incoming command line arguments and environment variables
-        for the TAU library and tau_exec script.
+        for the TAU library and tau_exec script.  If :any:`config_cache` is set
+        then results are memoized there.
 
         Args:
             opts (list): Command line options.
@@ -1335,6 +1419,11 @@ class TauInstallation(Installation):
         Returns:
             tuple: (opts, env) updated to support TAU.
         """
+        if self.config_cache is None:
+            return self._runtime_config(opts, env)
+        return self.config_cache.memoize('runtime', [], opts, env, self._runtime_config)
+
+    def _runtime_config(self, opts, env):
         opts, env = super().runtime_config(opts, env)
         env = self._sanitize_environment(env)
         env['TAU_VERBOSE'] = str(int(self.verbose))
@@ -1482,9 +1571,10 @@ class TauInstallation(Installation):
         LOGGER.debug(' '.join(cmd))
         retval = util.create_subprocess(cmd, env=env, stdout=True)
         if retval != 0:
-            raise ConfigurationError("TAU was unable to build the application.",
-                                     "Check that the application builds with its normal compilers, i.e. without TAU.",
-                                     "Use taucmdr --log and see detailed output at the end of '%s'" % logger.LOG_FILE)
+            hints = ["Check that the application builds with its normal compilers, i.e. without TAU."]
+            if logger.DEBUG_LOG_ENABLED:
+                hints.append("Use taucmdr --log and see detailed output at the end of '%s'" % logger.LOG_FILE)
+            raise ConfigurationError("TAU was unable to build the application.", *hints)
         return retval
 
     def _rewrite_launcher_appfile_cmd(self, cmd, tau_exec):
@@ -1732,6 +1822,19 @@ class TauInstallation(Installation):
                     raise ConfigurationError("No profile files found in '%s'" % path)
         return retval
 
+    def _show_text(self, fmt, paths, env):  # pylint: disable=unused-argument
+        """Shows profiles with a pprof-style report rendered in Python, without TAU's tools or Java."""
+        from taucmdr.perfdata.pprof import profile_report
+        if fmt != 'tau':
+            raise ConfigurationError("The text report cannot open profiles in '%s' format" % fmt)
+        reports = []
+        for path in paths:
+            if not os.path.isdir(path):
+                raise ConfigurationError("Profile directory '%s' does not exist" % path)
+            reports.extend([util.hline(path, 'cyan'), profile_report(path)])
+        util.page_output('\n'.join(reports))
+        return 0
+
     def _show_jumpshot(self, fmt, paths, env):
         if fmt != 'slog2':
             raise ConfigurationError("jumpshot cannot open traces in '%s' format" % fmt)
@@ -1789,7 +1892,7 @@ class TauInstallation(Installation):
         Raises:
             ConfigurationError: An error occurred while displaying a data file.
         """
-        self._prep_data_analysis_tools()
+        prepared = False
         _, env = self.runtime_config()
         for fmt, paths in dataset.items():
             if self.is_profile_format(fmt):
@@ -1799,6 +1902,10 @@ class TauInstallation(Installation):
             else:
                 raise InternalError("Unhandled data format '%s'" % fmt)
             for tool in tools:
+                if tool != 'text' and not prepared:
+                    # The text report is rendered in Python so TAU's tools are only installed when needed
+                    self._prep_data_analysis_tools()
+                    prepared = True
                 try:
                     launcher = getattr(self, '_show_'+tool)
                 except AttributeError:
@@ -1836,31 +1943,24 @@ class TauInstallation(Installation):
                                      "Make sure Java is installed and working",
                                      "Install the most recent Java from http://java.com")
 
-    def merge_tau_trace_files(self, prefix):
-        """Use tau_treemerge.pl to merge multiple TAU trace files into a single edf and a single trc file.
+    def merge_tau_trace_files(self, prefix, files=None):
+        """Merge multiple TAU trace files into a single edf and a single trc file.
 
-        The new edf file and trc file are written to ``prefix``.
+        The new edf file and trc file are written to ``prefix``.  See :any:`merge_traces`.
 
         Args:
             prefix (str): Path to the directory containing ``*.trc`` and ``*.edf`` files.
+            files (list): Paths to files in `prefix` relative to `prefix`, e.g. from a trial manifest.
+                          If None then `prefix` is listed.
         """
-        self._prep_data_analysis_tools()
-        trc_files = glob.glob(os.path.join(prefix, '*.trc'))
-        edf_files = glob.glob(os.path.join(prefix, '*.edf'))
-        if not trc_files:
-            raise ConfigurationError("No *.trc files at '%s'" % prefix)
-        if not edf_files:
-            raise ConfigurationError("No *.edf files at '%s'" % prefix)
+        from taucmdr.perfdata.tau_trace import merge_traces
         merged_trc = os.path.join(prefix, 'tau.trc')
         merged_edf = os.path.join(prefix, 'tau.edf')
         if os.path.isfile(merged_trc):
-            raise ConfigurationError("Remove '%s' before merging *.trc files")
+            raise ConfigurationError("Remove '%s' before merging *.trc files" % merged_trc)
         if os.path.isfile(merged_edf):
-            raise ConfigurationError("Remove '%s' before merging *.edf files")
-        cmd = [os.path.join(self.bin_path, 'tau_treemerge.pl')]
-        LOGGER.info("Merging %d TAU trace files...", len(trc_files) + len(edf_files))
-        if util.create_subprocess(cmd, cwd=prefix, stdout=False, log=True, show_progress=True):
-            raise InternalError("Nonzero return code from tau_treemerge.pl")
+            raise ConfigurationError("Remove '%s' before merging *.edf files" % merged_edf)
+        merge_traces(prefix, files, merged_trc, merged_edf)
 
     def tau_trace_to_slog2(self, trc, edf, slog2):
         """Convert a TAU trace file to SLOG2 format.
@@ -1944,3 +2044,94 @@ class TauInstallation(Installation):
         pattern = re.compile(r'\d+\.\d+\.\d+')
         match = pattern.search(out)
         return match.group()
+
+
+def _build_in_tree(tau, nprocs):
+    """Configures and compiles `tau` in a private copy of its source code."""
+    build_prefix = tempfile.mkdtemp(dir=util.tmpfs_prefix().name)
+    tau._src_prefix = util.extract_archive(tau.acquire_source(), build_prefix, show_progress=False)
+    tau._start_build_log()
+    tau.configure(show_progress=False)
+    tau.make(nprocs, show_progress=False)
+    return build_prefix
+
+
+@timing.traced('TAU prebuild')
+def prebuild(installations, max_workers=None):
+    """Builds TAU configurations ahead of time.
+
+    Configurations with the same installation prefix and makefile tags are built once.
+    Each configuration is configured and compiled concurrently in its own copy of the TAU
+    source code, then installed one at a time since configurations share files in the
+    installation prefix.
+
+    Args:
+        installations (list): :any:`TauInstallation` objects describing the configurations.
+        max_workers (int): Maximum number of configurations to compile at once.
+                           Defaults to the number of CPU cores divided by four.
+
+    Returns:
+        list: The configurations that were built.
+    """
+    unique = {}
+    for tau in installations:
+        unique.setdefault((tau.install_prefix, frozenset(tau.get_tags())), tau)
+    needed = []
+    for tau in unique.values():
+        if tau.forced_makefile:
+            continue
+        try:
+            tau.verify()
+        except SoftwarePackageError as err:
+            LOGGER.debug("TAU configuration %s must be built: %s", sorted(tau.get_tags()), err)
+            needed.append(tau)
+    if not needed:
+        return []
+    built = []
+    with new_os_environ(), util.umask(0o02):
+        # Managed dependencies and configurations that can't be built in a separate tree go first
+        separate = []
+        for tau in needed:
+            tau.check_env_compat()
+            if tau.unmanaged or tau.minimal:
+                tau.install()
+                built.append(tau)
+                continue
+            for pkg in tau.dependencies.values():
+                pkg.install()
+            tau._place_source()
+            separate.append(tau)
+        if not separate:
+            return built
+        max_workers = max_workers or max(1, multiprocessing.cpu_count() // 4)
+        nprocs = max(1, multiprocessing.cpu_count() // min(max_workers, len(separate)))
+        LOGGER.info("Compiling %d TAU configurations...", len(separate))
+        with ProgressIndicator("Compiling TAU", total_size=len(separate)) as progress_bar, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(_build_in_tree, tau, nprocs): tau for tau in separate}
+            build_prefixes = {}
+            for i, future in enumerate(as_completed(futures)):
+                tau = futures[future]
+                try:
+                    build_prefixes[tau] = future.result()
+                except (ConfigurationError, OSError) as err:
+                    LOGGER.warning("Failed to compile TAU configuration %s: %s", sorted(tau.get_tags()), err)
+                progress_bar.update(i+1)
+        for tau in separate:
+            build_prefix = build_prefixes.get(tau)
+            if not build_prefix:
+                continue
+            try:
+                LOGGER.info("Installing TAU configuration %s", sorted(tau.get_tags()))
+                tau.make_install()
+                tau._tau_makefile = None
+                tau.set_group()
+                tau.verify()
+            except (ConfigurationError, OSError) as err:
+                LOGGER.warning("Failed to install TAU configuration %s: %s", sorted(tau.get_tags()), err)
+            else:
+                built.append(tau)
+            finally:
+                tau._src_prefix = None
+                util.rmtree(build_prefix, ignore_errors=True)
+    return built
@@ -29,9 +29,175 @@
 Functions used for unit tests of installation.py.
 """
 
-
+import os
 from taucmdr.tests import TestCase, not_implemented
+from unittest import mock
+from taucmdr.cf.software import SoftwarePackageError
+from taucmdr import logger
+from taucmdr.cf.software.installation import ConfigCache, Installation
+from taucmdr.cf.software.tau_installation import TauInstallation, prebuild
 
 @not_implemented
 class InstallationTest(TestCase):
     pass
+
+
+class ConfigCacheTest(TestCase):
+    """Unit tests for ConfigCache."""
+
+    @staticmethod
+    def _config(opts, env):
+        env['PATH'] = os.pathsep.join(['/opt/tau/bin', env['PATH']])
+        del env['UNSET_ME']
+        return opts + ['-g'], env
+
+    def test_memoize(self):
+        path = os.path.join(os.getcwd(), 'config_cache.json')
+        env = {'PATH': '/usr/bin', 'UNSET_ME': '1'}
+        expected = self._config(['-O2'], dict(env))
+        self.assertEqual(ConfigCache(path, 'uid').memoize('runtime', [], ['-O2'], env, self._config), expected)
+        cached = ConfigCache(path, 'uid').memoize('runtime', [], ['-O2'], env, lambda *_: self.fail("not cached"))
+        self.assertEqual(cached, expected)
+
+    def test_invalidate(self):
+        path = os.path.join(os.getcwd(), 'config_cache.json')
+        env = {'PATH': '/usr/bin', 'UNSET_ME': '1'}
+        ConfigCache(path, 'uid').memoize('runtime', [], None, env, self._config)
+        calls = []
+        config = lambda opts, env: calls.append(1) or self._config(opts, env)
+        ConfigCache(path, 'new_uid').memoize('runtime', [], None, env, config)
+        ConfigCache(path, 'uid').memoize('compiletime', [], None, env, config)
+        ConfigCache(path, 'uid').memoize('runtime', [], None, dict(env, PATH='/bin'), config)
+        self.assertEqual(len(calls), 3)
+
+    def test_unrelated_environment(self):
+        path = os.path.join(os.getcwd(), 'config_cache.json')
+        env = {'PATH': '/usr/bin', 'UNSET_ME': '1', 'PWD': '/home/user', 'SHLVL': '1'}
+        ConfigCache(path, 'uid').memoize('runtime', [], None, env, self._config)
+        mtime = os.stat(path).st_mtime_ns
+        cached = ConfigCache(path, 'uid').memoize('runtime', [], None, dict(env, PWD='/tmp', SHLVL='2'),
+                                                  lambda *_: self.fail("not cached"))
+        self.assertEqual(cached[1]['PWD'], '/tmp')
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+        calls = []
+        ConfigCache(path, 'uid').memoize('runtime', [], None, dict(env, TAU_OPTIONS='-optVerbose'),
+                                         lambda opts, env: calls.append(1) or self._config(opts, env))
+        self.assertEqual(len(calls), 1)
+
+    def test_verified(self):
+        path = os.path.join(os.getcwd(), 'config_cache.json')
+        makefile = os.path.join(os.getcwd(), 'Makefile.tau-mpi')
+        library = os.path.join(os.getcwd(), 'libtau-mpi.a')
+        for name in makefile, library:
+            with open(name, 'w') as fout:
+                fout.write(name)
+        self.assertFalse(ConfigCache(path, 'uid').is_verified())
+        ConfigCache(path, 'uid').set_verified([makefile, library])
+        self.assertTrue(ConfigCache(path, 'uid').is_verified())
+        self.assertFalse(ConfigCache(path, 'new_uid').is_verified())
+        stat = os.stat(library)
+        os.utime(library, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        self.assertFalse(ConfigCache(path, 'uid').is_verified())
+        ConfigCache(path, 'uid').set_verified([makefile, library])
+        self.assertTrue(ConfigCache(path, 'uid').is_verified())
+        os.remove(makefile)
+        self.assertFalse(ConfigCache(path, 'uid').is_verified())
+        ConfigCache(path, 'uid').set_verified([makefile, library])
+        self.assertFalse(ConfigCache(path, 'uid').is_verified())
+
+    def test_install_verified(self):
+        path = os.path.join(os.getcwd(), 'config_cache.json')
+        makefile = os.path.join(os.getcwd(), 'Makefile.tau-mpi')
+        with open(makefile, 'w') as fout:
+            fout.write('TAU_CONFIG=-mpi\n')
+        tau = mock.Mock(forced_makefile=None, config_cache=ConfigCache(path, 'uid'))
+        tau.verification_paths.return_value = [makefile]
+        TauInstallation.install(tau)
+        TauInstallation.install(tau)
+        self.assertEqual(tau._install.call_count, 1)
+        stat = os.stat(makefile)
+        os.utime(makefile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        TauInstallation.install(tau)
+        self.assertEqual(tau._install.call_count, 2)
+        TauInstallation.install(tau, force_reinstall=True)
+        self.assertEqual(tau._install.call_count, 3)
+
+    def test_compiletime_select_file(self):
+        path = os.path.join(os.getcwd(), 'config_cache.json')
+        tau = mock.Mock(select_file='select.tau', baseline=False, config_cache=ConfigCache(path, 'uid'))
+        tau._compiletime_config.side_effect = lambda compiler, opts, env: (
+            [], {'TAU_MAKEFILE': 'Makefile.tau', 'TAU_OPTIONS': os.path.abspath(tau.select_file)})
+        compiler = mock.Mock(uid='compiler')
+        cwd = os.getcwd()
+        for subdir in 'first', 'second', 'first':
+            os.makedirs(subdir, exist_ok=True)
+            os.chdir(subdir)
+            try:
+                _, env = TauInstallation.compiletime_config(tau, compiler, env={})
+            finally:
+                os.chdir(cwd)
+            self.assertEqual(env['TAU_OPTIONS'], os.path.join(cwd, subdir, 'select.tau'))
+        self.assertEqual(tau._compiletime_config.call_count, 2)
+        self.assertEqual(tau._check_makefile_tags.call_count, 3)
+
+
+class BuildLogTest(TestCase):
+    """Unit tests for writing build output to a build log."""
+
+    @staticmethod
+    def _installation(path):
+        inst = mock.Mock(title='Test', _src_prefix=os.getcwd(), _build_log=None)
+        inst._build_log_path.return_value = path
+        inst.run_build_command = lambda *args, **kwargs: Installation.run_build_command(inst, *args, **kwargs)
+        return inst
+
+    def test_build_log(self):
+        path = os.path.join(os.getcwd(), 'test', 'tag.build.log')
+        inst = self._installation(path)
+        with mock.patch.object(logger, 'DEBUG_LOG_ENABLED', True):
+            Installation._start_build_log(inst)
+        with mock.patch('taucmdr.util.LOGGER') as util_logger:
+            self.assertEqual(inst.run_build_command(['sh', '-c', 'echo configure-$0', 'output']), 0)
+            self.assertEqual(inst.run_build_command(['sh', '-c', 'echo make-$0; exit 2', 'output']), 2)
+        with open(path) as fin:
+            self.assertEqual(fin.read(), 'configure-output\nmake-output\n')
+        for call in util_logger.debug.call_args_list:
+            self.assertNotIn('-output', str(call))
+        with mock.patch.object(logger, 'DEBUG_LOG_ENABLED', True):
+            Installation._start_build_log(inst)
+        with open(path) as fin:
+            self.assertEqual(fin.read(), '')
+
+    def test_debug_log_disabled(self):
+        path = os.path.join(os.getcwd(), 'disabled.build.log')
+        inst = self._installation(path)
+        with mock.patch.object(logger, 'DEBUG_LOG_ENABLED', False):
+            Installation._start_build_log(inst)
+        self.assertEqual(inst.run_build_command(['true']), 0)
+        self.assertFalse(os.path.exists(path))
+
+
+class PrebuildTest(TestCase):
+    """Unit tests for tau_installation.prebuild."""
+
+    @staticmethod
+    def _installation(prefix, tags, valid):
+        tau = mock.Mock(install_prefix=prefix, forced_makefile=None)
+        tau.get_tags.return_value = set(tags)
+        if not valid:
+            tau.verify.side_effect = SoftwarePackageError("not built")
+        return tau
+
+    def test_deduplicate(self):
+        first = self._installation('/tau', ('mpi', 'pdt'), True)
+        second = self._installation('/tau', ('pdt', 'mpi'), True)
+        self.assertListEqual(prebuild([first, second]), [])
+        first.verify.assert_called_once_with()
+        second.verify.assert_not_called()
+
+    def test_build_serial(self):
+        tau = self._installation('/tau', ('serial',), False)
+        tau.unmanaged = False
+        tau.minimal = True
+        self.assertListEqual(prebuild([tau]), [tau])
+        tau.install.assert_called_once_with()
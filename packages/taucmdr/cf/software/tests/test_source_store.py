@@ -0,0 +1,100 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Unit tests for taucmdr.cf.software.source_store"""
+
+import os
+import tarfile
+import tempfile
+from unittest import mock
+from taucmdr.tests import TestCase
+from taucmdr.cf.software.source_store import SourceStore, file_digest
+
+
+class SourceStoreTest(TestCase):
+    """Unit tests for SourceStore."""
+
+    def setUp(self):
+        super().setUp()
+        self.prefix = tempfile.mkdtemp(dir=os.getcwd())
+
+    def _make_archive(self, name='pkg.tgz'):
+        topdir = os.path.join(self.prefix, 'pkg')
+        os.mkdir(topdir)
+        with open(os.path.join(topdir, 'data'), 'wb') as fout:
+            fout.write(os.urandom(256*1024))
+        archive = os.path.join(self.prefix, name)
+        with tarfile.open(archive, 'w:gz') as fout:
+            fout.add(topdir, arcname='pkg')
+        return archive
+
+    def test_add_lookup(self):
+        archive = self._make_archive()
+        store = SourceStore(os.path.join(self.prefix, 'src'))
+        path = store.add('pkg.tgz', archive)
+        digest = file_digest(archive)
+        self.assertEqual(store.index['pkg.tgz']['sha256'], digest)
+        self.assertTrue(os.path.samefile(path, store.blob_path(digest)))
+        self.assertEqual(SourceStore(store.prefix).lookup('pkg.tgz'), path)
+
+    def test_truncated(self):
+        archive = self._make_archive()
+        with open(archive, 'r+b') as fout:
+            fout.truncate(os.path.getsize(archive) // 2)
+        store = SourceStore(os.path.join(self.prefix, 'src'))
+        self.assertRaises(OSError, store.add, 'pkg.tgz', archive)
+        self.assertFalse(os.path.exists(store.path('pkg.tgz')))
+
+    def test_modified(self):
+        archive = self._make_archive()
+        store = SourceStore(os.path.join(self.prefix, 'src'))
+        path = store.add('pkg.tgz', archive)
+        os.remove(path)
+        with open(archive, 'rb') as fin, open(path, 'wb') as fout:
+            fout.write(fin.read()[:-10])
+        self.assertIsNone(SourceStore(store.prefix).lookup('pkg.tgz'))
+
+    def test_read_only_unindexed(self):
+        archive = self._make_archive()
+        store = SourceStore(os.path.join(self.prefix, 'system'))
+        os.makedirs(store.prefix)
+        path = store.path('pkg.tgz')
+        with open(archive, 'rb') as fin, open(path, 'wb') as fout:
+            fout.write(fin.read())
+        with mock.patch('os.access', return_value=False):
+            self.assertEqual(SourceStore(store.prefix).lookup('pkg.tgz'), path)
+            with open(path, 'r+b') as fout:
+                fout.truncate(os.path.getsize(path) // 2)
+            self.assertIsNone(SourceStore(store.prefix).lookup('pkg.tgz'))
+        self.assertFalse(os.path.exists(store.path('index.json')))
+
+    def test_dedupe(self):
+        archive = self._make_archive()
+        system = SourceStore(os.path.join(self.prefix, 'system'))
+        user = SourceStore(os.path.join(self.prefix, 'user'))
+        system_path = system.add('pkg.tgz', archive)
+        user_path = user.add('pkg.tgz', archive, [system])
+        self.assertTrue(os.path.samefile(system_path, user_path))
@@ -30,7 +30,7 @@ This Storage class dispatches calls to either TinyDB or SQLite, depending on whi
 """
 import os
 
-from taucmdr import logger
+from taucmdr import logger, timing
 from taucmdr import util
 from taucmdr.cf.storage import AbstractStorage, StorageError
 from taucmdr.cf.storage.local_file import LocalFileStorage
@@ -144,6 +144,7 @@ class StorageDispatch(AbstractStorage):
         """Makes the store filesystem unreadable and unwritable."""
         return self._get_storage().disconnect_filesystem(*args, **kwargs)
 
+    @timing.traced('storage connect')
     def connect_database(self, *args, **kwargs):
         """Open the database for reading and writing."""
         return self._get_storage().connect_database(*args, **kwargs)
@@ -185,6 +186,7 @@ class StorageDispatch(AbstractStorage):
         """
         return self._get_storage().table(table_name)
 
+    @timing.traced('storage count')
     def count(self, table_name=None):
         """Count the records in the database.
 
@@ -196,6 +198,7 @@ class StorageDispatch(AbstractStorage):
         """
         return self._get_storage().count(table_name=table_name)
 
+    @timing.traced('storage get')
     def get(self, keys, table_name=None, match_any=False):
         """Find a single record.
 
@@ -221,6 +224,7 @@ class StorageDispatch(AbstractStorage):
         """
         return self._get_storage().get(keys, table_name=table_name, match_any=match_any)
 
+    @timing.traced('storage search')
     def search(self, keys=None, table_name=None, match_any=False):
         """Find multiple records.
 
@@ -244,6 +248,7 @@ class StorageDispatch(AbstractStorage):
         """
         return self._get_storage().search(keys=keys, table_name=table_name, match_any=match_any)
 
+    @timing.traced('storage match')
     def match(self, field, table_name=None, regex=None, test=None):
         """Find records where `field` matches `regex` or `test`.
 
@@ -266,6 +271,7 @@ class StorageDispatch(AbstractStorage):
         """
         return self._get_storage().match(field, table_name=table_name, regex=regex, test=test)
 
+    @timing.traced('storage contains')
     def contains(self, keys, table_name=None, match_any=False):
         """Check if the specified table contains at least one matching record.
 
@@ -288,6 +294,7 @@ class StorageDispatch(AbstractStorage):
         """
         return self._get_storage().contains(keys, table_name=table_name, match_any=match_any)
 
+    @timing.traced('storage insert')
     def insert(self, data, table_name=None):
         """Create a new record.
 
@@ -307,6 +314,7 @@ class StorageDispatch(AbstractStorage):
             raise TypeError(f"Bad binary type (bytes, bytearray, etc.) found in data(dict):\n{data}")
         return self._get_storage().insert(data, table_name=table_name)
 
+    @timing.traced('storage update')
     def update(self, fields, keys, table_name=None, match_any=False):
         """Update records.
 
@@ -332,6 +340,7 @@ class StorageDispatch(AbstractStorage):
             raise TypeError(f"Bad types (bytes, bytearray, etc. passed as keys:\n{keys}")
         return self._get_storage().update(fields, keys, table_name=table_name, match_any=match_any)
 
+    @timing.traced('storage unset')
     def unset(self, fields, keys, table_name=None, match_any=False):
         """Update records by unsetting fields.
 
@@ -355,6 +364,7 @@ class StorageDispatch(AbstractStorage):
         """
         return self._get_storage().unset(fields, keys, table_name=table_name, match_any=match_any)
 
+    @timing.traced('storage remove')
     def remove(self, keys, table_name=None, match_any=False):
         """Delete records.
 
@@ -0,0 +1,105 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Unit tests for taucmdr.cf.host_cache"""
+
+import os
+import json
+import time
+import tempfile
+from unittest import mock
+from taucmdr.tests import TestCase
+from taucmdr.cf.host_cache import HostCache, host_fingerprint, ATIME_RESOLUTION
+
+class HostCacheTest(TestCase):
+    """Unit tests for taucmdr.cf.host_cache"""
+
+    def test_fingerprint(self):
+        env = {'PATH': '/usr/bin'}
+        self.assertEqual(host_fingerprint(env), host_fingerprint(dict(env)))
+        self.assertNotEqual(host_fingerprint(env), host_fingerprint({'PATH': '/usr/local/bin'}))
+
+    def test_round_trip(self):
+        path = os.path.join(os.getcwd(), 'host_cache.json')
+        cache = HostCache(path)
+        cache.set('architecture', 'x86_64')
+        cache.set_item('which', 'cc', '/usr/bin/cc')
+        cache.flush()
+        with open(path) as fin:
+            self.assertEqual(len(json.load(fin)), 1)
+        cache = HostCache(path)
+        self.assertEqual(cache.get('architecture'), 'x86_64')
+        self.assertEqual(cache.get_item('which', 'cc'), '/usr/bin/cc')
+        self.assertIsNone(cache.get_item('which', 'f77'))
+
+    def test_disabled(self):
+        path = os.path.join(os.getcwd(), 'host_cache.json')
+        cache = HostCache(path, enabled=False)
+        cache.set('architecture', 'x86_64')
+        cache.flush()
+        self.assertFalse(os.path.exists(path))
+
+    def test_concurrent_writers(self):
+        path = os.path.join(tempfile.mkdtemp(dir=os.getcwd()), 'host_cache.json')
+        first, second = HostCache(path), HostCache(path)
+        first.set('architecture', 'x86_64')
+        second.set('operating_system', 'Linux')
+        second.set_item('which', 'cc', '/usr/bin/cc')
+        second.flush()
+        first.set_item('which', 'f77', '/usr/bin/f77')
+        first.set('operating_system', 'Linux')
+        third = HostCache(path)
+        self.assertEqual(third.get('operating_system'), 'Linux')
+        third.set('operating_system', 'Darwin')
+        third.flush()
+        first.flush()
+        cache = HostCache(path)
+        self.assertEqual(cache.get('architecture'), 'x86_64')
+        self.assertEqual(cache.get('operating_system'), 'Linux')
+        self.assertEqual(cache.get_item('which', 'cc'), '/usr/bin/cc')
+        self.assertEqual(cache.get_item('which', 'f77'), '/usr/bin/f77')
+        second.set('architecture', 'ppc64le')
+        second.flush()
+        cache = HostCache(path)
+        self.assertEqual(cache.get('architecture'), 'ppc64le')
+        self.assertEqual(cache.get('operating_system'), 'Linux')
+
+    def test_read_refreshes_atime(self):
+        path = os.path.join(tempfile.mkdtemp(dir=os.getcwd()), 'host_cache.json')
+        cache = HostCache(path)
+        cache.set('architecture', 'x86_64')
+        cache.flush()
+        mtime = os.stat(path).st_mtime_ns
+        cache = HostCache(path)
+        self.assertEqual(cache.get('architecture'), 'x86_64')
+        cache.flush()
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+        with mock.patch('time.time', return_value=time.time() + ATIME_RESOLUTION + 1):
+            cache = HostCache(path)
+            self.assertEqual(cache.get('architecture'), 'x86_64')
+            cache.flush()
+            with open(path) as fin:
+                self.assertEqual(json.load(fin)[host_fingerprint()]['_atime'], time.time())
@@ -32,8 +32,9 @@ Instead, process arguments in the appropriate subcommand.
 
 import os
 import sys
+import atexit
 import taucmdr
-from taucmdr import cli, logger, util, TAUCMDR_VERSION, TAUCMDR_SCRIPT
+from taucmdr import cli, logger, util, timing, TAUCMDR_VERSION, TAUCMDR_SCRIPT
 from taucmdr.cli import UnknownCommandError, arguments
 from taucmdr.cli.command import AbstractCommand
 from taucmdr.cli.commands.build import COMMAND as build_command
@@ -105,8 +106,24 @@ class MainCommand(AbstractCommand):
                            const='ERROR',
                            default=arguments.SUPPRESS,
                            action='store_const')
+        parser.add_argument('--timing',
+                            help="show where time was spent in TAU Commander",
+                            default=False,
+                            action='store_true')
+        parser.add_argument('--timing-trace',
+                            help="write TAU Commander timing spans as Chrome trace-event JSON",
+                            metavar='<file>',
+                            default=None)
         return parser
 
+    @staticmethod
+    def _timing_report(trace_file):
+        timing.disable()
+        timing.report()
+        if trace_file:
+            timing.write_chrome_trace(trace_file)
+            print("Timing trace written to '%s'" % trace_file, file=sys.stderr)
+
     def main(self, argv):
         """Program entry point.
 
@@ -125,6 +142,14 @@ class MainCommand(AbstractCommand):
         LOGGER.debug('Arguments: %s', args)
         LOGGER.debug('Verbosity level: %s', logger.LOG_LEVEL)
 
+        if args.timing or args.timing_trace:
+            timing.enable()
+        if timing.enabled():
+            atexit.register(self._timing_report, args.timing_trace)
+        with timing.span(' '.join([self.command, cmd])):
+            return self._execute(cmd, cmd_args)
+
+    def _execute(self, cmd, cmd_args):
         # Try to execute as a TAU command
         try:
             return cli.execute_command([cmd], cmd_args)
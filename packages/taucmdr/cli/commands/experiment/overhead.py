@@ -0,0 +1,150 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``experiment overhead`` subcommand."""
+
+from taucmdr import EXIT_SUCCESS, EXIT_WARNING, logger, util
+from taucmdr.error import ConfigurationError
+from taucmdr.cli import arguments
+from taucmdr.cli.cli_view import Texttable
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.model.project import Project
+
+
+def _successful_trials(experiments):
+    """Map commands to the successful trials that executed them, ordered by trial number."""
+    trials = {}
+    for expr in experiments:
+        for trial in expr.populate('trials'):
+            if trial.get('return_code', None) == 0 and trial.get('elapsed', None) is not None:
+                trials.setdefault(trial['command'], []).append(trial)
+    for same_command in trials.values():
+        same_command.sort(key=lambda trial: trial['number'])
+    return trials
+
+
+def _function_totals(trial):
+    from taucmdr.perfdata import overhead
+    try:
+        table = trial.profile_table('TIME')
+    except ConfigurationError:
+        return overhead.function_totals([]), 0
+    return overhead.function_totals(table), len(table.threads)
+
+
+class ExperimentOverheadCommand(AbstractCommand):
+    """``experiment overhead`` subcommand."""
+
+    def _construct_parser(self):
+        from taucmdr.perfdata.overhead import OVERHEAD_BUDGET
+        usage = "%s [experiment_name...] [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('experiment_names',
+                            help="experiments to analyze (default: all experiments without a baseline measurement)",
+                            metavar='<experiment_name>',
+                            nargs='*',
+                            default=[])
+        parser.add_argument('--budget',
+                            help="flag measurements that slow the application down by more than this percent",
+                            metavar='<percent>',
+                            type=float,
+                            default=OVERHEAD_BUDGET * 100)
+        parser.add_argument('--functions',
+                            help="number of functions with the highest overhead to show",
+                            metavar='<count>',
+                            type=int,
+                            default=10)
+        return parser
+
+    def _draw_functions(self, functions, count):
+        rows = [['Function', 'Calls', 'Exclusive (usec)', 'Overhead (usec)', 'Share', 'Overhead/Exclusive']]
+        for i in range(min(count, len(functions.names))):
+            rows.append([functions.names[i], f"{functions.calls[i]:.0f}", f"{functions.exclusive[i]:.6g}",
+                         f"{functions.overhead[i]:.6g}", f"{functions.share[i]:.1%}", f"{functions.relative[i]:.2f}"])
+        table = Texttable(logger.LINE_WIDTH)
+        table.set_cols_align(['l', 'r', 'r', 'r', 'r', 'r'])
+        table.set_cols_dtype(['t'] * 6)
+        table.set_deco(Texttable.HEADER | Texttable.VLINES)
+        table.add_rows(rows)
+        return table.draw()
+
+    def main(self, argv):
+        from taucmdr.perfdata import overhead
+        args = self._parse_args(argv)
+        proj = Project.selected()
+        baselines = {}
+        instrumented = []
+        for expr in proj.populate('experiments'):
+            populated = expr.populate()
+            if populated['measurement'].get('baseline', False):
+                baselines.setdefault((populated['target'].eid, populated['application'].eid), []).append(expr)
+            elif not args.experiment_names or expr['name'] in args.experiment_names:
+                instrumented.append(expr)
+        missing = set(args.experiment_names) - {expr['name'] for expr in instrumented}
+        if missing:
+            self.parser.error("No experiments with instrumented measurements named: %s" % ', '.join(sorted(missing)))
+        if not baselines:
+            raise ConfigurationError(f"Project '{proj['name']}' has no trials of a baseline measurement.",
+                                     "Select a measurement created with `--baseline T` and run the application.")
+        over_budget = False
+        for expr in instrumented:
+            populated = expr.populate()
+            meas = populated['measurement']
+            key = (populated['target'].eid, populated['application'].eid)
+            base_trials = _successful_trials(baselines.get(key, []))
+            inst_trials = _successful_trials([expr])
+            commands = sorted(set(base_trials) & set(inst_trials))
+            if not commands:
+                self.logger.warning("Experiment '%s' has no successful trials of a command that was also performed "
+                                    "with a baseline measurement.", expr['name'])
+                continue
+            for command in commands:
+                latest = inst_trials[command][-1]
+                totals, threads = _function_totals(latest)
+                estimate = overhead.estimate_overhead([trial['elapsed'] for trial in base_trials[command]],
+                                                      [trial['elapsed'] for trial in inst_trials[command]],
+                                                      totals, threads)
+                parts = [util.hline(f"Overhead of measurement '{meas['name']}' in experiment '{expr['name']}'", 'cyan'),
+                         f"Command:           {command}",
+                         f"Baseline elapsed:  {estimate.baseline_elapsed:.6g} s "
+                         f"(median of {len(base_trials[command])} trials)",
+                         f"Measured elapsed:  {estimate.elapsed:.6g} s (median of {len(inst_trials[command])} trials)",
+                         f"Overhead:          {estimate.overhead:.1%}"]
+                if len(totals.names):
+                    parts.append(f"Cost per call:     {estimate.usec_per_call:.3g} usec "
+                                 f"(trial {latest['number']}, {threads} threads)")
+                    parts.extend(['', self._draw_functions(estimate.functions, args.functions)])
+                print('\n'.join(parts + ['']))
+                hints = overhead.suggestions(meas, estimate, args.budget / 100)
+                if hints:
+                    over_budget = True
+                    self.logger.warning("Measurement '%s' exceeds the %s%% overhead budget:\n  %s",
+                                        meas['name'], args.budget, '\n  '.join(hints))
+        return EXIT_WARNING if over_budget else EXIT_SUCCESS
+
+
+COMMAND = ExperimentOverheadCommand(__name__, summary_fmt=("Estimate measurement overhead by comparing trials to "
+                                                           "baseline trials of the same command."))
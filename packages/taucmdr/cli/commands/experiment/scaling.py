@@ -0,0 +1,124 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``experiment scaling`` subcommand."""
+
+from taucmdr import EXIT_SUCCESS, EXIT_WARNING, logger, util
+from taucmdr.error import ConfigurationError
+from taucmdr.cli import arguments
+from taucmdr.cli.cli_view import Texttable
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.model.project import Project
+
+
+def _draw_table(rows, align):
+    table = Texttable(logger.LINE_WIDTH)
+    table.set_cols_align(align)
+    table.set_cols_dtype(['t'] * len(align))
+    table.set_deco(Texttable.HEADER | Texttable.VLINES)
+    table.add_rows(rows)
+    return table.draw()
+
+
+class ExperimentScalingCommand(AbstractCommand):
+    """``experiment scaling`` subcommand."""
+
+    def _construct_parser(self):
+        usage = "%s [experiment_name] [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('experiment_name',
+                            help="experiment to analyze (default: the selected experiment)",
+                            metavar='<experiment_name>',
+                            nargs='?',
+                            default=None)
+        parser.add_argument('--metric',
+                            help="function time to analyze",
+                            metavar='<metric>',
+                            choices=('exclusive', 'inclusive'),
+                            default='exclusive')
+        parser.add_argument('--functions',
+                            help="number of functions with the most time at the largest rank count to show",
+                            metavar='<count>',
+                            type=int,
+                            default=10)
+        parser.add_argument('--rebuild',
+                            help="read every trial's profiles instead of using cached totals",
+                            action='store_true',
+                            default=False)
+        return parser
+
+    def _format(self, expr, study, count):
+        import numpy as np
+        parts = [util.hline(f"Scaling of Experiment '{expr['name']}'", 'cyan')]
+        rows = [['Ranks', 'Trials', 'Elapsed (s)', 'Speedup', 'Ideal', 'Efficiency']]
+        for i, ranks in enumerate(study.ranks):
+            rows.append([str(ranks), str(study.trials[i]), f"{study.elapsed[i]:.6g}", f"{study.speedup[i]:.3g}",
+                         f"{ranks / study.ranks[0]:.3g}", f"{study.efficiency[i]:.1%}"])
+        parts += [_draw_table(rows, ['r'] * 6), '']
+        last = np.nan_to_num(study.times[:, -1], nan=-1.0) if len(study.ranks) else np.zeros(0)
+        order = [i for i in np.argsort(-last, kind='stable')[:count] if last[i] >= 0]
+        if order:
+            smallest, largest = study.ranks[0], study.ranks[-1]
+            rows = [['Function', f"Time @ {smallest} (usec)", f"Time @ {largest} (usec)", 'Exponent', 'Points']]
+            fmt = lambda value, spec: '-' if np.isnan(value) else format(value, spec)
+            for i in order:
+                rows.append([study.names[i], fmt(study.times[i, 0], '.6g'), fmt(study.times[i, -1], '.6g'),
+                             fmt(study.exponents[i], '.2f'), str(study.points[i])])
+            parts += [_draw_table(rows, ['l', 'r', 'r', 'r', 'r']),
+                      "Exponent is the slope of log(time) versus log(ranks): "
+                      "-1 is perfect strong scaling, 0 is no improvement.", '']
+        return '\n'.join(parts)
+
+    def main(self, argv):
+        from taucmdr.perfdata import scaling
+        args = self._parse_args(argv)
+        proj = Project.selected()
+        if args.experiment_name:
+            found = [expr for expr in proj.populate('experiments') if expr['name'] == args.experiment_name]
+            if not found:
+                self.parser.error(f"No experiment named '{args.experiment_name}' in project '{proj['name']}'")
+            expr = found[0]
+        else:
+            expr = proj.experiment()
+        data, added, skipped = expr.scaling_data(rebuild=args.rebuild)
+        self.logger.debug("Read profiles of %d trials, %d cached", added, len(data.numbers) - added)
+        if skipped:
+            self.logger.warning("Could not find the number of ranks in the command lines of trial(s) %s",
+                                ', '.join(str(number) for number in skipped))
+        if not len(data.numbers):
+            raise ConfigurationError(f"Experiment '{expr['name']}' has no successful trials to compare.",
+                                     "Run the application at several rank counts, e.g. `tau mpirun -np 4 ./a.out`.")
+        study = scaling.analyze(data, args.metric)
+        print(self._format(expr, study, args.functions))
+        if len(study.ranks) < 2:
+            self.logger.warning("All trials of experiment '%s' used %d ranks; run the application at other rank "
+                                "counts to measure scaling.", expr['name'], study.ranks[0])
+            return EXIT_WARNING
+        return EXIT_SUCCESS
+
+
+COMMAND = ExperimentScalingCommand(__name__, summary_fmt=("Compare trials performed at different rank counts: "
+                                                          "speedup, efficiency, and per-function scaling."))
@@ -0,0 +1,53 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of scaling.py.
+"""
+
+from taucmdr import tests, EXIT_SUCCESS
+from taucmdr.cf.compiler.mpi import MPI_CC
+from taucmdr.cli.commands.experiment.scaling import COMMAND as experiment_scaling_cmd
+from taucmdr.cli.commands.trial.create import COMMAND as trial_create_cmd
+
+
+class ScalingTest(tests.TestCase):
+    """Tests for :any:`experiment.scaling`."""
+
+    def test_unknown_experiment(self):
+        self.reset_project_storage(['--bare'])
+        _, stderr = self.assertNotCommandReturnValue(EXIT_SUCCESS, experiment_scaling_cmd, ['exp_missing'])
+        self.assertIn('exp_missing', stderr)
+
+    @tests.skipUnlessHaveCompiler(MPI_CC)
+    def test_scaling(self):
+        self.reset_project_storage(['--mpi', '--trace', 'none'])
+        self.assertManagedBuild(0, MPI_CC, [], 'mpi_hello.c')
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_create_cmd, ['mpirun', '-np', '2', './a.out'])
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_create_cmd, ['mpirun', '-np', '4', './a.out'])
+        stdout, _ = self.assertCommandReturnValue(EXIT_SUCCESS, experiment_scaling_cmd, [])
+        self.assertIn('Scaling of Experiment', stdout)
@@ -0,0 +1,117 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``measurement autoselect`` subcommand."""
+
+import os
+from taucmdr import EXIT_SUCCESS, EXIT_WARNING, util
+from taucmdr.cli import arguments
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.cli.commands.measurement.copy import COMMAND as measurement_copy_cmd
+from taucmdr.cf.storage.levels import PROJECT_STORAGE
+from taucmdr.model.project import Project
+
+
+class MeasurementAutoselectCommand(AbstractCommand):
+    """``measurement autoselect`` subcommand."""
+
+    def _construct_parser(self):
+        from taucmdr.perfdata import autoselect
+        usage = "%s [trial_number] [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('trial_number',
+                            help="trial in the selected experiment to analyze (default: most recent trial)",
+                            metavar='<trial_number>',
+                            nargs='?',
+                            type=int,
+                            default=None)
+        parser.add_argument('--name',
+                            help="name of the new measurement (default: '<measurement>-autoselect')",
+                            metavar='<name>',
+                            default=None)
+        parser.add_argument('--select-file',
+                            help="path to the selective instrumentation file to write",
+                            metavar='<path>',
+                            default=None)
+        parser.add_argument('--min-calls',
+                            help="only exclude short functions called at least this many times",
+                            metavar='<count>',
+                            type=int,
+                            default=autoselect.MIN_CALLS)
+        parser.add_argument('--max-usec-per-call',
+                            help="exclude frequently called functions taking less time per call",
+                            metavar='<usec>',
+                            type=float,
+                            default=autoselect.MAX_USEC_PER_CALL)
+        parser.add_argument('--overhead-usec-per-call',
+                            help="estimated instrumentation overhead per function call",
+                            metavar='<usec>',
+                            type=float,
+                            default=autoselect.OVERHEAD_USEC_PER_CALL)
+        parser.add_argument('--max-overhead',
+                            help="exclude functions whose estimated overhead is at least this percent of runtime",
+                            metavar='<percent>',
+                            type=float,
+                            default=autoselect.MAX_OVERHEAD * 100)
+        parser.add_argument('--dry-run',
+                            help="list the functions that would be excluded but don't create a measurement",
+                            action='store_true',
+                            default=False)
+        return parser
+
+    def main(self, argv):
+        from taucmdr.perfdata import autoselect
+        args = self._parse_args(argv)
+        expr = Project.selected().experiment()
+        trial = expr.trials([args.trial_number] if args.trial_number is not None else None)[0]
+        meas = expr.populate('measurement')
+        exclusions = autoselect.select_exclusions(trial.profile_table('TIME'),
+                                                  min_calls=args.min_calls,
+                                                  max_usec_per_call=args.max_usec_per_call,
+                                                  overhead_usec_per_call=args.overhead_usec_per_call,
+                                                  max_overhead=args.max_overhead / 100)
+        if not exclusions:
+            self.logger.info("No functions in trial %s of experiment '%s' need to be excluded.",
+                             trial['number'], expr['name'])
+            return EXIT_WARNING
+        for exclusion in exclusions:
+            self.logger.info("Excluding %s (%s calls, %s)", exclusion.name, exclusion.calls, exclusion.reason)
+        if args.dry_run:
+            return EXIT_SUCCESS
+        name = args.name or f"{meas['name']}-autoselect"
+        select_file = args.select_file or os.path.join(PROJECT_STORAGE.prefix, 'select', f'{name}.tau')
+        util.mkdirp(os.path.dirname(os.path.abspath(select_file)))
+        autoselect.write_select_file(select_file, exclusions,
+                                     comment=(f"Generated by `{self.command}` from trial {trial['number']} "
+                                              f"of experiment '{expr['name']}'.\n"
+                                              f"Excludes {len(exclusions)} functions."))
+        self.logger.info("Wrote selective instrumentation file '%s'", select_file)
+        return measurement_copy_cmd.main([meas['name'], name, '--select-file', os.path.abspath(select_file),
+                                          '-' + arguments.STORAGE_LEVEL_FLAG, meas.storage.name])
+
+
+COMMAND = MeasurementAutoselectCommand(__name__, summary_fmt=("Create a measurement that doesn't instrument "
+                                                              "functions with high overhead in a trial."))
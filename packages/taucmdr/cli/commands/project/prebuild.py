@@ -0,0 +1,95 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``project prebuild`` subcommand."""
+
+import os
+import itertools
+import fasteners
+from taucmdr import EXIT_SUCCESS, EXIT_WARNING
+from taucmdr.error import ConfigurationError, IncompatibleRecordError
+from taucmdr.cli import arguments
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.model.project import Project
+from taucmdr.model.experiment import Experiment
+from taucmdr.cf.software.tau_installation import prebuild
+from taucmdr.cf.storage.levels import highest_writable_storage
+
+
+class ProjectPrebuildCommand(AbstractCommand):
+    """``project prebuild`` subcommand."""
+
+    def _construct_parser(self):
+        usage = "%s [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('-j', '--jobs',
+                            help="number of TAU configurations to compile at once",
+                            metavar='<count>',
+                            type=int,
+                            default=None)
+        parser.add_argument('--dry-run',
+                            help="list the TAU configurations but don't build them",
+                            action='store_true',
+                            default=False)
+        return parser
+
+    def _installations(self, proj):
+        populated = proj.populate()
+        for targ, app, meas in itertools.product(populated['targets'], populated['applications'],
+                                                 populated['measurements']):
+            names = (targ['name'], app['name'], meas['name'])
+            try:
+                for lhs in targ, app, meas:
+                    for rhs in targ, app, meas:
+                        lhs.check_compatibility(rhs)
+                yield Experiment.tau_installation(targ, app, meas)
+            except IncompatibleRecordError as err:
+                self.logger.debug("Skipping incompatible configurations %s: %s", names, err)
+            except ConfigurationError as err:
+                self.logger.warning("Skipping configurations %s: %s", names, err)
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        if args.jobs is not None and args.jobs < 1:
+            self.parser.error("Invalid job count: %s" % args.jobs)
+        proj = Project.controller().selected()
+        installations = list(self._installations(proj))
+        if args.dry_run:
+            seen = set()
+            for tau in installations:
+                tags = ','.join(sorted(tau.get_tags()))
+                if tags not in seen:
+                    seen.add(tags)
+                    print(tags)
+            return EXIT_SUCCESS
+        with fasteners.InterProcessLock(os.path.join(highest_writable_storage().prefix, '.lock')):
+            built = prebuild(installations, max_workers=args.jobs)
+        self.logger.info("Built %d TAU configurations.", len(built))
+        return EXIT_SUCCESS if installations else EXIT_WARNING
+
+
+COMMAND = ProjectPrebuildCommand(__name__, summary_fmt=("Build all TAU configurations used by the selected project.\n"
+                                                        "Later builds and runs don't wait for TAU to compile."))
@@ -0,0 +1,77 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``project serve`` subcommand."""
+
+from taucmdr import EXIT_SUCCESS, EXIT_WARNING
+from taucmdr.cli import arguments
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.cf.storage.levels import PROJECT_STORAGE
+from taucmdr.server import CommandServer, server_address, daemonize, DEFAULT_IDLE_TIMEOUT
+
+
+class ProjectServeCommand(AbstractCommand):
+    """``project serve`` subcommand."""
+
+    def _construct_parser(self):
+        usage = "%s [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('--idle-timeout',
+                            help="shut down after this many seconds without a request",
+                            metavar='<seconds>',
+                            type=float,
+                            default=DEFAULT_IDLE_TIMEOUT)
+        parser.add_argument('--foreground',
+                            help="don't detach from the terminal",
+                            action='store_true',
+                            default=False)
+        parser.add_argument('--stop',
+                            help="stop the running server",
+                            action='store_true',
+                            default=False)
+        return parser
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        server = CommandServer(server_address(PROJECT_STORAGE.prefix), idle_timeout=args.idle_timeout)
+        if args.stop:
+            if server.stop():
+                self.logger.info("Command server stopped.")
+                return EXIT_SUCCESS
+            self.logger.warning("No command server is running.")
+            return EXIT_WARNING
+        if args.foreground:
+            self.logger.info("Serving commands on '%s'", server.address)
+            server.serve()
+        elif daemonize():
+            server.serve()
+        else:
+            self.logger.info("Command server started on '%s'", server.address)
+        return EXIT_SUCCESS
+
+
+COMMAND = ProjectServeCommand(__name__, summary_fmt=("Start a server that keeps TAU Commander loaded in memory.\n"
+                                                     "Commands in this project start faster while it is running."))
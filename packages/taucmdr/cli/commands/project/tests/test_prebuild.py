@@ -0,0 +1,97 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of prebuild.py.
+"""
+
+import os
+import tempfile
+from unittest import mock
+from taucmdr import tests, EXIT_SUCCESS
+from taucmdr.cf.software import SoftwarePackageError, tau_installation
+from taucmdr.cf.software.installation import Installation
+from taucmdr.cf.software.tau_installation import TauInstallation
+from taucmdr.cli.commands.application.create import COMMAND as application_create_cmd
+from taucmdr.cli.commands.measurement.create import COMMAND as measurement_create_cmd
+from taucmdr.cli.commands.measurement.edit import COMMAND as measurement_edit_cmd
+from taucmdr.cli.commands.project.prebuild import COMMAND as project_prebuild_cmd
+from taucmdr.cli.commands.target.create import COMMAND as target_create_cmd
+
+
+class PrebuildTest(tests.TestCase):
+    """Tests for :any:`project.prebuild`."""
+
+    def _create_records(self):
+        self.reset_project_storage(['--bare'])
+        self.assertCommandReturnValue(0, target_create_cmd, ['targ1', '--tau', 'nightly'])
+        self.assertCommandReturnValue(0, application_create_cmd, ['app1'])
+        self.assertCommandReturnValue(0, application_create_cmd, ['app2', '--pthreads', 'T'])
+        for name in 'meas1', 'meas2':
+            self.assertCommandReturnValue(0, measurement_create_cmd, [name, '--source-inst', 'never',
+                                                                      '--compiler-inst', 'never'])
+        self.assertCommandReturnValue(0, measurement_edit_cmd, ['meas2', '--throttle', 'F'])
+
+    def _tags(self):
+        stdout, _ = self.assertCommandReturnValue(EXIT_SUCCESS, project_prebuild_cmd, ['--dry-run'])
+        return [line.split(',') for line in stdout.splitlines() if not line.startswith('[TAU]')]
+
+    def test_dry_run(self):
+        self._create_records()
+        configurations = self._tags()
+        self.assertEqual(len(configurations), 2)
+        self.assertListEqual(sorted('pthread' in tags for tags in configurations), [False, True])
+
+    def test_build(self):
+        self._create_records()
+        installed = {frozenset(tags) for tags in self._tags()[:1]}
+        built = []
+        def verify(tau):
+            if frozenset(tau.get_tags()) not in installed:
+                raise SoftwarePackageError("not built")
+        def make_install(tau):
+            built.append(sorted(tau.get_tags()))
+            installed.add(frozenset(tau.get_tags()))
+        # Don't download TAU to find the installation prefix
+        with mock.patch.object(TauInstallation, '_get_install_tag', return_value='tau-test'), \
+                mock.patch.object(TauInstallation, 'verify', autospec=True, side_effect=verify), \
+                mock.patch.object(TauInstallation, 'make_install', autospec=True, side_effect=make_install), \
+                mock.patch.object(TauInstallation, '_place_source', autospec=True), \
+                mock.patch.object(TauInstallation, 'set_group', autospec=True), \
+                mock.patch.object(Installation, 'install', autospec=True), \
+                mock.patch.object(tau_installation, '_build_in_tree',
+                                  side_effect=lambda *_: tempfile.mkdtemp(dir=os.getcwd())) as build_in_tree:
+            stdout, _ = self.assertCommandReturnValue(EXIT_SUCCESS, project_prebuild_cmd, ['-j', '2'])
+        # Four experiment configurations share two TAU configurations and one of those is already installed
+        self.assertListEqual(built, self._tags()[1:])
+        self.assertEqual(build_in_tree.call_count, 1)
+        self.assertIn('Built 1 TAU configurations', stdout)
+
+    def test_invalid_jobs(self):
+        self.reset_project_storage(['--bare'])
+        _, stderr = self.assertNotCommandReturnValue(EXIT_SUCCESS, project_prebuild_cmd, ['-j', '0'])
+        self.assertIn('Invalid job count', stderr)
@@ -0,0 +1,59 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of serve.py.
+"""
+
+import os
+from unittest import mock
+from taucmdr import tests, EXIT_SUCCESS, EXIT_WARNING
+from taucmdr.cf.storage.levels import PROJECT_STORAGE
+from taucmdr.cli.commands.project import serve
+from taucmdr.server import server_address
+
+
+class ServeTest(tests.TestCase):
+    """Tests for :any:`project.serve`."""
+
+    def test_stop(self):
+        self.reset_project_storage(['--bare'])
+        self.assertCommandReturnValue(EXIT_WARNING, serve.COMMAND, ['--stop'])
+        address = server_address(PROJECT_STORAGE.prefix)
+        with open(address, 'w'):
+            pass
+        self.assertCommandReturnValue(EXIT_SUCCESS, serve.COMMAND, ['--stop'])
+        self.assertFalse(os.path.exists(address))
+
+    def test_start(self):
+        self.reset_project_storage(['--bare'])
+        with mock.patch.object(serve, 'daemonize', return_value=False) as daemonize, \
+                mock.patch.object(serve.CommandServer, 'serve') as serve_method:
+            stdout, _ = self.assertCommandReturnValue(EXIT_SUCCESS, serve.COMMAND, ['--idle-timeout', '5'])
+        daemonize.assert_called_once_with()
+        serve_method.assert_not_called()
+        self.assertIn('Command server started', stdout)
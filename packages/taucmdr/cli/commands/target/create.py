@@ -279,6 +279,10 @@ class TargetCreateCommand(CreateCommand):
         group = parser.add_argument_group('CUDA arguments')
         self._configure_argument_group(group, CUDA_COMPILERS, '--cuda-compilers', 'cuda_family', hint)
 
+        parser.add_argument('--prefetch',
+                            help="download and verify all software package source archives for this target",
+                            default=False,
+                            action='store_true')
         return parser
 
     def _parse_args(self, argv):
@@ -325,7 +329,11 @@ class TargetCreateCommand(CreateCommand):
             record = Compiler.controller(store).register(comp)
             data[comp.info.role.keyword] = record.eid
 
-        return super()._create_record(store, data)
+        retval = super()._create_record(store, data)
+        # `tau initialize` passes a namespace of model attributes that doesn't have the flag
+        if getattr(args, 'prefetch', False):
+            Target.controller(store).one({'name': data['name']}).acquire_sources()
+        return retval
 
 
 COMMAND = TargetCreateCommand(Target, __name__)
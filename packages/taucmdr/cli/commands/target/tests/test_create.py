@@ -31,6 +31,7 @@ Functions used for unit tests of create.py.
 #pylint: disable=missing-docstring
 
 import os
+from unittest import mock
 from taucmdr import tests, util
 from taucmdr.error import ConfigurationError
 from taucmdr.cf.compiler.host import CC, CXX, FC
@@ -47,6 +48,24 @@ class CreateTest(tests.TestCase):
         self.assertIn('Added target \'targ02\' to project configuration \'proj1\'', stdout)
         self.assertFalse(stderr)
 
+    def test_initialize(self):
+        # `tau initialize` creates its default target through this command with a namespace of model attributes
+        self.reset_project_storage()
+        from taucmdr.cf.storage.levels import PROJECT_STORAGE
+        from taucmdr.model.target import Target
+        self.assertIsNotNone(Target.controller(PROJECT_STORAGE).one({'name': 'targ1'}))
+
+    def test_prefetch(self):
+        self.reset_project_storage()
+        from taucmdr.model.target import Target
+        with mock.patch.object(Target, 'acquire_sources') as acquire_sources:
+            stdout, stderr = self.assertCommandReturnValue(0, create_cmd, ['targ02'])
+            self.assertIn('Added target \'targ02\'', stdout)
+            self.assertFalse(stderr)
+            acquire_sources.assert_not_called()
+            self.assertCommandReturnValue(0, create_cmd, ['targ03', '--prefetch'])
+            acquire_sources.assert_called_once_with()
+
     def test_no_args(self):
         self.reset_project_storage()
         _, stderr = self.assertNotCommandReturnValue(0, create_cmd, [])
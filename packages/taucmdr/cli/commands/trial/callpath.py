@@ -0,0 +1,152 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``trial callpath`` subcommand."""
+
+import os
+from taucmdr import EXIT_SUCCESS, logger, util
+from taucmdr.cli import arguments
+from taucmdr.cli.cli_view import Texttable
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.model.project import Project
+
+
+class TrialCallpathCommand(AbstractCommand):
+    """``trial callpath`` subcommand."""
+
+    def _construct_parser(self):
+        from taucmdr.perfdata.pprof import SUMMARIES
+        usage = "%s [trial_number... | data_directory...] [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('trial_numbers',
+                            help="analyze trials (default: the most recent trial)",
+                            metavar='<trial_number>',
+                            nargs='*',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('data_dirs',
+                            help="analyze profiles in directories",
+                            metavar='<data_directory>',
+                            nargs='*',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--metric',
+                            help="metric to analyze (default: TIME if measured)",
+                            metavar='<metric>',
+                            default=None)
+        parser.add_argument('--statistic',
+                            help="how to merge threads into one tree",
+                            metavar='<statistic>',
+                            choices=SUMMARIES,
+                            default='mean')
+        parser.add_argument('--thread',
+                            help="show one thread's tree instead of merging threads",
+                            metavar='<node[.context.thread]>',
+                            default=None)
+        parser.add_argument('--hot',
+                            help="number of call paths with the most exclusive time to list",
+                            metavar='<count>',
+                            type=int,
+                            default=10)
+        parser.add_argument('--min-percent',
+                            help="hide subtrees with less inclusive time than this",
+                            metavar='<percent>',
+                            type=float,
+                            default=1.0)
+        parser.add_argument('--max-depth',
+                            help="hide calls deeper than this",
+                            metavar='<depth>',
+                            type=int,
+                            default=None)
+        return parser
+
+    def _thread(self, spec):
+        try:
+            ids = [int(x) for x in spec.split('.')]
+        except ValueError:
+            ids = []
+        if len(ids) not in (1, 3):
+            self.parser.error(f"Invalid thread: {spec}.  Give a node number or node.context.thread, e.g. 4.0.1")
+        return ids
+
+    def _format(self, title, table, args):
+        from taucmdr.perfdata import callpath
+        tree = callpath.build_tree(table.names)
+        if args.thread:
+            index = callpath.thread_index(table, *self._thread(args.thread))
+            values = callpath.tree_values(tree, table, thread=index)
+            merged = "node %d, context %d, thread %d" % tuple(table.threads[index])
+        else:
+            values = callpath.tree_values(tree, table, args.statistic)
+            merged = f"{args.statistic} over {len(table.threads)} threads"
+        scale, unit = (1e-3, 'msec') if table.metric == 'TIME' else (1, 'counts')
+        total = values.inclusive[tree.roots].max()
+        rows = [['%.6g' % (values.exclusive[node] * scale),
+                 '%.1f' % (values.exclusive[node] / total * 100 if total else 0),
+                 '%.6g' % values.calls[node], ' => '.join(callpath.node_path(tree, node))]
+                for node in callpath.hot_paths(values, args.hot)]
+        hot = Texttable(logger.LINE_WIDTH)
+        hot.set_cols_align(['r', 'r', 'r', 'l'])
+        hot.set_cols_dtype(['t'] * 4)
+        hot.set_deco(Texttable.HEADER | Texttable.VLINES)
+        hot.add_rows([[f'Exclusive {unit}', '%Total', '#Call', 'Call Path']] + rows)
+        return '\n'.join([util.hline(title, 'cyan'),
+                          f"Metric:     {table.metric} ({merged})",
+                          f"Call paths: {len(tree.parent)} ({int(tree.depth.max()) + 1} deep), "
+                          f"{len(tree.components)} functions",
+                          '',
+                          hot.draw(),
+                          '',
+                          callpath.render_tree(tree, values, table.metric, args.min_percent / 100, args.max_depth),
+                          ''])
+
+    def main(self, argv):
+        from taucmdr.perfdata.tau_profile import profile_table, read_profiles
+        args = self._parse_args(argv)
+        if args.thread:
+            self._thread(args.thread)
+        data_dirs = []
+        trial_numbers = []
+        for num in getattr(args, 'trial_numbers', []) + getattr(args, 'data_dirs', []):
+            if os.path.isdir(num):
+                data_dirs.append(num)
+            else:
+                try:
+                    trial_numbers.append(int(num))
+                except ValueError:
+                    self.parser.error("Invalid trial number: %s" % num)
+        parts = []
+        if trial_numbers or not data_dirs:
+            expr = Project.selected().experiment()
+            for trial in expr.trials(trial_numbers):
+                parts.append(self._format(f"Call Paths: Trial {trial['number']} of Experiment '{expr['name']}'",
+                                          trial.profile_table(args.metric), args))
+        for path in data_dirs:
+            parts.append(self._format(f"Call Paths: {path}", profile_table(read_profiles(path, args.metric)), args))
+        util.page_output('\n'.join(parts))
+        return EXIT_SUCCESS
+
+
+COMMAND = TrialCallpathCommand(__name__, summary_fmt=("Show the call path tree and hot paths of trials measured "
+                                                      "with callpath > 0."))
@@ -0,0 +1,136 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``trial communication`` subcommand."""
+
+import os
+from taucmdr import EXIT_SUCCESS, logger, util
+from taucmdr.cli import arguments
+from taucmdr.cli.cli_view import Texttable
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.model.project import Project
+
+
+def _draw_table(header, rows, align):
+    table = Texttable(logger.LINE_WIDTH)
+    table.set_cols_align(align)
+    table.set_cols_dtype(['t'] * len(header))
+    table.set_deco(Texttable.HEADER | Texttable.VLINES)
+    table.add_rows([header] + rows)
+    return table.draw()
+
+
+class TrialCommunicationCommand(AbstractCommand):
+    """``trial communication`` subcommand."""
+
+    def _construct_parser(self):
+        usage = "%s [trial_number... | data_directory...] [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('trial_numbers',
+                            help="analyze trials (default: the most recent trial)",
+                            metavar='<trial_number>',
+                            nargs='*',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('data_dirs',
+                            help="analyze profiles in directories",
+                            metavar='<data_directory>',
+                            nargs='*',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--top',
+                            help="number of ranks and rank pairs to list",
+                            metavar='<count>',
+                            type=int,
+                            default=10)
+        parser.add_argument('--export',
+                            help="write the communication matrix to a .npz or .mtx file",
+                            metavar='<file>',
+                            default=None)
+        return parser
+
+    def _format(self, title, matrix, top):
+        from taucmdr.perfdata import comm_matrix
+        size = util.human_size
+        host = lambda rank: matrix.host_names[matrix.host[rank]] if matrix.host[rank] >= 0 else ''
+        totals = comm_matrix.rank_totals(matrix)
+        local = comm_matrix.locality(matrix)
+        percent = lambda fraction: '-' if fraction is None else f"{fraction:.1%}"
+        parts = [util.hline(title, 'cyan'),
+                 f"Ranks:               {matrix.ranks}",
+                 f"Communicating pairs: {len(matrix.bytes)}",
+                 f"Messages:            {matrix.messages.sum()} ({size(int(matrix.bytes.sum()))})",
+                 f"Destinations:        {totals.out_degree.min()} min, {totals.out_degree.mean():.1f} mean, "
+                 f"{totals.out_degree.max()} max per rank",
+                 f"To self:             {percent(local.self_fraction)} of bytes",
+                 f"To rank +/- 1:       {percent(local.neighbor_fraction)} of bytes",
+                 f"Within a host:       {percent(local.intra_host_fraction)} of bytes",
+                 f"Rank distance:       {local.mean_distance:.1f} mean (weighted by bytes), {local.max_distance} max",
+                 '']
+        rows = [[str(rank), host(rank), size(int(totals.sent_bytes[rank])), size(int(totals.received_bytes[rank])),
+                 str(totals.sent_messages[rank]), str(totals.received_messages[rank]),
+                 str(totals.out_degree[rank]), str(totals.in_degree[rank])]
+                for rank in comm_matrix.top_talkers(totals, top)]
+        parts += [_draw_table(['Rank', 'Host', 'Sent', 'Received', 'Msgs Sent', 'Msgs Recv', 'Out Degree',
+                               'In Degree'], rows, ['r', 'l', 'r', 'r', 'r', 'r', 'r', 'r']), '']
+        rows = [[str(matrix.source[i]), str(matrix.destination[i]), str(matrix.messages[i]),
+                 size(int(matrix.bytes[i])), size(int(matrix.bytes[i] / matrix.messages[i]))]
+                for i in comm_matrix.top_pairs(matrix, top)]
+        parts += [_draw_table(['From Rank', 'To Rank', 'Messages', 'Bytes', 'Mean Size'], rows, ['r'] * 5), '']
+        return '\n'.join(parts)
+
+    def main(self, argv):
+        from taucmdr.perfdata import comm_matrix
+        args = self._parse_args(argv)
+        data_dirs = []
+        trial_numbers = []
+        for num in getattr(args, 'trial_numbers', []) + getattr(args, 'data_dirs', []):
+            if os.path.isdir(num):
+                data_dirs.append(num)
+            else:
+                try:
+                    trial_numbers.append(int(num))
+                except ValueError:
+                    self.parser.error("Invalid trial number: %s" % num)
+        datasets = []
+        if trial_numbers or not data_dirs:
+            expr = Project.selected().experiment()
+            for trial in expr.trials(trial_numbers):
+                files = [relpath for relpath, _, kind in trial.manifest() if kind == 'profile']
+                datasets.append((f"Communication: Trial {trial['number']} of Experiment '{expr['name']}'",
+                                 trial.prefix, files))
+        datasets.extend((f"Communication: {path}", path, None) for path in data_dirs)
+        if args.export and len(datasets) > 1:
+            self.parser.error("--export writes one trial's communication matrix; give only one trial or directory")
+        for title, prefix, files in datasets:
+            matrix = comm_matrix.read_comm_matrix(prefix, files)
+            print(self._format(title, matrix, args.top))
+            if args.export:
+                comm_matrix.export_comm_matrix(args.export, matrix)
+                self.logger.info("Wrote communication matrix to '%s'", args.export)
+        return EXIT_SUCCESS
+
+
+COMMAND = TrialCommunicationCommand(__name__, summary_fmt=("Analyze the point-to-point communication matrix of "
+                                                           "trials measured with comm_matrix."))
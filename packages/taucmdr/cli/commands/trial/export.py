@@ -27,10 +27,12 @@
 """``trial export`` subcommand."""
 
 import os
-from taucmdr import EXIT_SUCCESS
+import sys
+from taucmdr import EXIT_SUCCESS, logger
 from taucmdr.cli import arguments
 from taucmdr.cli.command import AbstractCommand
 from taucmdr.model.project import Project
+from taucmdr.model.trial import export_bundle
 
 
 class TrialExportCommand(AbstractCommand):
@@ -43,6 +45,14 @@ class TrialExportCommand(AbstractCommand):
                             help="location to store exported trial data",
                             metavar='<path>',
                             default=os.getcwd())
+        parser.add_argument('--bundle',
+                            help="write all trials to one tar archive, or to standard output if <file> is '-'",
+                            metavar='<file>',
+                            default=None)
+        parser.add_argument('--compression',
+                            help="compression for archives and merged profiles",
+                            choices=('gzip', 'zstd', 'none'),
+                            default='gzip')
         parser.add_argument('trial_numbers',
                             help="show details for specified trials",
                             metavar='trial_number',
@@ -58,9 +68,28 @@ class TrialExportCommand(AbstractCommand):
                 trial_numbers.append(int(num))
             except ValueError:
                 self.parser.error("Invalid trial number: %s" % num)
+        compression = {'gzip': 'gz', 'zstd': 'zst', 'none': None}[args.compression]
         expr = Project.selected().experiment()
-        for trial in expr.trials(trial_numbers):
-            trial.export(args.destination)
+        trials = expr.trials(trial_numbers)
+        if args.bundle == '-':
+            logger.console_to_stderr()
+            export_bundle(trials, sys.stdout.buffer, compression)
+            sys.stdout.buffer.flush()
+        elif args.bundle:
+            self.logger.info("Writing '%s'...", args.bundle)
+            try:
+                with open(args.bundle, 'wb') as fout:
+                    export_bundle(trials, fout, compression)
+            except BaseException:
+                # Don't leave a truncated bundle behind
+                try:
+                    os.remove(args.bundle)
+                except OSError:
+                    pass
+                raise
+        else:
+            for trial in trials:
+                trial.export(args.destination, compression)
         return EXIT_SUCCESS
 
 
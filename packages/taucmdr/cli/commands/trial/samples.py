@@ -0,0 +1,150 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``trial samples`` subcommand."""
+
+import os
+from taucmdr import EXIT_SUCCESS, logger, util
+from taucmdr.cli import arguments
+from taucmdr.cli.cli_view import Texttable
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.model.project import Project
+
+
+class TrialSamplesCommand(AbstractCommand):
+    """``trial samples`` subcommand."""
+
+    def _construct_parser(self):
+        from taucmdr.perfdata.sampling import GROUPINGS, WEIGHTS
+        usage = "%s [trial_number... | data_directory...] [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('trial_numbers',
+                            help="analyze trials (default: the most recent trial)",
+                            metavar='<trial_number>',
+                            nargs='*',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('data_dirs',
+                            help="analyze profiles in directories",
+                            metavar='<data_directory>',
+                            nargs='*',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--metric',
+                            help="metric to analyze (default: TIME if measured)",
+                            metavar='<metric>',
+                            default=None)
+        parser.add_argument('--by',
+                            help="group samples by source line, function, or module",
+                            metavar='<grouping>',
+                            choices=GROUPINGS,
+                            default='function')
+        parser.add_argument('--top',
+                            help="number of lines, functions, or modules to list",
+                            metavar='<count>',
+                            type=int,
+                            default=20)
+        parser.add_argument('--collapsed',
+                            help="write collapsed stacks for flame graph tools to a file ('-' for stdout)",
+                            metavar='<file>',
+                            default=None)
+        parser.add_argument('--weight',
+                            help="what collapsed stack counts measure",
+                            metavar='<weight>',
+                            choices=WEIGHTS,
+                            default='samples')
+        parser.add_argument('--lines',
+                            help="include source lines in collapsed stack frames",
+                            action='store_true',
+                            default=False)
+        return parser
+
+    def _format(self, title, table, args):
+        from taucmdr.perfdata import sampling
+        profile = sampling.aggregate(table)
+        groups = sampling.group(profile, args.by)
+        scale, unit = (1e-3, 'msec') if table.metric == 'TIME' else (1, 'counts')
+        total = profile.value.sum()
+        header = {'line': ['Function', 'File', 'Line'], 'function': ['Function', 'Module'], 'module': ['Module']}
+        rows = []
+        for key, samples, value in list(zip(groups.keys, groups.samples, groups.value))[:args.top]:
+            if args.by == 'line':
+                labels = [key[1], key[2] or key[0], str(key[3] or '')]
+            elif args.by == 'function':
+                labels = [key[1], key[0]]
+            else:
+                labels = [key[0] or '(unknown)']
+            rows.append(['%.6g' % (value * scale), '%.1f' % (value / total * 100 if total else 0),
+                         '%d' % samples] + labels)
+        out = Texttable(logger.LINE_WIDTH)
+        out.set_cols_align(['r', 'r', 'r'] + ['l'] * len(header[args.by]))
+        out.set_cols_dtype(['t'] * (3 + len(header[args.by])))
+        out.set_deco(Texttable.HEADER | Texttable.VLINES)
+        out.add_rows([[f'{table.metric} {unit}', '%Total', 'Samples'] + header[args.by]] + rows)
+        return '\n'.join([util.hline(title, 'cyan'),
+                          f"Samples:      {int(profile.samples.sum())} from {profile.thread_count} threads",
+                          f"Sample sites: {len(profile.sites)}",
+                          '',
+                          out.draw(),
+                          ''])
+
+    def main(self, argv):
+        from taucmdr.perfdata import sampling
+        from taucmdr.perfdata.tau_profile import profile_table, read_profiles
+        args = self._parse_args(argv)
+        data_dirs = []
+        trial_numbers = []
+        for num in getattr(args, 'trial_numbers', []) + getattr(args, 'data_dirs', []):
+            if os.path.isdir(num):
+                data_dirs.append(num)
+            else:
+                try:
+                    trial_numbers.append(int(num))
+                except ValueError:
+                    self.parser.error("Invalid trial number: %s" % num)
+        datasets = []
+        if trial_numbers or not data_dirs:
+            expr = Project.selected().experiment()
+            datasets.extend((f"Samples: Trial {trial['number']} of Experiment '{expr['name']}'",
+                             lambda trial=trial: trial.profile_table(args.metric))
+                            for trial in expr.trials(trial_numbers))
+        datasets.extend((f"Samples: {path}", lambda path=path: profile_table(read_profiles(path, args.metric)))
+                        for path in data_dirs)
+        if args.collapsed:
+            if len(datasets) > 1:
+                self.parser.error("--collapsed writes one trial's stacks; give only one trial or directory")
+            stacks = '\n'.join(sampling.collapsed_stacks(datasets[0][1](), args.weight, args.lines)) + '\n'
+            if args.collapsed == '-':
+                print(stacks, end='')
+            else:
+                with open(args.collapsed, 'w') as fout:
+                    fout.write(stacks)
+                self.logger.info("Wrote collapsed stacks to '%s'", args.collapsed)
+            return EXIT_SUCCESS
+        util.page_output('\n'.join(self._format(title, load(), args) for title, load in datasets))
+        return EXIT_SUCCESS
+
+
+COMMAND = TrialSamplesCommand(__name__, summary_fmt=("Show the hottest source lines, functions, or modules in "
+                                                     "trials measured with event-based sampling."))
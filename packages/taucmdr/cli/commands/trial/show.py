@@ -27,12 +27,21 @@
 """``trial show`` subcommand."""
 
 import os
+from taucmdr import EXIT_SUCCESS, logger, util
 from taucmdr.cli import arguments
+from taucmdr.cli.cli_view import Texttable
 from taucmdr.cli.command import AbstractCommand
 from taucmdr.model.project import Project
 from taucmdr.cf.software.tau_installation import TauInstallation, PROFILE_ANALYSIS_TOOLS, TRACE_ANALYSIS_TOOLS
 
 
+TEXT_VIEWS = ('flat', 'callpath', 'all')
+"""tuple: Timers a text report can show: only flat timers, only call path timers, or both."""
+
+TEXT_SORT_KEYS = ('inclusive', 'exclusive', 'calls', 'subroutines', 'per_call', 'name')
+"""tuple: Columns a text report can be sorted by."""
+
+
 class TrialShowCommand(AbstractCommand):
     """``trial show`` subcommand."""
 
@@ -51,6 +60,34 @@ class TrialShowCommand(AbstractCommand):
                             nargs='+',
                             choices=TRACE_ANALYSIS_TOOLS,
                             default=arguments.SUPPRESS)
+        parser.add_argument('--stats',
+                            help="print summary statistics of TAU traces instead of opening an analysis tool",
+                            action='store_true',
+                            default=False)
+        parser.add_argument('--top',
+                            help="number of rows in each table of --stats (default: 20) or text reports (default: all)",
+                            metavar='<count>',
+                            type=int,
+                            default=None)
+        group = parser.add_argument_group('text report arguments', "used with `--profile-tools text`")
+        group.add_argument('--metric',
+                           help="metric to report (default: TIME if measured)",
+                           metavar='<metric>',
+                           default=None)
+        group.add_argument('--view',
+                           help="report flat timers, call path timers, or both",
+                           metavar='<view>',
+                           choices=TEXT_VIEWS,
+                           default='flat')
+        group.add_argument('--sort',
+                           help="column to sort by",
+                           metavar='<column>',
+                           choices=TEXT_SORT_KEYS,
+                           default='inclusive')
+        group.add_argument('--per-thread',
+                           help="show each thread's profile before the total, mean, min, and max summaries",
+                           action='store_true',
+                           default=False)
         parser.add_argument('trial_numbers',
                             help="Display data from trials",
                             metavar='<trial_number>',
@@ -63,6 +100,94 @@ class TrialShowCommand(AbstractCommand):
                             default=arguments.SUPPRESS)
         return parser
 
+    @staticmethod
+    def _draw_table(header, rows, align):
+        table = Texttable(logger.LINE_WIDTH)
+        table.set_cols_align(align)
+        table.set_cols_dtype(['t'] * len(header))
+        table.set_deco(Texttable.HEADER | Texttable.VLINES)
+        table.add_rows([header] + rows)
+        return table.draw()
+
+    def _format_stats(self, title, stats, top):
+        import numpy as np
+        from taucmdr.perfdata.trace_stats import function_totals
+        seconds = lambda usec: f"{usec / 1e6:.6g}"
+        percent = lambda part, whole: f"{part / whole:.1%}" if whole else "-"
+        total = stats.span.sum()
+        parts = [util.hline(title, 'cyan'),
+                 f"Threads:       {len(stats.threads)}",
+                 f"Longest span:  {seconds(stats.span.max() if len(stats.span) else 0)} s",
+                 f"Idle:          {percent(stats.idle.sum(), total)} of all threads' time",
+                 f"MPI:           {percent(stats.mpi.sum(), total)} ({percent(stats.wait.sum(), total)} waiting)",
+                 f"Messages sent: {stats.sent_messages.sum()} ({util.human_size(int(stats.sent_bytes.sum()))})", '']
+        calls, inclusive, exclusive = function_totals(stats)
+        rows = [[stats.event_names[i], str(calls[i]), seconds(inclusive[i]), seconds(exclusive[i]),
+                 percent(exclusive[i], total)] for i in exclusive.argsort()[::-1][:top] if calls[i]]
+        if rows:
+            parts += [self._draw_table(['Function', 'Calls', 'Inclusive (s)', 'Exclusive (s)', '% Time'], rows,
+                                       ['l', 'r', 'r', 'r', 'r']), '']
+        rows = []
+        for label, reduce in ('Min', np.argmin), ('Max', np.argmax):
+            i = reduce(stats.span) if len(stats.span) else None
+            if i is not None:
+                rows.append([f"{label} span: %d.%d.%d" % tuple(stats.threads[i]), seconds(stats.span[i]),
+                             percent(stats.idle[i], stats.span[i]), percent(stats.mpi[i], stats.span[i]),
+                             percent(stats.wait[i], stats.span[i]), str(stats.sent_messages[i]),
+                             util.human_size(int(stats.sent_bytes[i]))])
+        if rows:
+            parts += [self._draw_table(['Thread', 'Span (s)', 'Idle', 'MPI', 'Wait', 'Sent', 'Sent Bytes'], rows,
+                                       ['l', 'r', 'r', 'r', 'r', 'r', 'r']), '']
+        order = stats.message_bytes.argsort()[::-1][:top]
+        rows = [[str(stats.message_source[i]), str(stats.message_destination[i]), str(stats.message_count[i]),
+                 util.human_size(int(stats.message_bytes[i]))] for i in order]
+        if rows:
+            parts += [self._draw_table(['From Node', 'To Node', 'Messages', 'Bytes'], rows, ['r', 'r', 'r', 'r']), '']
+        size = len(stats.event_ids)
+        counts = np.bincount(stats.userevent_event, weights=stats.userevent_count, minlength=size)
+        sums = np.bincount(stats.userevent_event, weights=stats.userevent_sum, minlength=size)
+        minimums = np.full(size, np.inf)
+        maximums = np.full(size, -np.inf)
+        np.minimum.at(minimums, stats.userevent_event, stats.userevent_min)
+        np.maximum.at(maximums, stats.userevent_event, stats.userevent_max)
+        rows = [[stats.event_names[i], f"{counts[i]:.0f}", f"{minimums[i]:.6g}", f"{sums[i] / counts[i]:.6g}",
+                 f"{maximums[i]:.6g}"] for i in np.flatnonzero(counts)]
+        if rows:
+            parts += [self._draw_table(['User Event', 'Count', 'Min', 'Mean', 'Max'], rows,
+                                       ['l', 'r', 'r', 'r', 'r']), '']
+        return '\n'.join(parts)
+
+    def _show_stats(self, trial_numbers, data_files, top):
+        from taucmdr.perfdata.trace_stats import compute_statistics
+        parts = []
+        if trial_numbers or not data_files:
+            expr = Project.selected().experiment()
+            for trial in expr.trials(trial_numbers):
+                title = f"Trace Statistics: Trial {trial['number']} of Experiment '{expr['name']}'"
+                parts.append(self._format_stats(title, trial.trace_statistics(), top))
+        for path in data_files:
+            if not os.path.isdir(path):
+                self.parser.error(f"--stats needs a directory of TAU trace files, not '{path}'")
+            parts.append(self._format_stats(f"Trace Statistics: {path}", compute_statistics(path), top))
+        print('\n'.join(parts))
+        return EXIT_SUCCESS
+
+    def _show_text(self, trial_numbers, data_files, args):
+        from taucmdr.perfdata import pprof
+        options = dict(view=args.view, sort=args.sort, top=args.top, per_thread=args.per_thread)
+        parts = []
+        if trial_numbers or not data_files:
+            expr = Project.selected().experiment()
+            for trial in expr.trials(trial_numbers):
+                parts.append(util.hline(f"Trial {trial['number']} of Experiment '{expr['name']}'", 'cyan'))
+                parts.append(pprof.render_report(trial.profile_table(args.metric), **options))
+        for path in data_files:
+            if not os.path.isdir(path):
+                self.parser.error(f"Text reports need a directory of TAU profiles, not '{path}'")
+            parts.extend([util.hline(path, 'cyan'), pprof.profile_report(path, None, args.metric, **options)])
+        util.page_output('\n'.join(parts))
+        return EXIT_SUCCESS
+
     def main(self, argv):
         args = self._parse_args(argv)
         profile_tools = getattr(args, 'profile_tools', None)
@@ -77,6 +202,11 @@ class TrialShowCommand(AbstractCommand):
                     trial_numbers.append(int(num))
                 except ValueError:
                     self.parser.error("Invalid trial number: %s" % num)
+        if args.stats:
+            return self._show_stats(trial_numbers, data_files, 20 if args.top is None else args.top)
+        if profile_tools == ['text'] and not trace_tools:
+            # The text report doesn't need TAU's tools so don't configure TAU
+            return self._show_text(trial_numbers, data_files, args)
 
         tau = TauInstallation.get_minimal()
         dataset = {}
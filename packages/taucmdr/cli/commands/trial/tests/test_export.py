@@ -30,16 +30,49 @@ Functions used for unit tests of export.py.
 """
 
 import os
+import tempfile
+from unittest import mock
 from taucmdr import tests, util, EXIT_SUCCESS
 from taucmdr.cf.compiler.host import CC
 from taucmdr.cf.compiler.mpi import MPI_CC
+from taucmdr.cf.storage import StorageRecord
+from taucmdr.cf.storage.levels import PROJECT_STORAGE
 from taucmdr.cli.commands.trial.create import COMMAND as trial_create_cmd
 from taucmdr.cli.commands.trial.export import COMMAND as trial_export_cmd
 from taucmdr.model.project import Project
+from taucmdr.model.trial import Trial
 
 
 class ExportTest(tests.TestCase):
 
+    def _export(self, argv):
+        """Export a trial with merged profiles and OTF2 traces and return the names of the exported files."""
+        prefix = tempfile.mkdtemp(dir=os.getcwd())
+        for relpath in 'tauprofile.xml', 'traces.otf2', 'traces.def', os.path.join('traces', '0.evt'):
+            os.makedirs(os.path.join(prefix, os.path.dirname(relpath)), exist_ok=True)
+            with open(os.path.join(prefix, relpath), 'w') as fout:
+                fout.write('data')
+        trial = Trial(StorageRecord(PROJECT_STORAGE, 1, {'number': 0, 'data_size': 4}))
+        expr = mock.MagicMock()
+        expr.__getitem__.return_value = 'ex1'
+        expr.trials.return_value = [trial]
+        dest = tempfile.mkdtemp(dir=os.getcwd())
+        data = {'merged': os.path.join(prefix, 'tauprofile.xml'), 'otf2': os.path.join(prefix, 'traces.otf2')}
+        with mock.patch.object(Trial, 'prefix', new_callable=mock.PropertyMock, return_value=prefix), \
+                mock.patch.object(Trial, 'populate', return_value=expr), \
+                mock.patch.object(Trial, 'get_data_files', return_value=data), \
+                mock.patch.object(Project, 'selected') as selected:
+            selected.return_value.experiment.return_value = expr
+            self.assertCommandReturnValue(EXIT_SUCCESS, trial_export_cmd, ['--destination', dest] + argv)
+        return sorted(os.listdir(dest))
+
+    def test_default_compression(self):
+        self.assertListEqual(self._export([]), ['ex1.trial0.tgz', 'ex1.trial0.xml.gz'])
+
+    @tests.skipUnless(util.which('zstd'), "zstd is required for this test")
+    def test_zstd_compression(self):
+        self.assertListEqual(self._export(['--compression', 'zstd']), ['ex1.trial0.tar.zst', 'ex1.trial0.xml.zst'])
+
     @tests.skipUnless(util.which('java'), "A java interpreter is required for this test")
     def test_export_tau_profile(self):
         self.reset_project_storage(['--profile', 'tau', '--trace', 'none'])
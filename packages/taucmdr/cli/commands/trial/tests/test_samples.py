@@ -0,0 +1,81 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of samples.py.
+"""
+
+import os
+import tempfile
+from unittest import mock
+from taucmdr import tests, EXIT_SUCCESS
+from taucmdr.cf.platforms import HOST_ARCH
+from taucmdr.cf.compiler.host import CC
+from taucmdr.cli.commands.select import COMMAND as select_cmd
+from taucmdr.cli.commands.trial.create import COMMAND as trial_create_cmd
+from taucmdr.cli.commands.trial.samples import COMMAND as trial_samples_cmd
+from taucmdr.perfdata.tests.test_tau_profile import write_profile
+
+PROFILE = '''3 templated_functions_MULTI_TIME
+# Name Calls Subrs Excl Incl ProfileCalls #
+"main" 1 0 100 100 0 GROUP="TAU_DEFAULT"
+"[SAMPLE] foo [{/src/a.c} {42}]" 3 0 30 30 0 GROUP="TAU_UNWIND|TAU_SAMPLE"
+"main => [CONTEXT] main => [UNWIND] bar [{/src/b.c} {7}] => [SAMPLE] foo [{/src/a.c} {42}]" 3 0 30 30 0 GROUP="TAU_SAMPLE"
+0 aggregates
+'''
+
+
+# Print reports instead of piping them to a pager so they can be checked
+@mock.patch.dict(os.environ, {'__TAUCMDR_DISABLE_PAGER__': '1'})
+class SamplesTest(tests.TestCase):
+    """Tests for :any:`trial.samples`."""
+
+    def setUp(self):
+        super().setUp()
+        self.prefix = tempfile.mkdtemp(dir=os.getcwd())
+        write_profile(self.prefix, 'profile.0.0.0', PROFILE)
+
+    def test_data_directory(self):
+        stdout, stderr = self.assertCommandReturnValue(EXIT_SUCCESS, trial_samples_cmd, [self.prefix, '--by', 'line'])
+        self.assertIn('Samples: %s' % self.prefix, stdout)
+        self.assertIn('/src/a.c', stdout)
+        self.assertFalse(stderr)
+
+    def test_collapsed(self):
+        path = os.path.join(self.prefix, 'stacks.txt')
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_samples_cmd, [self.prefix, '--collapsed', path])
+        with open(path) as fin:
+            self.assertEqual(fin.read(), 'main;bar;foo 3\n')
+
+    @tests.skipIf(HOST_ARCH.is_bluegene(), "Test skipped on BlueGene")
+    def test_samples(self):
+        self.reset_project_storage()
+        self.assertCommandReturnValue(0, select_cmd, ['sample'])
+        self.assertManagedBuild(0, CC, [], 'matmult.c')
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_create_cmd, ['./a.out'])
+        stdout, _ = self.assertCommandReturnValue(EXIT_SUCCESS, trial_samples_cmd, ['--by', 'function'])
+        self.assertIn('Samples: Trial 0', stdout)
@@ -40,6 +40,13 @@ from taucmdr import logger
 LOGGER = logger.get_logger(__name__)
 
 
+def _support_request():
+    """Tell the user how to ask for help, pointing at the debug log only if it is actually written."""
+    if logger.DEBUG_LOG_ENABLED:
+        return "send '%s' to %s" % (logger.LOG_FILE, HELP_CONTACT)
+    return "contact %s" % HELP_CONTACT
+
+
 class Error(Exception):
     """Base class for all errors in TAU Commander.
 
@@ -57,7 +64,7 @@ class Error(Exception):
                    "\n"
                    "%(backtrace)s\n"
                    "This is a bug in TAU Commander.\n"
-                   "Please send '%(logfile)s' to %(contact)s for assistance.")
+                   "Please %(support)s for assistance.")
 
     def __init__(self, value, *hints):
         """Initialize the Error instance.
@@ -69,7 +76,7 @@ class Error(Exception):
         super().__init__()
         self.value = value
         self.hints = list(hints)
-        self.message_fields = {'contact': HELP_CONTACT, 'logfile': logger.LOG_FILE}
+        self.message_fields = {'contact': HELP_CONTACT, 'logfile': logger.LOG_FILE, 'support': _support_request()}
 
     @property
     def message(self) -> str:
@@ -213,6 +220,7 @@ def excepthook(etype, value, tb):
                                            'typename': etype.__name__,
                                            'contact': HELP_CONTACT,
                                            'logfile': logger.LOG_FILE,
+                                           'support': _support_request(),
                                            'backtrace': backtrace}
             LOGGER.critical(message)
             sys.exit(EXIT_FAILURE)
@@ -34,11 +34,18 @@ TAU Commander has two channels for communicating with the user:
 
 TAU Commander also logs all status messages at the highest reporting level to
 a rotating debug file in the user's TAU Commander project prefix, typically "~/.taucmdr".
+Records are queued and written to the debug file by a background thread so that
+verbose subprocesses aren't slowed down by log formatting and file I/O.  Set
+``__TAUCMDR_LOG_FORMAT__=json`` to write the debug file as JSON lines, or set
+``__TAUCMDR_DISABLE_DEBUG_LOG__`` to skip it entirely.
 """
 
 import os
 import re
 import sys
+import json
+import queue
+import atexit
 import errno
 import textwrap
 import socket
@@ -336,6 +343,27 @@ class LogFormatter(logging.Formatter):
                 yield self.line_marker
 
 
+class JSONLinesFormatter(logging.Formatter):
+    """Formats log records as single-line JSON objects.
+
+    Much cheaper than :any:`LogFormatter` since nothing is wrapped or colored,
+    and easier to process with other tools.
+    """
+
+    def format(self, record):
+        # type: (LogRecord) -> str
+        fields = {'time': record.created,
+                  'level': record.levelname,
+                  'name': record.name,
+                  'line': record.lineno,
+                  'message': record.getMessage()}
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            fields['exception'] = record.exc_text
+        return json.dumps(fields)
+
+
 def get_logger(name):
     # type: (str) -> Logger
     """Returns a customized logging object.
@@ -364,6 +392,9 @@ def set_log_level(level):
     global LOG_LEVEL
     LOG_LEVEL = level.upper()
     _STDOUT_HANDLER.setLevel(LOG_LEVEL)
+    if not DEBUG_LOG_ENABLED:
+        # Nothing else captures debug records so let the loggers discard them before formatting
+        _ROOT_LOGGER.setLevel(LOG_LEVEL)
 
 LOG_LEVEL = 'INFO'
 """str: The global logging level for stdout loggers and software packages.
@@ -374,6 +405,60 @@ Don't change directly. May be changed via :any:`set_log_level`.
 LOG_FILE = os.path.join(USER_PREFIX, 'debug_log')
 """str: Absolute path to a log file to receive all debugging output."""
 
+LOG_FORMAT = os.environ.get('__TAUCMDR_LOG_FORMAT__', 'text').lower()
+"""str: Format of the debug log file, either 'text' or 'json'."""
+
+DEBUG_LOG_ENABLED = not os.environ.get('__TAUCMDR_DISABLE_DEBUG_LOG__', False)
+"""bool: True if debugging output is written to :any:`LOG_FILE`."""
+
+
+def _start_log_listener():
+    """Start a background thread to write queued records to the debug log file."""
+    # pylint: disable=global-statement
+    global _LOG_QUEUE, _LOG_LISTENER, _LOG_LISTENER_PID
+    _LOG_QUEUE = queue.Queue()
+    _QUEUE_HANDLER.queue = _LOG_QUEUE
+    _LOG_LISTENER = handlers.QueueListener(_LOG_QUEUE, _FILE_HANDLER, respect_handler_level=True)
+    _LOG_LISTENER.start()
+    _LOG_LISTENER_PID = os.getpid()
+
+
+def after_fork():
+    """Restart the debug log writer thread in a child process created by :any:`os.fork`.
+
+    Threads don't survive fork() so a forked child's debug log records would queue up forever.
+    This is called automatically where Python supports :any:`os.register_at_fork`, but code
+    that forks should still call it since older Pythons don't.  Calling it more than once,
+    or in a process that wasn't forked, does nothing.
+    """
+    if DEBUG_LOG_ENABLED and _LOG_LISTENER_PID != os.getpid():
+        _start_log_listener()
+
+
+def _stop_log_listener():
+    """Write all queued records to the debug log file and stop the background thread."""
+    _LOG_LISTENER.stop()
+    _FILE_HANDLER.flush()
+
+
+def refresh_terminal_size():
+    """Detect the terminal size again and rewrap console output to match.
+
+    The terminal size is detected once at import time.  Call this if the process'
+    standard output has been redirected to a different terminal since then.
+    """
+    global TERM_SIZE, LINE_WIDTH # pylint: disable=global-statement
+    TERM_SIZE = get_terminal_size()
+    LINE_WIDTH = TERM_SIZE[0] - len(LINE_MARKER)
+    _STDOUT_HANDLER.setFormatter(LogFormatter(line_width=LINE_WIDTH, printable_only=True))
+
+def console_to_stderr():
+    """Send console log messages to :any:`sys.stderr` instead of :any:`sys.stdout`.
+
+    Call this before writing data to the process' standard output, e.g. an archive piped to another command.
+    """
+    _STDOUT_HANDLER.setStream(sys.stderr)
+
 LINE_MARKER = os.environ.get('TAU_LINE_MARKER', '[TAU] ')
 """str: Marker for each line of output."""
 
@@ -391,21 +476,33 @@ width cannot be determined, the default is 80.
 
 _ROOT_LOGGER = logging.getLogger()
 if not _ROOT_LOGGER.handlers:
-    _ROOT_LOGGER.setLevel(logging.DEBUG)
-    _LOG_FILE_PREFIX = os.path.dirname(LOG_FILE)
-    try:
-        os.makedirs(_LOG_FILE_PREFIX)
-    except OSError as exc:
-        if not (exc.errno == errno.EEXIST and os.path.isdir(_LOG_FILE_PREFIX)):
-            raise
+    _ROOT_LOGGER.setLevel(logging.DEBUG if DEBUG_LOG_ENABLED else LOG_LEVEL)
     _STDOUT_HANDLER = logging.StreamHandler(sys.stdout)
     _STDOUT_HANDLER.setFormatter(LogFormatter(line_width=LINE_WIDTH, printable_only=True))
     _STDOUT_HANDLER.setLevel(LOG_LEVEL)
     _ROOT_LOGGER.addHandler(_STDOUT_HANDLER)
-    _FILE_HANDLER = handlers.TimedRotatingFileHandler(LOG_FILE, when='D', interval=1, backupCount=3)
-    _FILE_HANDLER.setFormatter(LogFormatter(line_width=120, allow_colors=False))
-    _FILE_HANDLER.setLevel(logging.DEBUG)
-    _ROOT_LOGGER.addHandler(_FILE_HANDLER)
+    if DEBUG_LOG_ENABLED:
+        _LOG_FILE_PREFIX = os.path.dirname(LOG_FILE)
+        try:
+            os.makedirs(_LOG_FILE_PREFIX)
+        except OSError as exc:
+            if not (exc.errno == errno.EEXIST and os.path.isdir(_LOG_FILE_PREFIX)):
+                raise
+        _FILE_HANDLER = handlers.TimedRotatingFileHandler(LOG_FILE, when='D', interval=1, backupCount=3)
+        if LOG_FORMAT == 'json':
+            _FILE_HANDLER.setFormatter(JSONLinesFormatter())
+        else:
+            _FILE_HANDLER.setFormatter(LogFormatter(line_width=120, allow_colors=False))
+        _FILE_HANDLER.setLevel(logging.DEBUG)
+        # Records are formatted and written by a background thread; callers only pay to enqueue them
+        _QUEUE_HANDLER = handlers.QueueHandler(None)
+        _QUEUE_HANDLER.setLevel(logging.DEBUG)
+        _ROOT_LOGGER.addHandler(_QUEUE_HANDLER)
+        _start_log_listener()
+        atexit.register(_stop_log_listener)
+        # The listener thread doesn't survive fork() so forked children need their own
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=after_fork)
     # pylint: disable=logging-not-lazy
     _ROOT_LOGGER.debug(("\n%(bar)s\n"
                         "TAU COMMANDER LOGGING INITIALIZED\n"
@@ -33,7 +33,7 @@ The selected experiment will be used for application compilation and trial visua
 
 import os
 import fasteners
-from taucmdr import logger, util
+from taucmdr import logger, util, TAUCMDR_VERSION
 from taucmdr.error import ConfigurationError, InternalError, IncompatibleRecordError, ProjectSelectionError
 from taucmdr.error import ExperimentSelectionError
 from taucmdr.mvc.model import Model
@@ -45,6 +45,9 @@ from taucmdr.cf.storage.levels import PROJECT_STORAGE, highest_writable_storage
 
 LOGGER = logger.get_logger(__name__)
 
+SCALING_DATA_FILE = '.taucmdr_scaling.npz'
+"""str: Name of the file in the experiment directory caching trials' function totals for scaling studies."""
+
 
 def attributes():
     from taucmdr.model.target import Target
@@ -251,6 +254,46 @@ class Experiment(Model):
     def data_size(self):
         return sum([int(trial.get('data_size', 0)) for trial in self.populate('trials')])
 
+    def scaling_data(self, rebuild=False):
+        """Get per-function totals of the experiment's successful trials for a scaling study.
+
+        Totals are cached in the experiment directory so only trials added or changed since the
+        cache was written have their profiles read.
+
+        Args:
+            rebuild (bool): If True then ignore the cache and read every trial's profiles.
+
+        Returns:
+            tuple: (:any:`ScalingData`, number of trials whose profiles were read,
+                   list of numbers of trials whose rank count couldn't be determined).
+        """
+        from taucmdr.perfdata import scaling
+        trials, entries, skipped = {}, [], []
+        for trial in self.populate('trials'):
+            if trial.get('return_code', None) != 0 or trial.get('elapsed', None) is None:
+                continue
+            ranks = trial.rank_count()
+            if ranks is None:
+                skipped.append(trial['number'])
+                continue
+            trials[trial['number']] = trial
+            entries.append((trial['number'], f"{trial['begin_time']}/{trial.get('data_size', 0)}",
+                            ranks, trial['elapsed']))
+
+        def read_trial(number):
+            try:
+                return trials[number].profile_table('TIME')
+            except ConfigurationError as err:
+                LOGGER.warning("Trial %s has no TIME profiles: %s", number, err.value)
+                return None
+
+        path = os.path.join(self.prefix, SCALING_DATA_FILE)
+        cached = scaling.empty_data() if rebuild else scaling.load_data(path)
+        data, added = scaling.update_data(cached, entries, read_trial)
+        if added or len(data.numbers) != len(cached.numbers) or rebuild:
+            scaling.save_data(path, data)
+        return data, added, skipped
+
     def next_trial_number(self):
         trials = self.populate(attribute='trials', defaults=True)
         for i, j in enumerate(sorted([trial['number'] for trial in trials])):
@@ -258,25 +301,23 @@ class Experiment(Model):
                 return i
         return len(trials)
 
-    @fasteners.interprocess_locked(os.path.join(highest_writable_storage().prefix, '.lock'))
-    def configure(self):
-        """Sets up the Experiment for a new trial.
+    @staticmethod
+    def tau_installation(target, application, measurement):
+        """Describes the TAU configuration needed by a combination of configuration records.
 
-        Installs or configures TAU and all its dependencies.  After calling this
-        function, the experiment is ready to operate on the user's application.
+        TAU is not installed or configured, see :any:`configure`.
+
+        Args:
+            target (Target): Target configuration.
+            application (Application): Application configuration.
+            measurement (Measurement): Measurement configuration.
 
         Returns:
             TauInstallation: Object handle for the TAU installation.
         """
         from taucmdr.cf.software.tau_installation import TauInstallation
-        LOGGER.debug("Configuring experiment %s", self['name'])
-        with fasteners.InterProcessLock(os.path.join(PROJECT_STORAGE.prefix, '.lock')):
-            populated = self.populate(defaults=True)
-        target = populated['target']
-        application = populated['application']
-        measurement = populated['measurement']
         baseline = measurement.get_or_default('baseline')
-        tau = TauInstallation(
+        return TauInstallation(
             target.sources(),
             target_arch=target.architecture(),
             target_os=target.operating_system(),
@@ -346,6 +387,28 @@ class Experiment(Model):
             mpit=measurement.get_or_default('mpit'),
             unwinder=target.get_or_default('unwinder'),
             unwind_depth=measurement.get_or_default('unwind_depth'))
+
+    @fasteners.interprocess_locked(os.path.join(highest_writable_storage().prefix, '.lock'))
+    def configure(self):
+        """Sets up the Experiment for a new trial.
+
+        Installs or configures TAU and all its dependencies.  After calling this
+        function, the experiment is ready to operate on the user's application.
+
+        Returns:
+            TauInstallation: Object handle for the TAU installation.
+        """
+        from taucmdr.cf.software.installation import ConfigCache
+        LOGGER.debug("Configuring experiment %s", self['name'])
+        with fasteners.InterProcessLock(os.path.join(PROJECT_STORAGE.prefix, '.lock')):
+            populated = self.populate(defaults=True)
+        target = populated['target']
+        application = populated['application']
+        measurement = populated['measurement']
+        baseline = measurement.get_or_default('baseline')
+        tau = self.tau_installation(target, application, measurement)
+        tau.config_cache = ConfigCache(os.path.join(self.prefix, 'config_cache.json'),
+                                       TAUCMDR_VERSION, tau.uid, measurement, application, target)
         tau.install()
         if not baseline:
             self.controller(self.storage).update({'tau_makefile': os.path.basename(tau.get_makefile())}, self.eid)
@@ -35,6 +35,7 @@ compilers are installed then there will target configurations for each compiler
 """
 
 import os
+import functools
 import glob
 import fasteners
 from taucmdr import logger, util
@@ -642,16 +643,20 @@ class Target(Model):
         return cls(self.sources(), self.architecture(), self.operating_system(), self.compilers())
 
     def acquire_sources(self):
-        """Acquire all source code packages known to this target."""
-        for attr, val in self.items():
-            if val and attr.endswith('_source'):
-                inst = self.get_installation(attr.replace('_source', ''))
-                try:
-                    inst.acquire_source()
-                except ConfigurationError as err:
-                    # Not a warning since using an existing installation is OK and in that case
-                    # there is no source code package to acquire.
-                    LOGGER.info(err)
+        """Acquire all source code packages known to this target.
+
+        Packages are downloaded concurrently.
+        """
+        def acquire(inst):
+            try:
+                inst.acquire_source()
+            except ConfigurationError as err:
+                # Not a warning since using an existing installation is OK and in that case
+                # there is no source code package to acquire.
+                LOGGER.info(err)
+        insts = [self.get_installation(attr.replace('_source', ''))
+                 for attr, val in self.items() if val and attr.endswith('_source')]
+        util.parallel_downloads([functools.partial(acquire, inst) for inst in insts])
 
     def compilers(self):
         """Get information about the compilers used by this target configuration.
@@ -29,9 +29,155 @@
 Functions used for unit tests of trial.py.
 """
 
-
+import io
+import os
+import gzip
+import tarfile
+import base64
+import tempfile
+from unittest import mock
 from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.cf.storage import StorageRecord
+from taucmdr.cf.storage.levels import PROJECT_STORAGE
+from taucmdr.model.trial import Trial, ENVIRONMENT_FILE, MANIFEST_FILE, data_file_kind, export_bundle
+from taucmdr.model.trial import PROFILE_CACHE_DIR, launcher_rank_count
+
+
+def _patched_trial(test, fields):
+    prefix = tempfile.mkdtemp(dir=os.getcwd())
+    trial = Trial(StorageRecord(PROJECT_STORAGE, 1, dict(fields, number=0)))
+    patcher = mock.patch.object(Trial, 'prefix', new_callable=mock.PropertyMock, return_value=prefix)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return trial
+
 
 @tests.not_implemented
 class TrialTest(tests.TestCase):
     pass
+
+
+class TrialSidecarTest(tests.TestCase):
+    """Tests for trial output and environment stored in compressed files."""
+
+    def _trial(self, fields):
+        return _patched_trial(self, fields)
+
+    def test_environment(self):
+        trial = self._trial({})
+        env = {'TAU_PROFILE': '1', 'PATH': '/bin'}
+        fields = trial.write_environment(env)
+        self.assertEqual(fields['environment_file'], ENVIRONMENT_FILE)
+        trial.update(fields)
+        self.assertDictEqual(trial.get_environment(), env)
+        self.assertEqual(trial.manifest_summary()['data_size'], 0)
+
+    def test_modified(self):
+        trial = self._trial({})
+        trial.update(trial.write_environment({'A': 'B'}))
+        with gzip.open(os.path.join(trial.prefix, ENVIRONMENT_FILE), 'wt') as fout:
+            fout.write('{}')
+        self.assertRaises(ConfigurationError, trial.get_environment)
+
+    def test_legacy_fields(self):
+        env = {'A': 'B'}
+        output = ['line 1\n', 'line 2\n']
+        trial = self._trial({'environment': base64.standard_b64encode(repr(env).encode()).decode(),
+                             'output': base64.standard_b64encode(repr(output).encode()).decode()})
+        self.assertDictEqual(trial.get_environment(), env)
+        self.assertEqual(trial.get_output(), 'line 1\nline 2\n')
+
+    def test_not_recorded(self):
+        trial = self._trial({})
+        self.assertIsNone(trial.get_output())
+        self.assertIsNone(trial.get_environment())
+
+
+class TrialManifestTest(tests.TestCase):
+    """Tests for the trial data file manifest."""
+
+    def _write(self, trial, relpath, size):
+        path = os.path.join(trial.prefix, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as fout:
+            fout.write(b'x' * size)
+
+    def test_data_file_kind(self):
+        self.assertEqual(data_file_kind('profile.0.0.0'), 'profile')
+        self.assertEqual(data_file_kind(os.path.join('MULTI__TIME', 'profile.1.0.0')), 'profile')
+        self.assertEqual(data_file_kind('tauprofile.xml'), 'profile')
+        self.assertEqual(data_file_kind('tautrace.0.0.0.trc'), 'trace')
+        self.assertEqual(data_file_kind(os.path.join('traces', '0.evt')), 'trace')
+        self.assertEqual(data_file_kind(os.path.join('other', 'profile.0.0.0')), 'metadata')
+        self.assertEqual(data_file_kind('tau.log'), 'metadata')
+
+    def test_manifest(self):
+        trial = _patched_trial(self, {})
+        self._write(trial, 'profile.0.0.0', 10)
+        self._write(trial, os.path.join('MULTI__TIME', 'profile.1.0.0'), 20)
+        self._write(trial, 'events.0.edf', 5)
+        self._write(trial, 'notes.txt', 1)
+        self._write(trial, os.path.join(PROFILE_CACHE_DIR, 'index.json'), 2)
+        trial.write_environment({'A': 'B'})
+        manifest = trial.write_manifest()
+        self.assertListEqual(manifest, [[os.path.join('MULTI__TIME', 'profile.1.0.0'), 20, 'profile'],
+                                        ['events.0.edf', 5, 'trace'],
+                                        ['notes.txt', 1, 'metadata'],
+                                        ['profile.0.0.0', 10, 'profile']])
+        self.assertTrue(os.path.exists(os.path.join(trial.prefix, MANIFEST_FILE)))
+        self.assertDictEqual(trial.manifest_summary(), {'data_size': 36,
+                                                        'data_manifest': [['metadata', 1, 1],
+                                                                          ['profile', 2, 30],
+                                                                          ['trace', 1, 5]]})
+        self.assertListEqual(trial.data_files('trace'), [os.path.join(trial.prefix, 'events.0.edf')])
+
+    def test_manifest_is_read_not_rescanned(self):
+        trial = _patched_trial(self, {})
+        self._write(trial, 'profile.0.0.0', 10)
+        trial.write_manifest()
+        self._write(trial, 'profile.1.0.0', 10)
+        reloaded = Trial(StorageRecord(PROJECT_STORAGE, 1, {'number': 0}))
+        self.assertEqual(len(reloaded.manifest()), 1)
+
+    def test_missing_manifest_is_created(self):
+        trial = _patched_trial(self, {})
+        self._write(trial, 'profile.0.0.0', 10)
+        self.assertEqual(trial.manifest(), [['profile.0.0.0', 10, 'profile']])
+        self.assertTrue(os.path.exists(os.path.join(trial.prefix, MANIFEST_FILE)))
+
+
+class ExportBundleTest(tests.TestCase):
+    """Tests for exporting trials to one archive."""
+
+    def test_export_bundle(self):
+        trial = _patched_trial(self, {'data_size': 10})
+        with open(os.path.join(trial.prefix, 'profile.0.0.0'), 'wb') as fout:
+            fout.write(b'x' * 10)
+        expr = mock.MagicMock()
+        expr.__getitem__.return_value = 'ex1'
+        expr.populate.return_value = {'trace': 'none'}
+        buf = io.BytesIO()
+        with mock.patch.object(Trial, 'populate', return_value=expr):
+            export_bundle([trial], buf, 'gz')
+        buf.seek(0)
+        with tarfile.open(fileobj=buf, mode='r:gz') as archive:
+            self.assertListEqual(sorted(archive.getnames()), [os.path.join('ex1.trial0', MANIFEST_FILE),
+                                                              os.path.join('ex1.trial0', 'profile.0.0.0')])
+            self.assertEqual(archive.extractfile(os.path.join('ex1.trial0', 'profile.0.0.0')).read(), b'x' * 10)
+
+    def test_no_data(self):
+        trial = _patched_trial(self, {'data_size': 0})
+        with mock.patch.object(Trial, 'populate', return_value=mock.MagicMock()):
+            self.assertRaises(ConfigurationError, export_bundle, [trial], io.BytesIO())
+
+
+class LauncherRankCountTest(tests.TestCase):
+    """Tests for finding the number of ranks in a launcher command line."""
+
+    def test_launcher_rank_count(self):
+        self.assertEqual(launcher_rank_count([], [['./a.out']]), 1)
+        self.assertEqual(launcher_rank_count(['mpirun', '-np', '64'], [['./a.out', '-n', '3']]), 64)
+        self.assertEqual(launcher_rank_count(['srun', '--ntasks=128'], [['./a.out']]), 128)
+        self.assertEqual(launcher_rank_count(['mpirun', '-np', '4'], [['./foo'], [':', '-np', '2', './bar']]), 6)
+        self.assertIsNone(launcher_rank_count(['mpirun', '--hostfile', 'hosts'], [['./a.out']]))
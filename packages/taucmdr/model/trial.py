@@ -32,16 +32,21 @@ the performance data.
 """
 
 import os
-import glob
+import ast
+import shlex
+import gzip
+import fnmatch
+import json
 import errno
 import base64
 import time
+import tarfile
 from datetime import datetime
 
 import shutil
 
 import fasteners
-from taucmdr import logger, util
+from taucmdr import logger, util, timing
 from taucmdr.error import ConfigurationError, InternalError
 from taucmdr.model.project import Project
 from taucmdr.progress import ProgressIndicator
@@ -49,10 +54,95 @@ from taucmdr.mvc.controller import Controller
 from taucmdr.mvc.model import Model
 from taucmdr.cf.software.tau_installation import TauInstallation, PROGRAM_LAUNCHERS
 from taucmdr.cf.storage.levels import PROJECT_STORAGE
+from taucmdr.cf.software.source_store import file_digest
 
 
 LOGGER = logger.get_logger(__name__)
 
+BACKGROUND_DELETE_SIZE = 256*1024*1024
+"""int: Trials with at least this many bytes of data are deleted by a background process."""
+
+BACKGROUND_DELETE_FILES = 10000
+"""int: Trials with at least this many data files are deleted by a background process."""
+
+OUTPUT_FILE = '.taucmdr_output.gz'
+"""str: Name of the file in the trial directory containing the recorded program output."""
+
+ENVIRONMENT_FILE = '.taucmdr_environment.json.gz'
+"""str: Name of the file in the trial directory containing the trial's environment variables."""
+
+MANIFEST_FILE = '.taucmdr_manifest.json'
+"""str: Name of the file in the trial directory listing the trial's data files."""
+
+TRACE_STATS_FILE = '.taucmdr_trace_stats.npz'
+"""str: Name of the file in the trial directory containing summary statistics of the trial's traces."""
+
+SIDECAR_FILES = (OUTPUT_FILE, ENVIRONMENT_FILE, MANIFEST_FILE, TRACE_STATS_FILE)
+"""tuple: Files written by TAU Commander in the trial directory that aren't performance data."""
+
+PROFILE_CACHE_DIR = '.taucmdr_profile_cache'
+"""str: Name of the directory in the trial directory caching parsed profiles.  See :any:`Trial.profile_table`."""
+
+DATA_FILE_PATTERNS = {'profile': (('', 'profile.*.*.*'), ('MULTI__*', 'profile.*.*.*'), ('', 'tauprofile.xml'),
+                                  ('', '*.cubex'), ('', '*.db')),
+                      'trace': (('', '*.slog2'), ('', '*.trc'), ('', '*.edf'), ('traces', '*.def'),
+                                ('traces', '*.evt'), ('', 'traces.def'), ('', 'traces.otf2'))}
+"""dict: (directory, file name) glob patterns identifying profile and trace files in a trial directory."""
+
+
+def data_file_kind(relpath):
+    """Classify a file in a trial directory.
+
+    Args:
+        relpath (str): Path to the file relative to the trial directory.
+
+    Returns:
+        str: 'profile', 'trace', or 'metadata'.
+    """
+    dirname, basename = os.path.split(relpath)
+    for kind, patterns in DATA_FILE_PATTERNS.items():
+        for dir_pattern, name_pattern in patterns:
+            if fnmatch.fnmatchcase(dirname, dir_pattern) and fnmatch.fnmatchcase(basename, name_pattern):
+                return kind
+    return 'metadata'
+
+
+RANK_COUNT_FLAGS = ('-np', '--np', '-n', '--n', '--ntasks')
+"""tuple: Program launcher flags that set the number of ranks, e.g. ``mpirun -np 4`` or ``srun --ntasks=4``."""
+
+
+def launcher_rank_count(launcher_cmd, application_cmds=()):
+    """Find the number of ranks a parsed launcher command line starts.
+
+    MPMD application commands, i.e. those starting with ':', may set their own rank counts which are added.
+
+    Args:
+        launcher_cmd (list): Launcher command, possibly empty, from :any:`Trial.parse_launcher_cmd`.
+        application_cmds (list): Application commands from :any:`Trial.parse_launcher_cmd`.
+
+    Returns:
+        int: Number of ranks, 1 if there is no launcher, or None if the launcher's rank count flag wasn't found.
+    """
+    if not launcher_cmd:
+        return 1
+    total = 0
+    for cmd in [launcher_cmd] + [cmd for cmd in application_cmds if cmd and cmd[0] == ':']:
+        for i, arg in enumerate(cmd):
+            flag, _, value = arg.partition('=')
+            if flag not in RANK_COUNT_FLAGS:
+                continue
+            if not value and i + 1 < len(cmd):
+                value = cmd[i + 1]
+            try:
+                total += int(value)
+            except ValueError:
+                continue
+            break
+        else:
+            if cmd is launcher_cmd:
+                return None
+    return total
+
 
 def attributes():
     from taucmdr.model.experiment import Experiment
@@ -80,7 +170,16 @@ def attributes():
         },
         'environment': {
             'type': 'string',
-            'description': "shell environment in which the trial was performed, encoded as a base64 string"
+            'description': "shell environment in which the trial was performed, encoded as a base64 string "
+                           "(trials created by older versions only)"
+        },
+        'environment_file': {
+            'type': 'string',
+            'description': "compressed file in the trial directory containing the shell environment"
+        },
+        'environment_sha256': {
+            'type': 'string',
+            'description': "SHA-256 digest of the environment file"
         },
         'begin_time': {
             'type': 'datetime',
@@ -98,6 +197,10 @@ def attributes():
             'type': 'integer',
             'description': "the size in bytes of the trial data"
         },
+        'data_manifest': {
+            'type': 'array',
+            'description': "number of files and bytes of each kind of trial data as [kind, files, bytes] triples"
+        },
         'description': {
             'type': 'string',
             'argparse': {'flags': ('--description',),
@@ -114,7 +217,15 @@ def attributes():
         },
         'output': {
             'type': 'string',
-            'description': "stdout and stderr of program"
+            'description': "stdout and stderr of program (trials created by older versions only)"
+        },
+        'output_file': {
+            'type': 'string',
+            'description': "compressed file in the trial directory containing stdout and stderr of program"
+        },
+        'output_sha256': {
+            'type': 'string',
+            'description': "SHA-256 digest of the output file"
         },
     }
 
@@ -125,7 +236,7 @@ class TrialError(ConfigurationError):
                    "\n"
                    "%(hints)s\n"
                    "Please check the selected configuration for errors or"
-                   " send '%(logfile)s' to  %(contact)s for assistance.")
+                   " %(support)s for assistance.")
 
 
 class TrialController(Controller):
@@ -171,10 +282,7 @@ class TrialController(Controller):
         retval = None
         try:
             self.update({'phase': 'executing', 'begin_time': begin_time}, trial.eid)
-            if record_output:
-                retval, output, elapsed = trial.execute_command(expr, cmd, cwd, env, record_output)
-            else:
-                retval, elapsed = trial.execute_command(expr, cmd, cwd, env, record_output)
+            retval, elapsed = trial.execute_command(expr, cmd, cwd, env, record_output)
         except:
             self.delete(trial.eid)
             raise
@@ -182,13 +290,11 @@ class TrialController(Controller):
             end_time = self._mark_time('END', expr)
 
         fields = {'end_time': end_time, 'return_code': retval, 'elapsed': elapsed}
-        data_size = 0
-        for dir_path, _, file_names in os.walk(trial.prefix):
-            for name in file_names:
-                data_size += os.path.getsize(os.path.join(dir_path, name))
-        fields['data_size'] = data_size
+        fields.update(trial.manifest_summary())
+        data_size = fields['data_size']
         if record_output:
-            fields['output'] = str(output)
+            fields['output_file'] = OUTPUT_FILE
+            fields['output_sha256'] = file_digest(os.path.join(trial.prefix, OUTPUT_FILE))
         self.update(fields, trial.eid)
         if retval != 0:
             if data_size != 0:
@@ -205,8 +311,6 @@ class TrialController(Controller):
         LOGGER.info('Current working directory: %s', cwd)
         LOGGER.info('Data size: %s bytes', util.human_size(data_size))
         LOGGER.info('Elapsed seconds: %s', elapsed)
-        if record_output:
-            return retval, str(output)
         return retval
 
     def perform(self, proj, cmd, cwd, env, description, record_output=False):
@@ -238,7 +342,6 @@ class TrialController(Controller):
         measurement = expr.populate('measurement')
         if measurement['trace'] == 'otf2' or measurement['profile'] == 'cubex':
             env['SCOREP_EXPERIMENT_DIRECTORY'] = trial.prefix
-        b64env = base64.standard_b64encode(repr(env).encode()).decode()
         is_bluegene = expr.populate('target').architecture().is_bluegene()
         is_cray_login = expr.populate('target').operating_system().is_cray_login()
         if is_cray_login:
@@ -248,19 +351,16 @@ class TrialController(Controller):
             if is_bluegene:
                 retval = self._perform_bluegene(expr, trial, cmd, cwd, env)
             else:
-                if record_output:
-                    retval, _ = self._perform_interactive(expr, trial, cmd, cwd, env, record_output)
-                else:
-                    retval = self._perform_interactive(expr, trial, cmd, cwd, env, record_output)
+                retval = self._perform_interactive(expr, trial, cmd, cwd, env, record_output)
         except Exception as err:
             try:
-                self.update({'phase': 'failed', 'environment': b64env}, trial.eid)
-            except KeyError:
-                # Trial record was deleted
+                self.update(dict(trial.write_environment(env), phase='failed'), trial.eid)
+            except (KeyError, OSError):
+                # Trial record or directory was deleted
                 pass
             raise err
         else:
-            self.update({'phase': 'completed', 'environment': b64env}, trial.eid)
+            self.update(dict(trial.write_environment(env), phase='completed'), trial.eid)
             return retval
 
     def renumber(self, old_trials, new_trials):
@@ -399,11 +499,200 @@ class Trial(Model):
                 application_cmds.append(cmd[idx:colons[i+1]])
             return launcher_cmd, application_cmds
 
+    def rank_count(self):
+        """Find the number of ranks the trial's program launcher command started.
+
+        Returns:
+            int: Number of ranks, 1 if no launcher was used, or None if the rank count couldn't be parsed.
+        """
+        cmd = shlex.split(self['command'])
+        try:
+            launcher_cmd, application_cmds = self.parse_launcher_cmd(cmd)
+        except ConfigurationError:
+            # The application executable may no longer exist so search the whole command
+            launcher_cmd, application_cmds = cmd, []
+        return launcher_rank_count(launcher_cmd, application_cmds)
+
     @property
     def prefix(self):
         experiment = self.populate('experiment')
         return os.path.join(experiment.prefix, str(self['number']))
 
+    def write_manifest(self):
+        """Lists the trial's data files in a manifest file in the trial directory.
+
+        The trial directory is scanned once and each file's path relative to the trial directory,
+        size, and kind (see :any:`data_file_kind`) are written to :any:`MANIFEST_FILE`.
+        Files written by TAU Commander are not listed.
+
+        Returns:
+            list: [relative path, size in bytes, kind] triples.
+        """
+        manifest = []
+        for path, _, files in util.walk_tree(self.prefix):
+            if os.path.relpath(path, self.prefix).split(os.sep, 1)[0] == PROFILE_CACHE_DIR:
+                continue
+            for entry in files:
+                if path == self.prefix and entry.name in SIDECAR_FILES:
+                    continue
+                relpath = os.path.relpath(entry.path, self.prefix)
+                manifest.append([relpath, entry.stat(follow_symlinks=False).st_size, data_file_kind(relpath)])
+        manifest.sort()
+        path = os.path.join(self.prefix, MANIFEST_FILE)
+        with open(path + '.tmp', 'w') as fout:
+            json.dump(manifest, fout, separators=(',', ':'))
+        os.replace(path + '.tmp', path)
+        self._manifest = manifest
+        return manifest
+
+    def manifest(self):
+        """Get the list of the trial's data files.
+
+        Reads the manifest written by :any:`write_manifest`, or writes one if the trial doesn't have one yet.
+
+        Returns:
+            list: [relative path, size in bytes, kind] triples.
+        """
+        if getattr(self, '_manifest', None) is None:
+            try:
+                with open(os.path.join(self.prefix, MANIFEST_FILE)) as fin:
+                    self._manifest = json.load(fin)
+            except (OSError, ValueError):
+                self.write_manifest()
+        return self._manifest
+
+    def manifest_summary(self):
+        """Summarize the trial's manifest for the trial record.
+
+        Returns:
+            dict: Values for the 'data_size' and 'data_manifest' attributes.
+        """
+        totals = {}
+        for _, size, kind in self.manifest():
+            count, total = totals.get(kind, (0, 0))
+            totals[kind] = (count + 1, total + size)
+        return {'data_size': sum(total for _, total in totals.values()),
+                'data_manifest': [[kind, count, total] for kind, (count, total) in sorted(totals.items())]}
+
+    def data_files(self, kind):
+        """Get paths to the trial's data files of one kind.
+
+        Args:
+            kind (str): 'profile', 'trace', or 'metadata'.
+
+        Returns:
+            list: Absolute paths to files listed in the trial's manifest.
+        """
+        return [os.path.join(self.prefix, relpath) for relpath, _, file_kind in self.manifest() if file_kind == kind]
+
+    def profile_table(self, metric=None):
+        """Get the trial's profiles of one metric.
+
+        Profiles are parsed the first time and cached in the trial directory.  Later calls
+        memory-map the cache unless the trial's profile files changed.
+
+        Args:
+            metric (str): Metric to get, e.g. 'TIME'.  If None then TIME is used if it was
+                          measured, otherwise the first metric in alphabetical order.
+
+        Returns:
+            ProfileTable: See :any:`taucmdr.perfdata.tau_profile`.
+
+        Raises:
+            ConfigurationError: The trial has no profiles of `metric`.
+        """
+        from taucmdr.perfdata.profile_cache import load_table
+        files = [relpath for relpath, _, kind in self.manifest() if kind == 'profile']
+        with timing.span('trial profile table'):
+            return load_table(self.prefix, os.path.join(self.prefix, PROFILE_CACHE_DIR), metric, files)
+
+    def trace_statistics(self):
+        """Get summary statistics of the trial's TAU traces.
+
+        Statistics are computed from the trace files the first time and saved in the trial directory.
+        They are also saved before TAU traces are converted to SLOG2 and deleted.
+
+        Returns:
+            TraceStatistics: See :any:`taucmdr.perfdata.trace_stats`.
+
+        Raises:
+            ConfigurationError: The trial has no TAU traces.
+        """
+        from taucmdr.perfdata import trace_stats
+        path = os.path.join(self.prefix, TRACE_STATS_FILE)
+        if os.path.exists(path):
+            return trace_stats.load_statistics(path)
+        if self.populate('experiment').populate('measurement').get('trace', 'none') == 'otf2':
+            raise ConfigurationError(f"Trial {self['number']} has OTF2 traces.",
+                                     "Trace statistics are only available for measurements with trace=slog2.")
+        files = [relpath for relpath, _, kind in self.manifest() if kind == 'trace']
+        if not any(relpath.endswith('.trc') for relpath in files):
+            raise ConfigurationError(f"Trial {self['number']} has no TAU trace files.",
+                                     "View the trial's traces with `tau trial show`.")
+        return self._save_trace_statistics(files)
+
+    def _save_trace_statistics(self, files):
+        """Computes summary statistics of TAU trace files in the trial directory and saves them.
+
+        Only the trial directory is changed so this is safe to call from a worker thread.
+        """
+        from taucmdr.perfdata import trace_stats
+        with timing.span('trial trace statistics'):
+            stats = trace_stats.compute_statistics(self.prefix, files)
+        trace_stats.save_statistics(os.path.join(self.prefix, TRACE_STATS_FILE), stats)
+        return stats
+
+    def write_environment(self, env):
+        """Saves the trial's environment variables in a compressed file in the trial directory.
+
+        Args:
+            env (dict): Environment variables set when performing the trial.
+
+        Returns:
+            dict: Record fields referring to the new file.
+        """
+        path = os.path.join(self.prefix, ENVIRONMENT_FILE)
+        with gzip.open(path, 'wt', compresslevel=6) as fout:
+            json.dump(env, fout)
+        return {'environment_file': ENVIRONMENT_FILE, 'environment_sha256': file_digest(path)}
+
+    def _read_sidecar(self, name):
+        path = os.path.join(self.prefix, self[name + '_file'])
+        digest = self.get(name + '_sha256')
+        if digest and file_digest(path) != digest:
+            raise ConfigurationError(f"The {name} file of trial {self['number']} at '{path}' has been modified.")
+        with gzip.open(path, 'rt', errors='replace') as fin:
+            return fin.read()
+
+    def get_output(self):
+        """Get the recorded output of the trial's program.
+
+        The output is read from the trial directory only when this method is called.
+
+        Returns:
+            str: Program stdout and stderr, or None if output was not recorded.
+        """
+        if self.get('output_file'):
+            return self._read_sidecar('output')
+        if self.get('output'):
+            lines = ast.literal_eval(base64.standard_b64decode(self['output']).decode())
+            return ''.join(lines)
+        return None
+
+    def get_environment(self):
+        """Get the environment variables set when the trial was performed.
+
+        The environment is read from the trial directory only when this method is called.
+
+        Returns:
+            dict: Environment variables, or None if the environment was not recorded.
+        """
+        if self.get('environment_file'):
+            return json.loads(self._read_sidecar('environment'))
+        if self.get('environment'):
+            return ast.literal_eval(base64.standard_b64decode(self['environment']).decode())
+        return None
+
     def on_create(self):
         try:
             util.mkdirp(self.prefix)
@@ -413,7 +702,9 @@ class Trial(Model):
 
     def on_delete(self):
         try:
-            util.rmtree(self.prefix)
+            files = sum(count for _, count, _ in self.get('data_manifest', None) or [])
+            background = self.get('data_size', 0) >= BACKGROUND_DELETE_SIZE or files >= BACKGROUND_DELETE_FILES
+            util.rmtree(self.prefix, background=background)
         except Exception as err:  # pylint: disable=broad-except
             if os.path.exists(self.prefix):
                 LOGGER.error("Could not remove trial data at '%s': %s", self.prefix, err)
@@ -432,26 +723,39 @@ class Trial(Model):
                 shutil.move(old_prefix, new_prefix)
                 LOGGER.debug("Renamed directory %s to %s", old_prefix, new_prefix)
 
+    @timing.traced('trial postprocess slog2')
     def _postprocess_slog2(self):
+        """Converts the trial's TAU traces to SLOG2 if that hasn't been done yet.
+
+        Returns:
+            bool: True if the trial data changed and the record needs :any:`manifest_summary` fields updated.
+        """
         slog2 = os.path.join(self.prefix, 'tau.slog2')
         if os.path.exists(slog2):
-            return
+            return False
         tau = TauInstallation.get_minimal()
         merged_trc = os.path.join(self.prefix, 'tau.trc')
         merged_edf = os.path.join(self.prefix, 'tau.edf')
         if not os.path.exists(merged_trc) or not os.path.exists(merged_edf):
-            tau.merge_tau_trace_files(self.prefix)
+            tau.merge_tau_trace_files(self.prefix, [relpath for relpath, _, kind in self.manifest() if kind == 'trace'])
         tau.tau_trace_to_slog2(merged_trc, merged_edf, slog2)
-        trc_files = glob.glob(os.path.join(self.prefix, '*.trc'))
-        edf_files = glob.glob(os.path.join(self.prefix, '*.edf'))
-        count_trc_edf = len(trc_files) + len(edf_files)
+        if not os.path.exists(os.path.join(self.prefix, TRACE_STATS_FILE)):
+            try:
+                self._save_trace_statistics([relpath for relpath, _, kind in self.manifest() if kind == 'trace'])
+            except ConfigurationError as err:
+                LOGGER.warning("Trace statistics not saved: %s", err.value)
+        trc_edf_files = {path for path in self.data_files('trace') if path.endswith(('.trc', '.edf'))}
+        trc_edf_files = sorted(trc_edf_files | {merged_trc, merged_edf})
         LOGGER.info('Cleaning up TAU trace files...')
-        with ProgressIndicator("", total_size=count_trc_edf) as progress_bar:
-            count = 0
-            for path in trc_files + edf_files:
-                os.remove(path)
-                count += 1
+        with ProgressIndicator("", total_size=len(trc_edf_files)) as progress_bar:
+            for count, path in enumerate(trc_edf_files, 1):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
                 progress_bar.update(count)
+        self.write_manifest()
+        return True
 
     def get_data_files(self):
         """Return paths to the trial's data files or directories mapped by data type.
@@ -470,8 +774,8 @@ class Trial(Model):
         meas = self.populate('experiment').populate('measurement')
         profile_fmt = meas.get('profile', 'none')
         trace_fmt = meas.get('trace', 'none')
-        if trace_fmt == 'slog2':
-            self._postprocess_slog2()
+        if trace_fmt == 'slog2' and self._postprocess_slog2():
+            self.controller(self.storage).update(self.manifest_summary(), self.eid)
         data = {}
         if profile_fmt == 'tau':
             data[profile_fmt] = self.prefix
@@ -503,9 +807,11 @@ class Trial(Model):
             cmd (str): Command to profile, with command line arguments.
             cwd (str): Working directory to perform trial in.
             env (dict): Environment variables to set before performing the trial.
+            record_output (bool): If True, save the command's stdout and stderr in a compressed
+                                  file in the trial directory.
 
         Returns:
-            int: Subprocess return code.
+            tuple: (Subprocess return code, seconds spent executing the command).
         """
         cmd_str = ' '.join(cmd)
         tau_env_opts = sorted(f'{key}={val}' for key, val in env.items()
@@ -537,9 +843,11 @@ class Trial(Model):
             cmd (str): Command to profile, with command line arguments.
             cwd (str): Working directory to perform trial in.
             env (dict): Environment variables to set before performing the trial.
+            record_output (bool): If True, save the command's stdout and stderr in a compressed
+                                  file in the trial directory.
 
         Returns:
-            int: Subprocess return code.
+            tuple: (Subprocess return code, seconds spent executing the command).
         """
         cmd_str = ' '.join(cmd)
         tau_env_opts = sorted(f'{key}={val}' for key, val in env.items()
@@ -550,13 +858,12 @@ class Trial(Model):
         LOGGER.info(cmd_str)
         try:
             begin_time = time.time()
-            ret = util.create_subprocess(cmd, cwd=cwd, env=env, log=False, record_output=record_output)
-            elapsed = time.time() - begin_time
             if record_output:
-                retval = ret[0]
-                output = base64.standard_b64encode(repr(ret[1]).encode()).decode()
+                with gzip.open(os.path.join(self.prefix, OUTPUT_FILE), 'wb', compresslevel=6) as fout:
+                    retval, _ = util.create_subprocess(cmd, cwd=cwd, env=env, log=False, record_output=fout)
             else:
-                retval = ret
+                retval = util.create_subprocess(cmd, cwd=cwd, env=env, log=False)
+            elapsed = time.time() - begin_time
         except OSError as err:
             target = expr.populate('target')
             errno_hint = {errno.EPERM: "Check filesystem permissions",
@@ -564,52 +871,52 @@ class Trial(Model):
                           errno.ENOEXEC: "Check that this host supports '%s'" % target['host_arch']}
             raise TrialError(f"Couldn't execute {cmd_str}: {err}", errno_hint.get(err.errno, None)) from err
 
-        measurement = expr.populate('measurement')
-
-        profiles = []
-        for pat in 'profile.*.*.*', 'MULTI__*/profile.*.*.*', 'tauprofile.xml', '*.cubex', '*.db':
-            profiles.extend(glob.glob(os.path.join(self.prefix, pat)))
-        if profiles:
-            LOGGER.info("Trial %s produced %s profile files.", self['number'], len(profiles))
-            negative_profiles = [prof for prof in profiles if 'profile.-1' in prof]
-            if negative_profiles:
-                LOGGER.warning("Trial %s produced a profile with negative node number!"
-                               " This usually indicates that process-level parallelism was not initialized,"
-                               " (e.g. MPI_Init() was not called) or there was a problem in instrumentation."
-                               " Check the compilation output and verify that MPI_Init (or similar) was called.",
-                               self['number'])
-                for fname in negative_profiles:
-                    new_name = fname.replace(".-1.", ".0.")
-                    if not os.path.exists(new_name):
-                        LOGGER.info("Renaming %s to %s", fname, new_name)
-                        os.rename(fname, new_name)
-                    else:
-                        raise ConfigurationError("The profile numbers for trial %d cannot be corrected.",
-                                                 "Check that the application configuration is correct.",
-                                                 "Check that the measurement configuration is correct.",
-                                                 "Check for instrumentation failure in the compilation log.")
-        elif measurement['profile'] != 'none':
-            raise TrialError("Trial did not produce any profiles.")
-
-        traces = []
-        for pat in '*.slog2', '*.trc', '*.edf', 'traces/*.def', 'traces/*.evt', 'traces.otf2':
-            traces.extend(glob.glob(os.path.join(self.prefix, pat)))
-        if traces:
-            LOGGER.info("Trial %s produced %s trace files.", self['number'], len(traces))
-        elif measurement['trace'] != 'none':
-            raise TrialError("Application completed successfully but did not produce any traces.")
+        with timing.span('trial postprocess'):
+            measurement = expr.populate('measurement')
+
+            with timing.span('trial manifest'):
+                manifest = self.write_manifest()
+            profiles = [os.path.join(self.prefix, relpath) for relpath, _, kind in manifest if kind == 'profile']
+            if profiles:
+                LOGGER.info("Trial %s produced %s profile files.", self['number'], len(profiles))
+                negative_profiles = [prof for prof in profiles if 'profile.-1' in prof]
+                if negative_profiles:
+                    LOGGER.warning("Trial %s produced a profile with negative node number!"
+                                   " This usually indicates that process-level parallelism was not initialized,"
+                                   " (e.g. MPI_Init() was not called) or there was a problem in instrumentation."
+                                   " Check the compilation output and verify that MPI_Init (or similar) was called.",
+                                   self['number'])
+                    for fname in negative_profiles:
+                        new_name = fname.replace(".-1.", ".0.")
+                        if not os.path.exists(new_name):
+                            LOGGER.info("Renaming %s to %s", fname, new_name)
+                            os.rename(fname, new_name)
+                        else:
+                            raise ConfigurationError("The profile numbers for trial %d cannot be corrected.",
+                                                     "Check that the application configuration is correct.",
+                                                     "Check that the measurement configuration is correct.",
+                                                     "Check for instrumentation failure in the compilation log.")
+                    manifest = self.write_manifest()
+            elif measurement['profile'] != 'none':
+                raise TrialError("Trial did not produce any profiles.")
+
+            traces = [relpath for relpath, _, kind in manifest if kind == 'trace']
+            if traces:
+                LOGGER.info("Trial %s produced %s trace files.", self['number'], len(traces))
+            elif measurement['trace'] != 'none':
+                raise TrialError("Application completed successfully but did not produce any traces.")
 
         if retval:
             LOGGER.warning("Return code %d from '%s'", retval, cmd_str)
-        if record_output:
-            return retval, str(output), elapsed
         return retval, elapsed
 
-    def export(self, dest):
+    def export(self, dest, compression='gz'):
         """Export experiment trial data.
 
         Args:
             dest (str): Path to directory to contain exported data.
+            compression (str): Compressed file format for merged profiles and OTF2 traces,
+                               'gz', 'zst', or None for uncompressed files.
 
         Raises:
             ConfigurationError: This trial has no data.
@@ -625,8 +932,13 @@ class Trial(Model):
                 tau = TauInstallation.get_minimal()
                 tau.create_ppk_file(export_file, path)
             elif fmt == 'merged':
-                export_file = os.path.join(dest, stem+'.xml.gz')
-                util.create_archive('gz', export_file, [path])
+                if compression:
+                    export_file = os.path.join(dest, f'{stem}.xml.{compression}')
+                    util.create_archive(compression, export_file, [path])
+                else:
+                    export_file = os.path.join(dest, stem+'.xml')
+                    LOGGER.info("Writing '%s'...", export_file)
+                    util.copy_file(path, export_file)
             elif fmt == 'cubex':
                 export_file = os.path.join(dest, stem+'.cubex')
                 LOGGER.info("Writing '%s'...", export_file)
@@ -636,13 +948,53 @@ class Trial(Model):
                 LOGGER.info("Writing '%s'...", export_file)
                 util.copy_file(path, export_file)
             elif fmt == 'otf2':
-                export_file = os.path.join(dest, stem+'.tgz')
+                archive_fmt = {'gz': 'tgz', 'zst': 'tar.zst', None: 'tar'}[compression]
+                export_file = os.path.join(dest, f'{stem}.{archive_fmt}')
                 expr_dir, trial_dir = os.path.split(os.path.dirname(path))
-                items = [os.path.join(trial_dir, item) for item in ('traces', 'traces.def', 'traces.otf2')]
-                util.create_archive('tgz', export_file, items, expr_dir)
+                items = [os.path.join(trial_dir, relpath) for relpath in
+                         sorted({relpath.split(os.sep)[0] for relpath, _, kind in self.manifest() if kind == 'trace'})]
+                util.create_archive(archive_fmt, export_file, items, expr_dir)
             elif fmt == 'sqlite':
                 export_file = os.path.join(dest, stem+'.db')
                 LOGGER.info("Writing '%s'...", export_file)
                 util.copy_file(path, export_file)
             elif fmt != 'none':
                 raise InternalError("Unhandled data file format '%s'" % fmt)
+
+
+@timing.traced('trial export bundle')
+def export_bundle(trials, fileobj, compression=None):
+    """Export several trials' data files into one tar stream.
+
+    Trials are post-processed one after another before the archive is started since converting
+    traces uses TAU's tools and compilers, which aren't safe to drive from several threads.  The
+    archive is then streamed through :any:`util.compressed_stream` so it's compressed in parallel
+    and never held in memory or on disk, and `fileobj` can be a pipe, e.g. ``sys.stdout.buffer``.
+    Each trial's data files, as listed in its manifest, are stored in the directory
+    ``<experiment>.trial<number>`` with the trial's manifest.
+
+    Args:
+        trials (list): Trials to export.
+        fileobj: Binary file object to write the archive to.
+        compression (str): 'zst', 'gz', or None for an uncompressed tar archive.
+
+    Raises:
+        ConfigurationError: A trial has no data.
+    """
+    stems = []
+    for trial in trials:
+        expr = trial.populate('experiment')
+        if trial.get('data_size', 0) <= 0:
+            raise ConfigurationError("Trial {} of experiment '{}' has no data".format(trial['number'], expr['name']))
+        if expr.populate('measurement').get('trace', 'none') == 'slog2':
+            if trial._postprocess_slog2():  # pylint: disable=protected-access
+                trial.controller(trial.storage).update(trial.manifest_summary(), trial.eid)
+        stems.append('%s.trial%d' % (expr['name'], trial['number']))
+    with util.compressed_stream(fileobj, compression) as stream, tarfile.open(fileobj=stream, mode='w|') as archive:
+        for trial, stem in zip(trials, stems):
+            manifest = trial.manifest()
+            LOGGER.info("Adding trial %s data (%s) to archive...", trial['number'],
+                        util.human_size(sum(size for _, size, _ in manifest)))
+            for relpath, _, _ in manifest:
+                archive.add(os.path.join(trial.prefix, relpath), arcname=os.path.join(stem, relpath), recursive=False)
+            archive.add(os.path.join(trial.prefix, MANIFEST_FILE), arcname=os.path.join(stem, MANIFEST_FILE))
@@ -26,7 +26,7 @@
 #
 """TODO: FIXME: Docs"""
 
-from taucmdr import logger
+from taucmdr import logger, timing
 from taucmdr import util
 from taucmdr.error import IncompatibleRecordError, ModelError, InternalError
 from taucmdr.cf.storage import StorageRecord
@@ -152,6 +152,7 @@ class Model(StorageRecord, metaclass=ModelMeta):
     def on_delete(self):
         """Callback to be invoked before a data record is deleted."""
 
+    @timing.traced('populate')
     def populate(self, attribute=None, defaults=False, context=True):
         """Shorthand for ``self.controller(self.storage).populate(self, attribute, defaults)``.
 
@@ -0,0 +1,149 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Choose functions to exclude from instrumentation based on a trial's profiles.
+
+Instrumenting a function costs roughly the same small amount of time on every call, so tiny
+functions that are called very often can dominate a trial's runtime.  :any:`select_exclusions`
+finds these functions in a trial's TIME profiles and :any:`write_select_file` writes a TAU
+selective instrumentation file that excludes them from the next build.
+"""
+
+import re
+from collections import namedtuple
+import numpy as np
+from taucmdr.perfdata.tau_profile import ProfileTable, is_callpath, profile_table
+
+
+MIN_CALLS = 10000
+"""int: Functions called fewer times than this are never excluded for being short."""
+
+MAX_USEC_PER_CALL = 10.0
+"""float: Functions frequently called for less than this many microseconds per call are excluded."""
+
+OVERHEAD_USEC_PER_CALL = 0.5
+"""float: Estimated instrumentation overhead in microseconds per function call."""
+
+MAX_OVERHEAD = 0.05
+"""float: Functions whose estimated overhead is at least this fraction of the program's runtime are excluded."""
+
+INSTRUMENTED_GROUPS = frozenset(('TAU_DEFAULT', 'TAU_USER'))
+"""frozenset: Timer groups of functions instrumented by source or compiler instrumentation."""
+
+_LOCATION = re.compile(r'\s*\[\{.*\}\]\s*$')
+
+
+Exclusion = namedtuple('Exclusion', ['name', 'calls', 'usec_per_call', 'overhead', 'reason'])
+"""A function chosen for exclusion.  `overhead` is the estimated fraction of runtime spent in instrumentation."""
+
+
+def routine_name(timer_name):
+    """Returns a timer's routine name as written in a selective instrumentation file.
+
+    Source and compiler instrumentation append the routine's source location to the timer name,
+    e.g. ``void foo(int) C [{foo.c} {10,1}-{20,1}]``, but selective instrumentation files list
+    routines by signature only.
+    """
+    return _LOCATION.sub('', timer_name)
+
+
+def _instrumented(name, group):
+    if name.startswith('.TAU') or is_callpath(name):
+        return False
+    groups = {group.strip() for group in (group or 'TAU_DEFAULT').split('|')}
+    return groups <= INSTRUMENTED_GROUPS
+
+
+def select_exclusions(profiles, min_calls=MIN_CALLS, max_usec_per_call=MAX_USEC_PER_CALL,
+                      overhead_usec_per_call=OVERHEAD_USEC_PER_CALL, max_overhead=MAX_OVERHEAD):
+    """Choose functions to exclude from instrumentation.
+
+    Each function's calls and inclusive time are summed over all threads.  A function is excluded if
+    it was called at least `min_calls` times for less than `max_usec_per_call` microseconds per call,
+    or if its estimated instrumentation overhead (calls times `overhead_usec_per_call`) is at least
+    `max_overhead` of the program's runtime.  The program's runtime is the sum over all threads of the
+    longest inclusive time, and the function with the longest inclusive time (e.g. ``main``) is never
+    excluded.
+
+    Args:
+        profiles: A :any:`ProfileTable` or a list of :any:`ThreadProfile` objects of the TIME metric.
+        min_calls (int): See :any:`MIN_CALLS`.
+        max_usec_per_call (float): See :any:`MAX_USEC_PER_CALL`.
+        overhead_usec_per_call (float): See :any:`OVERHEAD_USEC_PER_CALL`.
+        max_overhead (float): See :any:`MAX_OVERHEAD`.
+
+    Returns:
+        list: :any:`Exclusion` objects, highest estimated overhead first.
+    """
+    table = profiles if isinstance(profiles, ProfileTable) else profile_table(profiles) if profiles else None
+    if table is None or not len(table.entry_function):
+        return []
+    # Each thread's entry with the longest inclusive time, the first one if there's a tie
+    order = np.lexsort((-table.inclusive, table.entry_thread))
+    longest = order[np.unique(table.entry_thread[order], return_index=True)[1]]
+    runtime = float(table.inclusive[longest].sum())
+    top_level = {routine_name(name) for name in table.names[table.entry_function[longest]]}
+    # Timers with different source locations may be the same routine so sum them together
+    routines = {}
+    routine = np.array([routines.setdefault(routine_name(name), len(routines)) if _instrumented(name, group) else -1
+                        for name, group in zip(table.names, table.groups)], dtype=np.int64)
+    ids = routine[table.entry_function]
+    keep = ids >= 0
+    total_calls = np.bincount(ids[keep], weights=table.calls[keep], minlength=len(routines))
+    total_inclusive = np.bincount(ids[keep], weights=table.inclusive[keep], minlength=len(routines))
+    exclusions = []
+    for name, calls, inclusive in zip(routines, total_calls.astype(np.int64).tolist(), total_inclusive.tolist()):
+        if not calls or name in top_level:
+            continue
+        usec_per_call = inclusive / calls
+        overhead = calls * overhead_usec_per_call / runtime if runtime else 0.0
+        if calls >= min_calls and usec_per_call < max_usec_per_call:
+            reason = f"{usec_per_call:.3g} usec per call"
+        elif overhead >= max_overhead:
+            reason = f"{overhead:.1%} estimated overhead"
+        else:
+            continue
+        exclusions.append(Exclusion(name, calls, usec_per_call, overhead, reason))
+    exclusions.sort(key=lambda exclusion: (-exclusion.overhead, exclusion.name))
+    return exclusions
+
+
+def write_select_file(path, exclusions, comment=None):
+    """Write a TAU selective instrumentation file excluding functions.
+
+    Args:
+        path (str): Path to the file to write.
+        exclusions (list): :any:`Exclusion` objects.
+        comment (str): Optional comment written at the top of the file.
+    """
+    with open(path, 'w') as fout:
+        if comment:
+            for line in comment.splitlines():
+                fout.write(f"# {line}\n")
+        fout.write("BEGIN_EXCLUDE_LIST\n")
+        for exclusion in exclusions:
+            fout.write(f"{exclusion.name}\n")
+        fout.write("END_EXCLUDE_LIST\n")
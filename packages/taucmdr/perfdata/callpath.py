@@ -0,0 +1,241 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Call path trees of TAU profiles.
+
+When a measurement has ``callpath > 0`` TAU names a timer for every call path it sees, e.g.
+``main => solve => MPI_Allreduce()``, and also writes each path's prefixes.  :any:`build_tree`
+turns those names into a compact array-backed tree: path components are interned once and each node
+stores its component, parent, and depth, with children in compressed sparse row form
+(`child_offsets` and `children`).  A node's parent is found with one lookup of its path's prefix
+instead of by walking the path from the root, so deep call paths stay cheap.
+
+Per-thread values and statistics merged over all threads (:any:`tree_values`) are NumPy arrays
+indexed by node, so :any:`hot_paths` and :any:`render_tree` work the same way on one thread or
+on the whole trial.
+"""
+
+from collections import namedtuple
+import numpy as np
+from taucmdr.error import ConfigurationError
+from taucmdr.perfdata.pprof import summarize
+from taucmdr.perfdata.tau_profile import CALLPATH_SEPARATOR, is_callpath
+
+
+CallTree = namedtuple('CallTree', ['components', 'component', 'parent', 'depth', 'roots', 'child_offsets',
+                                   'children', 'node_function', 'function_node'])
+"""A call path tree as NumPy arrays.
+
+`components` holds each distinct path component (function name) once.  `component`, `parent`
+(-1 for roots), `depth` (0 for roots), and `node_function` have one entry per node.  The children
+of node ``i`` are ``children[child_offsets[i]:child_offsets[i + 1]]``.  `node_function` and
+`function_node` map nodes to timers of a :any:`ProfileTable` and back, or are -1 for a node that
+wasn't measured itself (e.g. a prefix TAU didn't write) and for flat timers that aren't tree roots.
+"""
+
+NodeValues = namedtuple('NodeValues', ['calls', 'exclusive', 'inclusive', 'measured'])
+"""Measurements of each node of a :any:`CallTree` as NumPy arrays indexed by node."""
+
+
+def build_tree(names):
+    """Build a call path tree from timer names.
+
+    Flat timers (names without ``=>``) become tree roots if a call path starts with them.  Other
+    flat timers summarize a function over all of its call paths so they aren't part of the tree.
+
+    Args:
+        names (list): Timer names, e.g. :any:`ProfileTable` `names`.
+
+    Returns:
+        CallTree: The tree.
+
+    Raises:
+        ConfigurationError: None of the timers are call paths.
+    """
+    names = list(names)
+    if not any(is_callpath(name) for name in names):
+        raise ConfigurationError("The profiles have no call path timers.",
+                                 "Set the measurement's call path depth, e.g. `tau measurement edit <name> "
+                                 "--callpath 100`, and run the application again.")
+    interned = {}
+    nodes = {}
+    component, parent, depth = [], [], []
+
+    for name in names:
+        if not is_callpath(name):
+            continue
+        # Walk up to the nearest ancestor already in the tree.  TAU usually writes every prefix
+        # before the path itself, so this loop rarely runs more than once.
+        path, missing = name, []
+        while path is not None and path not in nodes:
+            prefix, separator, last = path.rpartition(CALLPATH_SEPARATOR)
+            missing.append((path, last if separator else path))
+            path = prefix if separator else None
+        up = nodes[path] if path is not None else -1
+        for node_path, last in reversed(missing):
+            component.append(interned.setdefault(last, len(interned)))
+            parent.append(up)
+            depth.append(depth[up] + 1 if up >= 0 else 0)
+            nodes[node_path] = up = len(component) - 1
+    function_node = np.array([nodes.get(name, -1) for name in names], dtype=np.int64)
+    parent = np.array(parent, dtype=np.int64)
+    node_function = np.full(len(parent), -1, dtype=np.int64)
+    measured = np.flatnonzero(function_node >= 0)
+    node_function[function_node[measured]] = measured
+    has_parent = np.flatnonzero(parent >= 0)
+    children = has_parent[np.argsort(parent[has_parent], kind='stable')]
+    child_offsets = np.searchsorted(parent[children], np.arange(len(parent) + 1))
+    return CallTree(components=np.array(list(interned), dtype=object),
+                    component=np.array(component, dtype=np.int64),
+                    parent=parent,
+                    depth=np.array(depth, dtype=np.int64),
+                    roots=np.flatnonzero(parent < 0),
+                    child_offsets=child_offsets,
+                    children=children,
+                    node_function=node_function,
+                    function_node=function_node)
+
+
+def thread_index(table, node, context=0, thread=0):
+    """Find a thread's index in a :any:`ProfileTable`.
+
+    Raises:
+        ConfigurationError: The table has no profile of the thread.
+    """
+    found = np.flatnonzero((table.threads == (node, context, thread)).all(axis=1))
+    if not len(found):
+        raise ConfigurationError(f"No {table.metric} profile of node {node}, context {context}, thread {thread}.")
+    return int(found[0])
+
+
+def tree_values(tree, table, statistic='mean', thread=None):
+    """Map a profile's measurements onto a call path tree.
+
+    Args:
+        tree (CallTree): Tree built from `table`'s timer names.
+        table (ProfileTable): The profiles.
+        statistic (str): How to merge threads: 'total', 'mean', 'min', or 'max'.  See :any:`summarize`.
+        thread (int): Index of one thread in `table` to use instead of merging threads.
+
+    Returns:
+        NodeValues: Each node's measurements.  Nodes that weren't measured are zero.
+    """
+    if thread is not None:
+        entries = table.entry_thread == thread
+        table = table._replace(threads=table.threads[thread:thread + 1],
+                               entry_thread=np.zeros(np.count_nonzero(entries), dtype=np.int64),
+                               **{name: getattr(table, name)[entries] for name in
+                                  ('entry_function', 'calls', 'subroutines', 'exclusive', 'inclusive')})
+        statistic = 'total'
+    function, calls, _, exclusive, inclusive = summarize(table, statistic)
+    nodes = tree.function_node[function]
+    keep = nodes >= 0
+    size = len(tree.parent)
+    values = []
+    for column in calls, exclusive, inclusive:
+        value = np.zeros(size)
+        value[nodes[keep]] = column[keep]
+        values.append(value)
+    measured = np.zeros(size, dtype=bool)
+    measured[nodes[keep]] = True
+    # A node that wasn't measured itself still includes its children's time
+    inclusive = values[2]
+    orphans = np.flatnonzero((tree.parent >= 0) & ~measured[tree.parent])
+    for depth in np.unique(tree.depth[orphans])[::-1]:
+        level = orphans[tree.depth[orphans] == depth]
+        inclusive += np.bincount(tree.parent[level], weights=inclusive[level], minlength=size)
+    return NodeValues(*values, measured=measured)
+
+
+def node_path(tree, node):
+    """Returns the list of function names on the path from a root to `node`."""
+    path = []
+    while node >= 0:
+        path.append(tree.components[tree.component[node]])
+        node = tree.parent[node]
+    return path[::-1]
+
+
+def hot_paths(values, count=10):
+    """Find the call paths with the most exclusive time.
+
+    Args:
+        values (NodeValues): Node measurements from :any:`tree_values`.
+        count (int): Maximum number of paths to return.
+
+    Returns:
+        numpy.ndarray: Node indices, most exclusive time first.
+    """
+    exclusive = np.where(values.measured, values.exclusive, -np.inf)
+    count = min(count, int(values.measured.sum()))
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-exclusive, count - 1)[:count]
+    return top[np.argsort(-exclusive[top], kind='stable')]
+
+
+def render_tree(tree, values, metric='TIME', min_fraction=0.01, max_depth=None):
+    """Render a call path tree as indented text.
+
+    Children are listed in order of decreasing inclusive time.  Subtrees with less than
+    `min_fraction` of the largest root's inclusive time are left out, so huge trees print quickly.
+
+    Args:
+        tree (CallTree): The tree.
+        values (NodeValues): Node measurements from :any:`tree_values`.
+        metric (str): Name of the measured metric.  TIME is shown in milliseconds.
+        min_fraction (float): Smallest fraction of the total inclusive time to show.
+        max_depth (int): Deepest nodes to show, or None for all depths.
+
+    Returns:
+        str: The tree.
+    """
+    scale, unit = (1e-3, 'msec') if metric == 'TIME' else (1.0, 'counts')
+    total = values.inclusive[tree.roots].max() if len(tree.roots) else 0
+    threshold = total * min_fraction
+    lines = ["%Time    Inclusive    Exclusive       #Call  Call path",
+             f"          {unit:>8s}     {unit:>8s}",
+             '-' * 87]
+    # Sort every node's children at once, then traverse depth first with an explicit stack.
+    # Plain lists are much faster than NumPy arrays for the per-node lookups in the loop.
+    children = tree.children[np.lexsort((-values.inclusive[tree.children], tree.parent[tree.children]))].tolist()
+    offsets = tree.child_offsets.tolist()
+    stack = tree.roots[np.argsort(-values.inclusive[tree.roots], kind='stable')][::-1].tolist()
+    inclusive, exclusive, calls = values.inclusive.tolist(), values.exclusive.tolist(), values.calls.tolist()
+    depth, measured, component = tree.depth.tolist(), values.measured.tolist(), tree.component.tolist()
+    max_depth = max(depth) if max_depth is None else max_depth
+    while stack:
+        node = stack.pop()
+        if inclusive[node] < threshold or depth[node] > max_depth:
+            continue
+        name = tree.components[component[node]]
+        if not measured[node]:
+            name += ' (not measured)'
+        lines.append('%5.1f %12.6g %12.6g %11.6g  %s%s' % (inclusive[node] / total * 100 if total else 0,
+                                                          inclusive[node] * scale, exclusive[node] * scale,
+                                                          calls[node], '  ' * depth[node], name))
+        stack.extend(reversed(children[offsets[node]:offsets[node + 1]]))
+    return '\n'.join(lines)
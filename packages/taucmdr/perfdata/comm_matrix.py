@@ -0,0 +1,266 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Communication matrices of trials measured with ``comm_matrix``.
+
+When TAU_COMM_MATRIX is enabled TAU records an atomic user event named ``Message size sent to node <N>``
+on each thread for every destination rank the thread sent point-to-point messages to.  The event's
+count is the number of messages and its count times its mean is the number of bytes sent.
+
+:any:`read_comm_matrix` pulls just those events out of each rank's profiles into a sparse
+rank-by-rank matrix in coordinate form, i.e. parallel arrays of (source, destination, messages,
+bytes) entries, so memory grows with the number of communicating pairs rather than with the
+square of the number of ranks.  The analyses below are vectorized NumPy reductions over those arrays.
+"""
+
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from taucmdr import logger, util
+from taucmdr.error import ConfigurationError
+from taucmdr.perfdata.tau_profile import profile_files
+
+
+LOGGER = logger.get_logger(__name__)
+
+_SENT_EVENT = re.compile(rb'^"Message size sent to node (\d+)" (\S+) \S+ \S+ (\S+) ', re.MULTILINE)
+
+_HOSTNAME = re.compile(rb"<attribute>\s*<name>Hostname</name>\s*<value>([^<]*)</value>")
+
+EXPORT_FORMATS = ('npz', 'mtx')
+"""tuple: File formats supported by :any:`export_comm_matrix`, chosen by file name extension."""
+
+CommMatrix = namedtuple('CommMatrix', ['ranks', 'source', 'destination', 'messages', 'bytes', 'host', 'host_names'])
+"""A sparse communication matrix.
+
+`ranks` is the number of ranks.  `source`, `destination`, `messages`, and `bytes` are parallel
+NumPy arrays with one entry per communicating pair, sorted by source then destination.  `host` has
+one entry per rank indexing `host_names`, or -1 if the rank's host is unknown.
+"""
+
+RankTotals = namedtuple('RankTotals', ['sent_bytes', 'received_bytes', 'sent_messages', 'received_messages',
+                                       'out_degree', 'in_degree'])
+"""Per-rank communication totals as NumPy arrays indexed by rank.
+
+`out_degree` and `in_degree` are the number of distinct ranks a rank sends to and receives from.
+"""
+
+Locality = namedtuple('Locality', ['self_fraction', 'neighbor_fraction', 'intra_host_fraction', 'mean_distance',
+                                   'max_distance'])
+"""How local a trial's communication is.
+
+The fractions are shares of all bytes sent: to the sending rank itself, to the adjacent ranks
+(rank ± 1), and to ranks on the same host (None if hosts are unknown).  `mean_distance` is the
+byte-weighted mean of ``|source - destination|`` and `max_distance` is its maximum over all pairs.
+"""
+
+
+def _read_sent_events(path):
+    """Read one profile's message size events as (destinations, messages, bytes) arrays and its hostname."""
+    with open(path, 'rb') as fin:
+        data = fin.read()
+    found = _SENT_EVENT.findall(data)
+    host = _HOSTNAME.search(data, 0, data.find(b'\n', data.find(b'\n') + 1))
+    try:
+        dests = np.array([int(dest) for dest, _, _ in found], dtype=np.int64)
+        counts = np.array([float(count) for _, count, _ in found], dtype=np.float64)
+        means = np.array([float(mean) for _, _, mean in found], dtype=np.float64)
+    except ValueError as err:
+        raise ConfigurationError(f"'{path}' is not a valid TAU profile.") from err
+    return dests, counts, np.rint(counts * means), host.group(1).decode(errors='replace') if host else None
+
+
+def read_comm_matrix(prefix, files=None, max_workers=None):
+    """Read a communication matrix from a directory of TAU profiles.
+
+    Each rank's threads are summed.  User events are the same in every metric's profiles so only
+    one metric's files are read.
+
+    Args:
+        prefix (str): Directory containing profile files, e.g. a trial directory.
+        files (list): Paths to files in `prefix` relative to `prefix`, e.g. from a trial manifest.
+        max_workers (int): Maximum number of profile files to read at once.
+
+    Returns:
+        CommMatrix: The communication matrix.
+
+    Raises:
+        ConfigurationError: There are no profiles in `prefix` or they have no communication matrix events.
+    """
+    found = profile_files(prefix, files)
+    if not found:
+        raise ConfigurationError(f"No TAU profiles found in '{prefix}'.",
+                                 "Check that the trial's measurement has profile=tau.")
+    metric = None if None in found else 'TIME' if 'TIME' in found else min(found)
+    paths = found[metric]
+    nodes = np.array([int(os.path.basename(path).split('.')[1]) for path in paths], dtype=np.int64)
+    with ThreadPoolExecutor(max_workers=max_workers or util.tree_workers()) as executor:
+        results = list(executor.map(_read_sent_events, paths))
+    sources = np.concatenate([np.full(len(dests), node, dtype=np.int64)
+                              for node, (dests, _, _, _) in zip(nodes, results)] + [np.zeros(0, dtype=np.int64)])
+    if not len(sources):
+        raise ConfigurationError(f"The profiles in '{prefix}' have no communication matrix events.",
+                                 "Check that the trial's measurement has comm_matrix=True.")
+    dests = np.concatenate([result[0] for result in results])
+    ranks = int(max(nodes.max(), dests.max())) + 1
+    # Sum threads of the same rank by combining (source, destination) into one sortable key
+    pairs, inverse = np.unique(sources * ranks + dests, return_inverse=True)
+    host_names = sorted({result[3] for result in results if result[3] is not None})
+    host_index = {name: i for i, name in enumerate(host_names)}
+    host = np.full(ranks, -1, dtype=np.int32)
+    for node, result in zip(nodes.tolist(), results):
+        if result[3] is not None and host[node] < 0:
+            host[node] = host_index[result[3]]
+    return CommMatrix(ranks=ranks,
+                      source=(pairs // ranks).astype(np.int32),
+                      destination=(pairs % ranks).astype(np.int32),
+                      messages=np.bincount(inverse, weights=np.concatenate([r[1] for r in results])).astype(np.int64),
+                      bytes=np.bincount(inverse, weights=np.concatenate([r[2] for r in results])).astype(np.int64),
+                      host=host,
+                      host_names=np.array(host_names, dtype=str))
+
+
+def rank_totals(matrix):
+    """Sum each rank's sent and received messages and bytes.
+
+    Args:
+        matrix (CommMatrix): The communication matrix.
+
+    Returns:
+        RankTotals: Per-rank totals.
+    """
+    ranks = matrix.ranks
+    total = lambda index, weights=None: np.bincount(index, weights=weights, minlength=ranks)
+    return RankTotals(sent_bytes=total(matrix.source, matrix.bytes).astype(np.int64),
+                      received_bytes=total(matrix.destination, matrix.bytes).astype(np.int64),
+                      sent_messages=total(matrix.source, matrix.messages).astype(np.int64),
+                      received_messages=total(matrix.destination, matrix.messages).astype(np.int64),
+                      out_degree=total(matrix.source),
+                      in_degree=total(matrix.destination))
+
+
+def _top(values, count):
+    """Indices of the `count` largest values, largest first."""
+    count = min(count, len(values))
+    if count <= 0:
+        return np.zeros(0, dtype=np.intp)
+    top = np.argpartition(-values, count - 1)[:count]
+    return top[np.argsort(-values[top], kind='stable')]
+
+
+def top_talkers(totals, count=10):
+    """Find the ranks that send and receive the most bytes.
+
+    Args:
+        totals (RankTotals): Per-rank totals from :any:`rank_totals`.
+        count (int): Maximum number of ranks to return.
+
+    Returns:
+        numpy.ndarray: Ranks, highest sent plus received bytes first.
+    """
+    return _top(totals.sent_bytes + totals.received_bytes, count)
+
+
+def top_pairs(matrix, count=10):
+    """Find the source and destination pairs that exchange the most bytes.
+
+    Args:
+        matrix (CommMatrix): The communication matrix.
+        count (int): Maximum number of pairs to return.
+
+    Returns:
+        numpy.ndarray: Indices into the matrix's arrays, highest bytes first.
+    """
+    return _top(matrix.bytes, count)
+
+
+def locality(matrix):
+    """Measure how local a communication matrix is.
+
+    Args:
+        matrix (CommMatrix): The communication matrix.
+
+    Returns:
+        Locality: The matrix's locality.
+    """
+    total = matrix.bytes.sum()
+    distance = np.abs(matrix.source.astype(np.int64) - matrix.destination)
+    share = lambda mask: float(matrix.bytes[mask].sum() / total) if total else 0.0
+    intra_host = None
+    if len(matrix.host_names):
+        src_host, dst_host = matrix.host[matrix.source], matrix.host[matrix.destination]
+        intra_host = share((src_host >= 0) & (src_host == dst_host))
+    return Locality(self_fraction=share(distance == 0),
+                    neighbor_fraction=share(distance == 1),
+                    intra_host_fraction=intra_host,
+                    mean_distance=float((distance * matrix.bytes).sum() / total) if total else 0.0,
+                    max_distance=int(distance.max()) if len(distance) else 0)
+
+
+def export_comm_matrix(path, matrix):
+    """Write a communication matrix to a file.
+
+    A ``.npz`` file is a compressed NumPy archive of the :any:`CommMatrix` fields that
+    :any:`load_comm_matrix` can read.  A ``.mtx`` file is a Matrix Market coordinate matrix of bytes
+    sent, with ranks numbered from one, that most sparse matrix libraries can read.
+
+    Args:
+        path (str): Path to the file to write.
+        matrix (CommMatrix): The communication matrix.
+
+    Raises:
+        ConfigurationError: `path` doesn't have a supported extension.
+    """
+    ext = os.path.splitext(path)[1][1:]
+    if ext not in EXPORT_FORMATS:
+        raise ConfigurationError(f"Can't export a communication matrix to '{path}'.",
+                                 "Supported file extensions are: %s" % ', '.join(f'.{fmt}' for fmt in EXPORT_FORMATS))
+    with open(path + '.tmp', 'wb') as fout:
+        if ext == 'npz':
+            np.savez_compressed(fout, **matrix._asdict())
+        else:
+            fout.write(b'%%MatrixMarket matrix coordinate integer general\n'
+                       b'%% Bytes sent from row rank to column rank, written by TAU Commander\n')
+            fout.write(f"{matrix.ranks} {matrix.ranks} {len(matrix.bytes)}\n".encode())
+            np.savetxt(fout, np.column_stack((matrix.source + 1, matrix.destination + 1, matrix.bytes)), fmt='%d')
+    os.replace(path + '.tmp', path)
+
+
+def load_comm_matrix(path):
+    """Load a communication matrix written to a ``.npz`` file by :any:`export_comm_matrix`.
+
+    Args:
+        path (str): Path to the file to read.
+
+    Returns:
+        CommMatrix: The communication matrix.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        fields = {field: data[field] for field in CommMatrix._fields}
+    fields['ranks'] = int(fields['ranks'])
+    return CommMatrix(**fields)
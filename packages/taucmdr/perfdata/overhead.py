@@ -0,0 +1,153 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Estimate measurement overhead by comparing instrumented trials to baseline trials.
+
+A baseline measurement runs the application with minimal TAU and no instrumentation, so the
+difference between an instrumented trial's elapsed time and a baseline trial's elapsed time of the
+same command is the cost of measurement.  That cost is attributed to functions in proportion to
+how often they were called since every call executes the same timer start and stop probes.
+
+All per-function arithmetic is done with NumPy arrays so trials with many thousands of
+functions on many thousands of threads can be analyzed quickly.
+"""
+
+from collections import namedtuple
+import numpy as np
+from taucmdr.perfdata.tau_profile import ProfileTable, is_callpath, profile_table
+
+
+OVERHEAD_BUDGET = 0.10
+"""float: Measurements that slow the application down more than this fraction are flagged."""
+
+FunctionTotals = namedtuple('FunctionTotals', ['names', 'calls', 'exclusive', 'inclusive'])
+"""Each function's calls and times summed over all threads, as parallel NumPy arrays."""
+
+FunctionOverhead = namedtuple('FunctionOverhead', ['names', 'calls', 'exclusive', 'overhead', 'share', 'relative'])
+"""Estimated per-function overhead as parallel NumPy arrays sorted by `overhead`, highest first.
+
+`overhead` is the estimated probe time in microseconds, `share` is the fraction of the total
+overhead, and `relative` is `overhead` divided by the function's measured exclusive time.
+"""
+
+OverheadEstimate = namedtuple('OverheadEstimate', ['baseline_elapsed', 'elapsed', 'overhead', 'usec_per_call',
+                                                   'functions'])
+"""Estimated overhead of one measurement.
+
+`baseline_elapsed` and `elapsed` are median seconds, `overhead` is the fractional slowdown,
+`usec_per_call` is the estimated cost of one instrumented call, and `functions` is a
+:any:`FunctionOverhead`.
+"""
+
+
+def function_totals(profiles):
+    """Sum each function's calls and times over all threads.
+
+    Call path timers and TAU's own timers (e.g. ``.TAU application``) are skipped.
+
+    Args:
+        profiles: A :any:`ProfileTable` or a list of :any:`ThreadProfile` objects of one metric.
+
+    Returns:
+        FunctionTotals: Per-function totals.
+    """
+    if not isinstance(profiles, ProfileTable):
+        if not profiles:
+            empty = np.zeros(0)
+            return FunctionTotals(np.zeros(0, dtype=object), empty, empty, empty)
+        profiles = profile_table(profiles)
+    table = profiles
+    keep = np.fromiter((not (name.startswith('.TAU') or is_callpath(name)) for name in table.names),
+                       dtype=bool, count=len(table.names))
+    # Renumber the kept functions densely, in order of first appearance
+    new_index = np.cumsum(keep) - 1
+    entries = keep[table.entry_function]
+    ids = new_index[table.entry_function[entries]]
+    size = int(keep.sum())
+    return FunctionTotals(table.names[keep],
+                          np.bincount(ids, weights=table.calls[entries], minlength=size),
+                          np.bincount(ids, weights=table.exclusive[entries], minlength=size),
+                          np.bincount(ids, weights=table.inclusive[entries], minlength=size))
+
+
+def estimate_overhead(baseline_elapsed, elapsed, totals, threads=1):
+    """Estimate the overhead of a measurement.
+
+    The medians of the baseline and instrumented trials' elapsed times are compared.  Threads run
+    concurrently so the slowdown is multiplied by the number of threads before it is divided among
+    all function calls to estimate the cost of one call.
+
+    Args:
+        baseline_elapsed (list): Elapsed seconds of baseline trials.
+        elapsed (list): Elapsed seconds of instrumented trials.
+        totals (FunctionTotals): Per-function totals of one instrumented trial.
+        threads (int): Number of threads in the instrumented trial.
+
+    Returns:
+        OverheadEstimate: The estimated overhead.
+    """
+    base = float(np.median(np.asarray(baseline_elapsed, dtype=np.float64)))
+    inst = float(np.median(np.asarray(elapsed, dtype=np.float64)))
+    overhead = (inst - base) / base if base > 0 else 0.0
+    extra_usec = max(inst - base, 0.0) * 1e6 * max(threads, 1)
+    total_calls = totals.calls.sum()
+    usec_per_call = extra_usec / total_calls if total_calls else 0.0
+    function_overhead = totals.calls * usec_per_call
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = function_overhead / extra_usec if extra_usec else np.zeros_like(function_overhead)
+        relative = np.where(totals.exclusive > 0, function_overhead / totals.exclusive, np.inf)
+    order = np.argsort(-function_overhead, kind='stable')
+    functions = FunctionOverhead(totals.names[order], totals.calls[order], totals.exclusive[order],
+                                 function_overhead[order], share[order], relative[order])
+    return OverheadEstimate(base, inst, overhead, usec_per_call, functions)
+
+
+def suggestions(measurement, estimate, budget=OVERHEAD_BUDGET):
+    """Suggest measurement changes that would reduce overhead.
+
+    Args:
+        measurement (Measurement): The instrumented measurement.
+        estimate (OverheadEstimate): The measurement's estimated overhead.
+        budget (float): Acceptable fractional slowdown.
+
+    Returns:
+        list: Suggestions as strings; empty if the overhead is within `budget`.
+    """
+    if estimate.overhead <= budget:
+        return []
+    name = measurement['name']
+    hints = []
+    if measurement.get('source_inst', 'never') != 'never' or measurement.get('compiler_inst', 'never') != 'never':
+        hints.append("Exclude high-overhead functions from instrumentation: `tau measurement autoselect`")
+        if not measurement.get('throttle', False):
+            hints.append(f"Enable throttling: `tau measurement edit {name} --throttle T`")
+        else:
+            hints.append(f"Throttle more functions: `tau measurement edit {name} --throttle-per-call "
+                         f"{max(int(measurement.get('throttle_per_call', 10)) * 2, 1)}`")
+    if not measurement.get('sample', False):
+        hints.append(f"Use event-based sampling instead: `tau measurement edit {name} --sample T"
+                     f" --source-inst never --compiler-inst never`")
+    return hints
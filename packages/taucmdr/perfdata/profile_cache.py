@@ -0,0 +1,152 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Columnar on-disk cache of parsed TAU profiles.
+
+Parsing thousands of ASCII ``profile.*`` files dominates the time of every analysis of a trial.
+:any:`load_table` parses a metric's profiles once into a :any:`ProfileTable` and writes each of
+its arrays to a ``.npy`` file in a cache directory next to the profiles.  The cache's
+``index.json`` holds the string tables (metric, timer, and group names) and the size and
+modification time of every source profile file.  Later loads check those against the profile files
+and memory-map the arrays, so loading is nearly instant and only the pages an analysis touches are
+read from disk.  If any profile file was added, removed, or changed the metric is parsed again.
+
+Every write uses new array file names and the index is updated under a lock, so concurrent
+writers never mix one table's arrays with another table's names.
+"""
+
+import os
+import json
+import uuid
+import fasteners
+import numpy as np
+from taucmdr import logger
+from taucmdr.perfdata.tau_profile import ProfileTable, metric_files, profile_table, read_profile
+
+
+LOGGER = logger.get_logger(__name__)
+
+CACHE_VERSION = 2
+"""int: Version of the cache format.  Caches of other versions are rebuilt."""
+
+_ARRAYS = ('threads', 'entry_thread', 'entry_function', 'calls', 'subroutines', 'exclusive', 'inclusive')
+
+
+def _sources(prefix, paths):
+    """[relative path, size, mtime in nanoseconds] of each profile file."""
+    sources = []
+    for path in paths:
+        stat = os.stat(path)
+        sources.append([os.path.relpath(path, prefix), stat.st_size, stat.st_mtime_ns])
+    return sources
+
+
+def _read_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'index.json')) as fin:
+            index = json.load(fin)
+    except (OSError, ValueError):
+        return {'version': CACHE_VERSION, 'metrics': {}}
+    if not isinstance(index, dict) or index.get('version') != CACHE_VERSION:
+        return {'version': CACHE_VERSION, 'metrics': {}}
+    return index
+
+
+def _replace(path, write):
+    """Write a file atomically by calling `write` with a temporary file object."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as fout:
+        write(fout)
+    os.replace(tmp, path)
+
+
+def _array_path(cache_dir, stem, name):
+    return os.path.join(cache_dir, f"{stem}.{name}.npy")
+
+
+def _load(cache_dir, metric, entry):
+    arrays = {name: np.load(_array_path(cache_dir, entry['stem'], name), mmap_mode='r', allow_pickle=False)
+              for name in _ARRAYS}
+    if len({len(arrays[name]) for name in _ARRAYS[1:]}) != 1 or len(entry['names']) != len(entry['groups']):
+        raise ValueError("inconsistent array lengths")
+    return ProfileTable(metric=metric, names=np.array(entry['names'], dtype=object),
+                        groups=np.array(entry['groups'], dtype=object), **arrays)
+
+
+def _store(cache_dir, metric, table, sources):
+    os.makedirs(cache_dir, exist_ok=True)
+    # A new stem for every write so a reader or another writer never sees a mix of two writes' arrays
+    stem = uuid.uuid4().hex
+    for name in _ARRAYS:
+        array = np.ascontiguousarray(getattr(table, name))
+        _replace(_array_path(cache_dir, stem, name), lambda fout, array=array: np.save(fout, array, allow_pickle=False))
+    with fasteners.InterProcessLock(os.path.join(cache_dir, '.lock')):
+        # Read the index again so metrics cached by other processes since it was last read are kept
+        index = _read_index(cache_dir)
+        old = index['metrics'].get(metric)
+        index['metrics'][metric] = {'stem': stem, 'sources': sources,
+                                    'names': table.names.tolist(), 'groups': table.groups.tolist()}
+        _replace(os.path.join(cache_dir, 'index.json'),
+                 lambda fout: fout.write(json.dumps(index, separators=(',', ':')).encode()))
+    if old and 'stem' in old:
+        # Processes that already mapped the old arrays can still read them after they're unlinked
+        for name in _ARRAYS:
+            try:
+                os.remove(_array_path(cache_dir, old['stem'], name))
+            except OSError:
+                pass
+
+
+def load_table(prefix, cache_dir, metric=None, files=None):
+    """Load one metric's profiles from a directory, using and updating the cache.
+
+    Args:
+        prefix (str): Directory containing profile files, e.g. a trial directory.
+        cache_dir (str): Cache directory.  It is created if it doesn't exist.
+        metric (str): Metric to load.  See :any:`metric_files`.
+        files (list): Paths to files in `prefix` relative to `prefix`, e.g. from a trial manifest.
+
+    Returns:
+        ProfileTable: The profiles.  Arrays loaded from the cache are read-only memory maps.
+
+    Raises:
+        ConfigurationError: There are no profiles of `metric` in `prefix`.
+    """
+    metric, paths = metric_files(prefix, metric, files)
+    sources = _sources(prefix, paths)
+    index = _read_index(cache_dir)
+    entry = index['metrics'].get(metric)
+    if entry and entry.get('sources') == sources:
+        try:
+            return _load(cache_dir, metric, entry)
+        except (OSError, ValueError, KeyError) as err:
+            LOGGER.debug("Ignoring invalid profile cache in '%s': %s", cache_dir, err)
+    table = profile_table([read_profile(path) for path in paths])._replace(metric=metric)
+    try:
+        _store(cache_dir, metric, table, sources)
+    except OSError as err:
+        LOGGER.debug("Could not write profile cache in '%s': %s", cache_dir, err)
+    return table
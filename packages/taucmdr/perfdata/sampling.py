@@ -0,0 +1,253 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Event-based sampling (EBS) data in TAU profiles.
+
+Measurements with ``sample = True`` add timers for the samples TAU took.  Their names look like::
+
+    [SAMPLE] compute [{/src/solver.c} {42}]
+    [SAMPLE] UNRESOLVED /lib64/libm.so.6 ADDR 0x2b7d0
+    [SUMMARY] compute [{/src/solver.c} {30,1}-{57,1}]
+    main => compute => [CONTEXT] compute => [UNWIND] kernel [{/src/kernel.c} {10}] => [SAMPLE] ...
+
+``[SAMPLE]`` timers count the samples at one source line; their exclusive value is the time (or
+other metric) sampled there.  ``[SUMMARY]`` timers repeat their functions' totals and ``[CONTEXT]``
+timers repeat the enclosing timer's, so only ``[SAMPLE]`` timers are aggregated here.
+
+Every ``[SAMPLE]`` timer name is parsed once into a :any:`SampleSite` and the profile's entries are
+then reduced by site with :any:`numpy.bincount` in fixed-size chunks.  Memory use depends on the
+number of sites, not on the number of threads, and a memory-mapped :any:`ProfileTable` is read
+one chunk at a time.
+"""
+
+import re
+from collections import namedtuple
+import numpy as np
+from taucmdr.error import ConfigurationError
+from taucmdr.perfdata.tau_profile import CALLPATH_SEPARATOR, is_callpath
+
+
+SAMPLE_PREFIX = '[SAMPLE] '
+
+UNWIND_PREFIX = '[UNWIND] '
+
+CONTEXT_PREFIX = '[CONTEXT] '
+
+GROUPINGS = ('line', 'function', 'module')
+"""Ways to aggregate sample sites, from finest to coarsest."""
+
+WEIGHTS = ('samples', 'value')
+"""What collapsed stack counts measure: number of samples or the sampled metric's value."""
+
+CHUNK_SIZE = 1 << 20
+"""Number of profile entries reduced at a time."""
+
+_LOCATION = re.compile(r'^(?P<function>.*?) \[\{(?P<file>.*)\} \{(?P<line>\d+)(?:,\d+)?\}(?:-\{[\d,]+\})?\]$')
+
+_UNRESOLVED = re.compile(r'^UNRESOLVED(?: (?P<module>.*?))? ADDR (?P<address>\S+)$')
+
+SampleSite = namedtuple('SampleSite', ['module', 'function', 'file', 'line'])
+"""Where samples were taken.
+
+`module` is the shared object for addresses TAU couldn't resolve to source, in which case
+`function` is the address, `file` is empty, and `line` is 0.  Otherwise `module` is the source file.
+"""
+
+SampleProfile = namedtuple('SampleProfile', ['metric', 'thread_count', 'sites', 'samples', 'value'])
+"""Samples aggregated over all threads.
+
+`sites` is a list of :any:`SampleSite` and `samples` and `value` are arrays with the total number
+of samples and sampled metric value at each site.
+"""
+
+SampleGroups = namedtuple('SampleGroups', ['keys', 'samples', 'value'])
+"""Samples grouped by line, function, or module, most sampled value first.
+
+`keys` is a list of tuples: (module, function, file, line), (module, function, file), or (module,).
+"""
+
+
+def parse_frame(name):
+    """Parse a sample or unwind frame name, e.g. ``compute [{/src/solver.c} {42}]``.
+
+    Args:
+        name (str): Frame name without its ``[SAMPLE]`` or ``[UNWIND]`` prefix.
+
+    Returns:
+        SampleSite: Where the sample was taken.
+    """
+    match = _LOCATION.match(name)
+    if match:
+        path = match.group('file')
+        return SampleSite(path, match.group('function'), path, int(match.group('line')))
+    match = _UNRESOLVED.match(name)
+    if match:
+        return SampleSite(match.group('module') or '', match.group('address'), '', 0)
+    return SampleSite('', name, '', 0)
+
+
+def parse_sample(name):
+    """Parse a sample timer's name.
+
+    Args:
+        name (str): Timer name, possibly a call path ending in a ``[SAMPLE]`` timer.
+
+    Returns:
+        SampleSite: Where the sample was taken, or None if `name` isn't a sample timer.
+    """
+    leaf = name.rpartition(CALLPATH_SEPARATOR)[2]
+    if not leaf.startswith(SAMPLE_PREFIX):
+        return None
+    return parse_frame(leaf[len(SAMPLE_PREFIX):])
+
+
+def collapsed_frames(name, lines=False):
+    """Split a call path sample timer into stack frames for flame graph tools.
+
+    ``[CONTEXT]`` components duplicate the timer before them so they are left out.  Semicolons
+    separate frames in collapsed stacks so they are replaced in frame names.
+
+    Args:
+        name (str): Timer name ending in a ``[SAMPLE]`` timer.
+        lines (bool): If True, append the source line to sample and unwind frames.
+
+    Returns:
+        list: Frame names from outermost to innermost.
+    """
+    frames = []
+    for part in name.split(CALLPATH_SEPARATOR):
+        if part.startswith(CONTEXT_PREFIX):
+            continue
+        for prefix in SAMPLE_PREFIX, UNWIND_PREFIX:
+            if part.startswith(prefix):
+                site = parse_frame(part[len(prefix):])
+                part = f"{site.function}:{site.line}" if lines and site.line else site.function
+                break
+        frames.append(part.replace(';', ':'))
+    return frames
+
+
+def _reduce(table, index, size, chunk_size):
+    """Sum samples and values of each table entry into bins ``index[entry_function]``, -1 to skip."""
+    samples, value = np.zeros(size), np.zeros(size)
+    for start in range(0, len(table.entry_function), chunk_size):
+        bins = index[table.entry_function[start:start + chunk_size]]
+        keep = bins >= 0
+        bins = bins[keep]
+        samples += np.bincount(bins, weights=table.calls[start:start + chunk_size][keep], minlength=size)
+        value += np.bincount(bins, weights=table.exclusive[start:start + chunk_size][keep], minlength=size)
+    return samples, value
+
+
+def _no_samples():
+    return ConfigurationError("The profiles have no event-based samples.",
+                              "Enable sampling with `tau measurement edit <name> --sample T` and run the "
+                              "application again.")
+
+
+def aggregate(table, chunk_size=CHUNK_SIZE):
+    """Total all threads' samples by sample site.
+
+    Flat ``[SAMPLE]`` timers are used if there are any.  Otherwise the call path sample timers are
+    merged by their leaf sample, so samples aren't counted twice when call paths are measured.
+
+    Args:
+        table (ProfileTable): The profiles.
+        chunk_size (int): Number of profile entries to reduce at a time.
+
+    Returns:
+        SampleProfile: Samples at each site.
+
+    Raises:
+        ConfigurationError: The profiles have no samples.
+    """
+    sites = {}
+    flat = np.full(len(table.names), -1, dtype=np.int64)
+    nested = np.full(len(table.names), -1, dtype=np.int64)
+    for i, name in enumerate(table.names):
+        site = parse_sample(name)
+        if site is not None:
+            (nested if is_callpath(name) else flat)[i] = sites.setdefault(site, len(sites))
+    if not sites:
+        raise _no_samples()
+    samples, value = _reduce(table, flat if (flat >= 0).any() else nested, len(sites), chunk_size)
+    return SampleProfile(table.metric, len(table.threads), list(sites), samples, value)
+
+
+def group(profile, by='function'):
+    """Group samples by source line, function, or module.
+
+    Args:
+        profile (SampleProfile): Samples from :any:`aggregate`.
+        by (str): One of :any:`GROUPINGS`.
+
+    Returns:
+        SampleGroups: Grouped samples, most sampled value first.
+    """
+    if by not in GROUPINGS:
+        raise ValueError(f"Invalid grouping: {by}")
+    width = {'line': 4, 'function': 3, 'module': 1}[by]
+    keys = {}
+    index = np.array([keys.setdefault(site[:width], len(keys)) for site in profile.sites], dtype=np.int64)
+    samples = np.bincount(index, weights=profile.samples, minlength=len(keys))
+    value = np.bincount(index, weights=profile.value, minlength=len(keys))
+    order = np.lexsort((-samples, -value))
+    keys = list(keys)
+    return SampleGroups([keys[i] for i in order], samples[order], value[order])
+
+
+def collapsed_stacks(table, weight='samples', lines=False, chunk_size=CHUNK_SIZE):
+    """Write samples as collapsed stacks, e.g. for ``flamegraph.pl`` or speedscope.
+
+    Each line is a stack of frames separated by semicolons followed by a space and a count.
+    Without call path sample timers every stack has just the sampled function.
+
+    Args:
+        table (ProfileTable): The profiles.
+        weight (str): One of :any:`WEIGHTS`.  Values are rounded to integers.
+        lines (bool): If True, sampled frames include their source line.
+        chunk_size (int): Number of profile entries to reduce at a time.
+
+    Returns:
+        list: Lines of collapsed stack text, sorted by stack.
+
+    Raises:
+        ConfigurationError: The profiles have no samples.
+    """
+    if weight not in WEIGHTS:
+        raise ValueError(f"Invalid weight: {weight}")
+    samples = [(i, name) for i, name in enumerate(table.names) if parse_sample(name) is not None]
+    if not samples:
+        raise _no_samples()
+    if any(is_callpath(name) for _, name in samples):
+        samples = [(i, name) for i, name in samples if is_callpath(name)]
+    stacks = {}
+    index = np.full(len(table.names), -1, dtype=np.int64)
+    for i, name in samples:
+        index[i] = stacks.setdefault(';'.join(collapsed_frames(name, lines)), len(stacks))
+    counts = _reduce(table, index, len(stacks), chunk_size)[WEIGHTS.index(weight)]
+    return [f"{stack} {count}" for stack, count in sorted(zip(stacks, np.rint(counts).astype(np.int64).tolist()))
+            if count > 0]
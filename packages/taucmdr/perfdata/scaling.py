@@ -0,0 +1,224 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Scaling studies of trials performed at different rank counts.
+
+Each trial's profiles are reduced once to per-function totals which are cached with the trial's
+number, rank count, and elapsed time in a :any:`ScalingData` object.  :any:`update_data` only reads
+profiles of trials that aren't already in the cache, so adding a trial to a study of hundreds of
+large trials reads one trial's profiles.
+
+:any:`analyze` groups trials by rank count and computes speedup and parallel efficiency relative to
+the smallest rank count.  Each function's scaling exponent `b` is the slope of a least squares fit
+of ``log(time) = a + b * log(ranks)`` computed for all functions at once with masked NumPy
+reductions: -1 is perfect strong scaling, 0 is no improvement, and positive values mean the
+function slows down as ranks are added.
+"""
+
+import os
+from collections import namedtuple
+import numpy as np
+from taucmdr import logger
+from taucmdr.perfdata.overhead import function_totals
+
+
+LOGGER = logger.get_logger(__name__)
+
+ScalingData = namedtuple('ScalingData', ['names', 'numbers', 'keys', 'ranks', 'elapsed', 'threads',
+                                         'entry_trial', 'entry_function', 'entry_calls', 'entry_exclusive',
+                                         'entry_inclusive'])
+"""Per-function totals of many trials as NumPy arrays.
+
+`numbers`, `keys`, `ranks`, `elapsed`, and `threads` have one entry per trial.  A trial's key changes
+if the trial is replaced or its data changes.  The ``entry_*`` arrays are parallel arrays of (trial
+index, function index, totals) entries where function indices refer to `names`.  Times are summed
+over all threads in the profile's units, i.e. microseconds.
+"""
+
+ScalingStudy = namedtuple('ScalingStudy', ['ranks', 'trials', 'elapsed', 'speedup', 'efficiency',
+                                           'names', 'times', 'exponents', 'points'])
+"""Results of a scaling study.
+
+`ranks` are the distinct rank counts in increasing order and `trials`, `elapsed` (median seconds),
+`speedup`, and `efficiency` have one entry per rank count.  `times` has a row per function in
+`names` and a column per rank count of the median mean-per-thread time in microseconds, or NaN if
+the function wasn't measured at that rank count.  `exponents` are the functions' scaling exponents,
+NaN if `points` (the number of rank counts fitted) is less than two.
+"""
+
+
+def empty_data():
+    """Returns a :any:`ScalingData` object without any trials."""
+    ints = lambda dtype=np.int64: np.zeros(0, dtype=dtype)
+    return ScalingData(names=np.zeros(0, dtype=str), numbers=ints(), keys=np.zeros(0, dtype=str), ranks=ints(),
+                       elapsed=np.zeros(0), threads=ints(), entry_trial=ints(np.int32),
+                       entry_function=ints(np.int32), entry_calls=np.zeros(0), entry_exclusive=np.zeros(0),
+                       entry_inclusive=np.zeros(0))
+
+
+def update_data(data, trials, read_trial):
+    """Bring cached scaling data up to date with a list of trials.
+
+    Trials no longer in `trials` or whose key changed are dropped and new trials' profiles are read.
+
+    Args:
+        data (ScalingData): Cached data, e.g. from :any:`load_data`.
+        trials (list): (number, key, ranks, elapsed) tuples of the trials to include.
+        read_trial (callable): Called with a trial number, returns the trial's :any:`ProfileTable`
+                               or None if the trial has no profiles.
+
+    Returns:
+        tuple: (Updated :any:`ScalingData`, number of trials whose profiles were read).
+    """
+    wanted = {number: (key, ranks, elapsed) for number, key, ranks, elapsed in trials}
+    keep = np.array([wanted.get(number, (None,))[0] == key
+                     for number, key in zip(data.numbers.tolist(), data.keys.tolist())], dtype=bool)
+    kept = np.flatnonzero(keep)
+    # Renumber the kept trials' entries so trial indices stay dense
+    trial_index = np.full(len(keep), -1, dtype=np.int64)
+    trial_index[kept] = np.arange(len(kept))
+    entries = keep[data.entry_trial] if len(keep) else np.zeros(0, dtype=bool)
+    names = {name: i for i, name in enumerate(data.names.tolist())}
+    numbers, keys = data.numbers[kept].tolist(), data.keys[kept].tolist()
+    ranks, elapsed, threads = data.ranks[kept].tolist(), data.elapsed[kept].tolist(), data.threads[kept].tolist()
+    columns = {'entry_trial': [trial_index[data.entry_trial[entries]]],
+               'entry_function': [data.entry_function[entries]],
+               'entry_calls': [data.entry_calls[entries]],
+               'entry_exclusive': [data.entry_exclusive[entries]],
+               'entry_inclusive': [data.entry_inclusive[entries]]}
+    added = sorted(set(wanted) - set(numbers))
+    for number in added:
+        key, rank_count, trial_elapsed = wanted[number]
+        table = read_trial(number)
+        totals = function_totals([] if table is None else table)
+        columns['entry_trial'].append(np.full(len(totals.names), len(numbers)))
+        columns['entry_function'].append(np.array([names.setdefault(name, len(names)) for name in totals.names],
+                                                  dtype=np.int64))
+        columns['entry_calls'].append(totals.calls)
+        columns['entry_exclusive'].append(totals.exclusive)
+        columns['entry_inclusive'].append(totals.inclusive)
+        numbers.append(number)
+        keys.append(key)
+        ranks.append(rank_count)
+        elapsed.append(trial_elapsed)
+        threads.append(0 if table is None else len(table.threads))
+    data = ScalingData(names=np.array(list(names), dtype=str), numbers=np.array(numbers, dtype=np.int64),
+                       keys=np.array(keys, dtype=str), ranks=np.array(ranks, dtype=np.int64),
+                       elapsed=np.array(elapsed, dtype=np.float64), threads=np.array(threads, dtype=np.int64),
+                       entry_trial=np.concatenate(columns['entry_trial']).astype(np.int32),
+                       entry_function=np.concatenate(columns['entry_function']).astype(np.int32),
+                       entry_calls=np.concatenate(columns['entry_calls']).astype(np.float64),
+                       entry_exclusive=np.concatenate(columns['entry_exclusive']).astype(np.float64),
+                       entry_inclusive=np.concatenate(columns['entry_inclusive']).astype(np.float64))
+    return data, len(added)
+
+
+def save_data(path, data):
+    """Save scaling data to a compressed NumPy archive.
+
+    Args:
+        path (str): Path to the file to write.
+        data (ScalingData): The data.
+    """
+    with open(path + '.tmp', 'wb') as fout:
+        np.savez_compressed(fout, **data._asdict())
+    os.replace(path + '.tmp', path)
+
+
+def load_data(path):
+    """Load scaling data saved by :any:`save_data`.
+
+    Args:
+        path (str): Path to the file to read.
+
+    Returns:
+        ScalingData: The data, or an empty :any:`ScalingData` if the file doesn't exist or is invalid.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as archive:
+            return ScalingData(**{field: archive[field] for field in ScalingData._fields})
+    except FileNotFoundError:
+        return empty_data()
+    except (OSError, ValueError, KeyError) as err:
+        LOGGER.debug("Ignoring invalid scaling data in '%s': %s", path, err)
+        return empty_data()
+
+
+def scaling_exponents(ranks, times):
+    """Fit ``log(time) = a + b * log(ranks)`` for many functions at once.
+
+    Args:
+        ranks (numpy.ndarray): Rank counts.
+        times (numpy.ndarray): A row of times per function and a column per rank count.
+                               Missing and non-positive times are left out of the fit.
+
+    Returns:
+        tuple: (exponents `b`, number of points fitted) arrays with one entry per row of `times`.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mask = np.isfinite(times) & (times > 0)
+        x = np.broadcast_to(np.log(np.asarray(ranks, dtype=np.float64)), times.shape)
+        y = np.where(mask, np.log(np.where(mask, times, 1)), 0)
+        points = mask.sum(axis=1)
+        x_mean = np.where(mask, x, 0).sum(axis=1) / points
+        y_mean = y.sum(axis=1) / points
+        dx = np.where(mask, x - x_mean[:, None], 0)
+        covariance = (dx * (y - y_mean[:, None]) * mask).sum(axis=1)
+        variance = (dx * dx).sum(axis=1)
+        exponents = np.where((points >= 2) & (variance > 0), covariance / variance, np.nan)
+    return exponents, points
+
+
+def analyze(data, metric='exclusive'):
+    """Analyze scaling of elapsed time and per-function time.
+
+    Trials at the same rank count are combined by taking medians.  A function's time in a trial is
+    its total time divided by the trial's number of threads.
+
+    Args:
+        data (ScalingData): Per-trial function totals.
+        metric (str): 'exclusive' or 'inclusive' function time.
+
+    Returns:
+        ScalingStudy: The results.
+    """
+    ranks, group = np.unique(data.ranks, return_inverse=True)
+    trials = np.bincount(group, minlength=len(ranks))
+    elapsed = np.array([np.median(data.elapsed[group == i]) for i in range(len(ranks))])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speedup = elapsed[0] / elapsed if len(elapsed) else elapsed
+        efficiency = speedup / (ranks / ranks[0]) if len(ranks) else speedup
+    per_trial = np.full((len(data.names), len(data.numbers)), np.nan)
+    values = data.entry_exclusive if metric == 'exclusive' else data.entry_inclusive
+    per_trial[data.entry_function, data.entry_trial] = values / np.maximum(data.threads[data.entry_trial], 1)
+    times = np.full((len(data.names), len(ranks)), np.nan)
+    for i in range(len(ranks)):
+        columns = per_trial[:, group == i]
+        measured = np.isfinite(columns).any(axis=1)
+        times[measured, i] = np.nanmedian(columns[measured], axis=1)
+    exponents, points = scaling_exponents(ranks, times)
+    return ScalingStudy(ranks=ranks, trials=trials, elapsed=elapsed, speedup=speedup, efficiency=efficiency,
+                        names=data.names, times=times, exponents=exponents, points=points)
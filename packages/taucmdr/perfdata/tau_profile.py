@@ -0,0 +1,272 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Reader for TAU profile files.
+
+TAU writes one text file named ``profile.<node>.<context>.<thread>`` per thread of execution.
+When more than one metric is measured each metric's files are in a ``MULTI__<metric>`` directory.
+Each file lists the thread's timers (functions) followed by its atomic user events::
+
+    2 templated_functions_MULTI_TIME
+    # Name Calls Subrs Excl Incl ProfileCalls #<metadata>...</metadata>
+    "main" 1 1 15 40 0 GROUP="TAU_DEFAULT"
+    "foo" 10 0 25 25 0 GROUP="TAU_USER"
+    0 aggregates
+    1 userevents
+    # eventname numevents max min mean sumsqr
+    "Message size" 4 8 2 5 120
+"""
+
+import os
+import re
+import fnmatch
+import xml.etree.ElementTree as ElementTree
+from collections import namedtuple
+import numpy as np
+from taucmdr import logger
+from taucmdr.error import ConfigurationError
+
+
+LOGGER = logger.get_logger(__name__)
+
+CALLPATH_SEPARATOR = ' => '
+"""str: Separator between timer names in a call path timer's name."""
+
+_FUNCTION_LINE = re.compile(r'^"(.*)" (\S+) (\S+) (\S+) (\S+) (\S+)(?: GROUP="(.*)")?\s*$')
+
+_EVENT_LINE = re.compile(r'^"(.*)" (\S+) (\S+) (\S+) (\S+) (\S+)\s*$')
+
+_FILE_NAME = re.compile(r'^profile\.(-?\d+)\.(\d+)\.(\d+)$')
+
+
+Function = namedtuple('Function', ['name', 'calls', 'subroutines', 'exclusive', 'inclusive', 'group'])
+"""A timer's measurements on one thread.  Times are in the metric's units, e.g. microseconds for TIME."""
+
+UserEvent = namedtuple('UserEvent', ['name', 'count', 'maximum', 'minimum', 'mean', 'sumsqr'])
+"""An atomic user event's statistics on one thread."""
+
+ThreadProfile = namedtuple('ThreadProfile', ['node', 'context', 'thread', 'metric', 'functions', 'events', 'metadata'])
+"""All measurements of one metric on one thread."""
+
+ProfileTable = namedtuple('ProfileTable', ['metric', 'names', 'groups', 'threads', 'entry_thread', 'entry_function',
+                                           'calls', 'subroutines', 'exclusive', 'inclusive'])
+"""All threads' timers of one metric as NumPy arrays.
+
+`threads` has a (node, context, thread) row per thread and `names` and `groups` have one entry per
+timer.  The remaining arrays are parallel with one entry per timer measured on a thread;
+`entry_thread` and `entry_function` index `threads` and `names`.
+"""
+
+
+def is_callpath(name):
+    """Returns True if `name` is a call path timer's name, e.g. ``main => foo``."""
+    return CALLPATH_SEPARATOR in name
+
+
+def _parse_metadata(header):
+    start = header.find('<metadata>')
+    end = header.rfind('</metadata>')
+    if start < 0 or end < 0:
+        return {}
+    try:
+        root = ElementTree.fromstring(header[start:end + len('</metadata>')])
+    except ElementTree.ParseError as err:
+        LOGGER.debug("Ignoring invalid profile metadata: %s", err)
+        return {}
+    return {attr.findtext('name'): attr.findtext('value') for attr in root.iter('attribute')}
+
+
+def read_profile(path):
+    """Read a TAU profile file.
+
+    Args:
+        path (str): Path to a ``profile.<node>.<context>.<thread>`` file.
+
+    Returns:
+        ThreadProfile: The file's data.
+
+    Raises:
+        ConfigurationError: The file isn't a valid TAU profile.
+    """
+    match = _FILE_NAME.match(os.path.basename(path))
+    node, context, thread = (int(x) for x in match.groups()) if match else (0, 0, 0)
+    try:
+        with open(path, errors='replace') as fin:
+            count, kind = fin.readline().split(None, 1)
+            metric = kind.strip().partition('_MULTI_')[2] or 'TIME'
+            metadata = _parse_metadata(fin.readline())
+            functions = []
+            for _ in range(int(count)):
+                name, calls, subrs, excl, incl, _, group = _FUNCTION_LINE.match(fin.readline()).groups()
+                functions.append(Function(name, int(float(calls)), int(float(subrs)), float(excl), float(incl), group))
+            events = []
+            line = fin.readline()
+            if line:
+                for _ in range(int(line.split()[0])):
+                    fin.readline()
+                line = fin.readline()
+            if line:
+                count = int(line.split()[0])
+                fin.readline()
+                for _ in range(count):
+                    name, numevents, maximum, minimum, mean, sumsqr = _EVENT_LINE.match(fin.readline()).groups()
+                    events.append(UserEvent(name, int(float(numevents)), float(maximum), float(minimum),
+                                            float(mean), float(sumsqr)))
+    except (ValueError, AttributeError, IndexError) as err:
+        raise ConfigurationError(f"'{path}' is not a valid TAU profile.") from err
+    return ThreadProfile(node, context, thread, metric, functions, events, metadata)
+
+
+def read_metric(path):
+    """Returns the name of the metric measured in a TAU profile file, e.g. 'TIME'."""
+    with open(path, errors='replace') as fin:
+        return fin.readline().strip().partition('_MULTI_')[2] or 'TIME'
+
+
+def profile_files(prefix, files=None):
+    """Find TAU profile files in a directory.
+
+    Args:
+        prefix (str): Directory containing profile files, e.g. a trial directory.
+        files (list): Paths to files in `prefix` relative to `prefix`, e.g. from a trial manifest.
+                      If None then `prefix` is listed.
+
+    Returns:
+        dict: Metric names mapped to lists of absolute paths to profile files, sorted by node, context, and thread.
+    """
+    if files is None:
+        files = []
+        with os.scandir(prefix) as entries:
+            for entry in entries:
+                if entry.is_dir() and entry.name.startswith('MULTI__'):
+                    files.extend(os.path.join(entry.name, name) for name in os.listdir(entry.path))
+                else:
+                    files.append(entry.name)
+    found = {}
+    for relpath in files:
+        dirname, basename = os.path.split(relpath)
+        match = _FILE_NAME.match(basename)
+        if not match:
+            continue
+        if not dirname:
+            metric = None
+        elif fnmatch.fnmatchcase(dirname, 'MULTI__*'):
+            metric = dirname[len('MULTI__'):]
+        else:
+            continue
+        found.setdefault(metric, []).append((tuple(int(x) for x in match.groups()), os.path.join(prefix, relpath)))
+    return {metric: [path for _, path in sorted(paths)] for metric, paths in found.items()}
+
+
+def metric_files(prefix, metric=None, files=None):
+    """Find the profile files of one metric in a directory.
+
+    Args:
+        prefix (str): Directory containing profile files, e.g. a trial directory.
+        metric (str): Metric to find, e.g. 'TIME'.  If None then TIME is found if it was
+                      measured, otherwise the first metric in alphabetical order.
+        files (list): Paths to files in `prefix` relative to `prefix`, e.g. from a trial manifest.
+
+    Returns:
+        tuple: (metric name, list of absolute paths to profile files sorted by node, context, and thread).
+
+    Raises:
+        ConfigurationError: There are no profiles of `metric` in `prefix`.
+    """
+    found = profile_files(prefix, files)
+    if None in found:
+        # Profiles written outside of MULTI__ directories have their metric named inside the file
+        paths = found.pop(None)
+        found.setdefault(read_metric(paths[0]), []).extend(paths)
+    if metric is None:
+        metric = 'TIME' if 'TIME' in found else min(found, default=None)
+    try:
+        paths = found[metric]
+    except KeyError as err:
+        raise ConfigurationError(f"No {metric or 'TAU'} profiles found in '{prefix}'.",
+                                 "Check that the trial's measurement has profile=tau.") from err
+    return metric, paths
+
+
+def read_profiles(prefix, metric=None, files=None):
+    """Read all threads' profiles of one metric from a directory.
+
+    Args:
+        prefix (str): Directory containing profile files, e.g. a trial directory.
+        metric (str): Metric to read.  See :any:`metric_files`.
+        files (list): Paths to files in `prefix` relative to `prefix`, e.g. from a trial manifest.
+
+    Returns:
+        list: :any:`ThreadProfile` objects sorted by node, context, and thread.
+
+    Raises:
+        ConfigurationError: There are no profiles of `metric` in `prefix`.
+    """
+    _, paths = metric_files(prefix, metric, files)
+    return [read_profile(path) for path in paths]
+
+
+def profile_table(profiles):
+    """Store profiles in a :any:`ProfileTable`.
+
+    Args:
+        profiles (list): :any:`ThreadProfile` objects of one metric.
+
+    Returns:
+        ProfileTable: The profiles' timers.
+
+    Raises:
+        ConfigurationError: `profiles` is empty.
+    """
+    if not profiles:
+        raise ConfigurationError("No profiles to tabulate.")
+    index = {}
+    groups = []
+    entry_thread, entry_function, calls, subroutines, exclusive, inclusive = [], [], [], [], [], []
+    for i, profile in enumerate(profiles):
+        if not profile.functions:
+            continue
+        names, *columns, function_groups = zip(*profile.functions)
+        ids = [index.setdefault(name, len(index)) for name in names]
+        if len(index) > len(groups):
+            # New timers get the next indices in order so their groups can be appended
+            for name_id, group in zip(ids, function_groups):
+                if name_id == len(groups):
+                    groups.append(group)
+        entry_thread.extend([i] * len(names))
+        entry_function.extend(ids)
+        for values, column in zip((calls, subroutines, exclusive, inclusive), columns):
+            values.extend(column)
+    return ProfileTable(metric=profiles[0].metric,
+                        names=np.array(list(index), dtype=object),
+                        groups=np.array([group or '' for group in groups], dtype=object),
+                        threads=np.array([(p.node, p.context, p.thread) for p in profiles], dtype=np.int64),
+                        entry_thread=np.array(entry_thread, dtype=np.int64),
+                        entry_function=np.array(entry_function, dtype=np.int64),
+                        calls=np.array(calls, dtype=np.float64),
+                        subroutines=np.array(subroutines, dtype=np.float64),
+                        exclusive=np.array(exclusive, dtype=np.float64),
+                        inclusive=np.array(inclusive, dtype=np.float64))
@@ -0,0 +1,345 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Reader and merger for TAU trace files.
+
+TAU writes one binary trace file named ``tautrace.<node>.<context>.<thread>.trc`` per thread and
+one event definition file named ``events.<node>.edf`` per node.  Trace files are arrays of fixed
+size records (see :any:`EVENT_DTYPE`) in the byte order of the host that wrote them, sorted by
+timestamp.  Event definition files are text::
+
+    3 dynamic_trace_events
+    # FunctionId Group Tag "Name Type" Parameters
+    1 TAU_DEFAULT 0 "main() int (int, char **)" EntryExit
+    60000 TRACER 0 "EV_INIT" none
+    60007 TAU_MESSAGE -7 "MESSAGE_SEND" par
+
+Each node numbers its events independently so :any:`merge_traces` unifies the event definitions
+by name, translates every record's event ID, and merges all threads' records by timestamp into a
+single ``tau.trc`` and ``tau.edf`` pair like ``tau_treemerge.pl`` does.
+"""
+
+import os
+import re
+import heapq
+from contextlib import nullcontext
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from taucmdr import logger, util, timing
+from taucmdr.error import ConfigurationError
+from taucmdr.progress import ProgressIndicator
+
+
+LOGGER = logger.get_logger(__name__)
+
+EVENT_DTYPE = np.dtype([('ev', '=i4'), ('nid', '=u2'), ('tid', '=u2'), ('par', '=i8'), ('ti', '=u8')])
+"""numpy.dtype: A trace record: event ID, node, thread, event parameter, and timestamp in microseconds."""
+
+CHUNK_RECORDS = 64*1024
+"""int: Maximum number of records buffered from each trace file while merging."""
+
+MERGE_FAN_IN = 64
+"""int: Maximum number of trace files merged together at once.
+
+Wider traces are first merged in groups of this many files by parallel workers and then the
+partial merges are merged.  This also limits the number of memory-mapped files open at once.
+"""
+
+EventDef = namedtuple('EventDef', ['id', 'group', 'tag', 'name', 'param'])
+"""An event definition from an event definition (.edf) file."""
+
+TraceFile = namedtuple('TraceFile', ['node', 'context', 'thread', 'trc', 'edf'])
+"""One thread's trace file and the path to its node's event definition file."""
+
+_EDF_LINE = re.compile(r'^(-?\d+)\s+(\S+)\s+(-?\d+)\s+"(.*)"\s+(\S+)\s*$')
+
+_TRC_NAME = re.compile(r'^tautrace\.(\d+)\.(\d+)\.(\d+)\.trc$')
+
+
+def read_edf(path):
+    """Read an event definition file.
+
+    Args:
+        path (str): Path to the .edf file.
+
+    Returns:
+        dict: :any:`EventDef` objects keyed by event ID.
+
+    Raises:
+        ConfigurationError: The file isn't a valid event definition file.
+    """
+    events = {}
+    with open(path, errors='replace') as fin:
+        for lineno, line in enumerate(fin, 1):
+            if lineno == 1 or not line.strip() or line.startswith('#'):
+                continue
+            match = _EDF_LINE.match(line)
+            if not match:
+                raise ConfigurationError(f"Invalid event definition on line {lineno} of '{path}'.")
+            eid, group, tag, name, param = match.groups()
+            events[int(eid)] = EventDef(int(eid), group, int(tag), name, param)
+    return events
+
+
+def write_edf(path, events):
+    """Write an event definition file.
+
+    Args:
+        path (str): Path to the .edf file to write.
+        events (dict): :any:`EventDef` objects keyed by event ID.
+    """
+    with open(path, 'w') as fout:
+        fout.write(f"{len(events)} dynamic_trace_events\n")
+        fout.write('# FunctionId Group Tag "Name Type" Parameters\n')
+        for eid in sorted(events):
+            event = events[eid]
+            fout.write(f'{eid} {event.group} {event.tag} "{event.name}" {event.param}\n')
+
+
+def read_trc(path, event_ids=None):
+    """Memory-map a binary trace file.
+
+    TAU writes traces in the byte order of the host that ran the application.  If the first record's
+    event ID is not in `event_ids` in this host's byte order but is in the opposite byte order then
+    the file is read in the opposite byte order.
+
+    Args:
+        path (str): Path to the .trc file.
+        event_ids (set): IDs of the events defined for the trace, used to detect the byte order.
+
+    Returns:
+        numpy.ndarray: Read-only array of :any:`EVENT_DTYPE` records (possibly byte-swapped).
+    """
+    size = os.path.getsize(path)
+    count = size // EVENT_DTYPE.itemsize
+    if size % EVENT_DTYPE.itemsize:
+        LOGGER.warning("Ignoring %d bytes of an incomplete record at the end of '%s'",
+                       size % EVENT_DTYPE.itemsize, path)
+    if not count:
+        return np.zeros(0, dtype=EVENT_DTYPE)
+    dtype = EVENT_DTYPE
+    if event_ids:
+        first = np.fromfile(path, dtype=EVENT_DTYPE, count=1)
+        swapped = EVENT_DTYPE.newbyteorder('S')
+        if int(first['ev'][0]) not in event_ids and int(first.view(swapped)['ev'][0]) in event_ids:
+            dtype = swapped
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+
+def trace_files(prefix, files=None):
+    """Find TAU trace files in a directory.
+
+    Args:
+        prefix (str): Directory containing trace files, e.g. a trial directory.
+        files (list): Paths to files in `prefix` relative to `prefix`, e.g. from a trial manifest.
+                      If None then `prefix` is listed.
+
+    Returns:
+        list: :any:`TraceFile` objects sorted by node, context, and thread.
+
+    Raises:
+        ConfigurationError: A trace file's node has no event definition file.
+    """
+    if files is None:
+        files = os.listdir(prefix)
+    found = []
+    for relpath in files:
+        match = _TRC_NAME.match(relpath)
+        if match:
+            node, context, thread = (int(x) for x in match.groups())
+            edf = os.path.join(prefix, f'events.{node}.edf')
+            found.append(TraceFile(node, context, thread, os.path.join(prefix, relpath), edf))
+    for node in {trace.node for trace in found}:
+        if not os.path.isfile(os.path.join(prefix, f'events.{node}.edf')):
+            raise ConfigurationError(f"No event definition file for node {node} in '{prefix}'.")
+    return sorted(found)
+
+
+def merge_event_definitions(edfs):
+    """Unify several nodes' event definitions.
+
+    Events are identified by name.  An event keeps its original ID unless another event already has
+    that ID, in which case it gets a new ID larger than all others.
+
+    Args:
+        edfs (dict): Each node's :any:`read_edf` result keyed by node.
+
+    Returns:
+        tuple: (events, translations) where `events` is the unified :any:`read_edf`-style dictionary and
+               `translations` maps each node to a pair of parallel arrays (local IDs sorted, unified IDs).
+    """
+    merged = {}
+    by_name = {}
+    next_id = max((eid for events in edfs.values() for eid in events), default=0) + 1
+    translations = {}
+    for node in sorted(edfs):
+        local_ids, merged_ids = [], []
+        for eid, event in sorted(edfs[node].items()):
+            merged_id = by_name.get(event.name)
+            if merged_id is None:
+                if eid in merged:
+                    merged_id, next_id = next_id, next_id + 1
+                else:
+                    merged_id = eid
+                merged[merged_id] = event._replace(id=merged_id)
+                by_name[event.name] = merged_id
+            local_ids.append(eid)
+            merged_ids.append(merged_id)
+        translations[node] = (np.array(local_ids, dtype=np.int32), np.array(merged_ids, dtype=np.int32))
+    return merged, translations
+
+
+_Source = namedtuple('_Source', ['records', 'local_ids', 'merged_ids'])
+
+
+def _translate(records, source):
+    """Copies records to native byte order with event IDs translated to the unified IDs."""
+    part = records.astype(EVENT_DTYPE)
+    if source.local_ids is not None and len(source.local_ids):
+        index = np.minimum(np.searchsorted(source.local_ids, part['ev']), len(source.local_ids) - 1)
+        found = source.local_ids[index] == part['ev']
+        part['ev'] = np.where(found, source.merged_ids[index], part['ev'])
+    return part
+
+
+def _merge_sources(sources, fout, chunk_records=CHUNK_RECORDS, progress=None):
+    """Merge sorted record arrays by timestamp into a file.
+
+    At most `chunk_records` records of each source are buffered.  A heap orders the buffers by their
+    last timestamp; every buffered record up to the smallest last timestamp can be written since
+    no source has an earlier record left.  Those records are gathered from all buffers, stably
+    sorted, and written as one block, and the exhausted buffers are refilled.
+    """
+    count = len(sources)
+    pos = np.zeros(count, dtype=np.int64)
+    end = np.zeros(count, dtype=np.int64)
+    first = np.full(count, np.iinfo(np.uint64).max, dtype=np.uint64)
+    heap = []
+
+    def refill(i):
+        records = sources[i].records
+        pos[i] = end[i]
+        end[i] = min(end[i] + chunk_records, len(records))
+        if pos[i] < end[i]:
+            first[i] = records['ti'][pos[i]]
+            heapq.heappush(heap, (int(records['ti'][end[i] - 1]), i))
+        else:
+            first[i] = np.iinfo(np.uint64).max
+
+    for i in range(count):
+        refill(i)
+    written = 0
+    while heap:
+        bound = heap[0][0]
+        parts = []
+        for i in np.flatnonzero(first <= bound):
+            records = sources[i].records
+            stop = pos[i] + int(np.searchsorted(records['ti'][pos[i]:end[i]], bound, side='right'))
+            parts.append(_translate(records[pos[i]:stop], sources[i]))
+            pos[i] = stop
+            first[i] = records['ti'][stop] if stop < end[i] else np.iinfo(np.uint64).max
+        while heap and heap[0][0] <= bound:
+            _, i = heapq.heappop(heap)
+            if pos[i] < end[i]:
+                # Only possible if the trace file isn't sorted by timestamp
+                parts.append(_translate(sources[i].records[pos[i]:end[i]], sources[i]))
+            refill(i)
+        block = np.concatenate(parts)
+        block = block[np.argsort(block['ti'], kind='stable')]
+        fout.write(block.tobytes())
+        written += len(block)
+        if progress:
+            progress.update(written)
+    return written
+
+
+def _merge_group(traces, translations, event_ids, dest, chunk_records):
+    sources = [_Source(read_trc(trace.trc, event_ids[trace.node]), *translations[trace.node]) for trace in traces]
+    with open(dest, 'wb') as fout:
+        return _merge_sources(sources, fout, chunk_records)
+
+
+@timing.traced('TAU trace merge')
+def merge_traces(prefix, files=None, merged_trc=None, merged_edf=None, chunk_records=CHUNK_RECORDS,
+                 fan_in=MERGE_FAN_IN, max_workers=None, show_progress=True):
+    """Merge all threads' TAU trace files into a single trace.
+
+    Replaces ``tau_treemerge.pl``.  Trace files are memory-mapped and merged by timestamp with at
+    most `chunk_records` records of each file in memory.  If there are more than `fan_in` trace files
+    then groups of `fan_in` files are merged into temporary files by parallel workers first.
+
+    Args:
+        prefix (str): Directory containing the trace files, e.g. a trial directory.
+        files (list): Paths to files in `prefix` relative to `prefix`, e.g. from a trial manifest.
+        merged_trc (str): Path to the merged trace file to write (default: ``<prefix>/tau.trc``).
+        merged_edf (str): Path to the merged event definition file to write (default: ``<prefix>/tau.edf``).
+        chunk_records (int): See :any:`CHUNK_RECORDS`.
+        fan_in (int): See :any:`MERGE_FAN_IN`.
+        max_workers (int): Maximum number of partial merges to perform at once.
+        show_progress (bool): Show a progress bar while merging.
+
+    Returns:
+        int: Number of records in the merged trace.
+
+    Raises:
+        ConfigurationError: There are no trace files in `prefix`.
+    """
+    merged_trc = merged_trc or os.path.join(prefix, 'tau.trc')
+    merged_edf = merged_edf or os.path.join(prefix, 'tau.edf')
+    traces = trace_files(prefix, files)
+    if not traces:
+        raise ConfigurationError(f"No TAU trace files in '{prefix}'.")
+    edfs = {node: read_edf(os.path.join(prefix, f'events.{node}.edf')) for node in {trace.node for trace in traces}}
+    events, translations = merge_event_definitions(edfs)
+    event_ids = {node: set(edf) for node, edf in edfs.items()}
+    total = sum(os.path.getsize(trace.trc) for trace in traces) // EVENT_DTYPE.itemsize
+    LOGGER.info("Merging %d TAU trace files...", len(traces))
+    partials = []
+    try:
+        if len(traces) > fan_in:
+            groups = [traces[i:i + fan_in] for i in range(0, len(traces), fan_in)]
+            partials = [f'{merged_trc}.partial-{i}' for i in range(len(groups))]
+            with ThreadPoolExecutor(max_workers=max_workers or min(util.tree_workers(), 8)) as executor:
+                list(executor.map(_merge_group, groups, [translations] * len(groups), [event_ids] * len(groups),
+                                  partials, [chunk_records] * len(groups)))
+            sources = [_Source(read_trc(path), None, None) for path in partials]
+        else:
+            sources = [_Source(read_trc(trace.trc, event_ids[trace.node]), *translations[trace.node])
+                       for trace in traces]
+        context = ProgressIndicator("Merging", total_size=total) if show_progress else nullcontext()
+        with context as progress, open(merged_trc + '.tmp', 'wb') as fout:
+            written = _merge_sources(sources, fout, chunk_records, progress)
+        del sources
+        os.replace(merged_trc + '.tmp', merged_trc)
+        write_edf(merged_edf, events)
+    finally:
+        for path in partials + [merged_trc + '.tmp']:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return written
@@ -0,0 +1,67 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of autoselect.py.
+"""
+
+import os
+import tempfile
+from taucmdr import tests
+from taucmdr.perfdata import autoselect
+from taucmdr.perfdata.tests import thread_profile
+
+
+class AutoselectTest(tests.TestCase):
+    """Tests for choosing functions to exclude from instrumentation."""
+
+    def test_routine_name(self):
+        self.assertEqual(autoselect.routine_name('void foo(int) C [{foo.c} {10,1}-{20,1}]'), 'void foo(int) C')
+        self.assertEqual(autoselect.routine_name('foo'), 'foo')
+
+    def test_select_exclusions(self):
+        profiles = [thread_profile(0, [('main [{m.c} {1,0}]', 1, 3, 1e5, 1e6),
+                                       ('tiny [{m.c} {9,0}]', 20000, 0, 4e4, 4e4),
+                                       ('hot', 200000, 0, 5e5, 5e5, 'TAU_USER'),
+                                       ('big', 10, 0, 3e5, 3e5),
+                                       ('MPI_Send()', 100000, 0, 1e4, 1e4, 'MPI'),
+                                       ('main [{m.c} {1,0}] => tiny [{m.c} {9,0}]', 20000, 0, 4e4, 4e4,
+                                        'TAU_CALLPATH')]),
+                    thread_profile(1, [('main [{m.c} {1,0}]', 1, 1, 1e5, 1e6),
+                                       ('tiny [{m.c} {9,0}]', 20000, 0, 4e4, 4e4)])]
+        exclusions = autoselect.select_exclusions(profiles)
+        self.assertListEqual([exclusion.name for exclusion in exclusions], ['hot', 'tiny'])
+        self.assertEqual(exclusions[1].calls, 40000)
+        self.assertAlmostEqual(exclusions[1].usec_per_call, 2.0)
+        self.assertAlmostEqual(exclusions[0].overhead, 0.05)
+        self.assertListEqual(autoselect.select_exclusions(profiles, min_calls=1000000, max_overhead=1), [])
+
+    def test_write_select_file(self):
+        path = os.path.join(tempfile.mkdtemp(dir=os.getcwd()), 'select.tau')
+        autoselect.write_select_file(path, [autoselect.Exclusion('void foo(int) C', 1, 1, 1, '')], comment='A\nB')
+        with open(path) as fin:
+            self.assertEqual(fin.read(), "# A\n# B\nBEGIN_EXCLUDE_LIST\nvoid foo(int) C\nEND_EXCLUDE_LIST\n")
@@ -0,0 +1,99 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of callpath.py.
+"""
+
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.perfdata import callpath
+from taucmdr.perfdata.tau_profile import profile_table
+from taucmdr.perfdata.tests import thread_profile
+from taucmdr.perfdata.tests import test_pprof
+
+
+PROFILES = [test_pprof.PROFILES[0],
+            thread_profile(1, [('main', 1, 2, 2000, 8500), ('foo', 2, 1, 2500, 3500), ('main => foo', 2, 1, 2500, 3500),
+                               ('main => foo => MPI_Send()', 1, 0, 1000, 1000), ('main => bar', 1, 0, 3000, 3000)])]
+
+
+class CallpathTest(tests.TestCase):
+    """Tests for call path trees."""
+
+    def test_build_tree(self):
+        table = profile_table(PROFILES)
+        tree = callpath.build_tree(table.names)
+        paths = [' => '.join(callpath.node_path(tree, node)) for node in range(len(tree.parent))]
+        self.assertCountEqual(paths, ['main', 'main => foo', 'main => foo => MPI_Send()', 'main => bar'])
+        self.assertListEqual([paths[node] for node in tree.roots], ['main'])
+        main = paths.index('main')
+        children = tree.children[tree.child_offsets[main]:tree.child_offsets[main + 1]]
+        self.assertCountEqual([paths[node] for node in children], ['main => foo', 'main => bar'])
+        self.assertEqual(tree.depth[paths.index('main => foo => MPI_Send()')], 2)
+        # The flat 'foo' timer summarizes all of foo's call paths so it isn't part of the tree
+        self.assertEqual(tree.function_node[table.names.tolist().index('foo')], -1)
+        self.assertEqual(len(tree.components), 4)
+
+    def test_missing_prefix(self):
+        tree = callpath.build_tree(['a => b => c'])
+        self.assertListEqual(callpath.node_path(tree, tree.function_node[0]), ['a', 'b', 'c'])
+        self.assertEqual(len(tree.parent), 3)
+        self.assertEqual(tree.node_function.tolist().count(-1), 2)
+
+    def test_no_callpaths(self):
+        self.assertRaises(ConfigurationError, callpath.build_tree, ['main', 'foo'])
+
+    def test_values(self):
+        table = profile_table(PROFILES)
+        tree = callpath.build_tree(table.names)
+        paths = [' => '.join(callpath.node_path(tree, node)) for node in range(len(tree.parent))]
+        values = callpath.tree_values(tree, table, 'total')
+        self.assertEqual(values.exclusive[paths.index('main => foo')], 11500)
+        self.assertEqual(values.inclusive[paths.index('main')], 18500)
+        values = callpath.tree_values(tree, table, thread=1)
+        self.assertEqual(values.exclusive[paths.index('main => foo')], 2500)
+        self.assertEqual(values.calls[paths.index('main => bar')], 1)
+        self.assertTrue(values.measured.all())
+        hot = callpath.hot_paths(values, 2)
+        self.assertListEqual([paths[node] for node in hot], ['main => bar', 'main => foo'])
+
+    def test_unmeasured_inclusive(self):
+        table = profile_table([thread_profile(0, [('a => b', 1, 0, 5, 5), ('a => c', 1, 0, 7, 7)])])
+        tree = callpath.build_tree(table.names)
+        values = callpath.tree_values(tree, table, 'total')
+        self.assertEqual(values.inclusive[tree.roots[0]], 12)
+        self.assertFalse(values.measured[tree.roots[0]])
+        self.assertListEqual(callpath.hot_paths(values, 5).tolist(), [tree.function_node[1], tree.function_node[0]])
+
+    def test_render_tree(self):
+        table = profile_table(PROFILES)
+        tree = callpath.build_tree(table.names)
+        lines = callpath.render_tree(tree, callpath.tree_values(tree, table)).splitlines()[3:]
+        self.assertListEqual([line.split('  ')[-1] for line in lines], ['main', 'foo', 'MPI_Send()', 'bar'])
+        report = callpath.render_tree(tree, callpath.tree_values(tree, table), max_depth=0)
+        self.assertEqual(len(report.splitlines()), 4)
@@ -0,0 +1,113 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of comm_matrix.py.
+"""
+
+import os
+import tempfile
+import numpy as np
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.perfdata import comm_matrix
+from taucmdr.perfdata.tests.test_tau_profile import write_profile
+
+HEADER = ('1 templated_functions_MULTI_TIME\n'
+          '# Name Calls Subrs Excl Incl ProfileCalls #<metadata><attribute><name>Hostname</name>'
+          '<value>{host}</value></attribute></metadata>\n'
+          '"main" 1 0 10 10 0 GROUP="TAU_DEFAULT"\n'
+          '0 aggregates\n')
+
+
+def write_comm_profile(prefix, node, thread, host, sends):
+    """Write a profile with communication matrix events from (destination, messages, mean size) triples."""
+    lines = [HEADER.format(host=host), f'{len(sends) + 1} userevents\n', '# eventname numevents max min mean sumsqr\n',
+             f'"Message size sent to all nodes" {sum(count for _, count, _ in sends)} 1 1 1 1\n']
+    lines += [f'"Message size sent to node {dest}" {count} {mean} {mean} {mean} 0\n' for dest, count, mean in sends]
+    write_profile(prefix, f'profile.{node}.0.{thread}', ''.join(lines))
+
+
+class CommMatrixTest(tests.TestCase):
+    """Tests for communication matrices."""
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp(dir=os.getcwd())
+        write_comm_profile(self.tmpdir, 0, 0, 'n01', [(1, 10, 100), (3, 1, 1000)])
+        write_comm_profile(self.tmpdir, 0, 1, 'n01', [(1, 5, 100)])
+        write_comm_profile(self.tmpdir, 1, 0, 'n01', [(0, 2, 8), (1, 1, 4)])
+        write_comm_profile(self.tmpdir, 2, 0, 'n02', [])
+        write_comm_profile(self.tmpdir, 3, 0, 'n02', [(2, 4, 50)])
+
+    def test_read(self):
+        matrix = comm_matrix.read_comm_matrix(self.tmpdir)
+        self.assertEqual(matrix.ranks, 4)
+        self.assertListEqual(matrix.source.tolist(), [0, 0, 1, 1, 3])
+        self.assertListEqual(matrix.destination.tolist(), [1, 3, 0, 1, 2])
+        self.assertListEqual(matrix.messages.tolist(), [15, 1, 2, 1, 4])
+        self.assertListEqual(matrix.bytes.tolist(), [1500, 1000, 16, 4, 200])
+        self.assertListEqual(matrix.host_names[matrix.host].tolist(), ['n01', 'n01', 'n02', 'n02'])
+
+    def test_analysis(self):
+        matrix = comm_matrix.read_comm_matrix(self.tmpdir)
+        totals = comm_matrix.rank_totals(matrix)
+        self.assertListEqual(totals.sent_bytes.tolist(), [2500, 20, 0, 200])
+        self.assertListEqual(totals.received_bytes.tolist(), [16, 1504, 200, 1000])
+        self.assertListEqual(totals.out_degree.tolist(), [2, 2, 0, 1])
+        self.assertListEqual(totals.in_degree.tolist(), [1, 2, 1, 1])
+        self.assertListEqual(comm_matrix.top_talkers(totals, 2).tolist(), [0, 1])
+        self.assertListEqual(comm_matrix.top_pairs(matrix, 10).tolist(), [0, 1, 4, 2, 3])
+        local = comm_matrix.locality(matrix)
+        total = 2720
+        self.assertAlmostEqual(local.self_fraction, 4 / total)
+        self.assertAlmostEqual(local.neighbor_fraction, 1716 / total)
+        self.assertAlmostEqual(local.intra_host_fraction, 1720 / total)
+        self.assertAlmostEqual(local.mean_distance, (1500 + 3000 + 16 + 200) / total)
+        self.assertEqual(local.max_distance, 3)
+
+    def test_export(self):
+        matrix = comm_matrix.read_comm_matrix(self.tmpdir)
+        path = os.path.join(self.tmpdir, 'matrix.npz')
+        comm_matrix.export_comm_matrix(path, matrix)
+        loaded = comm_matrix.load_comm_matrix(path)
+        self.assertEqual(loaded.ranks, matrix.ranks)
+        for field in 'source', 'destination', 'messages', 'bytes', 'host', 'host_names':
+            self.assertListEqual(getattr(loaded, field).tolist(), getattr(matrix, field).tolist())
+        path = os.path.join(self.tmpdir, 'matrix.mtx')
+        comm_matrix.export_comm_matrix(path, matrix)
+        with open(path) as fin:
+            lines = [line for line in fin if not line.startswith('%')]
+        self.assertEqual(lines[0], '4 4 5\n')
+        self.assertListEqual(np.loadtxt(lines[1:], dtype=np.int64).tolist()[0], [1, 2, 1500])
+        self.assertRaises(ConfigurationError, comm_matrix.export_comm_matrix, path + '.csv', matrix)
+
+    def test_no_events(self):
+        prefix = tempfile.mkdtemp(dir=os.getcwd())
+        write_comm_profile(prefix, 0, 0, 'n01', [])
+        self.assertRaises(ConfigurationError, comm_matrix.read_comm_matrix, prefix)
+        self.assertRaises(ConfigurationError, comm_matrix.read_comm_matrix, tempfile.mkdtemp(dir=os.getcwd()))
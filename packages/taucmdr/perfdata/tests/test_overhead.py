@@ -0,0 +1,79 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of overhead.py.
+"""
+
+import numpy as np
+from taucmdr import tests
+from taucmdr.perfdata import overhead
+from taucmdr.perfdata.tests import thread_profile
+
+
+class OverheadTest(tests.TestCase):
+    """Tests for estimating measurement overhead."""
+
+    def setUp(self):
+        super().setUp()
+        self.profiles = [thread_profile(0, [('.TAU application', 1, 1, 0, 3e6),
+                                            ('main', 1, 2, 1e6, 3e6),
+                                            ('tiny', 300000, 0, 6e5, 6e5),
+                                            ('main => tiny', 300000, 0, 6e5, 6e5, 'TAU_CALLPATH')]),
+                         thread_profile(1, [('tiny', 100000, 0, 2e5, 2e5),
+                                            ('big', 99, 0, 1e6, 1e6)])]
+
+    def test_function_totals(self):
+        totals = overhead.function_totals(self.profiles)
+        self.assertListEqual(list(totals.names), ['main', 'tiny', 'big'])
+        np.testing.assert_array_equal(totals.calls, [1, 400000, 99])
+        np.testing.assert_array_equal(totals.exclusive, [1e6, 8e5, 1e6])
+
+    def test_estimate_overhead(self):
+        totals = overhead.function_totals(self.profiles)
+        estimate = overhead.estimate_overhead([1.0, 1.2, 0.8], [1.2], totals, threads=2)
+        self.assertAlmostEqual(estimate.baseline_elapsed, 1.0)
+        self.assertAlmostEqual(estimate.overhead, 0.2)
+        self.assertAlmostEqual(estimate.usec_per_call, 0.4e6 / 400100)
+        self.assertEqual(estimate.functions.names[0], 'tiny')
+        self.assertAlmostEqual(float(estimate.functions.share.sum()), 1.0)
+        self.assertAlmostEqual(float(estimate.functions.overhead.sum()), 0.4e6)
+
+    def test_no_functions(self):
+        estimate = overhead.estimate_overhead([1.0], [0.9], overhead.function_totals([]))
+        self.assertLess(estimate.overhead, 0)
+        self.assertEqual(estimate.usec_per_call, 0)
+        self.assertEqual(len(estimate.functions.names), 0)
+
+    def test_suggestions(self):
+        totals = overhead.function_totals(self.profiles)
+        estimate = overhead.estimate_overhead([1.0], [2.0], totals)
+        meas = {'name': 'inst', 'source_inst': 'automatic', 'throttle': False, 'sample': False}
+        hints = overhead.suggestions(meas, estimate)
+        self.assertEqual(len(hints), 3)
+        self.assertIn('--throttle T', hints[1])
+        self.assertListEqual(overhead.suggestions(meas, estimate, budget=2.0), [])
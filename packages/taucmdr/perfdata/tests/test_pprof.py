@@ -0,0 +1,96 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of pprof.py.
+"""
+
+import os
+import tempfile
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.perfdata import pprof
+from taucmdr.perfdata.tests import thread_profile
+from taucmdr.perfdata.tests.test_tau_profile import write_profile
+
+
+PROFILES = [thread_profile(0, [('main', 1, 2, 1000, 10000), ('foo', 4, 0, 9000, 9000),
+                               ('main => foo', 4, 0, 9000, 9000)]),
+            thread_profile(1, [('main', 1, 1, 2000, 4000), ('bar', 1, 0, 2000, 2000)])]
+
+
+def _rows(report, title):
+    """Timer names and columns of the rows in a report section."""
+    lines = report.splitlines()
+    start = lines.index(title) + 5
+    end = lines.index('', start) if '' in lines[start:] else len(lines)
+    return [(line.split()[-1], line.split()[1:-1]) for line in lines[start:end]]
+
+
+class PprofTest(tests.TestCase):
+    """Tests for pprof-style text reports."""
+
+    def test_summarize(self):
+        table = pprof.profile_table(PROFILES)
+        names = table.names.tolist()
+        function, calls, _, exclusive, inclusive = pprof.summarize(table, 'total')
+        totals = dict(zip([names[i] for i in function], zip(calls.tolist(), exclusive.tolist(), inclusive.tolist())))
+        self.assertTupleEqual(totals['main'], (2, 3000, 14000))
+        self.assertTupleEqual(totals['bar'], (1, 2000, 2000))
+        function, _, _, exclusive, _ = pprof.summarize(table, 'mean')
+        self.assertEqual(exclusive[[names[i] for i in function].index('foo')], 4500)
+        function, _, _, exclusive, _ = pprof.summarize(table, 'min')
+        self.assertEqual(exclusive[[names[i] for i in function].index('main')], 1000)
+        function, _, _, _, inclusive = pprof.summarize(table, 'max')
+        self.assertEqual(inclusive[[names[i] for i in function].index('main')], 10000)
+
+    def test_report(self):
+        report = pprof.render_report(pprof.profile_table(PROFILES), per_thread=True)
+        self.assertListEqual([name for name, _ in _rows(report, 'NODE 0;CONTEXT 0;THREAD 0:')], ['main', 'foo'])
+        self.assertListEqual([name for name, _ in _rows(report, 'NODE 0;CONTEXT 0;THREAD 1:')], ['main', 'bar'])
+        rows = _rows(report, 'FUNCTION SUMMARY (total):')
+        self.assertListEqual([name for name, _ in rows], ['main', 'foo', 'bar'])
+        self.assertListEqual(rows[0][1], ['3', '14', '2', '3', '7000'])
+        self.assertEqual(_rows(report, 'FUNCTION SUMMARY (mean):')[0][1][1], '7')
+
+    def test_views_and_sorting(self):
+        table = pprof.profile_table(PROFILES)
+        report = pprof.render_report(table, view='callpath', summaries=('total',))
+        self.assertListEqual([name for name, _ in _rows(report, 'FUNCTION SUMMARY (total):')], ['foo'])
+        report = pprof.render_report(table, sort='exclusive', top=2, summaries=('total',))
+        self.assertListEqual([name for name, _ in _rows(report, 'FUNCTION SUMMARY (total):')], ['foo', 'main'])
+        report = pprof.render_report(table, sort='name', summaries=('total',))
+        self.assertListEqual([name for name, _ in _rows(report, 'FUNCTION SUMMARY (total):')], ['bar', 'foo', 'main'])
+        self.assertNotIn('NODE 0', report)
+
+    def test_profile_report(self):
+        prefix = tempfile.mkdtemp(dir=os.getcwd())
+        write_profile(prefix, 'profile.0.0.0')
+        report = pprof.profile_report(prefix, view='all', summaries=('total',))
+        self.assertIn('Metric: TIME', report)
+        self.assertEqual(len(_rows(report, 'FUNCTION SUMMARY (total):')), 3)
+        self.assertRaises(ConfigurationError, pprof.profile_table, [])
@@ -0,0 +1,112 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of profile_cache.py.
+"""
+
+import os
+import json
+import tempfile
+import numpy as np
+from taucmdr import tests
+from taucmdr.perfdata import profile_cache
+from taucmdr.perfdata.tests.test_tau_profile import PROFILE, write_profile
+
+
+class ProfileCacheTest(tests.TestCase):
+    """Tests for the columnar profile cache."""
+
+    def setUp(self):
+        super().setUp()
+        self.prefix = tempfile.mkdtemp(dir=os.getcwd())
+        write_profile(self.prefix, 'profile.0.0.0')
+        write_profile(self.prefix, 'profile.1.0.0', PROFILE.replace('"foo" 20', '"foo" 30'))
+        self.cache_dir = os.path.join(self.prefix, '.taucmdr_profile_cache')
+
+    def _index(self):
+        with open(os.path.join(self.cache_dir, 'index.json')) as fin:
+            return json.load(fin)
+
+    def _check(self, table):
+        self.assertEqual(table.metric, 'TIME')
+        self.assertListEqual(table.threads.tolist(), [[0, 0, 0], [1, 0, 0]])
+        self.assertListEqual(table.names.tolist(), ['.TAU application', 'main [{main.c} {3,0}]',
+                                                    'main [{main.c} {3,0}] => foo'])
+        self.assertListEqual(table.groups.tolist(), ['TAU_DEFAULT', 'TAU_DEFAULT', 'TAU_CALLPATH'])
+        self.assertListEqual(table.entry_thread.tolist(), [0, 0, 0, 1, 1, 1])
+        self.assertListEqual(table.calls.tolist(), [1, 1, 20, 1, 1, 20])
+
+    def test_cached(self):
+        table = profile_cache.load_table(self.prefix, self.cache_dir)
+        self._check(table)
+        self.assertFalse(isinstance(table.calls, np.memmap))
+        self.assertTrue(os.path.exists(os.path.join(self.cache_dir, 'index.json')))
+        table = profile_cache.load_table(self.prefix, self.cache_dir)
+        self._check(table)
+        self.assertTrue(isinstance(table.calls, np.memmap))
+        self.assertRaises(ValueError, table.calls.__setitem__, 0, 5)
+
+    def test_invalidated(self):
+        profile_cache.load_table(self.prefix, self.cache_dir)
+        path = write_profile(self.prefix, 'profile.1.0.0', PROFILE.replace(' 1 2 45 95 ', ' 5 2 45 95 '))
+        os.utime(path, ns=(0, 0))
+        table = profile_cache.load_table(self.prefix, self.cache_dir)
+        self.assertFalse(isinstance(table.calls, np.memmap))
+        self.assertListEqual(table.calls.tolist(), [1, 1, 20, 1, 5, 20])
+        os.remove(path)
+        table = profile_cache.load_table(self.prefix, self.cache_dir)
+        self.assertListEqual(table.threads.tolist(), [[0, 0, 0]])
+
+    def test_metrics(self):
+        write_profile(self.prefix, os.path.join('MULTI__PAPI_TOT_CYC', 'profile.0.0.0'),
+                      PROFILE.replace('MULTI_TIME', 'MULTI_PAPI_TOT_CYC'))
+        self._check(profile_cache.load_table(self.prefix, self.cache_dir))
+        self.assertEqual(profile_cache.load_table(self.prefix, self.cache_dir, 'PAPI_TOT_CYC').metric, 'PAPI_TOT_CYC')
+        metrics = self._index()['metrics']
+        self.assertSetEqual(set(metrics), {'TIME', 'PAPI_TOT_CYC'})
+        self.assertNotEqual(metrics['TIME']['stem'], metrics['PAPI_TOT_CYC']['stem'])
+        self.assertTrue(isinstance(profile_cache.load_table(self.prefix, self.cache_dir).calls, np.memmap))
+
+    def test_rewrite(self):
+        profile_cache.load_table(self.prefix, self.cache_dir)
+        old_stem = self._index()['metrics']['TIME']['stem']
+        path = write_profile(self.prefix, 'profile.1.0.0', PROFILE.replace(' 1 2 45 95 ', ' 5 2 45 95 '))
+        os.utime(path, ns=(0, 0))
+        profile_cache.load_table(self.prefix, self.cache_dir)
+        new_stem = self._index()['metrics']['TIME']['stem']
+        self.assertNotEqual(old_stem, new_stem)
+        self.assertFalse([name for name in os.listdir(self.cache_dir) if name.startswith(old_stem)])
+        self.assertEqual(len([name for name in os.listdir(self.cache_dir) if name.startswith(new_stem)]), 7)
+
+    def test_corrupt_cache(self):
+        profile_cache.load_table(self.prefix, self.cache_dir)
+        stem = self._index()['metrics']['TIME']['stem']
+        with open(os.path.join(self.cache_dir, f'{stem}.calls.npy'), 'wb') as fout:
+            fout.write(b'garbage')
+        self._check(profile_cache.load_table(self.prefix, self.cache_dir))
+        self.assertTrue(isinstance(profile_cache.load_table(self.prefix, self.cache_dir).calls, np.memmap))
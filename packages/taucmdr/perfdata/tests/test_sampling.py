@@ -0,0 +1,93 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of sampling.py.
+"""
+
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.perfdata import sampling
+from taucmdr.perfdata.tau_profile import profile_table
+from taucmdr.perfdata.tests import thread_profile
+
+
+FOO_42 = '[SAMPLE] foo [{/src/a.c} {42}]'
+FOO_43 = '[SAMPLE] foo [{/src/a.c} {43}]'
+LIBM = '[SAMPLE] UNRESOLVED /lib64/libm.so.6 ADDR 0x2b7d0'
+
+PROFILES = [thread_profile(0, [('main', 1, 0, 100, 100), ('[SUMMARY] foo [{/src/a.c} {40,1}-{50,1}]', 5, 0, 50, 50),
+                               (FOO_42, 3, 0, 30, 30), (FOO_43, 2, 0, 20, 20),
+                               ('main => [CONTEXT] main => [SAMPLE] foo [{/src/a.c} {42}]', 3, 0, 30, 30),
+                               ('main => [CONTEXT] main => [UNWIND] bar [{/src/b.c} {7}] => ' + FOO_43, 2, 0, 20, 20)]),
+            thread_profile(1, [('main', 1, 0, 100, 100), (FOO_42, 1, 0, 10, 10), (LIBM, 4, 0, 40, 40),
+                               ('main => [CONTEXT] main => [SAMPLE] foo [{/src/a.c} {42}]', 1, 0, 10, 10),
+                               ('main => [CONTEXT] main => ' + LIBM, 4, 0, 40, 40)])]
+
+
+class SamplingTest(tests.TestCase):
+    """Tests for event-based sampling aggregation."""
+
+    def test_parse_sample(self):
+        self.assertTupleEqual(sampling.parse_sample(FOO_42), ('/src/a.c', 'foo', '/src/a.c', 42))
+        self.assertTupleEqual(sampling.parse_sample('main => ' + LIBM), ('/lib64/libm.so.6', '0x2b7d0', '', 0))
+        self.assertTupleEqual(sampling.parse_sample('[SAMPLE] UNRESOLVED ADDR 0x10'), ('', '0x10', '', 0))
+        self.assertIsNone(sampling.parse_sample('[SUMMARY] foo [{/src/a.c} {40,1}-{50,1}]'))
+        self.assertIsNone(sampling.parse_sample('main'))
+
+    def test_aggregate(self):
+        table = profile_table(PROFILES)
+        profile = sampling.aggregate(table)
+        self.assertEqual(profile.thread_count, 2)
+        totals = dict(zip(profile.sites, zip(profile.samples.tolist(), profile.value.tolist())))
+        # Call path samples repeat the flat samples so they aren't counted again
+        self.assertTupleEqual(totals[sampling.parse_sample(FOO_42)], (4, 40))
+        self.assertEqual(profile.value.sum(), 100)
+        self.assertListEqual(sampling.aggregate(table, chunk_size=2).value.tolist(), profile.value.tolist())
+
+    def test_group(self):
+        profile = sampling.aggregate(profile_table(PROFILES))
+        groups = sampling.group(profile, 'function')
+        self.assertListEqual(groups.keys, [('/src/a.c', 'foo', '/src/a.c'), ('/lib64/libm.so.6', '0x2b7d0', '')])
+        self.assertListEqual(groups.value.tolist(), [60, 40])
+        groups = sampling.group(profile, 'line')
+        self.assertEqual(groups.keys[0], ('/src/a.c', 'foo', '/src/a.c', 42))
+        self.assertListEqual(sampling.group(profile, 'module').samples.tolist(), [6, 4])
+        self.assertRaises(ValueError, sampling.group, profile, 'file')
+
+    def test_collapsed_stacks(self):
+        table = profile_table(PROFILES)
+        self.assertListEqual(sampling.collapsed_stacks(table), ['main;0x2b7d0 4', 'main;bar;foo 2', 'main;foo 4'])
+        self.assertListEqual(sampling.collapsed_stacks(table, 'value', lines=True),
+                             ['main;0x2b7d0 40', 'main;bar:7;foo:43 20', 'main;foo:42 40'])
+        flat = profile_table([thread_profile(0, [(FOO_42, 3, 0, 30, 30), (FOO_43, 2, 0, 20, 20)])])
+        self.assertListEqual(sampling.collapsed_stacks(flat), ['foo 5'])
+
+    def test_no_samples(self):
+        table = profile_table([thread_profile(0, [('main', 1, 0, 100, 100)])])
+        self.assertRaises(ConfigurationError, sampling.aggregate, table)
+        self.assertRaises(ConfigurationError, sampling.collapsed_stacks, table)
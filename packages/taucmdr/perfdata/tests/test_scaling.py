@@ -0,0 +1,113 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of scaling.py.
+"""
+
+import os
+import tempfile
+import numpy as np
+from taucmdr import tests
+from taucmdr.perfdata import scaling
+from taucmdr.perfdata.tau_profile import profile_table
+from taucmdr.perfdata.tests import thread_profile
+
+
+def _profiles(ranks, times):
+    """Profiles of `ranks` threads each spending `times[name]` microseconds in each function."""
+    functions = [(name, 1, 0, time, time) for name, time in times.items()]
+    return [thread_profile(0, functions, node=rank) for rank in range(ranks)]
+
+
+class ScalingTest(tests.TestCase):
+    """Tests for scaling studies."""
+
+    # Trial number: (ranks, elapsed, per-thread function times)
+    TRIALS = {0: (1, 80.0, {'solve': 800.0, 'comm': 10.0}),
+              1: (2, 40.0, {'solve': 400.0, 'comm': 20.0}),
+              2: (4, 25.0, {'solve': 200.0, 'comm': 40.0, 'setup': 5.0}),
+              3: (4, 15.0, {'solve': 200.0, 'comm': 40.0})}
+
+    def setUp(self):
+        super().setUp()
+        self.read = []
+
+    def _read_trial(self, number):
+        self.read.append(number)
+        ranks, _, times = self.TRIALS[number]
+        return profile_table(_profiles(ranks, times))
+
+    def _update(self, data, numbers, key='a'):
+        trials = [(number, key, self.TRIALS[number][0], self.TRIALS[number][1]) for number in numbers]
+        return scaling.update_data(data, trials, self._read_trial)
+
+    def test_analyze(self):
+        data, added = self._update(scaling.empty_data(), [0, 1, 2, 3])
+        self.assertEqual(added, 4)
+        study = scaling.analyze(data)
+        self.assertListEqual(study.ranks.tolist(), [1, 2, 4])
+        self.assertListEqual(study.trials.tolist(), [1, 1, 2])
+        self.assertListEqual(study.elapsed.tolist(), [80, 40, 20])
+        self.assertListEqual(study.speedup.tolist(), [1, 2, 4])
+        self.assertListEqual(study.efficiency.tolist(), [1, 1, 1])
+        names = study.names.tolist()
+        self.assertListEqual(study.times[names.index('solve')].tolist(), [800, 400, 200])
+        self.assertAlmostEqual(study.exponents[names.index('solve')], -1)
+        self.assertAlmostEqual(study.exponents[names.index('comm')], 1)
+        self.assertEqual(study.points[names.index('setup')], 1)
+        self.assertTrue(np.isnan(study.exponents[names.index('setup')]))
+
+    def test_incremental(self):
+        data, _ = self._update(scaling.empty_data(), [0, 1])
+        path = os.path.join(tempfile.mkdtemp(dir=os.getcwd()), 'scaling.npz')
+        scaling.save_data(path, data)
+        self.read = []
+        data, added = self._update(scaling.load_data(path), [0, 1, 2])
+        self.assertEqual(added, 1)
+        self.assertListEqual(self.read, [2])
+        self.assertListEqual(data.numbers.tolist(), [0, 1, 2])
+        # Trial 1 was deleted and trial 0 was replaced
+        self.read = []
+        data, added = self._update(data, [0], key='b')
+        self.assertListEqual(self.read, [0])
+        self.assertListEqual(data.numbers.tolist(), [0])
+        self.assertSetEqual(set(data.names[data.entry_function].tolist()), {'solve', 'comm'})
+        self.assertListEqual(data.entry_trial.tolist(), [0, 0])
+
+    def test_load_missing(self):
+        data = scaling.load_data(os.path.join(tempfile.mkdtemp(dir=os.getcwd()), 'scaling.npz'))
+        self.assertEqual(len(data.numbers), 0)
+
+    def test_scaling_exponents(self):
+        times = np.array([[100, 10, 1], [5, 5, 5], [np.nan, 2, 8], [0, np.nan, 3]])
+        exponents, points = scaling.scaling_exponents(np.array([1, 10, 100]), times)
+        self.assertListEqual(points.tolist(), [3, 3, 2, 1])
+        self.assertAlmostEqual(exponents[0], -1)
+        self.assertAlmostEqual(exponents[1], 0)
+        self.assertAlmostEqual(exponents[2], np.log10(4))
+        self.assertTrue(np.isnan(exponents[3]))
@@ -0,0 +1,98 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of tau_profile.py.
+"""
+
+import os
+import tempfile
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.perfdata.tau_profile import read_profile, read_profiles, profile_files, is_callpath
+
+PROFILE = '''3 templated_functions_MULTI_TIME
+# Name Calls Subrs Excl Incl ProfileCalls #<metadata><attribute><name>Node Name</name><value>n01</value></attribute></metadata>
+".TAU application" 1 1 5 100 0 GROUP="TAU_DEFAULT"
+"main [{main.c} {3,0}]" 1 2 45 95 0 GROUP="TAU_DEFAULT"
+"main [{main.c} {3,0}] => foo" 20 0 5E+01 50 0 GROUP="TAU_CALLPATH"
+0 aggregates
+1 userevents
+# eventname numevents max min mean sumsqr
+"Message size sent to all nodes" 4 8 2 5 120
+'''
+
+
+def write_profile(prefix, relpath, text=PROFILE):
+    """Write a TAU profile file for a test."""
+    path = os.path.join(prefix, relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as fout:
+        fout.write(text)
+    return path
+
+
+class TauProfileTest(tests.TestCase):
+    """Tests for reading TAU profile files."""
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp(dir=os.getcwd())
+
+    def test_read_profile(self):
+        profile = read_profile(write_profile(self.tmpdir, 'profile.1.0.2'))
+        self.assertEqual((profile.node, profile.context, profile.thread, profile.metric), (1, 0, 2, 'TIME'))
+        self.assertDictEqual(profile.metadata, {'Node Name': 'n01'})
+        self.assertEqual(len(profile.functions), 3)
+        self.assertEqual(profile.functions[1].name, 'main [{main.c} {3,0}]')
+        self.assertEqual(profile.functions[2].calls, 20)
+        self.assertEqual(profile.functions[2].exclusive, 50.0)
+        self.assertEqual(profile.functions[2].group, 'TAU_CALLPATH')
+        self.assertTrue(is_callpath(profile.functions[2].name))
+        self.assertEqual(profile.events[0].name, 'Message size sent to all nodes')
+        self.assertEqual(profile.events[0].mean, 5.0)
+
+    def test_invalid(self):
+        path = write_profile(self.tmpdir, 'profile.0.0.0', '2 templated_functions\n# Name\n"main" 1\n')
+        self.assertRaises(ConfigurationError, read_profile, path)
+
+    def test_profile_files(self):
+        write_profile(self.tmpdir, 'profile.10.0.0')
+        write_profile(self.tmpdir, 'profile.2.0.0')
+        write_profile(self.tmpdir, os.path.join('MULTI__PAPI_TOT_CYC', 'profile.0.0.0'))
+        write_profile(self.tmpdir, 'tau.log')
+        found = profile_files(self.tmpdir)
+        self.assertSetEqual(set(found), {'PAPI_TOT_CYC', None})
+        self.assertListEqual(found[None], [os.path.join(self.tmpdir, 'profile.2.0.0'),
+                                           os.path.join(self.tmpdir, 'profile.10.0.0')])
+
+    def test_read_profiles(self):
+        write_profile(self.tmpdir, os.path.join('MULTI__TIME', 'profile.0.0.0'))
+        write_profile(self.tmpdir, os.path.join('MULTI__PAPI_TOT_CYC', 'profile.0.0.0'))
+        self.assertEqual(len(read_profiles(self.tmpdir)), 1)
+        self.assertEqual(len(read_profiles(self.tmpdir, 'PAPI_TOT_CYC')), 1)
+        self.assertRaises(ConfigurationError, read_profiles, self.tmpdir, 'PAPI_FP_OPS')
@@ -0,0 +1,123 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of tau_trace.py.
+"""
+
+import os
+import tempfile
+import numpy as np
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.perfdata import tau_trace
+from taucmdr.perfdata.tau_trace import EVENT_DTYPE, EventDef
+
+
+def write_edf(prefix, node, events):
+    """Write an event definition file for a test from (id, name) pairs."""
+    tau_trace.write_edf(os.path.join(prefix, f'events.{node}.edf'),
+                        {eid: EventDef(eid, 'TAU_DEFAULT', 0, name, 'EntryExit') for eid, name in events})
+
+
+def write_trc(prefix, node, thread, records, byteorder='='):
+    """Write a trace file for a test from (event, timestamp) pairs."""
+    data = np.zeros(len(records), dtype=EVENT_DTYPE.newbyteorder(byteorder))
+    data['ev'] = [ev for ev, _ in records]
+    data['ti'] = [ti for _, ti in records]
+    data['nid'] = node
+    data['tid'] = thread
+    data['par'] = 1
+    path = os.path.join(prefix, f'tautrace.{node}.0.{thread}.trc')
+    data.tofile(path)
+    return path
+
+
+class TauTraceTest(tests.TestCase):
+    """Tests for reading and merging TAU traces."""
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp(dir=os.getcwd())
+
+    def test_edf(self):
+        events = {1: EventDef(1, 'TAU_DEFAULT', 0, 'main() int (int, char **)', 'EntryExit'),
+                  60007: EventDef(60007, 'TAU_MESSAGE', -7, 'MESSAGE_SEND', 'par')}
+        path = os.path.join(self.tmpdir, 'events.0.edf')
+        tau_trace.write_edf(path, events)
+        self.assertDictEqual(tau_trace.read_edf(path), events)
+
+    def test_invalid_edf(self):
+        path = os.path.join(self.tmpdir, 'events.0.edf')
+        with open(path, 'w') as fout:
+            fout.write('1 dynamic_trace_events\nbad line\n')
+        self.assertRaises(ConfigurationError, tau_trace.read_edf, path)
+
+    def test_byte_order(self):
+        path = write_trc(self.tmpdir, 0, 0, [(60000, 1), (1, 2)], byteorder='S')
+        records = tau_trace.read_trc(path, {1, 60000})
+        self.assertListEqual(list(records['ev']), [60000, 1])
+        self.assertListEqual(list(records['ti']), [1, 2])
+
+    def test_merge_event_definitions(self):
+        events, translations = tau_trace.merge_event_definitions({0: {1: EventDef(1, 'G', 0, 'a', 'p'),
+                                                                      2: EventDef(2, 'G', 0, 'b', 'p')},
+                                                                  1: {1: EventDef(1, 'G', 0, 'b', 'p'),
+                                                                      2: EventDef(2, 'G', 0, 'c', 'p')}})
+        self.assertDictEqual({eid: event.name for eid, event in events.items()}, {1: 'a', 2: 'b', 3: 'c'})
+        self.assertListEqual(list(translations[1][0]), [1, 2])
+        self.assertListEqual(list(translations[1][1]), [2, 3])
+
+    def _check_merge(self, **kwargs):
+        write_edf(self.tmpdir, 0, [(1, 'main'), (2, 'foo')])
+        write_edf(self.tmpdir, 1, [(1, 'foo'), (2, 'main')])
+        write_trc(self.tmpdir, 0, 0, [(1, 1), (2, 4), (2, 6), (1, 9)])
+        write_trc(self.tmpdir, 0, 1, [(1, 2), (1, 3)])
+        write_trc(self.tmpdir, 1, 0, [(2, 0), (1, 5), (1, 7), (2, 8)], byteorder='S')
+        self.assertEqual(tau_trace.merge_traces(self.tmpdir, show_progress=False, **kwargs), 10)
+        merged = np.fromfile(os.path.join(self.tmpdir, 'tau.trc'), dtype=EVENT_DTYPE)
+        self.assertListEqual(list(merged['ti']), list(range(10)))
+        names = {eid: event.name for eid, event in tau_trace.read_edf(os.path.join(self.tmpdir, 'tau.edf')).items()}
+        self.assertListEqual([(int(rec['nid']), int(rec['tid']), names[int(rec['ev'])]) for rec in merged],
+                             [(1, 0, 'main'), (0, 0, 'main'), (0, 1, 'main'), (0, 1, 'main'), (0, 0, 'foo'),
+                              (1, 0, 'foo'), (0, 0, 'foo'), (1, 0, 'foo'), (1, 0, 'main'), (0, 0, 'main')])
+        self.assertListEqual(sorted(os.listdir(self.tmpdir)),
+                             ['events.0.edf', 'events.1.edf', 'tau.edf', 'tau.trc',
+                              'tautrace.0.0.0.trc', 'tautrace.0.0.1.trc', 'tautrace.1.0.0.trc'])
+
+    def test_merge(self):
+        self._check_merge(chunk_records=2)
+
+    def test_partial_merges(self):
+        self._check_merge(chunk_records=1, fan_in=2)
+
+    def test_no_traces(self):
+        self.assertRaises(ConfigurationError, tau_trace.merge_traces, self.tmpdir, show_progress=False)
+
+    def test_missing_edf(self):
+        write_trc(self.tmpdir, 3, 0, [(1, 1)])
+        self.assertRaises(ConfigurationError, tau_trace.trace_files, self.tmpdir)
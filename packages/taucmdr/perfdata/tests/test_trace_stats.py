@@ -0,0 +1,122 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of trace_stats.py.
+"""
+
+import os
+import tempfile
+import numpy as np
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.perfdata import tau_trace, trace_stats
+from taucmdr.perfdata.tau_trace import EVENT_DTYPE, EventDef
+
+EVENTS = {1: EventDef(1, 'TAU_DEFAULT', 0, 'main', 'EntryExit'),
+          2: EventDef(2, 'TAU_DEFAULT', 0, 'foo', 'EntryExit'),
+          3: EventDef(3, 'MPI', 0, 'MPI_Recv()', 'EntryExit'),
+          4: EventDef(4, 'TAU_EVENT', 1, 'Message size', 'TriggerValue'),
+          60007: EventDef(60007, 'TAU_MESSAGE', -7, 'MESSAGE_SEND', 'par')}
+
+# Sends 100 bytes to node 1
+SEND = (1 << 24) | 100
+
+
+def write_trace(prefix, node, records):
+    """Write thread 0's trace file and the event definitions for `node` from (event, parameter, timestamp) triples."""
+    tau_trace.write_edf(os.path.join(prefix, f'events.{node}.edf'), EVENTS)
+    data = np.zeros(len(records), dtype=EVENT_DTYPE)
+    data['ev'] = [ev for ev, _, _ in records]
+    data['par'] = [par for _, par, _ in records]
+    data['ti'] = [ti for _, _, ti in records]
+    data['nid'] = node
+    data.tofile(os.path.join(prefix, f'tautrace.{node}.0.0.trc'))
+
+
+class TraceStatsTest(tests.TestCase):
+    """Tests for trace summary statistics."""
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp(dir=os.getcwd())
+        write_trace(self.tmpdir, 0, [(1, 1, 0), (2, 1, 10), (2, -1, 30), (3, 1, 40), (3, -1, 70),
+                                     (60007, SEND, 75), (4, 5, 80), (2, 1, 90), (2, -1, 95), (1, -1, 100),
+                                     (4, 7, 110)])
+        write_trace(self.tmpdir, 1, [(1, 1, 5), (1, -1, 50)])
+
+    def _function(self, stats, thread, name):
+        event = list(stats.event_names).index(name)
+        row = np.flatnonzero((stats.function_thread == thread) & (stats.function_event == event))
+        self.assertEqual(len(row), 1)
+        return (stats.function_calls[row[0]], stats.function_inclusive[row[0]], stats.function_exclusive[row[0]])
+
+    def _check(self, stats):
+        self.assertListEqual(stats.threads.tolist(), [[0, 0, 0], [1, 0, 0]])
+        self.assertListEqual(stats.span.tolist(), [110, 45])
+        self.assertListEqual(stats.idle.tolist(), [10, 0])
+        self.assertListEqual(stats.mpi.tolist(), [30, 0])
+        self.assertListEqual(stats.wait.tolist(), [30, 0])
+        self.assertTupleEqual(self._function(stats, 0, 'main'), (1, 100, 45))
+        self.assertTupleEqual(self._function(stats, 0, 'foo'), (2, 25, 25))
+        self.assertTupleEqual(self._function(stats, 0, 'MPI_Recv()'), (1, 30, 30))
+        self.assertTupleEqual(self._function(stats, 1, 'main'), (1, 45, 45))
+        self.assertListEqual(stats.sent_messages.tolist(), [1, 0])
+        self.assertListEqual(stats.sent_bytes.tolist(), [100, 0])
+        self.assertListEqual([stats.message_source.tolist(), stats.message_destination.tolist(),
+                              stats.message_count.tolist(), stats.message_bytes.tolist()], [[0], [1], [1], [100]])
+        self.assertListEqual([stats.userevent_count.tolist(), stats.userevent_sum.tolist(),
+                              stats.userevent_min.tolist(), stats.userevent_max.tolist()], [[2], [12], [5], [7]])
+        calls, inclusive, exclusive = trace_stats.function_totals(stats)
+        main = list(stats.event_names).index('main')
+        self.assertEqual(calls[main], 2)
+        self.assertEqual(inclusive[main], 145)
+        self.assertEqual(exclusive[main], 90)
+
+    def test_statistics(self):
+        self._check(trace_stats.compute_statistics(self.tmpdir))
+
+    def test_small_chunks(self):
+        for chunk_records in 1, 2, 3, 4:
+            self._check(trace_stats.compute_statistics(self.tmpdir, chunk_records=chunk_records, max_workers=1))
+
+    def test_decode_message(self):
+        other, tag, length = trace_stats.decode_message(np.array([(2 << 56) | (3 << 24) | (1 << 32) | 7]))
+        self.assertListEqual([other.tolist(), tag.tolist(), length.tolist()], [[515], [0], [65543]])
+
+    def test_save_load(self):
+        stats = trace_stats.compute_statistics(self.tmpdir)
+        path = os.path.join(self.tmpdir, 'stats.npz')
+        trace_stats.save_statistics(path, stats)
+        self._check(trace_stats.load_statistics(path))
+
+    def test_unmatched_exit(self):
+        write_trace(self.tmpdir, 1, [(1, -1, 5)])
+        self.assertRaises(ConfigurationError, trace_stats.compute_statistics, self.tmpdir)
+
+    def test_no_traces(self):
+        self.assertRaises(ConfigurationError, trace_stats.compute_statistics, tempfile.mkdtemp(dir=os.getcwd()))
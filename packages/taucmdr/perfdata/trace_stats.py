@@ -0,0 +1,334 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Summary statistics of TAU traces.
+
+:any:`compute_statistics` reads each thread's trace file once, in chunks of a bounded number of
+records, and reduces it to per-thread, per-event aggregates: function calls and inclusive and
+exclusive time, atomic user event statistics, message counts and bytes, and how much of the
+thread's time was spent idle (outside of any function), in MPI, and waiting in MPI.  Users get
+the totals without converting traces to SLOG2 or opening a trace viewer.
+
+Each chunk is processed with vectorized NumPy operations.  The call stack is replayed by computing
+each entry or exit record's stack depth with a cumulative sum; entries and exits at the same depth
+pair up to give inclusive times, and the function on top of the stack between consecutive records
+gives exclusive times.  Functions still on the stack at the end of a chunk are carried into the next.
+"""
+
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from taucmdr import logger, util, timing
+from taucmdr.error import ConfigurationError
+from taucmdr.perfdata.tau_trace import CHUNK_RECORDS, read_edf, read_trc, trace_files, merge_event_definitions
+
+
+LOGGER = logger.get_logger(__name__)
+
+WAIT_FUNCTIONS = re.compile(r'^MPI_(Wait|Barrier|Recv|Probe|Mprobe)')
+"""Regular expression matching MPI functions that mostly wait for other ranks."""
+
+TraceStatistics = namedtuple('TraceStatistics', [
+    'event_ids', 'event_names', 'event_groups',
+    'threads', 'span', 'idle', 'mpi', 'wait',
+    'sent_messages', 'sent_bytes', 'received_messages', 'received_bytes',
+    'function_thread', 'function_event', 'function_calls', 'function_inclusive', 'function_exclusive',
+    'userevent_thread', 'userevent_event', 'userevent_count', 'userevent_sum', 'userevent_min', 'userevent_max',
+    'message_source', 'message_destination', 'message_count', 'message_bytes'])
+"""Trace statistics as NumPy arrays.
+
+`threads` has a (node, context, thread) row per thread and `span`, `idle`, `mpi`, `wait`, and the
+message totals have one value per thread.  Times are in microseconds.  Function, user event, and
+message statistics are sparse: ``function_*`` arrays are parallel arrays of (thread index, event index,
+value) entries, ``userevent_*`` likewise, and ``message_*`` list node-to-node message totals.  Event
+indices refer to `event_ids`, `event_names`, and `event_groups`.
+"""
+
+_EventTable = namedtuple('_EventTable', ['local_ids', 'dense'])
+
+
+def decode_message(par):
+    """Decode the parameters of TAU's MESSAGE_SEND and MESSAGE_RECV trace records.
+
+    TAU packs the other node, the message tag, and the message length into the record's 64-bit parameter.
+
+    Args:
+        par (numpy.ndarray): Record parameters.
+
+    Returns:
+        tuple: (other node, tag, length) arrays.
+    """
+    par = par.astype(np.uint64)
+    other = ((par >> np.uint64(24)) & np.uint64(0xFF)) | (((par >> np.uint64(56)) & np.uint64(0xFF)) << np.uint64(8))
+    tag = ((par >> np.uint64(16)) & np.uint64(0xFF)) | (((par >> np.uint64(48)) & np.uint64(0xFF)) << np.uint64(8))
+    length = (par & np.uint64(0xFFFF)) | (((par >> np.uint64(32)) & np.uint64(0x3FF)) << np.uint64(16))
+    return other.astype(np.int64), tag.astype(np.int64), length.astype(np.int64)
+
+
+class _Classes:
+    """Boolean arrays classifying unified events by index, plus one extra slot for unknown events."""
+
+    def __init__(self, events):
+        count = len(events)
+        self.entry_exit = np.zeros(count + 1, dtype=bool)
+        self.trigger = np.zeros(count + 1, dtype=bool)
+        self.send = np.zeros(count + 1, dtype=bool)
+        self.receive = np.zeros(count + 1, dtype=bool)
+        self.mpi = np.zeros(count + 1, dtype=bool)
+        self.wait = np.zeros(count + 1, dtype=bool)
+        for i, event in enumerate(events):
+            self.entry_exit[i] = event.param == 'EntryExit'
+            self.trigger[i] = event.param == 'TriggerValue'
+            self.send[i] = event.name == 'MESSAGE_SEND'
+            self.receive[i] = event.name == 'MESSAGE_RECV'
+            self.mpi[i] = 'MPI' in event.group.split('|') or event.name.startswith('MPI_')
+            self.wait[i] = self.mpi[i] and bool(WAIT_FUNCTIONS.match(event.name))
+
+
+def _thread_statistics(trace, table, classes, event_ids, chunk_records):
+    """Reduce one thread's trace file to aggregate statistics."""
+    size = len(classes.entry_exit)
+    unknown = size - 1
+    calls = np.zeros(size, dtype=np.int64)
+    inclusive = np.zeros(size)
+    exclusive = np.zeros(size)
+    ue_count = np.zeros(size, dtype=np.int64)
+    ue_sum = np.zeros(size)
+    ue_min = np.full(size, np.inf)
+    ue_max = np.full(size, -np.inf)
+    messages = {'sent': 0, 'sent_bytes': 0, 'received': 0, 'received_bytes': 0}
+    pairs = {}
+    stack_ev = np.zeros(0, dtype=np.int64)
+    stack_ti = np.zeros(0, dtype=np.int64)
+    idle = 0
+    first_ti = last_ti = end_ti = None
+    prev_top = -1
+    records = read_trc(trace.trc, event_ids)
+    for start in range(0, len(records), chunk_records):
+        chunk = records[start:start + chunk_records]
+        index = np.minimum(np.searchsorted(table.local_ids, chunk['ev']), len(table.local_ids) - 1)
+        ev = np.where(table.local_ids[index] == chunk['ev'], table.dense[index], unknown)
+        ti = chunk['ti'].astype(np.int64)
+        par = chunk['par'].astype(np.int64)
+        if first_ti is None:
+            first_ti = last_ti = int(ti[0])
+        end_ti = int(ti[-1])
+
+        mask = classes.trigger[ev]
+        if mask.any():
+            values = par[mask].astype(np.float64)
+            ue_count += np.bincount(ev[mask], minlength=size)
+            ue_sum += np.bincount(ev[mask], weights=values, minlength=size)
+            np.minimum.at(ue_min, ev[mask], values)
+            np.maximum.at(ue_max, ev[mask], values)
+
+        for kind, counter in ((classes.send, 'sent'), (classes.receive, 'received')):
+            mask = kind[ev]
+            if mask.any():
+                other, _, length = decode_message(par[mask])
+                messages[counter] += int(mask.sum())
+                messages[counter + '_bytes'] += int(length.sum())
+                if counter == 'sent':
+                    dests, inverse = np.unique(other, return_inverse=True)
+                    counts = np.bincount(inverse)
+                    volumes = np.bincount(inverse, weights=length)
+                    for dest, count, volume in zip(dests.tolist(), counts.tolist(), volumes.tolist()):
+                        total = pairs.get(dest, (0, 0))
+                        pairs[dest] = (total[0] + count, total[1] + int(volume))
+
+        mask = classes.entry_exit[ev]
+        if not mask.any():
+            continue
+        e_ev, e_ti, enter = ev[mask], ti[mask], par[mask] > 0
+        nstack = len(stack_ev)
+        depth = nstack + np.cumsum(np.where(enter, 1, -1))
+        if depth.min() < 0:
+            raise ConfigurationError(f"'{trace.trc}' has a function exit record without a matching entry record.")
+        # Functions still on the stack from earlier chunks are prepended as if they were entered here
+        c_ev = np.concatenate((stack_ev, e_ev))
+        c_ti = np.concatenate((stack_ti, e_ti))
+        c_enter = np.concatenate((np.ones(nstack, dtype=bool), enter))
+        c_level = np.concatenate((np.arange(1, nstack + 1), np.where(enter, depth, depth + 1)))
+        order = np.argsort(c_level, kind='stable')
+        s_level, s_enter = c_level[order], c_enter[order]
+        is_pair = s_enter[:-1] & ~s_enter[1:] & (s_level[:-1] == s_level[1:])
+        p_enter, p_exit = order[:-1][is_pair], order[1:][is_pair]
+        inclusive += np.bincount(c_ev[p_enter], weights=c_ti[p_exit] - c_ti[p_enter], minlength=size)
+        calls += np.bincount(e_ev[enter], minlength=size)
+        still_open = c_enter.copy()
+        still_open[p_enter] = False
+        stack_ev, stack_ti = c_ev[still_open], c_ti[still_open]
+
+        # The function on top of the stack after each record owns the time until the next record
+        top = np.where(enter, e_ev, -1)
+        exits = np.flatnonzero(~enter & (depth > 0))
+        if len(exits):
+            levels = depth[exits]
+            for level in np.unique(levels):
+                enter_pos = np.flatnonzero(c_enter & (c_level == level))
+                selected = exits[levels == level]
+                top[selected] = c_ev[enter_pos[np.searchsorted(enter_pos, selected + nstack) - 1]]
+        durations = np.diff(np.concatenate(([last_ti], e_ti)))
+        owners = np.concatenate(([prev_top], top[:-1]))
+        idle += int(durations[owners < 0].sum())
+        owned = owners >= 0
+        exclusive += np.bincount(owners[owned], weights=durations[owned], minlength=size)
+        prev_top, last_ti = int(top[-1]), int(e_ti[-1])
+    if first_ti is None:
+        return None
+    if prev_top >= 0:
+        exclusive[prev_top] += end_ti - last_ti
+    else:
+        idle += end_ti - last_ti
+    return {'span': end_ti - first_ti, 'idle': idle,
+            'mpi': float(exclusive[classes.mpi].sum()), 'wait': float(exclusive[classes.wait].sum()),
+            'calls': calls[:-1], 'inclusive': inclusive[:-1], 'exclusive': exclusive[:-1],
+            'ue_count': ue_count[:-1], 'ue_sum': ue_sum[:-1], 'ue_min': ue_min[:-1], 'ue_max': ue_max[:-1],
+            'messages': messages, 'pairs': pairs}
+
+
+@timing.traced('trace statistics')
+def compute_statistics(prefix, files=None, chunk_records=CHUNK_RECORDS, max_workers=None):
+    """Compute summary statistics of a directory of TAU trace files.
+
+    Threads are processed in parallel and each thread's trace file is read once with at most
+    `chunk_records` records in memory at a time.
+
+    Args:
+        prefix (str): Directory containing ``tautrace.*.trc`` and ``events.*.edf`` files, e.g. a trial directory.
+        files (list): Paths to files in `prefix` relative to `prefix`, e.g. from a trial manifest.
+        chunk_records (int): Maximum number of records of each file to process at once.
+        max_workers (int): Maximum number of threads' traces to process at once.
+
+    Returns:
+        TraceStatistics: The statistics.
+
+    Raises:
+        ConfigurationError: There are no TAU trace files in `prefix` or a trace file is invalid.
+    """
+    traces = trace_files(prefix, files)
+    if not traces:
+        raise ConfigurationError(f"No TAU trace files in '{prefix}'.",
+                                 "Trace statistics are computed from TAU traces (tautrace.*.trc files).")
+    nodes = sorted({trace.node for trace in traces})
+    edfs = {node: read_edf(os.path.join(prefix, f'events.{node}.edf')) for node in nodes}
+    merged, translations = merge_event_definitions(edfs)
+    merged_ids = np.array(sorted(merged), dtype=np.int32)
+    events = [merged[eid] for eid in merged_ids.tolist()]
+    tables = {node: _EventTable(local_ids, np.searchsorted(merged_ids, unified).astype(np.int64))
+              for node, (local_ids, unified) in translations.items()}
+    classes = _Classes(events)
+    with ThreadPoolExecutor(max_workers=max_workers or util.tree_workers()) as executor:
+        results = list(executor.map(lambda trace: _thread_statistics(trace, tables[trace.node], classes,
+                                                                     set(edfs[trace.node]), chunk_records),
+                                    traces))
+    kept = [(trace, result) for trace, result in zip(traces, results) if result is not None]
+
+    def per_thread(key, dtype=np.float64):
+        return np.array([result[key] for _, result in kept], dtype=dtype)
+
+    def sparse(*keys):
+        """Parallel (thread index, event index, values...) arrays of events with a nonzero value of keys[0]."""
+        columns = [[np.zeros(0, dtype=np.int32)], [np.zeros(0, dtype=np.int32)]] + [[np.zeros(0)] for _ in keys]
+        for i, (_, result) in enumerate(kept):
+            nonzero = np.flatnonzero(result[keys[0]])
+            columns[0].append(np.full(len(nonzero), i, dtype=np.int32))
+            columns[1].append(nonzero.astype(np.int32))
+            for column, key in zip(columns[2:], keys):
+                column.append(result[key][nonzero])
+        return [np.concatenate(column) for column in columns]
+
+    pairs = {}
+    for trace, result in kept:
+        for dest, (count, volume) in result['pairs'].items():
+            total = pairs.get((trace.node, dest), (0, 0))
+            pairs[(trace.node, dest)] = (total[0] + count, total[1] + volume)
+    pair_keys = sorted(pairs)
+    function_columns = sparse('calls', 'inclusive', 'exclusive')
+    userevent_columns = sparse('ue_count', 'ue_sum', 'ue_min', 'ue_max')
+    return TraceStatistics(
+        event_ids=merged_ids,
+        event_names=np.array([event.name for event in events], dtype=str),
+        event_groups=np.array([event.group for event in events], dtype=str),
+        threads=np.array([(trace.node, trace.context, trace.thread) for trace, _ in kept],
+                         dtype=np.int32).reshape(-1, 3),
+        span=per_thread('span'), idle=per_thread('idle'), mpi=per_thread('mpi'), wait=per_thread('wait'),
+        sent_messages=np.array([result['messages']['sent'] for _, result in kept], dtype=np.int64),
+        sent_bytes=np.array([result['messages']['sent_bytes'] for _, result in kept], dtype=np.int64),
+        received_messages=np.array([result['messages']['received'] for _, result in kept], dtype=np.int64),
+        received_bytes=np.array([result['messages']['received_bytes'] for _, result in kept], dtype=np.int64),
+        function_thread=function_columns[0], function_event=function_columns[1],
+        function_calls=function_columns[2].astype(np.int64), function_inclusive=function_columns[3],
+        function_exclusive=function_columns[4],
+        userevent_thread=userevent_columns[0], userevent_event=userevent_columns[1],
+        userevent_count=userevent_columns[2].astype(np.int64), userevent_sum=userevent_columns[3],
+        userevent_min=userevent_columns[4], userevent_max=userevent_columns[5],
+        message_source=np.array([src for src, _ in pair_keys], dtype=np.int32),
+        message_destination=np.array([dst for _, dst in pair_keys], dtype=np.int32),
+        message_count=np.array([pairs[key][0] for key in pair_keys], dtype=np.int64),
+        message_bytes=np.array([pairs[key][1] for key in pair_keys], dtype=np.int64))
+
+
+def save_statistics(path, stats):
+    """Save trace statistics to a compressed NumPy archive.
+
+    Args:
+        path (str): Path to the file to write.
+        stats (TraceStatistics): The statistics.
+    """
+    with open(path + '.tmp', 'wb') as fout:
+        np.savez_compressed(fout, **stats._asdict())
+    os.replace(path + '.tmp', path)
+
+
+def load_statistics(path):
+    """Load trace statistics saved by :any:`save_statistics`.
+
+    Args:
+        path (str): Path to the file to read.
+
+    Returns:
+        TraceStatistics: The statistics.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        return TraceStatistics(**{field: data[field] for field in TraceStatistics._fields})
+
+
+def function_totals(stats):
+    """Sum function statistics over all threads.
+
+    Args:
+        stats (TraceStatistics): The statistics.
+
+    Returns:
+        tuple: (calls, inclusive, exclusive) arrays indexed by event index.
+    """
+    size = len(stats.event_ids)
+    return (np.bincount(stats.function_event, weights=stats.function_calls, minlength=size).astype(np.int64),
+            np.bincount(stats.function_event, weights=stats.function_inclusive, minlength=size),
+            np.bincount(stats.function_event, weights=stats.function_exclusive, minlength=size))
@@ -29,8 +29,10 @@
 Show bars or spinners, possibly with instantaneous CPU load average.
 """
 
+
 import os
 import sys
+import time
 import threading
 import itertools
 from datetime import datetime, timedelta
@@ -40,6 +42,12 @@ from taucmdr.error import ConfigurationError
 
 LOGGER = logger.get_logger(__name__)
 
+CPU_SAMPLE_INTERVAL = 0.5
+"""float: Minimum number of seconds between reads of /proc/stat."""
+
+MAX_REFRESH_INTERVAL = 1.0
+"""float: Longest time in seconds between redraws of an idle progress indicator."""
+
 
 def _read_proc_stat_cpu():
     with open('/proc/stat') as fin:
@@ -65,53 +73,116 @@ def _proc_stat_cpu_load_average():
             return (diff_total - diff_idle) / diff_total
     return 0.0
 
+_CPU_SAMPLE = {'time': None, 'value': None}
+
 def load_average():
     """Calculate the CPU load average.
 
+    /proc/stat is read at most once every :any:`CPU_SAMPLE_INTERVAL` seconds no matter
+    how many progress indicators are active; the last sample is returned in between.
+
     Returns:
-        float: Load average since last time this routine was called
-               or None if couldn't calculate load average.
+        float: Load average since the previous sample or None if couldn't calculate load average.
     """
+    now = time.monotonic()
+    last = _CPU_SAMPLE['time']
+    if last is None or now - last >= CPU_SAMPLE_INTERVAL:
+        try:
+            _CPU_SAMPLE['value'] = _proc_stat_cpu_load_average()
+        except OSError:
+            _CPU_SAMPLE['value'] = None
+        _CPU_SAMPLE['time'] = now
+    return _CPU_SAMPLE['value']
+
+
+class _Renderer:
+    """The one thread per process that redraws active progress indicators.
+
+    Only the most recently started indicator is drawn.  The refresh interval grows while the
+    indicator isn't updated and returns to the indicator's `auto_refresh` when it is.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._active = []
+        self._thread = None
+        self._pid = None
+
+    def add(self, indicator):
+        with self.lock:
+            self._active.append(indicator)
+            # Threads don't survive fork() so check the process ID too
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def remove(self, indicator):
+        with self.lock:
+            if indicator in self._active:
+                self._active.remove(indicator)
+
+    def _run(self):
+        interval = None
+        while True:
+            with self.lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                indicator = self._active[-1]
+                if indicator.changed or interval is None:
+                    interval = indicator.auto_refresh
+                else:
+                    interval = min(interval*2, max(MAX_REFRESH_INTERVAL, indicator.auto_refresh))
+                indicator.changed = False
+                indicator.draw()
+            time.sleep(interval)
+
+
+_RENDERER = _Renderer()
+
+
+def _stdout_is_terminal():
     try:
-        cpu_load_avg = _proc_stat_cpu_load_average()
-    except OSError:
-        cpu_load_avg = None
-    return cpu_load_avg
+        return sys.stdout.isatty()
+    except (AttributeError, ValueError):
+        return False
 
 
 class ProgressIndicator:
-    """A fancy progress indicator to entertain antsy users."""
+    """A fancy progress indicator to entertain antsy users.
+
+    Calls to :any:`update` only record the new values so they are cheap enough to make in
+    tight loops.  Drawing is done by a thread shared by all indicators.  If stdout is not a
+    terminal then the indicator does nothing at all.
+    """
 
     _spinner = itertools.cycle(['-', '\\', '|', '/'])
 
     _indent = '    '
 
+    _cpu_available = None
+
     def __init__(self, label, total_size=0, block_size=1, show_cpu=True, auto_refresh=0.25):
         mode = os.environ.get('__TAUCMDR_PROGRESS_BARS__', 'full').lower()
         if mode not in ('full', 'disabled'):
             raise ConfigurationError('Invalid value for __TAUCMDR_PROGRESS_BARS__ environment variable: %s' % mode)
+        if ProgressIndicator._cpu_available is None:
+            ProgressIndicator._cpu_available = os.path.exists('/proc/stat')
         self.label = label
         self.count = 0
         self.total_size = total_size
         self.block_size = block_size
-        self.show_cpu = show_cpu if load_average() is not None else False
-        self.auto_refresh = auto_refresh if mode != 'disabled' else 0
+        self.show_cpu = show_cpu and self._cpu_available
+        self.auto_refresh = auto_refresh
+        self.changed = False
+        self._enabled = mode != 'disabled' and _stdout_is_terminal()
         self._mode = mode
         self._line_remaining = 0
         self._phases = []
-        self._phase_count = 0
         self._phase_depth = 0
         self._phase_base = 0
-        self._thread = None
-        self._exiting = None
-        self._updating = None
-
-    def _thread_progress(self):
-        while not self._exiting.wait(self.auto_refresh):
-            self._updating.acquire()
-            self.update()
-            self._updating.notify()
-            self._updating.release()
+        self._registered = False
 
     def __enter__(self):
         self.push_phase(self.label)
@@ -175,74 +246,68 @@ class ProgressIndicator:
         self._phase_base = max(self._phase_base, self._phase_depth-1)
 
     def push_phase(self, label, implicit=False):
-        if self.auto_refresh:
-            if self._thread is None:
-                self._thread = threading.Thread(target=self._thread_progress)
-                self._exiting = threading.Event()
-                self._updating = threading.Condition()
-                self._thread.daemon = True
-                self._thread.start()
-            self._updating.acquire()
-        try:
-            top_phase = self._phases[-1]
-        except IndexError:
-            new_phase = True
-        else:
-            new_phase = top_phase[0] is not None and top_phase[0].strip() != label
-            if top_phase[2]:
-                self.pop_phase()
-        if new_phase:
-            label = (self._phase_depth*self._indent) + label
-            self._phases.append((label, datetime.now(), implicit))
-        if self.auto_refresh:
-            self._updating.wait()
-            self._updating.release()
-        else:
-            self.update()
+        if not self._enabled:
+            return
+        with _RENDERER.lock:
+            try:
+                top_phase = self._phases[-1]
+            except IndexError:
+                new_phase = True
+            else:
+                new_phase = top_phase[0] is not None and top_phase[0].strip() != label
+                if top_phase[2]:
+                    self.pop_phase()
+            if new_phase:
+                label = (self._phase_depth*self._indent) + label
+                self._phases.append((label, datetime.now(), implicit))
+            if self.auto_refresh and not self._registered:
+                self._registered = True
+                _RENDERER.add(self)
+            self.draw()
 
     def pop_phase(self):
-        if self.auto_refresh:
-            self._updating.acquire()
-        if self._phases:
-            self._phases.append((None, datetime.now(), None))
-        if self.auto_refresh:
-            self._updating.wait()
-            self._updating.release()
-        else:
-            self.update()
+        if not self._enabled:
+            return
+        with _RENDERER.lock:
+            if self._phases:
+                self._phases.append((None, datetime.now(), None))
+            self.draw()
 
     def phase(self, label):
         self.push_phase(label, True)
 
     def increment(self, count=1):
         self.count += count
-
+        self.changed = True
 
     def update(self, count=None, block_size=None, total_size=None):
         """Show progress.
 
         Updates `block_size` or `total_size` if given for compatibility with :any:`urllib.urlretrieve`.
+        Unless `auto_refresh` is zero the new values are drawn later by the rendering thread.
 
         Args:
             count (int): Number of blocks of `block_size` that have been completed.
             block_size (int): Size of a work block.
             total_size (int): Total amount of work to be completed.
         """
+        if not self._enabled:
+            return
         if count is not None:
             self.count = count
         if block_size is not None:
             self.block_size = block_size
         if total_size is not None:
             self.total_size = total_size
-        if self.auto_refresh:
-            if threading.current_thread() is not self._thread:
-                if not self._phases:
-                    self.push_phase(self.label)
-                return
-        else:
-            if not self._phases:
-                self.push_phase(self.label)
-                return
+        self.changed = True
+        if not self._phases:
+            self.push_phase(self.label)
+        elif not self.auto_refresh:
+            with _RENDERER.lock:
+                self.draw()
+
+    def draw(self):
+        """Draw the indicator now.  The caller must hold the renderer lock."""
         if self._phase_depth != len(self._phases):
             self._draw_phase_labels()
         if not self._phases:
@@ -256,7 +321,7 @@ class ProgressIndicator:
             self._line_append("{}: {:0.1f} seconds {}".format(label, tdelta, next(self._spinner)))
         show_bar = self.total_size > 0
         if self.show_cpu and self._line_remaining > 40:
-            cpu_load = min(load_average(), 1.0)
+            cpu_load = min(load_average() or 0.0, 1.0)
             self._line_append("[CPU: %0.1f " % (100*cpu_load))
             width = (self._line_remaining//4) if show_bar else (self._line_remaining-2)
             self._draw_bar(cpu_load, width, '|', 'white', 'on_white')
@@ -278,13 +343,13 @@ class ProgressIndicator:
             self._line_append("] %s" % eta)
         self._line_flush()
 
-
     def complete(self):
-        active = len(self._phases)
-        for _ in range(active):
-            self.pop_phase()
-        if self.auto_refresh:
-            self._exiting.set()
-            self._thread.join()
-        else:
-            self.update()
+        if not self._enabled:
+            return
+        with _RENDERER.lock:
+            active = len(self._phases)
+            for _ in range(active):
+                self.pop_phase()
+            if self._registered:
+                self._registered = False
+                _RENDERER.remove(self)
@@ -0,0 +1,431 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Per-project command server.
+
+Every `tau` command is a new Python process that imports the package and probes the
+selected experiment's compilers before it can do any real work.  In a large build that
+cost is paid once per compiler invocation.
+
+The command server pays it once.  It listens on a UNIX socket in the project directory
+and forks a worker for each request.  The worker inherits the server's already-imported
+modules and compiler probe caches, receives the client's standard file descriptors,
+working directory, and environment, and runs the command as if it had been started from
+the command line.  Records are not kept: each worker reads the project, experiment, and
+other models from storage just like a command run from the shell.  Forking keeps each
+command isolated from the server and from other commands, so nothing a command does can
+corrupt the server.  The server probes compilers again whenever a storage database changes
+and shuts itself down after a period of inactivity.
+
+The client half of this module is imported by the `tau` script before anything else in
+the package, so it must only depend on the standard library.  If the server can't be
+reached, or declines a request, the client returns None and the caller runs the command
+in-process as usual.
+
+Only the user who started the server may use it: the socket is created readable and writable
+only by its owner and, where the platform reports it, the peer's user ID is checked on every
+connection.  Database connections are closed before workers are forked so that no SQLite or
+TinyDB handle is ever shared across a fork; each worker reopens the databases it uses.
+"""
+
+import os
+import sys
+import json
+import time
+import array
+import errno
+import atexit
+import select
+import signal
+import socket
+import struct
+from taucmdr import PROJECT_DIR
+
+SERVER_SOCKET = 'server.sock'
+"""str: Name of the server's socket file in the project directory."""
+
+DEFAULT_IDLE_TIMEOUT = 900
+"""int: Seconds the server waits for a request before shutting down."""
+
+MATCHING_ENVIRONMENT = ('PATH', 'CRAYOS_VERSION', 'PE_ENV', 'TAU_LINE_MARKER')
+"""tuple: Environment variables that must match between client and server.
+
+Module-level state computed at import time (e.g. host detection, storage prefixes)
+depends on these variables and on every ``__TAUCMDR_*__`` variable, so the server
+declines requests from clients with a different environment.
+"""
+
+_HEADER = struct.Struct('!I')
+_STDIO_FDS = (0, 1, 2)
+
+
+def server_address(project_prefix):
+    """Get the path to the server socket for a project.
+
+    Args:
+        project_prefix (str): Path to the project directory, i.e. :any:`PROJECT_STORAGE.prefix`.
+
+    Returns:
+        str: Absolute path to the socket file.
+    """
+    return os.path.join(project_prefix, SERVER_SOCKET)
+
+
+def find_server_address(cwd=None):
+    """Search the current directory and its parents for a project with a running server.
+
+    Args:
+        cwd (str): Directory to start searching from.  Defaults to the current directory.
+
+    Returns:
+        str: Absolute path to the socket file, or None if no project directory with a socket was found.
+    """
+    root = os.path.realpath(cwd or os.getcwd())
+    lastroot = None
+    while root and root != lastroot:
+        prefix = os.path.join(root, PROJECT_DIR)
+        if os.path.isdir(prefix):
+            address = server_address(prefix)
+            return address if os.path.exists(address) else None
+        lastroot = root
+        root = os.path.dirname(root)
+    return None
+
+
+def _environment_key(env):
+    return sorted((key, val) for key, val in env.items()
+                  if key in MATCHING_ENVIRONMENT or (key.startswith('__TAUCMDR_') and key.endswith('__')))
+
+
+def _peer_uid(conn):
+    """Returns the user ID of the process at the other end of a UNIX socket, or None if unknown."""
+    try:
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    except (AttributeError, OSError):
+        try:
+            return os.getpeereid(conn.fileno())[0]  # pylint: disable=no-member
+        except (AttributeError, OSError):
+            return None
+    return struct.unpack('3i', creds)[1]
+
+
+def _read_exactly(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+
+def forward_to_server(argv, address=None):
+    """Ask the project's command server to execute a command on our behalf.
+
+    The server receives this process' standard input, output, and error file descriptors
+    so the command reads and writes the terminal directly.  If this process is interrupted
+    the interrupt is forwarded to the worker executing the command.
+
+    Args:
+        argv (list): Command line arguments.
+        address (str): Path to the server socket.  If None, search for the socket with :any:`find_server_address`.
+
+    Returns:
+        int: The command's return code, or None if the command was not executed by a server.
+    """
+    address = address or find_server_address()
+    if not address:
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        return None
+    worker = None
+    retval = None
+    try:
+        with sock, sock.makefile('rb') as reply:
+            payload = json.dumps({'argv': argv, 'cwd': os.getcwd(), 'env': dict(os.environ)}).encode()
+            fds = array.array('i', _STDIO_FDS)
+            sock.sendmsg([_HEADER.pack(len(payload))], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)])
+            sock.sendall(payload)
+            while True:
+                try:
+                    line = reply.readline()
+                except KeyboardInterrupt:
+                    if not worker:
+                        raise
+                    os.kill(worker, signal.SIGINT)
+                    continue
+                if not line:
+                    break
+                kind, value = line[:1], line[1:].strip()
+                if kind == b'P':
+                    worker = int(value)
+                elif kind == b'X':
+                    retval = int(value)
+                elif kind == b'D':
+                    return None
+            return retval
+    except (OSError, EOFError, ValueError):
+        return retval if worker else None
+
+
+class CommandServer:
+    """Executes `tau` commands for clients in forked workers with preloaded modules and compiler caches.
+
+    Attributes:
+        address (str): Path to the server socket.
+        idle_timeout (float): Seconds to wait for a request before shutting down.
+    """
+
+    def __init__(self, address, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.address = address
+        self.idle_timeout = idle_timeout
+        self._env_key = _environment_key(os.environ)
+        self._storage_signature = None
+        self._workers = set()
+        self._listener = None
+
+    @staticmethod
+    def _get_storage_signature():
+        from taucmdr.cf.storage.levels import ORDERED_LEVELS
+        signature = []
+        for storage in ORDERED_LEVELS:
+            try:
+                stat = os.stat(storage.dbfile)
+            except Exception: # pylint: disable=broad-except
+                signature.append(None)
+            else:
+                signature.append((stat.st_mtime_ns, stat.st_size))
+        return signature
+
+    @staticmethod
+    def _disconnect_storage():
+        from taucmdr.cf.storage import StorageError
+        from taucmdr.cf.storage.levels import ORDERED_LEVELS
+        for storage in ORDERED_LEVELS:
+            try:
+                storage.disconnect_database()
+            except StorageError:
+                pass
+
+    def _warm_up(self):
+        """Import commands and probe the selected experiment's compilers.
+
+        Only module imports and the compiler probe caches outlive this method.  The project and
+        experiment records are read here to find the compilers and then discarded; workers read
+        records from storage again since another command may have changed them.
+        """
+        from taucmdr import logger
+        from taucmdr.error import Error
+        from taucmdr.cli import get_all_commands
+        from taucmdr.model.project import Project
+        log = logger.get_logger(__name__)
+        if self._storage_signature is not None:
+            log.debug("Storage changed, probing compilers again")
+        get_all_commands()
+        try:
+            proj = Project.selected()
+            if proj:
+                expr = proj.experiment()
+                expr.populate()
+                expr.populate('target').compilers()
+        except (Error, KeyError) as err:
+            log.debug("Server warm-up incomplete: %s", err)
+        self._storage_signature = self._get_storage_signature()
+
+    def _reap_workers(self):
+        for pid in list(self._workers):
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done = pid
+            if done:
+                self._workers.discard(pid)
+
+    def _receive_request(self, conn):
+        fds = array.array('i')
+        msg, ancdata, _, _ = conn.recvmsg(_HEADER.size, socket.CMSG_LEN(len(_STDIO_FDS) * fds.itemsize))
+        for level, kind, data in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+        if len(msg) < _HEADER.size:
+            msg += _read_exactly(conn, _HEADER.size - len(msg))
+        size, = _HEADER.unpack(msg)
+        request = json.loads(_read_exactly(conn, size).decode())
+        return request, list(fds)
+
+    def _run_worker(self, conn, request, fds):
+        """Execute a request in a forked worker process.  Never returns."""
+        retval = 1
+        try:
+            from taucmdr import error, logger
+            from taucmdr.cli.commands.__main__ import COMMAND
+            logger.after_fork()
+            self._listener.close()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for fd, stdio_fd in zip(fds, _STDIO_FDS):
+                os.dup2(fd, stdio_fd)
+                os.close(fd)
+            os.environ.clear()
+            os.environ.update(request['env'])
+            os.chdir(request['cwd'])
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            logger.refresh_terminal_size()
+            conn.sendall(b'P%d\n' % os.getpid())
+            try:
+                retval = COMMAND.main(request['argv'])
+            except SystemExit as err:
+                retval = err.code
+            except BaseException: # pylint: disable=broad-except
+                try:
+                    error.excepthook(*sys.exc_info())
+                except SystemExit as err:
+                    retval = err.code
+            if not isinstance(retval, int):
+                retval = 0 if retval is None else 1
+        finally:
+            try:
+                # Exit handlers (e.g. temporary directory cleanup) would normally run when the
+                # process exits, but the worker must not unwind into the server's accept loop.
+                atexit._run_exitfuncs() # pylint: disable=protected-access
+                sys.stdout.flush()
+                sys.stderr.flush()
+                conn.sendall(b'X%d\n' % retval)
+            finally:
+                os._exit(0)
+
+    def _handle(self, conn):
+        peer_uid = _peer_uid(conn)
+        if peer_uid is not None and peer_uid != os.getuid():
+            return
+        try:
+            request, fds = self._receive_request(conn)
+        except (OSError, EOFError, ValueError):
+            return
+        try:
+            if len(fds) != len(_STDIO_FDS) or _environment_key(request['env']) != self._env_key:
+                conn.sendall(b'D\n')
+                return
+            if self._get_storage_signature() != self._storage_signature:
+                self._warm_up()
+            # Workers must not share database connections with the server or each other across fork
+            self._disconnect_storage()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                self._run_worker(conn, request, fds)
+            self._workers.add(pid)
+        finally:
+            for fd in fds:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+    def serve(self):
+        """Accept requests until no request arrives for :any:`idle_timeout` seconds."""
+        from taucmdr import logger
+        log = logger.get_logger(__name__)
+        self._warm_up()
+        self._listener = listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            os.unlink(self.address)
+        except OSError as err:
+            if err.errno != errno.ENOENT:
+                raise
+        # Create the socket with no group or other permissions so it can't be used by other users
+        umask = os.umask(0o177)
+        try:
+            listener.bind(self.address)
+        finally:
+            os.umask(umask)
+        os.chmod(self.address, 0o600)
+        listener.listen(16)
+        inode = os.stat(self.address).st_ino
+        log.debug("Command server listening on '%s'", self.address)
+        last_request = time.time()
+        try:
+            while True:
+                timeout = last_request + self.idle_timeout - time.time()
+                if timeout <= 0 and not self._workers:
+                    break
+                readable, _, _ = select.select([listener], [], [], max(min(timeout, 1), 0.1))
+                self._reap_workers()
+                try:
+                    if os.stat(self.address).st_ino != inode:
+                        break
+                except OSError:
+                    break
+                if readable:
+                    conn, _ = listener.accept()
+                    with conn:
+                        self._handle(conn)
+                    last_request = time.time()
+        finally:
+            listener.close()
+            try:
+                if os.stat(self.address).st_ino == inode:
+                    os.unlink(self.address)
+            except OSError:
+                pass
+            log.debug("Command server on '%s' shut down", self.address)
+
+    def stop(self):
+        """Ask a running server to shut down by removing its socket."""
+        try:
+            os.unlink(self.address)
+        except OSError as err:
+            if err.errno != errno.ENOENT:
+                raise
+            return False
+        return True
+
+
+def daemonize():
+    """Detach the current process from its parent and terminal.
+
+    Returns:
+        bool: True in the detached process, False in the original process.
+    """
+    pid = os.fork()
+    if pid:
+        os.waitpid(pid, 0)
+        return False
+    os.setsid()
+    if os.fork():
+        os._exit(0)
+    from taucmdr import logger
+    logger.after_fork()
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in _STDIO_FDS:
+        os.dup2(devnull, fd)
+    os.close(devnull)
+    return True
@@ -29,8 +29,33 @@
 Functions used for unit tests of error.py.
 """
 
-from taucmdr import tests
+from unittest import mock
+from taucmdr import tests, logger, HELP_CONTACT
+from taucmdr.error import InternalError
+from taucmdr.cf.software import SoftwarePackageError
 
 @tests.not_implemented
 class ErrorTest(tests.TestCase):
     pass
+
+
+class SupportRequestTest(tests.TestCase):
+    """Unit tests for the support request in error messages."""
+
+    @staticmethod
+    def _messages():
+        err = InternalError('oops')
+        with mock.patch('taucmdr.error.LOGGER') as error_logger:
+            err.handle(InternalError, err, None)
+        return [error_logger.critical.call_args[0][0], SoftwarePackageError('oops').message]
+
+    def test_debug_log(self):
+        with mock.patch.object(logger, 'DEBUG_LOG_ENABLED', True):
+            for message in self._messages():
+                self.assertIn(logger.LOG_FILE, message)
+
+    def test_debug_log_disabled(self):
+        with mock.patch.object(logger, 'DEBUG_LOG_ENABLED', False):
+            for message in self._messages():
+                self.assertNotIn(logger.LOG_FILE, message)
+                self.assertIn('contact %s for assistance' % HELP_CONTACT, message)
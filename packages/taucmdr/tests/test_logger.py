@@ -29,9 +29,73 @@
 Functions used for unit tests of logger.py.
 """
 
-
-from taucmdr import tests
+import os
+import sys
+import json
+import logging
+import subprocess
+import tempfile
+from unittest import mock
+from taucmdr import tests, logger
 
 @tests.not_implemented
 class LoggerTest(tests.TestCase):
     pass
+
+
+class JSONLinesFormatterTest(tests.TestCase):
+    """Unit tests for logger.JSONLinesFormatter."""
+
+    def test_format(self):
+        record = logging.LogRecord('taucmdr.test', logging.DEBUG, __file__, 42, "%s\nworld", ('hello',), None)
+        line = logger.JSONLinesFormatter().format(record)
+        self.assertNotIn('\n', line)
+        fields = json.loads(line)
+        self.assertEqual(fields['level'], 'DEBUG')
+        self.assertEqual(fields['line'], 42)
+        self.assertEqual(fields['message'], "hello\nworld")
+
+
+@tests.skipUnless(logger.DEBUG_LOG_ENABLED, "The debug log is disabled")
+class DebugLogTest(tests.TestCase):
+    """Unit tests for writing the debug log from a background thread."""
+
+    def test_queued_records_written(self):
+        with mock.patch.object(logger._FILE_HANDLER, 'emit') as emit:
+            logger.get_logger(__name__).debug("queued %s", 'record')
+            logger._LOG_QUEUE.join()
+        messages = [call[0][0].getMessage() for call in emit.call_args_list]
+        self.assertIn("queued record", messages)
+
+    def test_after_fork(self):
+        listener = logger._LOG_LISTENER
+        logger.after_fork()
+        self.assertIs(logger._LOG_LISTENER, listener)
+        rfd, wfd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                logger.after_fork()
+                restarted = logger._LOG_LISTENER is not listener and logger._LOG_LISTENER._thread.is_alive()
+                os.write(wfd, b'1' if restarted else b'0')
+            finally:
+                os._exit(0)
+        os.close(wfd)
+        with os.fdopen(rfd, 'rb') as fin:
+            result = fin.read()
+        os.waitpid(pid, 0)
+        self.assertEqual(result, b'1')
+
+
+class DisabledDebugLogTest(tests.TestCase):
+    """Unit tests for ``__TAUCMDR_DISABLE_DEBUG_LOG__``."""
+
+    def test_disabled(self):
+        user_prefix = tempfile.mkdtemp(dir=os.getcwd())
+        env = dict(os.environ, __TAUCMDR_DISABLE_DEBUG_LOG__='1', __TAUCMDR_USER_PREFIX__=user_prefix,
+                   PYTHONPATH=os.pathsep.join(sys.path))
+        script = ("import logging; from taucmdr import logger; logger.get_logger('test').debug('hidden'); "
+                  "print(logger.DEBUG_LOG_ENABLED, logging.getLogger().level, len(logging.getLogger().handlers))")
+        output = subprocess.check_output([sys.executable, '-c', script], env=env, universal_newlines=True)
+        self.assertEqual(output.split(), ['False', str(logging.INFO), '1'])
+        self.assertFalse(os.path.exists(os.path.join(user_prefix, 'debug_log')))
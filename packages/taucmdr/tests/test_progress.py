@@ -0,0 +1,61 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Unit tests for taucmdr.progress"""
+
+import io
+from unittest import mock
+from taucmdr import tests, progress
+
+
+class LoadAverageTest(tests.TestCase):
+
+    def test_sampled_once_per_interval(self):
+        with mock.patch.object(progress, '_proc_stat_cpu_load_average', return_value=0.5) as sample, \
+                mock.patch.dict(progress._CPU_SAMPLE, {'time': None, 'value': None}):
+            self.assertEqual(progress.load_average(), 0.5)
+            self.assertEqual(progress.load_average(), 0.5)
+            self.assertEqual(sample.call_count, 1)
+
+
+class ProgressIndicatorTest(tests.TestCase):
+
+    def test_not_terminal(self):
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            with progress.ProgressIndicator("Working", total_size=10) as bar:
+                for i in range(10):
+                    bar.update(i)
+            self.assertEqual(stdout.getvalue(), '')
+        self.assertFalse(bar._registered)
+
+    def test_terminal(self):
+        stdout = io.StringIO()
+        stdout.isatty = lambda: True
+        with mock.patch('sys.stdout', stdout):
+            with progress.ProgressIndicator("Working", total_size=10, show_cpu=False) as bar:
+                bar.update(5)
+        self.assertIn('Working [', stdout.getvalue())
+        self.assertNotIn(bar, progress._RENDERER._active)
@@ -0,0 +1,99 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Unit tests for taucmdr.server"""
+
+import os
+import sys
+import stat
+import atexit
+import time
+import tempfile
+from unittest import mock
+import taucmdr
+from taucmdr import tests, PROJECT_DIR
+from taucmdr.server import CommandServer, find_server_address, forward_to_server, server_address
+
+
+class ServerTest(tests.TestCase):
+    """Unit tests for taucmdr.server"""
+
+    def test_find_server_address(self):
+        cwd = os.getcwd()
+        prefix = os.path.join(cwd, PROJECT_DIR)
+        os.mkdir(prefix)
+        subdir = os.path.join(cwd, 'src')
+        os.mkdir(subdir)
+        self.assertIsNone(find_server_address(subdir))
+        with open(server_address(prefix), 'w'):
+            pass
+        self.assertEqual(find_server_address(subdir), os.path.realpath(server_address(prefix)))
+
+    def test_no_server(self):
+        address = os.path.join(os.getcwd(), 'server.sock')
+        self.assertIsNone(forward_to_server(['--version'], address))
+
+    def _start_server(self, address):
+        pid = os.fork()
+        if pid == 0:
+            # Workers run exit handlers, so don't let them clean up the test's working directory
+            atexit._clear()  # pylint: disable=protected-access
+            # Workers write to the client's file descriptors, not to the test runner's buffers
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+            try:
+                CommandServer(address, idle_timeout=60).serve()
+            finally:
+                os._exit(0)  # pylint: disable=protected-access
+        for _ in range(300):
+            if os.path.exists(address):
+                break
+            time.sleep(0.1)
+        return pid
+
+    def test_forward_to_server(self):
+        address = os.path.join(os.getcwd(), 'server.sock')
+        pid = self._start_server(address)
+        try:
+            self.assertEqual(stat.S_IMODE(os.stat(address).st_mode), 0o600)
+            with tempfile.TemporaryFile() as output:
+                # The worker writes to the client's file descriptors, not to sys.stdout
+                saved = os.dup(1)
+                os.dup2(output.fileno(), 1)
+                try:
+                    retval = forward_to_server(['--version'], address)
+                finally:
+                    os.dup2(saved, 1)
+                    os.close(saved)
+                output.seek(0)
+                self.assertEqual(retval, 0)
+                self.assertIn(taucmdr.version_banner().splitlines()[0], output.read().decode())
+            # Clients with a different environment run commands themselves
+            with mock.patch.dict(os.environ, {'PATH': os.environ.get('PATH', '') + ':/nonexistent'}):
+                self.assertIsNone(forward_to_server(['--version'], address))
+        finally:
+            CommandServer(address).stop()
+            os.waitpid(pid, 0)
+        self.assertFalse(os.path.exists(address))
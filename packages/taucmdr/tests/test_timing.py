@@ -0,0 +1,67 @@
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Unit tests for taucmdr.timing"""
+
+import os
+import json
+from taucmdr import tests, timing
+
+
+class TimingTest(tests.TestCase):
+    """Unit tests for taucmdr.timing"""
+
+    def tearDown(self):
+        timing.disable()
+        timing.reset()
+        super().tearDown()
+
+    def test_disabled(self):
+        timing.disable()
+        with timing.span('outer'):
+            pass
+        self.assertListEqual(timing.summarize(), [])
+
+    def test_nested(self):
+        timing.enable()
+        traced = timing.traced('inner')(lambda: None)
+        with timing.span('outer'):
+            traced()
+            traced()
+        summary = timing.summarize()
+        self.assertEqual([(path, calls) for path, calls, _ in summary],
+                         [(('outer',), 1), (('outer', 'inner'), 2)])
+
+    def test_chrome_trace(self):
+        timing.enable()
+        with timing.span('outer'):
+            pass
+        path = os.path.join(os.getcwd(), 'trace.json')
+        timing.write_chrome_trace(path)
+        with open(path) as fin:
+            events = json.load(fin)['traceEvents']
+        self.assertEqual(events[0]['name'], 'outer')
+        self.assertEqual(events[0]['ph'], 'X')
@@ -30,7 +30,15 @@ Functions used for unit tests of util.py.
 """
 
 
+import io
+import os
+import gzip
+import tarfile
+import tempfile
+import time
+from unittest import mock
 from taucmdr import util, tests
+from taucmdr.error import ConfigurationError
 
 
 class HumanSizeTest(tests.TestCase):
@@ -131,3 +139,222 @@ class IsCleanContainerTest(tests.TestCase):
         self.assertFalse(util.is_clean_container(('some', 1, b'tuple')))
         self.assertFalse(util.is_clean_container(['some', True, bytearray(b'list')]))
         self.assertFalse(util.is_clean_container({'key': [{b'bad value', 'good value'}]}))
+
+
+class DownloadTest(tests.TestCase):
+    """Unit tests for util.download and util.parallel_downloads."""
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp(dir=os.getcwd())
+        self.mirror = os.path.join(self.tmpdir, 'mirror')
+        os.mkdir(self.mirror)
+        with open(os.path.join(self.mirror, 'pkg.tgz'), 'w') as fout:
+            fout.write('mirrored')
+
+    def test_mirror(self):
+        dest = os.path.join(self.tmpdir, 'dl', 'pkg.tgz')
+        with mock.patch.dict(os.environ, {'__TAUCMDR_SOURCE_MIRROR__': self.mirror}):
+            util.download('http://example.invalid/path/pkg.tgz', dest)
+        with open(dest) as fin:
+            self.assertEqual(fin.read(), 'mirrored')
+
+    def test_offline(self):
+        dest = os.path.join(self.tmpdir, 'dl', 'other.tgz')
+        with mock.patch.dict(os.environ, {'__TAUCMDR_SOURCE_MIRROR__': self.mirror, '__TAUCMDR_OFFLINE__': '1'}):
+            self.assertRaises(OSError, util.download, 'http://example.invalid/path/other.tgz', dest)
+        self.assertFalse(os.path.exists(dest))
+
+    def test_parallel_downloads(self):
+        self.assertListEqual(util.parallel_downloads([lambda: 1, lambda: 2, lambda: 3]), [1, 2, 3])
+        def fail():
+            raise OSError("failed")
+        self.assertRaises(OSError, util.parallel_downloads, [lambda: 1, fail])
+
+
+class ExtractArchiveTest(tests.TestCase):
+    """Unit tests for util.extract_archive."""
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp(dir=os.getcwd())
+        src = os.path.join(self.tmpdir, 'src')
+        os.makedirs(os.path.join(src, 'pkg-1.0', 'sub'))
+        with open(os.path.join(src, 'pkg-1.0', 'sub', 'data'), 'w') as fout:
+            fout.write('data' * 1000)
+        self.archive = os.path.join(self.tmpdir, 'pkg-1.0.tgz')
+        with tarfile.open(self.archive, 'w:gz') as fout:
+            fout.add(os.path.join(src, 'pkg-1.0'), arcname='./pkg-1.0')
+
+    def _check(self, dest):
+        self.assertEqual(util.extract_archive(self.archive, dest, show_progress=False),
+                         os.path.join(dest, 'pkg-1.0'))
+        with open(os.path.join(dest, 'pkg-1.0', 'sub', 'data')) as fin:
+            self.assertEqual(fin.read(), 'data' * 1000)
+
+    def test_toplevel(self):
+        self.assertEqual(util.archive_toplevel(self.archive), 'pkg-1.0')
+
+    def test_extract(self):
+        self._check(os.path.join(self.tmpdir, 'dest'))
+
+    def test_extract_without_decompressor(self):
+        with mock.patch.object(util, '_decompress_command', return_value=None):
+            self._check(os.path.join(self.tmpdir, 'dest_nocmd'))
+
+    def test_truncated(self):
+        truncated = os.path.join(self.tmpdir, 'truncated.tgz')
+        with open(self.archive, 'rb') as fin, open(truncated, 'wb') as fout:
+            fout.write(fin.read(os.path.getsize(self.archive) // 2))
+        self.assertRaises(OSError, util.extract_archive, truncated, os.path.join(self.tmpdir, 'dest_bad'), False)
+
+
+class CreateArchiveTest(tests.TestCase):
+    """Unit tests for util.create_archive and util.compressed_stream."""
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp(dir=os.getcwd())
+        os.makedirs(os.path.join(self.tmpdir, 'trial', 'traces'))
+        with open(os.path.join(self.tmpdir, 'trial', 'traces', 'data'), 'w') as fout:
+            fout.write('data' * 1000)
+
+    def _check_tar(self, fmt):
+        cwd = os.getcwd()
+        archive = os.path.join(self.tmpdir, 'out.' + fmt)
+        util.create_archive(fmt, archive, ['trial'], self.tmpdir, show_progress=False)
+        self.assertEqual(os.getcwd(), cwd)
+        self.assertEqual(util.extract_archive(archive, os.path.join(self.tmpdir, fmt), show_progress=False),
+                         os.path.join(self.tmpdir, fmt, 'trial'))
+        with open(os.path.join(self.tmpdir, fmt, 'trial', 'traces', 'data')) as fin:
+            self.assertEqual(fin.read(), 'data' * 1000)
+
+    def test_tgz(self):
+        self._check_tar('tgz')
+
+    def test_tgz_without_compressor(self):
+        with mock.patch.object(util, '_compress_command', return_value=None):
+            self._check_tar('tgz')
+
+    def test_tar_zst(self):
+        if not util.which('zstd'):
+            self.skipTest("zstd not installed")
+        self._check_tar('tar.zst')
+
+    def test_gz_to_unseekable_stream(self):
+        buf = io.BytesIO()
+        with util.compressed_stream(buf, 'gz') as stream:
+            stream.write(b'data' * 1000)
+        self.assertEqual(gzip.decompress(buf.getvalue()), b'data' * 1000)
+
+    def test_failed_archive_removed(self):
+        for fmt in 'tgz', 'tar':
+            archive = os.path.join(self.tmpdir, 'out.' + fmt)
+            self.assertRaises(OSError, util.create_archive, fmt, archive, ['trial', 'missing'], self.tmpdir, False)
+            self.assertFalse(os.path.exists(archive))
+
+    def test_interrupted_stream(self):
+        for compress_command in util._compress_command, lambda fmt: None:
+            with tempfile.TemporaryFile() as fout:
+                with mock.patch.object(util, '_compress_command', compress_command):
+                    with self.assertRaises(RuntimeError):
+                        with util.compressed_stream(fout, 'gz') as stream:
+                            stream.write(b'data' * 1000)
+                            raise RuntimeError
+                fout.seek(0)
+                compressed = fout.read()
+                if compressed:
+                    self.assertRaises((OSError, EOFError), gzip.decompress, compressed)
+
+    def test_missing_compressor(self):
+        with mock.patch.object(util, '_compress_command', return_value=None):
+            with self.assertRaises(ConfigurationError):
+                with util.compressed_stream(io.BytesIO(), 'zst'):
+                    pass
+
+
+class TreeTest(tests.TestCase):
+    """Unit tests for util.walk_tree, util.tree_size, and util.rmtree."""
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp(dir=os.getcwd())
+        self.top = os.path.join(self.tmpdir, 'top')
+        for i in range(5):
+            path = os.path.join(self.top, *['d%d' % j for j in range(i)])
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, 'file'), 'w') as fout:
+                fout.write('x' * (i+1))
+        os.symlink(self.tmpdir, os.path.join(self.top, 'link'))
+
+    def test_walk_tree(self):
+        walked = {os.path.relpath(path, self.top): sorted(entry.name for entry in files)
+                  for path, _, files in util.walk_tree(self.top)}
+        expected = {os.path.relpath(path, self.top): sorted(files) for path, _, files in os.walk(self.top)}
+        # Symbolic links to directories are not followed and are listed with the files
+        expected['.'].append('link')
+        self.assertDictEqual(walked, expected)
+
+    def test_tree_size(self):
+        self.assertEqual(util.tree_size(self.top), 15)
+        self.assertEqual(util.tree_size(os.path.join(self.tmpdir, 'missing')), 0)
+
+    def test_rmtree(self):
+        util.rmtree(self.top)
+        self.assertFalse(os.path.exists(self.top))
+        self.assertTrue(os.path.isdir(self.tmpdir))
+
+    def test_rmtree_background(self):
+        # This process has other threads so it must not fork a copy of itself to remove the tree
+        with mock.patch('os.fork', side_effect=AssertionError("forked")):
+            util.rmtree(self.top, background=True)
+        self.assertFalse(os.path.exists(self.top))
+        for _ in range(50):
+            if os.listdir(self.tmpdir) == []:
+                break
+            time.sleep(0.1)
+        self.assertListEqual(os.listdir(self.tmpdir), [])
+
+    def test_rmtree_symlink(self):
+        link = os.path.join(self.tmpdir, 'top_link')
+        os.symlink(self.top, link)
+        for background in False, True:
+            self.assertRaises(OSError, util.rmtree, link, background=background)
+            util.rmtree(link, ignore_errors=True, background=background)
+            self.assertTrue(os.path.islink(link))
+        self.assertEqual(util.tree_size(self.top), 15)
+        self.assertListEqual(list(util.walk_tree(link)), [])
+
+
+class CreateSubprocessTest(tests.TestCase):
+    """Unit tests for util.create_subprocess."""
+
+    def test_record_output(self):
+        retval, output = util.create_subprocess(['sh', '-c', 'printf "a\\nb\\r\\nc"'], stdout=False, record_output=True)
+        self.assertEqual(retval, 0)
+        self.assertListEqual(output, ['a\n', 'b\n', 'c'])
+
+    def test_record_output_file(self):
+        tmpdir = tempfile.mkdtemp(dir=os.getcwd())
+        record = os.path.join(tmpdir, 'output')
+        log_file = os.path.join(tmpdir, 'log')
+        retval, output = util.create_subprocess(['sh', '-c', 'seq 1 20000; exit 2'], stdout=False,
+                                                record_output=record, log_file=log_file, error_buf=0)
+        self.assertEqual(retval, 2)
+        self.assertEqual(output, record)
+        for path in record, log_file:
+            with open(path) as fin:
+                self.assertEqual(fin.read(), ''.join('%d\n' % i for i in range(1, 20001)))
+
+    def test_error_buf(self):
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            retval = util.create_subprocess(['sh', '-c', 'seq 1 1000; exit 1'], stdout=False, error_buf=3)
+        self.assertEqual(retval, 1)
+        self.assertEqual(stdout.getvalue(), '998\n999\n1000\n')
+
+    def test_split_characters(self):
+        with mock.patch('taucmdr.util._READ_CHUNK_SIZE', 1), \
+                mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            retval = util.create_subprocess(['sh', '-c', 'printf "caf\\303\\251 \\342\\202\\254\\n"'], stdout=True)
+        self.assertEqual(retval, 0)
+        self.assertEqual(stdout.getvalue(), 'café €\n')
@@ -0,0 +1,196 @@
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Lightweight tracing spans for timing TAU Commander itself.
+
+Spans mark phases of TAU Commander's own execution, e.g. connecting to storage,
+probing compilers, or waiting for a subprocess.  Spans are only recorded after
+:any:`enable` is called (see ``tau --timing``) or if the ``__TAUCMDR_TIMING__``
+environment variable is set.  When disabled, :any:`span` returns a shared no-op
+context manager and :any:`traced` functions cost one extra call and a flag check.
+
+Recorded spans can be summarized as a hierarchical wall-time report or written
+as Chrome trace-event JSON for viewing in chrome://tracing or Perfetto.
+"""
+
+import os
+import sys
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+
+_ENABLED = False
+_SPANS = []
+_LOCAL = threading.local()
+
+
+class _NullSpan:
+    """A reusable context manager that does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+
+def enabled():
+    """Returns True if spans are being recorded."""
+    return _ENABLED
+
+
+def enable():
+    """Start recording spans."""
+    global _ENABLED # pylint: disable=global-statement
+    _ENABLED = True
+
+
+def disable():
+    """Stop recording spans.  Already recorded spans are kept."""
+    global _ENABLED # pylint: disable=global-statement
+    _ENABLED = False
+
+
+def reset():
+    """Discard all recorded spans."""
+    del _SPANS[:]
+
+
+@contextmanager
+def _span(name):
+    try:
+        stack = _LOCAL.stack
+    except AttributeError:
+        stack = _LOCAL.stack = []
+    stack.append(name)
+    path = tuple(stack)
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        stack.pop()
+        _SPANS.append((path, begin, end, threading.get_ident()))
+
+
+def span(name):
+    """Time a block of code.
+
+    Spans may be nested.  Nesting is tracked per thread.
+
+    Args:
+        name (str): Name of the phase being timed.
+
+    Returns:
+        A context manager.
+    """
+    if not _ENABLED:
+        return _NULL_SPAN
+    return _span(name)
+
+
+def traced(name=None):
+    """Decorator that times every call to a function.
+
+    Args:
+        name (str): Span name.  Defaults to the function's qualified name.
+
+    Returns:
+        callable: A function decorator.
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return func(*args, **kwargs)
+            with _span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def summarize():
+    """Summarize recorded spans as a call tree.
+
+    Returns:
+        list: (path, calls, total seconds) tuples in depth-first order where `path` is a tuple of span names.
+    """
+    totals = {}
+    for path, begin, end, _ in _SPANS:
+        calls, total = totals.get(path, (0, 0.0))
+        totals[path] = (calls + 1, total + (end - begin))
+    children = {}
+    for path in totals:
+        children.setdefault(path[:-1], []).append(path)
+    summary = []
+    def walk(parent):
+        for path in sorted(children.get(parent, []), key=lambda path: -totals[path][1]):
+            summary.append((path,) + totals[path])
+            walk(path)
+    walk(())
+    return summary
+
+
+def report(stream=None):
+    """Print a hierarchical wall-time report of recorded spans.
+
+    Args:
+        stream: File-like object to write to.  Defaults to :any:`sys.stderr`.
+    """
+    stream = stream or sys.stderr
+    summary = summarize()
+    if not summary:
+        return
+    width = max(2*(len(path)-1) + len(path[-1]) for path, _, _ in summary)
+    root_total = sum(total for path, _, total in summary if len(path) == 1)
+    stream.write("%-*s %8s %12s %7s\n" % (width, "Phase", "Calls", "Time (ms)", "%"))
+    for path, calls, total in summary:
+        label = '  '*(len(path)-1) + path[-1]
+        percent = 100.0*total/root_total if root_total else 0.0
+        stream.write("%-*s %8d %12.3f %6.1f%%\n" % (width, label, calls, 1000*total, percent))
+
+
+def write_chrome_trace(path):
+    """Write recorded spans as Chrome trace-event JSON.
+
+    Args:
+        path (str): Path to the output file.
+    """
+    pid = os.getpid()
+    events = [{'name': span_path[-1], 'ph': 'X', 'pid': pid, 'tid': tid,
+               'ts': 1e6*begin, 'dur': 1e6*(end - begin)}
+              for span_path, begin, end, tid in _SPANS]
+    with open(path, 'w') as fout:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, fout)
+
+
+if os.environ.get('__TAUCMDR_TIMING__'):
+    enable()
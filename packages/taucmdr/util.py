@@ -29,28 +29,34 @@
 Handles system manipulation and status tasks, e.g. subprocess management or file creation.
 """
 
+import io
+import codecs
 import re
 import os
 import sys
 import time
 import atexit
+import logging
 import subprocess
 import errno
 import shutil
 import pkgutil
 import tarfile
 import gzip
+import zlib
+import lzma
 import tempfile
 from stat import S_IRUSR, S_IWUSR, S_IEXEC
 import hashlib
 import urllib.parse
 import urllib.request
-from collections import deque
-from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as futures_wait
+from contextlib import contextmanager, ExitStack
 from zipfile import ZipFile
 import termcolor
 from unidecode import unidecode
-from taucmdr import logger
+from taucmdr import logger, timing
+from taucmdr.cf.host_cache import HOST_CACHE
 from taucmdr.cf.storage.levels import highest_writable_storage
 from taucmdr.error import InternalError, ConfigurationError
 from taucmdr.progress import ProgressIndicator
@@ -141,10 +147,137 @@ def mkdirp(*args):
 def add_error_stack(path):
     _DTEMP_ERROR_STACK.append(str(path))
 
-def rmtree(path, ignore_errors=False, onerror=None, attempts=5):
+def tree_workers():
+    """Returns the maximum number of threads to use for concurrent filesystem metadata operations."""
+    try:
+        return max(1, int(os.environ.get('__TAUCMDR_TREE_WORKERS__', 16)))
+    except ValueError as err:
+        raise ConfigurationError("Invalid value for __TAUCMDR_TREE_WORKERS__: %s" %
+                                 os.environ['__TAUCMDR_TREE_WORKERS__']) from err
+
+
+def _scan_directory(path, visit):
+    dirs, files = [], []
+    if os.path.islink(path):
+        # Never follow a symbolic link, even one that replaced a directory after it was scanned
+        return path, dirs, files
+    with os.scandir(path) as entries:
+        for entry in entries:
+            # Stat here so the metadata requests are made concurrently by the worker threads
+            entry.stat(follow_symlinks=False)
+            if entry.is_dir(follow_symlinks=False):
+                dirs.append(entry)
+            else:
+                files.append(entry)
+    if visit:
+        visit(path, dirs, files)
+    return path, dirs, files
+
+
+def walk_tree(top, visit=None, max_workers=None):
+    """Walks a directory tree with concurrent :any:`os.scandir` calls.
+
+    Metadata operations on parallel filesystems like Lustre or NFS have high latency, so
+    scanning many directories at once is much faster than :any:`os.walk`.  Directories are
+    yielded in no particular order.  Symbolic links are not followed, so if `top` is a symbolic
+    link then nothing is yielded.
+
+    Args:
+        top (str): Path to the root of the tree.
+        visit: Callable accepting the same arguments as the yielded tuples.  It is called by
+               the worker thread that scanned the directory, so it may make more system calls
+               concurrently, e.g. to remove the directory's files.
+        max_workers (int): Maximum number of concurrent worker threads.
+                           Defaults to the ``__TAUCMDR_TREE_WORKERS__`` environment variable or 16.
+
+    Yields:
+        tuple: (path, dirs, files) where `dirs` and `files` are lists of :any:`os.DirEntry`
+               objects with cached ``stat(follow_symlinks=False)`` results.
+    """
+    if os.path.islink(top):
+        return
+    with ThreadPoolExecutor(max_workers=max_workers or tree_workers()) as executor:
+        pending = {executor.submit(_scan_directory, top, visit)}
+        while pending:
+            done, pending = futures_wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, dirs, files = future.result()
+                pending.update(executor.submit(_scan_directory, entry.path, visit) for entry in dirs)
+                yield path, dirs, files
+
+
+def tree_size(top):
+    """Returns the total size in bytes of the files in a directory tree.
+
+    Args:
+        top (str): Path to the root of the tree.
+
+    Returns:
+        int: Sum of the sizes of all regular files.
+    """
+    if not os.path.isdir(top):
+        return 0
+    return sum(entry.stat(follow_symlinks=False).st_size
+               for _, _, files in walk_tree(top) for entry in files if entry.is_file(follow_symlinks=False))
+
+
+def _unlink_files(unused_path, unused_dirs, files):
+    for entry in files:
+        try:
+            os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def _parallel_rmtree(path):
+    if os.path.islink(path):
+        raise OSError("Cannot call rmtree on a symbolic link")
+    dirs = [path]
+    for _, subdirs, _ in walk_tree(path, visit=_unlink_files):
+        dirs.extend(entry.path for entry in subdirs)
+    # Deepest directories first so each is empty when it's removed
+    for dirpath in sorted(dirs, key=lambda x: x.count(os.sep), reverse=True):
+        try:
+            os.rmdir(dirpath)
+        except FileNotFoundError:
+            pass
+
+
+_BACKGROUND_RMTREE_SCRIPT = "import shutil, sys; shutil.rmtree(sys.argv[1], ignore_errors=True)"
+
+
+def _background_rmtree(path):
+    """Removes a directory tree in a detached process after moving it out of the way.
+
+    The removal runs in a new interpreter instead of a forked copy of this one because this
+    process has other threads (e.g. the debug log writer) whose locks a forked child could inherit held.
+    """
+    if getattr(sys, 'frozen', False):
+        # sys.executable isn't a Python interpreter
+        return False
+    parent, name = os.path.split(os.path.abspath(path))
+    trash = os.path.join(parent, f'.{name}.deleting-{os.getpid()}-{int(time.time())}')
+    try:
+        os.rename(path, trash)
+    except OSError as err:
+        LOGGER.debug("Cannot rename '%s' for background removal: %s", path, err)
+        return False
+    try:
+        # A new session so the removal isn't interrupted by signals sent to the caller's terminal
+        subprocess.Popen([sys.executable, '-c', _BACKGROUND_RMTREE_SCRIPT, trash], start_new_session=True,
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except OSError as err:
+        LOGGER.debug("Cannot start background removal of '%s': %s", trash, err)
+        os.rename(trash, path)
+        return False
+    return True
+
+
+def rmtree(path, ignore_errors=False, onerror=None, attempts=5, background=False):
     """Wrapper around shutil.rmtree to work around stale or slow NFS directories.
 
-    Tries repeatedly to recursively remove `path` and sleeps between attempts.
+    Removes files with many concurrent workers (see :any:`walk_tree`) and, if that fails,
+    tries repeatedly to recursively remove `path` and sleeps between attempts.
 
     Args:
         path (str): A directory but not a symbolic link to a directory.
@@ -153,12 +286,26 @@ def rmtree(path, ignore_errors=False, onerror=None, attempts=5):
                               specified by `onerror` or, if that is omitted, they raise an exception.
         onerror: Callable that accepts three parameters: function, path, and excinfo.  See :any:shutil.rmtree.
         attempts (int): Number of times to repeat shutil.rmtree before giving up.
+        background (bool): If True, rename `path` and remove it in a separate process so this
+                           call returns immediately.  Falls back to removing it now if `path`
+                           can't be renamed.
     """
     if not os.path.exists(path):
         return
+    if os.path.islink(path):
+        # Let shutil.rmtree raise or report the error so symbolic links are never followed
+        return shutil.rmtree(path, ignore_errors, onerror)
+    if background and _background_rmtree(path):
+        return
+    try:
+        return _parallel_rmtree(path)
+    except Exception as err:        # pylint: disable=broad-except
+        LOGGER.debug("Parallel removal of '%s' failed: %s", path, err)
     for i in range(attempts-1):
         try:
             return shutil.rmtree(path)
+        except FileNotFoundError:
+            return
         except Exception as err:        # pylint: disable=broad-except
             LOGGER.warning("Unexpected error: %s", err)
             time.sleep(i+1)
@@ -186,7 +333,8 @@ def which(program, use_cached=True):
 
     Program must exist and be executable.
     Searches the system PATH and the current directory.
-    Caches the result.
+    Caches the result.  Paths found by searching PATH are also kept in the
+    persistent host cache and reused if they are still executable.
 
     Args:
         program (str): program to find.
@@ -213,28 +361,45 @@ def which(program, use_cached=True):
             _WHICH_CACHE[prog_enc] = abs_program
             return abs_program
     else:
+        if use_cached:
+            exe_file = HOST_CACHE.get_item('which', prog_enc)
+            if exe_file and _is_exec(exe_file):
+                _heavy_debug("which(%s) = '%s' (host cache)", prog_enc, exe_file)
+                _WHICH_CACHE[prog_enc] = exe_file
+                return exe_file
         for path in os.environ['PATH'].split(os.pathsep):
             path = path.strip('"')
             exe_file = os.path.join(path, prog_enc)
             if _is_exec(exe_file):
                 LOGGER.debug("which(%s) = '%s'", prog_enc, exe_file)
                 _WHICH_CACHE[prog_enc] = exe_file
+                HOST_CACHE.set_item('which', prog_enc, exe_file)
                 return exe_file
     _heavy_debug("which(%s): command not found", prog_enc)
     _WHICH_CACHE[prog_enc] = None
     return None
 
 
-def download(src, dest, timeout=8):
+def _source_mirrors():
+    mirrors = os.environ.get('__TAUCMDR_SOURCE_MIRROR__', '')
+    return [path for path in mirrors.split(os.pathsep) if path]
+
+
+def download(src, dest, timeout=8, resume=False):
     """Downloads or copies files.
 
     `src` may be a file path or URL.  The destination folder will be created
     if it doesn't exist.  Download is via curl, wget, or Python's urllib as appropriate.
 
+    Directories listed in the ``__TAUCMDR_SOURCE_MIRROR__`` environment variable are
+    searched for a file with the same name as the URL before anything is downloaded.
+    If ``__TAUCMDR_OFFLINE__`` is set then URLs that aren't mirrored are not downloaded.
+
     Args:
         src (str): Path or URL to source file.
         dest (str): Path to file copy or download destination.
         timeout (int): Maximum time in seconds for the connection to the server.  0 for no timeout.
+        resume (bool): If True and `dest` exists then continue a previous partial download.
 
     Raises:
         IOError: File copy or download failed.
@@ -244,6 +409,17 @@ def download(src, dest, timeout=8):
     assert isinstance(timeout, int) and timeout >= 0
     if src.startswith('file://'):
         src = str(src[6:])
+    if is_url(src):
+        name = os.path.basename(urllib.parse.urlparse(src).path)
+        for mirror in _source_mirrors():
+            mirrored = os.path.join(mirror, name)
+            if os.path.isfile(mirrored):
+                LOGGER.debug("Found '%s' in mirror '%s'", src, mirror)
+                src = mirrored
+                break
+        else:
+            if os.environ.get('__TAUCMDR_OFFLINE__'):
+                raise OSError("Not downloading '%s' because __TAUCMDR_OFFLINE__ is set" % src)
     if os.path.isfile(src):
         LOGGER.debug("Copying '%s' to '%s'", src, dest)
         mkdirp(os.path.dirname(dest))
@@ -252,11 +428,16 @@ def download(src, dest, timeout=8):
         LOGGER.debug("Downloading '%s' to '%s'", src, dest)
         LOGGER.info("Downloading '%s'", src)
         mkdirp(os.path.dirname(dest))
+        if not resume and os.path.exists(dest):
+            os.remove(dest)
         for cmd in "curl", "wget":
             abs_cmd = which(cmd)
             if abs_cmd and _create_dl_subprocess(abs_cmd, src, dest, timeout) == 0:
                 return
             LOGGER.warning("%s failed to download '%s'. Retrying with a different method...", cmd, src)
+            # The server may not support resuming, so start over
+            if os.path.exists(dest):
+                os.remove(dest)
         # Fallback: urllib is usually **much** slower than curl or wget and doesn't support timeout
         if timeout:
             raise OSError("Failed to download '%s'" % src)
@@ -269,40 +450,139 @@ def download(src, dest, timeout=8):
                 raise OSError("Failed to download '%s'" % src) from err
 
 
+class _Download:
+    """A curl or wget subprocess downloading a file.
+
+    The response headers are saved as they arrive so the expected size is known
+    without a separate request, and existing partial files are continued rather
+    than downloaded again.
+    """
+
+    def __init__(self, abs_cmd, src, dest, timeout):
+        self.dest = dest
+        self.header_file = dest + '.headers'
+        try:
+            self.offset = os.path.getsize(dest)
+        except OSError:
+            self.offset = 0
+        if "curl" in str(os.path.basename(abs_cmd)):
+            self.cmd = [abs_cmd, '-s', '-f', '-L', '-C', '-', src, '-o', dest, '-D', self.header_file,
+                        '--connect-timeout', str(timeout)]
+            self._stderr = None
+        elif "wget" in str(os.path.basename(abs_cmd)):
+            # wget writes response headers to stderr
+            self.cmd = [abs_cmd, '-q', '-S', '-c', src, '-O', dest, '--timeout=%d' % timeout]
+            self._stderr = self.header_file
+        else:
+            raise InternalError("Invalid command parameter: %s" % abs_cmd)
+        self._expected_size = None
+        self.proc = None
+
+    def start(self):
+        with open(os.devnull, 'wb') as devnull:
+            if self._stderr:
+                with open(self._stderr, 'wb') as stderr:
+                    self.proc = subprocess.Popen(self.cmd, stdout=devnull, stderr=stderr)
+            else:
+                self.proc = subprocess.Popen(self.cmd, stdout=devnull, stderr=devnull)
+        return self
+
+    def current_size(self):
+        try:
+            return os.path.getsize(self.dest)
+        except OSError:
+            return 0
+
+    def expected_size(self):
+        """Returns the expected final file size, or 0 if not yet known."""
+        if self._expected_size is None:
+            try:
+                with open(self.header_file) as fin:
+                    headers = fin.read()
+            except OSError:
+                return 0
+            # With redirects the last response is the one that matters
+            lengths = re.findall(r'^\s*content-length:\s*(\d+)', headers, re.IGNORECASE | re.MULTILINE)
+            if not lengths:
+                return 0
+            self._expected_size = self.offset + int(lengths[-1])
+        return self._expected_size
+
+    def wait(self):
+        self.proc.wait()
+        try:
+            os.remove(self.header_file)
+        except OSError:
+            pass
+        LOGGER.debug("%s returned %d", self.cmd, self.proc.returncode)
+        return self.proc.returncode
+
+
+_SHARED_DOWNLOADS = None
+
+
 def _create_dl_subprocess(abs_cmd, src, dest, timeout):
-    if "curl" in str(os.path.basename(abs_cmd)):
-        size_cmd = [abs_cmd, '-sI', src, '--location', '--max-time', str(timeout)]
-        get_cmd = [abs_cmd, '-s', '-L', src, '-o', dest, '--connect-timeout', str(timeout)]
-    elif "wget" in str(os.path.basename(abs_cmd)):
-        size_cmd = [abs_cmd, src, '--spider', '--server-response', '--timeout=%d' % timeout, '--tries=1']
-        get_cmd = [abs_cmd, '-q', src, '-O', dest, '--timeout=%d' % timeout]
-    else:
-        raise InternalError("Invalid command parameter: %s" % abs_cmd)
-    try:
-        proc_output = get_command_output(size_cmd)
-    except subprocess.CalledProcessError as err:
-        return err.returncode
-    _heavy_debug(proc_output)
+    download = _Download(abs_cmd, src, dest, timeout).start()
+    shared = _SHARED_DOWNLOADS
+    if shared is not None:
+        shared.add(download)
+        try:
+            return download.wait()
+        finally:
+            shared.discard(download)
+    with ProgressIndicator("Downloading") as progress_bar:
+        while download.proc.poll() is None:
+            progress_bar.update(download.current_size(), total_size=download.expected_size())
+            time.sleep(0.1)
+        return download.wait()
+
+
+def parallel_downloads(tasks, max_workers=None):
+    """Run tasks that download files concurrently with one shared progress indicator.
+
+    Downloads started by :any:`download` in any task are shown as a single aggregate
+    progress bar instead of one bar per file.
+
+    Args:
+        tasks (list): Callables taking no arguments.
+        max_workers (int): Maximum number of concurrent tasks.
+                           Defaults to the ``__TAUCMDR_MAX_DOWNLOADS__`` environment variable or 4.
+
+    Returns:
+        list: The value returned by each task, in order.
+
+    Raises:
+        Exception: The first exception raised by any task, after all tasks have finished.
+    """
+    global _SHARED_DOWNLOADS # pylint: disable=global-statement
+    if not max_workers:
+        try:
+            max_workers = max(1, int(os.environ.get('__TAUCMDR_MAX_DOWNLOADS__', 4)))
+        except ValueError as err:
+            raise ConfigurationError("Invalid value for __TAUCMDR_MAX_DOWNLOADS__: %s" %
+                                     os.environ['__TAUCMDR_MAX_DOWNLOADS__']) from err
+    _SHARED_DOWNLOADS = downloads = set()
     try:
-        file_size = int(proc_output.partition('Content-Length')[2].split()[1])
-    except (ValueError, IndexError):
-        LOGGER.warning("Invalid response while retrieving download file size")
-        file_size = -1
-    with ProgressIndicator("Downloading", total_size=file_size) as progress_bar:
-        with open(os.devnull, 'wb') as devnull:
-            proc = subprocess.Popen(get_cmd, stdout=devnull, stderr=subprocess.STDOUT, universal_newlines=True)
-            while proc.poll() is None:
-                try:
-                    current_size = os.stat(dest).st_size
-                except OSError:
-                    pass
-                else:
-                    progress_bar.update(current_size)
-                time.sleep(0.1)
-            proc.wait()
-            retval = proc.returncode
-            LOGGER.debug("%s returned %d", get_cmd, retval)
-            return retval
+        with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+                ProgressIndicator("Downloading") as progress_bar:
+            futures = [executor.submit(task) for task in tasks]
+            pending = futures
+            while pending:
+                _, pending = futures_wait(pending, timeout=0.1)
+                active = list(downloads)
+                expected = [download.expected_size() for download in active]
+                progress_bar.update(sum(download.current_size() for download in active),
+                                    total_size=sum(expected) if all(expected) else 0)
+    finally:
+        _SHARED_DOWNLOADS = None
+    return [future.result() for future in futures]
+
+
+def _member_toplevel(name):
+    """Returns the first path component of an archive member name, or None for the archive root."""
+    parts = [part for part in str(name).split('/') if part not in ('', '.')]
+    return parts[0] if parts else None
+
 
 def archive_toplevel(archive):
     """Returns the name of the top-level directory in an archive.
@@ -313,6 +593,7 @@ def archive_toplevel(archive):
             /baz
 
     The top-level directory here is "foo"
+    Only the first few member headers are read, so this is fast even for very large archives.
     This routine will return stupid results for archives with multiple top-level elements.
 
     Args:
@@ -326,26 +607,41 @@ def archive_toplevel(archive):
     """
     _heavy_debug("Determining top-level directory name in '%s'", archive)
     try:
-        fin = tarfile.open(archive)
-    except tarfile.ReadError as err:
-        raise OSError from err
-    else:
-        if fin.firstmember.isdir():
-            topdir = str(fin.firstmember.name)
-        else:
-            dirs = [str(d.name) for d in fin.getmembers() if d.isdir()]
-            if dirs:
-                topdir = min(dirs, key=len)
+        with tarfile.open(archive) as fin:
+            for member in fin:
+                topdir = _member_toplevel(member.name)
+                if topdir:
+                    break
             else:
-                names = [str(d.name) for d in fin.getmembers() if d.isfile()]
-                for name in names:
-                    dirname, basename = os.path.split(name)
-                    while dirname:
-                        dirname, basename = os.path.split(dirname)
-                    dirs += [str(basename)]
-                topdir = min(dirs, key=len)
-        LOGGER.debug("Top-level directory in '%s' is '%s'", archive, topdir)
-        return str(topdir)
+                raise OSError(f"Archive '{archive}' is empty")
+    except (tarfile.TarError, EOFError, zlib.error, lzma.LZMAError) as err:
+        raise OSError(f"Cannot read archive '{archive}': {err}") from err
+    LOGGER.debug("Top-level directory in '%s' is '%s'", archive, topdir)
+    return str(topdir)
+
+
+def verify_archive(archive):
+    """Checks that an archive can be read from beginning to end.
+
+    Reads every member header and decompresses the whole archive so that truncated
+    or corrupted files are detected before they are extracted.
+
+    Args:
+        archive (str): Path to archive file.
+
+    Raises:
+        IOError: `archive` is incomplete or corrupt.
+    """
+    LOGGER.debug("Verifying archive '%s'", archive)
+    try:
+        with tarfile.open(archive) as fin:
+            for _ in fin:
+                pass
+            # Read any trailing data so compressed stream checksums are verified
+            while fin.fileobj.read(1024*1024):
+                pass
+    except (tarfile.TarError, EOFError, zlib.error, lzma.LZMAError) as err:
+        raise OSError(f"Archive '{archive}' is incomplete or corrupt: {err}") from err
 
 
 def is_clean_container(obj):
@@ -397,18 +693,55 @@ def is_clean_container(obj):
     return True
 
 
-def _show_extract_progress(members):
-    with ProgressIndicator("Extracting", total_size=len(members), show_cpu=False) as progress_bar:
-        for i, member in enumerate(members):
-            progress_bar.update(i)
+_PARALLEL_DECOMPRESSORS = (
+    (b'\x1f\x8b', (('pigz', '-dc'), ('gzip', '-dc'))),
+    (b'BZh', (('pbzip2', '-dc'), ('lbzip2', '-dc'), ('bzip2', '-dc'))),
+    (b'\xfd7zXZ\x00', (('xz', '-dc', '-T0'),)),
+    (b'\x28\xb5\x2f\xfd', (('zstd', '-dc'),)),
+)
+"""Archive magic numbers and the external decompression commands to try, fastest first."""
+
+
+def _decompress_command(archive):
+    """Returns a command that decompresses `archive` from stdin to stdout, or None to use tarfile directly."""
+    with open(archive, 'rb') as fin:
+        magic = fin.read(6)
+    for prefix, commands in _PARALLEL_DECOMPRESSORS:
+        if magic.startswith(prefix):
+            for cmd in commands:
+                abs_cmd = which(cmd[0])
+                if abs_cmd:
+                    return [abs_cmd] + list(cmd[1:])
+            break
+    return None
+
+
+def _stream_members(fin, archive_file, archive_size, show_progress, first_member):
+    """Yields archive members in order, updating progress by compressed bytes consumed."""
+    if show_progress:
+        context = ProgressIndicator("Extracting", total_size=archive_size, show_cpu=False)
+    else:
+        context = _null_context("")
+    with context as progress_bar:
+        for member in fin:
+            if first_member is not None and _member_toplevel(member.name):
+                first_member.append(member.name)
+                first_member = None
+            if progress_bar:
+                # Child processes share the file offset so this is the amount of compressed data read
+                progress_bar.update(os.lseek(archive_file.fileno(), 0, os.SEEK_CUR))
             yield member
 
+
 def extract_archive(archive, dest, show_progress=True):
     """Extracts archive file to dest.
 
     Supports compressed and uncompressed tar archives. Destination folder will
     be created if it doesn't exist.
 
+    The archive is read once from beginning to end.  Parallel decompressors like pigz,
+    pbzip2, ``xz -T0``, or zstd are used through a pipe when they are available.
+
     Args:
         archive (str): Path to archive file to extract.
         dest (str): Destination folder.
@@ -419,61 +752,173 @@ def extract_archive(archive, dest, show_progress=True):
     Raises:
         IOError: Failed to extract archive.
     """
-    topdir = archive_toplevel(archive)
-    full_dest = os.path.join(dest, topdir)
     mkdirp(dest)
-    with tarfile.open(archive) as fin:
-        if show_progress:
-            LOGGER.info("Checking contents of '%s'", archive)
-            with ProgressIndicator("Extracting archive", show_cpu=False):
-                members = fin.getmembers()
-            LOGGER.info("Extracting '%s' to create '%s'", archive, full_dest)
-            fin.extractall(dest, members=_show_extract_progress(members))
+    cmd = _decompress_command(archive)
+    first_member = []
+    LOGGER.info("Extracting '%s' to '%s'", archive, dest)
+    with open(archive, 'rb') as archive_file:
+        archive_size = os.fstat(archive_file.fileno()).st_size
+        if not cmd:
+            try:
+                with tarfile.open(fileobj=archive_file, mode='r|*') as fin:
+                    fin.extractall(dest, members=_stream_members(fin, archive_file, archive_size,
+                                                                  show_progress, first_member))
+            except (tarfile.TarError, EOFError, zlib.error, lzma.LZMAError) as err:
+                raise OSError(f"Cannot extract '{archive}': {err}") from err
         else:
-            LOGGER.info("Extracting '%s' to create '%s'", archive, full_dest)
-            fin.extractall(dest)
+            LOGGER.debug("Decompressing '%s' with %s", archive, cmd)
+            with tempfile.TemporaryFile() as stderr:
+                proc = subprocess.Popen(cmd, stdin=archive_file, stdout=subprocess.PIPE, stderr=stderr)
+                try:
+                    with tarfile.open(fileobj=proc.stdout, mode='r|') as fin:
+                        fin.extractall(dest, members=_stream_members(fin, archive_file, archive_size,
+                                                                      show_progress, first_member))
+                    # Drain padding after the end-of-archive marker so the decompressor exits cleanly
+                    while proc.stdout.read(1024*1024):
+                        pass
+                except tarfile.TarError as err:
+                    proc.kill()
+                    raise OSError(f"Cannot extract '{archive}': {err}") from err
+                finally:
+                    proc.stdout.close()
+                    retval = proc.wait()
+                if retval:
+                    stderr.seek(0)
+                    raise OSError(f"{cmd[0]} failed to decompress '{archive}': "
+                                  f"{stderr.read().decode(errors='replace').strip()}")
+    if not first_member:
+        raise OSError(f"Archive '{archive}' is empty")
+    full_dest = os.path.join(dest, _member_toplevel(first_member[0]))
     if not os.path.isdir(full_dest):
         raise OSError(f"Extracting '{archive}' does not create '{full_dest}'")
     return full_dest
 
 
+_PARALLEL_COMPRESSORS = {
+    'zst': (('zstd', '-q', '-c', '-T0'),),
+    'gz': (('pigz', '-c'), ('gzip', '-c')),
+}
+"""External compression commands for each compressed file format, fastest first."""
+
+
+def _compress_command(fmt):
+    """Returns a command that compresses stdin to stdout in format `fmt`, or None if none are installed."""
+    for cmd in _PARALLEL_COMPRESSORS.get(fmt, ()):
+        abs_cmd = which(cmd[0])
+        if abs_cmd:
+            return [abs_cmd] + list(cmd[1:])
+    return None
+
+
+@contextmanager
+def compressed_stream(fileobj, fmt):
+    """Context manager for a binary stream that compresses everything written to it into `fileobj`.
+
+    The fastest installed compressor (see :any:`_PARALLEL_COMPRESSORS`) runs in a separate process
+    that writes directly to `fileobj`'s file descriptor so compression happens on other cores while
+    the caller is still producing data.  Gzip falls back to Python's :any:`gzip` module if no
+    compressor is installed or `fileobj` has no file descriptor.  If the caller raises an exception
+    the compressed stream is not finalized so a truncated archive can't be mistaken for a valid one.
+
+    Args:
+        fileobj: Binary file object the compressed data is written to, e.g. ``sys.stdout.buffer``.
+        fmt (str): 'zst', 'gz', or None to write uncompressed data.
+
+    Raises:
+        ConfigurationError: No compressor for `fmt` is available.
+    """
+    if not fmt:
+        yield fileobj
+        return
+    cmd = _compress_command(fmt)
+    try:
+        fileno = fileobj.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        cmd = None
+    if cmd:
+        fileobj.flush()
+        with tempfile.TemporaryFile() as errors:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=fileno, stderr=errors)
+            try:
+                yield proc.stdin
+            except BaseException:
+                proc.kill()
+                raise
+            finally:
+                try:
+                    proc.stdin.close()
+                except BrokenPipeError:
+                    pass
+                retval = proc.wait()
+            if retval:
+                errors.seek(0)
+                raise OSError(f"'{' '.join(cmd)}' failed with return code {retval}: "
+                              f"{errors.read().decode(errors='replace').strip()}")
+    elif fmt == 'gz':
+        stream = gzip.GzipFile(fileobj=fileobj, mode='wb', compresslevel=6)
+        try:
+            yield stream
+        except BaseException:
+            # Detach from `fileobj` so closing doesn't write the gzip trailer
+            stream.fileobj = None
+            raise
+        finally:
+            stream.close()
+    else:
+        raise ConfigurationError(f"Cannot write {fmt!r} compressed files: no compression program found.",
+                                 "Install one of: %s" % ', '.join(cmd[0] for cmd in _PARALLEL_COMPRESSORS.get(fmt, ())))
+
+
 def create_archive(fmt, dest, items, cwd=None, show_progress=True):
     """Creates a new archive file in the specified format.
 
+    Tar archives and compressed files are streamed through :any:`compressed_stream` so
+    compression is done in parallel when a multi-threaded compressor is installed.
+    The archive file is removed if it can't be completely written.
+
     Args:
-        fmt (str): Archive fmt, e.g. 'zip' or 'tgz'.
+        fmt (str): Archive fmt, e.g. 'zip', 'tgz', 'tar.zst', 'gz', or 'zst'.
         dest (str): Path to the archive file that will be created.
         items (list): Items (i.e. files or folders) to add to the archive.
-        cwd (str): Current working directory while creating the archive.
+        cwd (str): Directory that relative paths in `items` are relative to.
+                   Items are stored in the archive with the paths given in `items`.
     """
-    if cwd:
-        oldcwd = os.getcwd()
-        os.chdir(cwd)
+    def source(item):
+        return os.path.join(cwd, item) if cwd else item
     if show_progress:
         LOGGER.info("Writing '%s'...", dest)
         context = ProgressIndicator
     else:
         context = _null_context
+    tar_compression = {'tar': None, 'tgz': 'gz', 'tar.gz': 'gz', 'tar.zst': 'zst'}
     with context(""):
         try:
             if fmt == 'zip':
                 with ZipFile(dest, 'w') as archive:
                     archive.comment = b"Created by TAU Commander"
                     for item in items:
-                        archive.write(item)
-            elif fmt in ('tar', 'tgz', 'tar.bz2'):
-                mode_map = {'tar': 'w', 'tgz': 'w:gz', 'tar.bz2': 'w:bz2'}
-                with tarfile.open(dest, mode_map[fmt]) as archive:
+                        archive.write(source(item), arcname=item)
+            elif fmt == 'tar.bz2':
+                with tarfile.open(dest, 'w:bz2') as archive:
                     for item in items:
-                        archive.add(item)
-            elif fmt == 'gz':
-                with open(items[0], 'rb') as fin, gzip.open(dest, 'wb') as fout:
-                    shutil.copyfileobj(fin, fout)
+                        archive.add(source(item), arcname=item)
+            elif fmt in tar_compression:
+                with open(dest, 'wb') as fout, compressed_stream(fout, tar_compression[fmt]) as stream:
+                    with tarfile.open(fileobj=stream, mode='w|') as archive:
+                        for item in items:
+                            archive.add(source(item), arcname=item)
+            elif fmt in _PARALLEL_COMPRESSORS:
+                with open(source(items[0]), 'rb') as fin, open(dest, 'wb') as fout:
+                    with compressed_stream(fout, fmt) as stream:
+                        shutil.copyfileobj(fin, stream, 16*_READ_CHUNK_SIZE)
             else:
                 raise InternalError("Invalid archive format: %s" % fmt)
-        finally:
-            if cwd:
-                os.chdir(oldcwd)
+        except BaseException:
+            try:
+                os.remove(dest)
+            except OSError:
+                pass
+            raise
 
 
 def path_accessible(path, mode='r'):
@@ -522,13 +967,80 @@ def _null_context(label):
     yield
 
 
+_READ_CHUNK_SIZE = 64*1024
+
+_ERROR_BUF_LINE_BYTES = 512
+
+
+class _OutputTee:
+    """Sends chunks of subprocess output to all requested destinations without splitting lines in Python."""
+
+    def __init__(self, stdout, log, error_buf, record, log_file):
+        if stdout:
+            # Text already printed must appear before the subprocess output
+            sys.stdout.flush()
+            self._stdout = getattr(sys.stdout, 'buffer', None) or sys.stdout
+        else:
+            self._stdout = None
+        # Chunks are split at arbitrary byte offsets so a text stream needs a decoder that holds partial characters
+        if isinstance(self._stdout, io.TextIOBase):
+            self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        else:
+            self._decoder = None
+        self._log = log
+        self._partial = b''
+        self._tail_limit = error_buf * _ERROR_BUF_LINE_BYTES
+        self.tail = bytearray()
+        self.record = record
+        self.log_file = log_file
+
+    def write(self, chunk):
+        if self._stdout:
+            if self._decoder:
+                self._stdout.write(self._decoder.decode(chunk))
+            else:
+                self._stdout.write(chunk)
+            self._stdout.flush()
+        if self.log_file:
+            self.log_file.write(chunk)
+        if self.record:
+            self.record.write(chunk)
+        if self._tail_limit:
+            self.tail += chunk
+            if len(self.tail) > self._tail_limit:
+                del self.tail[:len(self.tail) - self._tail_limit]
+        if self._log:
+            # One log record per chunk of complete lines
+            lines, _, self._partial = (self._partial + chunk).rpartition(b'\n')
+            if lines:
+                LOGGER.debug(lines.decode(errors='replace'))
+
+    def close(self):
+        if self._decoder:
+            text = self._decoder.decode(b'', final=True)
+            if text:
+                self._stdout.write(text)
+                self._stdout.flush()
+        if self._log and self._partial:
+            LOGGER.debug(self._partial.decode(errors='replace'))
+            self._partial = b''
+
+    def tail_lines(self, count):
+        return self.tail.decode(errors='replace').splitlines(True)[-count:]
+
+
 def create_subprocess(
-        cmd, cwd=None, env=None, stdout=True, log=True, show_progress=False, error_buf=50, record_output=False
+        cmd, cwd=None, env=None, stdout=True, log=True, show_progress=False, error_buf=50, record_output=False,
+        log_file=None
 ):
     """Create a subprocess.
 
     See :any:`subprocess.Popen`.
 
+    Output is read in large binary chunks and passed unchanged to each destination, so very chatty
+    subprocesses don't spend most of their time waiting on Python.  Only a bounded tail of the output
+    is kept in memory for error reporting.
+
     Args:
         cmd (list): Command and its command line arguments.
         cwd (str): If not None, change directory to `cwd` before creating the subprocess.
@@ -538,10 +1050,13 @@ def create_subprocess(
         error_buf (int): If non-zero, stdout is not already being sent, and return value is
                           non-zero then send last `error_buf` lines of subprocess stdout and stderr
                           to this processes' stdout.
-        record_output (bool): If True return output.
+        record_output: If True return output as a list of lines.  If a path or binary file object
+                       then stream output to that file instead of keeping it in memory.
+        log_file: Path or binary file object that will receive a raw copy of the output.
 
     Returns:
-        int: Subprocess return code.
+        int: Subprocess return code.  If `record_output` is set then a (return code, output) tuple
+             is returned where output is a list of lines or the file `record_output`.
     """
     subproc_env = dict(os.environ)
     if env:
@@ -553,33 +1068,43 @@ def create_subprocess(
                 subproc_env[key] = val
                 _heavy_debug("%s=%s", key, val)
     LOGGER.debug("Creating subprocess: cmd=%s, cwd='%s'\n", cmd, cwd)
+    # Subprocesses can be very chatty so check the log level once instead of once per chunk
+    log = log and LOGGER.isEnabledFor(logging.DEBUG)
     context = ProgressIndicator if show_progress else _null_context
-    with context(""):
-        if error_buf:
-            buf = deque(maxlen=error_buf)
-        output = []
-        proc = subprocess.Popen(cmd, cwd=cwd, env=subproc_env, universal_newlines=True,
-                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1)
-        with proc.stdout:
-            # Use iter to avoid hidden read-ahead buffer bug in named pipes:
-            # http://bugs.python.org/issue3907
-            for line in iter(proc.stdout.readline, ''):
-                if log:
-                    LOGGER.debug(line[:-1])
-                if stdout:
-                    print(line, end='')
-                if error_buf:
-                    buf.append(line)
-                if record_output:
-                    output.append(line)
-        proc.wait()
-    retval = proc.returncode
-    LOGGER.debug("%s returned %d", cmd, retval)
-    if retval and error_buf and not stdout:
-        for line in buf:
-            print(line, end='')
+    with ExitStack() as files:
+        if record_output is True:
+            record = files.enter_context(tempfile.SpooledTemporaryFile(max_size=16*1024*1024))
+        elif record_output:
+            if hasattr(record_output, 'write'):
+                record = record_output
+            else:
+                record = files.enter_context(open(record_output, 'wb'))
+        else:
+            record = None
+        if log_file and not hasattr(log_file, 'write'):
+            log_file = files.enter_context(open(log_file, 'ab'))
+        tee = _OutputTee(stdout, log, error_buf, record, log_file)
+        with context(""):
+            with timing.span('subprocess spawn'):
+                proc = subprocess.Popen(cmd, cwd=cwd, env=subproc_env, bufsize=0,
+                                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            with timing.span('subprocess wait'):
+                with proc.stdout:
+                    fd = proc.stdout.fileno()
+                    for chunk in iter(lambda: os.read(fd, _READ_CHUNK_SIZE), b''):
+                        tee.write(chunk)
+                tee.close()
+                proc.wait()
+        retval = proc.returncode
+        LOGGER.debug("%s returned %d", cmd, retval)
+        if retval and error_buf and not stdout:
+            for line in tee.tail_lines(error_buf):
+                print(line, end='')
+        if record_output is True:
+            record.seek(0)
+            return retval, io.StringIO(record.read().decode(errors='replace'), newline=None).readlines()
     if record_output:
-        return retval, output
+        return retval, record_output
     return retval
 
 
@@ -608,7 +1133,8 @@ def get_command_output(cmd):
     else:
         _heavy_debug("Using cached output for command: %s", cmd)
     LOGGER.debug("Checking subprocess output: %s", cmd)
-    stdout = subprocess.check_output(cmd, stderr=subprocess.STDOUT, universal_newlines=True)
+    with timing.span('subprocess output'):
+        stdout = subprocess.check_output(cmd, stderr=subprocess.STDOUT, universal_newlines=True)
     get_command_output.cache[key] = stdout
     _heavy_debug(stdout)
     LOGGER.debug("%s returned 0", cmd)
@@ -631,7 +1157,7 @@ def page_output(output_string: str):
     else:
         pager_cmd = os.environ.get('PAGER', 'less -F -R -S -X -K').split(' ')
         proc = subprocess.Popen(pager_cmd, stdin=subprocess.PIPE)
-        proc.communicate(output_string)
+        proc.communicate(output_string.encode())
 
 
 def human_size(num, suffix='B'):
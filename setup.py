@@ -622,6 +622,7 @@ setuptools.setup(
     scripts=['scripts/tau', 'scripts/system_configure'],
     zip_safe=False,
     data_files=_data_files(),
+    install_requires=['numpy>=1.17'],
     # Testing
     test_suite='taucmdr',
     tests_require=['backports.functools_lru_cache'],